@@ -2,6 +2,7 @@
 Advanced AI Design Engine
 Industry-leading AI capabilities that differentiate from competitors like Canva and Figma
 """
+import asyncio
 import logging
 import json
 from typing import Dict, List, Any, Optional
@@ -10,6 +11,8 @@ from enum import Enum
 from django.conf import settings
 from celery import shared_task
 
+from .stage_executor import Stage, StageExecutor, StageFailed
+
 logger = logging.getLogger(__name__)
 
 
@@ -68,10 +71,25 @@ class AdvancedAIEngine:
     7. Multi-variant generation
     """
     
+    # Per-stage timeouts in seconds (None = no limit)
+    STAGE_TIMEOUTS = {
+        'layout': 45,
+        'colors': 10,
+        'typography': 10,
+        'variant': 15,
+    }
+    
     def __init__(self):
         self.openai_api_key = getattr(settings, 'OPENAI_API_KEY', None)
         self.groq_api_key = getattr(settings, 'GROQ_API_KEY', None)
         self.anthropic_api_key = getattr(settings, 'ANTHROPIC_API_KEY', None)
+        self.stage_timeouts = {
+            **self.STAGE_TIMEOUTS,
+            **getattr(settings, 'AI_STAGE_TIMEOUTS', {}),
+        }
+        self.executor = StageExecutor(
+            provider_limits=getattr(settings, 'AI_PROVIDER_CONCURRENCY', {}),
+        )
     
     async def generate_design(
         self,
@@ -89,27 +107,46 @@ class AdvancedAIEngine:
         # Build comprehensive system prompt
         system_prompt = self._build_system_prompt(context)
         
-        # Generate design layout
-        layout = await self._generate_layout(system_prompt, context)
-        
-        # Generate color scheme based on brand or context
-        colors = await self._generate_color_scheme(context)
-        
-        # Generate typography recommendations
-        typography = await self._generate_typography(context)
-        
-        # Generate multiple variants
-        variants = []
-        for i in range(num_variants):
+        async def build_variant(index, layout, colors, typography):
             variant = await self._generate_variant(
-                layout, colors, typography, context, variant_index=i
+                layout, colors, typography, context, variant_index=index
             )
-            
             if include_accessibility:
                 variant = self._ensure_accessibility(variant)
-            
-            variants.append(variant)
-        
+            return variant
+        
+        # Layout, color scheme and typography are independent; every
+        # variant needs all three.  Stages run as soon as their inputs are
+        # ready, so the whole run takes about as long as the slowest path.
+        base_deps = ('layout', 'colors', 'typography')
+        stages = [
+            Stage('layout', lambda: self._generate_layout(system_prompt, context),
+                  provider='openai', timeout=self.stage_timeouts.get('layout'),
+                  fallback=lambda: self._get_default_layout(context.design_type)),
+            Stage('colors', lambda: self._generate_color_scheme(context),
+                  timeout=self.stage_timeouts.get('colors')),
+            Stage('typography', lambda: self._generate_typography(context),
+                  timeout=self.stage_timeouts.get('typography')),
+        ]
+        for i in range(num_variants):
+            stages.append(Stage(
+                f'variant_{i}',
+                lambda layout, colors, typography, i=i: build_variant(i, layout, colors, typography),
+                deps=base_deps,
+                timeout=self.stage_timeouts.get('variant'),
+                required=False,
+            ))
+        
+        run = await self.executor.run(stages)
+        
+        # Variants that failed or timed out are left out of the result
+        variant_names = [f'variant_{i}' for i in range(num_variants)]
+        variants = [run.results[name] for name in variant_names if name in run.results]
+        if not variants:
+            raise StageFailed(f"No design variants could be generated: {run.errors}")
+        
+        colors = run.results['colors']
+        typography = run.results['typography']
         return {
             "primary": variants[0],
             "variants": variants[1:],
@@ -118,7 +155,10 @@ class AdvancedAIEngine:
                 "type": context.design_type.value,
                 "colors": colors,
                 "typography": typography,
-                "accessibility_score": self._calculate_accessibility_score(variants[0])
+                "accessibility_score": self._calculate_accessibility_score(variants[0]),
+                "partial": run.partial,
+                "stage_errors": run.errors,
+                "stage_timings": run.timings,
             }
         }
     
@@ -185,7 +225,9 @@ Return a JSON object with:
             
             client = openai.OpenAI(api_key=self.openai_api_key)
             
-            response = client.chat.completions.create(
+            # The SDK call blocks; run it in a thread so other stages proceed
+            response = await asyncio.to_thread(
+                client.chat.completions.create,
                 model="gpt-4",
                 messages=[
                     {"role": "system", "content": "You are an expert design system architect."},
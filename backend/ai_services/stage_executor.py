@@ -0,0 +1,132 @@
+"""
+Dependency-aware concurrent executor for multi-stage AI generation.
+
+A generation is a small DAG of stages (layout, colors, typography, then
+one stage per variant).  Every stage starts as soon as the stages it
+depends on have finished, so independent provider calls overlap and the
+whole run takes roughly as long as its critical path.
+
+Each stage may name a provider; calls to the same provider share a
+semaphore (per event loop) limiting how many run at once.  Stages can
+have a timeout and a fallback, and optional stages may fail without
+failing the run.
+"""
+import asyncio
+import logging
+import time
+import weakref
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROVIDER_CONCURRENCY = 4
+
+
+class StageFailed(Exception):
+    """Raised when a required stage fails and has no fallback."""
+
+
+@dataclass
+class Stage:
+    """
+    One unit of work.  ``func`` is called with the results of ``deps``
+    as keyword arguments and must return an awaitable.
+    """
+    name: str
+    func: Callable[..., Awaitable[Any]]
+    deps: Tuple[str, ...] = ()
+    provider: Optional[str] = None
+    timeout: Optional[float] = None
+    required: bool = True
+    fallback: Optional[Callable[[], Any]] = None
+
+
+@dataclass
+class StageRun:
+    """Outcome of an executor run."""
+    results: Dict[str, Any] = field(default_factory=dict)
+    errors: Dict[str, str] = field(default_factory=dict)
+    timings: Dict[str, float] = field(default_factory=dict)
+
+    @property
+    def partial(self) -> bool:
+        return bool(self.errors)
+
+
+class StageExecutor:
+    """Run a list of stages concurrently, honouring their dependencies."""
+
+    # event loop -> provider -> semaphore; asyncio primitives are bound
+    # to the loop they are first used on.
+    _semaphores: 'weakref.WeakKeyDictionary' = weakref.WeakKeyDictionary()
+
+    def __init__(self, provider_limits: Optional[Dict[str, int]] = None,
+                 default_limit: int = DEFAULT_PROVIDER_CONCURRENCY):
+        self.provider_limits = provider_limits or {}
+        self.default_limit = default_limit
+
+    def _semaphore(self, provider: str) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        per_loop = self._semaphores.setdefault(loop, {})
+        semaphore = per_loop.get(provider)
+        if semaphore is None:
+            limit = self.provider_limits.get(provider, self.default_limit)
+            semaphore = per_loop[provider] = asyncio.Semaphore(limit)
+        return semaphore
+
+    async def run(self, stages: List[Stage]) -> StageRun:
+        by_name = {stage.name: stage for stage in stages}
+        for stage in stages:
+            missing = [dep for dep in stage.deps if dep not in by_name]
+            if missing:
+                raise ValueError(f"Stage {stage.name!r} depends on unknown stages {missing}")
+
+        outcome = StageRun()
+        tasks: Dict[str, asyncio.Task] = {}
+
+        async def execute(stage: Stage):
+            # Await dependencies; a failed dependency fails this stage too.
+            kwargs = {}
+            for dep in stage.deps:
+                await tasks[dep]
+                if dep not in outcome.results:
+                    return self._fail(outcome, stage, f'dependency {dep!r} failed')
+                kwargs[dep] = outcome.results[dep]
+
+            started = time.perf_counter()
+            try:
+                if stage.provider:
+                    async with self._semaphore(stage.provider):
+                        result = await asyncio.wait_for(stage.func(**kwargs), stage.timeout)
+                else:
+                    result = await asyncio.wait_for(stage.func(**kwargs), stage.timeout)
+            except asyncio.TimeoutError:
+                return self._fail(outcome, stage, f'timed out after {stage.timeout}s')
+            except Exception as e:
+                logger.exception(f"Stage {stage.name} failed")
+                return self._fail(outcome, stage, str(e))
+            finally:
+                outcome.timings[stage.name] = round(time.perf_counter() - started, 4)
+            outcome.results[stage.name] = result
+
+        for stage in stages:
+            tasks[stage.name] = asyncio.create_task(execute(stage))
+        await asyncio.gather(*tasks.values())
+
+        failed = [
+            name for name, error in outcome.errors.items()
+            if by_name[name].required and name not in outcome.results
+        ]
+        if failed:
+            raise StageFailed(f"Required stages failed: {', '.join(failed)} ({outcome.errors})")
+        return outcome
+
+    @staticmethod
+    def _fail(outcome: StageRun, stage: Stage, reason: str):
+        outcome.errors[stage.name] = reason
+        if stage.fallback is not None:
+            logger.warning(f"Stage {stage.name} {reason}; using fallback")
+            outcome.results[stage.name] = stage.fallback()
+        else:
+            logger.warning(f"Stage {stage.name} {reason}")
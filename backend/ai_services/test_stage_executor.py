@@ -0,0 +1,109 @@
+"""
+Unit tests for concurrent AI generation stages.
+"""
+import asyncio
+import time
+
+import pytest
+
+from ai_services.advanced_ai_engine import (
+    AdvancedAIEngine, AIDesignStyle, AIDesignType, DesignContext,
+)
+from ai_services.stage_executor import Stage, StageExecutor, StageFailed
+
+LATENCY = 0.2
+
+
+class SlowProviderEngine(AdvancedAIEngine):
+    """Engine whose provider-backed stages sleep instead of calling out."""
+
+    def __init__(self, variant_delays=None):
+        super().__init__()
+        self.variant_delays = variant_delays or {}
+
+    async def _generate_layout(self, system_prompt, context):
+        await asyncio.sleep(LATENCY)
+        return self._get_default_layout(context.design_type)
+
+    async def _generate_color_scheme(self, context):
+        await asyncio.sleep(LATENCY)
+        return await super()._generate_color_scheme(context)
+
+    async def _generate_typography(self, context):
+        await asyncio.sleep(LATENCY)
+        return await super()._generate_typography(context)
+
+    async def _generate_variant(self, layout, colors, typography, context, variant_index):
+        await asyncio.sleep(self.variant_delays.get(variant_index, LATENCY))
+        return await super()._generate_variant(layout, colors, typography, context, variant_index)
+
+
+def make_context():
+    return DesignContext(
+        prompt='Launch page', style=AIDesignStyle.MODERN, design_type=AIDesignType.WEBSITE,
+    )
+
+
+@pytest.mark.unit
+class TestConcurrentGeneration:
+    """Tests for the stage DAG behind AdvancedAIEngine.generate_design."""
+
+    def test_latency_is_critical_path(self):
+        engine = SlowProviderEngine()
+        started = time.perf_counter()
+        result = asyncio.run(engine.generate_design(make_context(), num_variants=3))
+        elapsed = time.perf_counter() - started
+
+        # Sequentially this is 6 * LATENCY; the critical path is 2 stages.
+        assert elapsed < 3 * LATENCY
+        assert len(result['variants']) == 2
+        assert result['metadata']['partial'] is False
+
+    def test_variant_timeout_returns_partial_result(self):
+        engine = SlowProviderEngine(variant_delays={1: 5})
+        engine.stage_timeouts['variant'] = 2 * LATENCY
+        result = asyncio.run(engine.generate_design(make_context(), num_variants=3))
+
+        assert result['primary']['id'] == 'variant_0'
+        assert [v['id'] for v in result['variants']] == ['variant_2']
+        assert result['metadata']['partial'] is True
+        assert 'timed out' in result['metadata']['stage_errors']['variant_1']
+
+
+@pytest.mark.unit
+class TestStageExecutor:
+
+    def test_provider_semaphore_limits_concurrency(self):
+        active, peak = 0, 0
+
+        async def call():
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+            return True
+
+        executor = StageExecutor(provider_limits={'openai': 2})
+        stages = [Stage(f's{i}', call, provider='openai') for i in range(6)]
+        run = asyncio.run(executor.run(stages))
+        assert len(run.results) == 6
+        assert peak == 2
+
+    def test_required_stage_failure_uses_fallback_or_raises(self):
+        async def boom():
+            raise RuntimeError('provider down')
+
+        async def child(base):
+            return base + 1
+
+        executor = StageExecutor()
+        run = asyncio.run(executor.run([
+            Stage('base', boom, fallback=lambda: 1),
+            Stage('child', child, deps=('base',)),
+        ]))
+        assert run.results['child'] == 2
+        assert run.errors == {'base': 'provider down'}
+
+        with pytest.raises(StageFailed):
+            asyncio.run(executor.run([Stage('base', boom), Stage('child', child, deps=('base',))]))
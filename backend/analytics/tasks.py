@@ -9,61 +9,111 @@ import logging
 logger = logging.getLogger('analytics')
 
 
+ROLLUP_CHUNK_SIZE = 1000
+ROLLUP_CURSOR_TTL = 24 * 3600
+
+
+def _resumable_chunks(queryset, cursor_key, chunk_size):
+    """
+    Yield primary keys of ``queryset`` in ascending chunks.  The last
+    finished chunk is remembered in the cache, so a run that dies part
+    way resumes after it instead of starting over.
+    """
+    from django.core.cache import cache
+
+    last_pk = cache.get(cursor_key, 0)
+    while True:
+        pks = list(
+            queryset.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:chunk_size]
+        )
+        if not pks:
+            break
+        yield pks
+        last_pk = pks[-1]
+        cache.set(cursor_key, last_pk, ROLLUP_CURSOR_TTL)
+    cache.delete(cursor_key)
+
+
 @shared_task(bind=True)
-def generate_daily_analytics(self):
+def generate_daily_analytics(self, chunk_size=None):
     """Generate daily analytics for all users"""
     try:
         from analytics.models import DailyUsageStats, AIUsageMetrics
+        from django.conf import settings
         from django.contrib.auth.models import User
+        from django.db import transaction
         from projects.models import Project
-        from django.db.models import Sum, Count
+        from django.db.models import Sum, Count, Q
         
+        chunk_size = chunk_size or getattr(settings, 'ANALYTICS_ROLLUP_CHUNK_SIZE', ROLLUP_CHUNK_SIZE)
         yesterday = (timezone.now() - timedelta(days=1)).date()
         yesterday_start = timezone.make_aware(timezone.datetime.combine(yesterday, timezone.datetime.min.time()))
         yesterday_end = timezone.make_aware(timezone.datetime.combine(yesterday, timezone.datetime.max.time()))
+        created_q = Q(created_at__gte=yesterday_start, created_at__lte=yesterday_end)
+        edited_q = Q(updated_at__gte=yesterday_start, updated_at__lte=yesterday_end)
         
         stats_created = 0
         
-        # Generate stats for all active users
-        for user in User.objects.filter(is_active=True):
-            # Check if stats already exist
-            if DailyUsageStats.objects.filter(user=user, date=yesterday).exists():
+        # Generate stats for all active users, one chunk of users at a time
+        chunks = _resumable_chunks(
+            User.objects.filter(is_active=True),
+            f'analytics:daily_rollup:{yesterday.isoformat()}',
+            chunk_size,
+        )
+        for user_ids in chunks:
+            # Skip users whose stats already exist
+            existing = set(DailyUsageStats.objects.filter(
+                user_id__in=user_ids, date=yesterday
+            ).values_list('user_id', flat=True))
+            pending = [uid for uid in user_ids if uid not in existing]
+            if not pending:
                 continue
             
-            # Calculate metrics for yesterday
-            projects_created = Project.objects.filter(
-                user=user,
-                created_at__gte=yesterday_start,
-                created_at__lte=yesterday_end
-            ).count()
-            
-            projects_edited = Project.objects.filter(
-                user=user,
-                updated_at__gte=yesterday_start,
-                updated_at__lte=yesterday_end
-            ).count()
+            # Calculate metrics for yesterday, grouped by user
+            project_counts = {
+                row['user_id']: row
+                for row in Project.objects.filter(user_id__in=pending).filter(created_q | edited_q)
+                .values('user_id')
+                .annotate(
+                    created=Count('id', filter=created_q),
+                    edited=Count('id', filter=edited_q),
+                )
+            }
             
-            ai_usage = AIUsageMetrics.objects.filter(
-                user=user,
-                timestamp__gte=yesterday_start,
-                timestamp__lte=yesterday_end
-            ).aggregate(
-                count=Count('id'),
-                tokens=Sum('tokens_used'),
-                cost=Sum('estimated_cost')
-            )
+            ai_usage = {
+                row['user_id']: row
+                for row in AIUsageMetrics.objects.filter(
+                    user_id__in=pending,
+                    timestamp__gte=yesterday_start,
+                    timestamp__lte=yesterday_end
+                ).values('user_id').annotate(
+                    count=Count('id'),
+                    tokens=Sum('tokens_used'),
+                    cost=Sum('estimated_cost')
+                )
+            }
             
             # Create daily stats
-            DailyUsageStats.objects.create(
-                user=user,
-                date=yesterday,
-                projects_created=projects_created,
-                projects_edited=projects_edited,
-                ai_generations_count=ai_usage['count'] or 0,
-                ai_tokens_used=ai_usage['tokens'] or 0,
-                ai_cost=ai_usage['cost'] or 0,
-            )
-            stats_created += 1
+            stats = []
+            for uid in pending:
+                projects = project_counts.get(uid, {})
+                ai = ai_usage.get(uid, {})
+                stats.append(DailyUsageStats(
+                    user_id=uid,
+                    date=yesterday,
+                    projects_created=projects.get('created', 0),
+                    projects_edited=projects.get('edited', 0),
+                    ai_generations_count=ai.get('count') or 0,
+                    ai_tokens_used=ai.get('tokens') or 0,
+                    ai_cost=ai.get('cost') or 0,
+                ))
+            # Count what was inserted; rows another run added meanwhile
+            # are skipped by ignore_conflicts
+            written = DailyUsageStats.objects.filter(user_id__in=pending, date=yesterday)
+            with transaction.atomic():
+                before = written.count()
+                DailyUsageStats.objects.bulk_create(stats, ignore_conflicts=True)
+                stats_created += written.count() - before
         
         logger.info(f'Generated daily analytics for {stats_created} users')
         return {'status': 'success', 'stats_created': stats_created}
@@ -74,24 +124,64 @@ def generate_daily_analytics(self):
 
 
 @shared_task(bind=True)
-def aggregate_project_analytics(self):
+def aggregate_project_analytics(self, chunk_size=None):
     """Update aggregated analytics for all projects"""
     try:
         from analytics.models import ProjectAnalytics
-        from projects.models import Project
+        from django.conf import settings
+        from django.db import transaction
+        from django.db.models import Count, Q
+        from projects.models import DesignComponent, Project
         
+        chunk_size = chunk_size or getattr(settings, 'ANALYTICS_ROLLUP_CHUNK_SIZE', ROLLUP_CHUNK_SIZE)
+        Collaborator = Project.collaborators.through
         updated_count = 0
         
-        for project in Project.objects.all():
-            analytics, created = ProjectAnalytics.objects.get_or_create(project=project)
+        chunks = _resumable_chunks(
+            Project.objects.all(),
+            f'analytics:project_rollup:{timezone.now().date().isoformat()}',
+            chunk_size,
+        )
+        for project_ids in chunks:
+            # Component and collaborator counts, grouped by project
+            components = {
+                row['project_id']: row
+                for row in DesignComponent.objects.filter(project_id__in=project_ids)
+                .values('project_id')
+                .annotate(total=Count('id'), ai=Count('id', filter=Q(ai_generated=True)))
+            }
+            collaborators = dict(
+                Collaborator.objects.filter(project_id__in=project_ids)
+                .values('project_id')
+                .annotate(total=Count('id'))
+                .values_list('project_id', 'total')
+            )
             
-            # Update component counts
-            analytics.total_components = project.components.count()
-            analytics.ai_generated_components = project.components.filter(ai_generated=True).count()
-            analytics.total_collaborators = project.collaborators.count()
+            existing = ProjectAnalytics.objects.in_bulk(project_ids, field_name='project_id')
+            now = timezone.now()
+            to_create, to_update = [], []
+            for project_id in project_ids:
+                analytics = existing.get(project_id)
+                if analytics is None:
+                    analytics = ProjectAnalytics(project_id=project_id)
+                    to_create.append(analytics)
+                else:
+                    to_update.append(analytics)
+                
+                # Update component counts
+                counts = components.get(project_id, {})
+                analytics.total_components = counts.get('total', 0)
+                analytics.ai_generated_components = counts.get('ai', 0)
+                analytics.total_collaborators = collaborators.get(project_id, 0)
+                analytics.updated_at = now
             
-            analytics.save()
-            updated_count += 1
+            with transaction.atomic():
+                ProjectAnalytics.objects.bulk_create(to_create)
+                ProjectAnalytics.objects.bulk_update(to_update, [
+                    'total_components', 'ai_generated_components',
+                    'total_collaborators', 'updated_at',
+                ])
+            updated_count += len(project_ids)
         
         logger.info(f'Updated analytics for {updated_count} projects')
         return {'status': 'success', 'updated': updated_count}
@@ -165,3 +165,108 @@ class TestAnalyticsAPI:
     def test_analytics_unauthenticated(self, api_client, db):
         response = api_client.get('/api/v1/analytics/dashboard/')
         assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+def seed_rollup_data(count, prefix):
+    """Users with one project each created yesterday, plus AI usage."""
+    from datetime import timedelta
+    from django.contrib.auth.models import User
+    from django.utils import timezone
+    from projects.models import DesignComponent
+
+    yesterday = timezone.now() - timedelta(days=1)
+    users = []
+    for i in range(count):
+        u = User.objects.create_user(username=f'{prefix}{i}', password='x')
+        p = Project.objects.create(user=u, name=f'{prefix}{i}')
+        Project.objects.filter(pk=p.pk).update(created_at=yesterday, updated_at=yesterday)
+        DesignComponent.objects.create(project=p, component_type='text', ai_generated=True)
+        DesignComponent.objects.create(project=p, component_type='shape')
+        AIUsageMetrics.objects.create(
+            user=u, service_type='color_palette', tokens_used=100,
+            estimated_cost=0.01, model_used='gpt-4', request_duration_ms=10,
+        )
+        AIUsageMetrics.objects.filter(user=u).update(timestamp=yesterday)
+        users.append(u)
+    return users
+
+
+def stats_date():
+    from datetime import timedelta
+    from django.utils import timezone
+    return (timezone.now() - timedelta(days=1)).date()
+
+
+@pytest.mark.unit
+class TestAnalyticsRollups:
+    """Tests for the set-based nightly rollup tasks."""
+
+    def test_daily_rollup_values(self, db):
+        from analytics.models import DailyUsageStats
+        from analytics.tasks import generate_daily_analytics
+
+        users = seed_rollup_data(3, 'daily')
+        result = generate_daily_analytics.apply(kwargs={'chunk_size': 2}).get()
+
+        assert result == {'status': 'success', 'stats_created': 3}
+        stats = DailyUsageStats.objects.get(user=users[0], date=stats_date())
+        assert (stats.projects_created, stats.projects_edited) == (1, 1)
+        assert (stats.ai_generations_count, stats.ai_tokens_used) == (1, 100)
+        # Re-running skips users that already have stats.
+        assert generate_daily_analytics.apply().get()['stats_created'] == 0
+
+    def test_query_count_independent_of_users(self, db):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from analytics.tasks import aggregate_project_analytics, generate_daily_analytics
+
+        counts = []
+        for size, prefix in ((2, 'small'), (8, 'large')):
+            seed_rollup_data(size, prefix)
+            with CaptureQueriesContext(connection) as ctx:
+                generate_daily_analytics.apply().get()
+                aggregate_project_analytics.apply().get()
+            counts.append(len(ctx.captured_queries))
+        assert counts[0] == counts[1]
+
+    def test_project_rollup_updates_existing(self, project, user2):
+        from analytics.tasks import aggregate_project_analytics
+
+        project.components.create(component_type='text', ai_generated=True)
+        project.collaborators.add(user2)
+        # Signals already created the analytics row.
+        ProjectAnalytics.objects.filter(project=project).update(view_count=7, total_components=0)
+        aggregate_project_analytics.apply().get()
+
+        analytics = ProjectAnalytics.objects.get(project=project)
+        assert analytics.view_count == 7
+        assert (analytics.total_components, analytics.ai_generated_components) == (1, 1)
+        assert analytics.total_collaborators == 1
+
+    def test_daily_rollup_resumes_after_cursor(self, db):
+        from django.core.cache import cache
+        from analytics.models import DailyUsageStats
+        from analytics.tasks import generate_daily_analytics
+
+        users = seed_rollup_data(3, 'resume')
+        cursor_key = f'analytics:daily_rollup:{stats_date().isoformat()}'
+        cache.set(cursor_key, users[1].pk)
+
+        generate_daily_analytics.apply().get()
+        stats = DailyUsageStats.objects.filter(date=stats_date())
+        assert list(stats.values_list('user_id', flat=True)) == [users[2].pk]
+        assert cache.get(cursor_key) is None
+
+    def test_project_rollup_ignores_other_days_cursor(self, project):
+        from datetime import timedelta
+        from django.core.cache import cache
+        from django.utils import timezone
+        from analytics.tasks import aggregate_project_analytics
+
+        stale_key = f'analytics:project_rollup:{(timezone.now() - timedelta(days=1)).date().isoformat()}'
+        cache.set(stale_key, project.pk)
+        project.components.create(component_type='text')
+
+        assert aggregate_project_analytics.apply().get()['updated'] == 1
+        assert ProjectAnalytics.objects.get(project=project).total_components == 1
+        cache.delete(stale_key)
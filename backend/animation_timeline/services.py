@@ -1,15 +1,96 @@
 """
 Services for Animation Timeline app.
 """
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 from django.db import transaction
+from django.db.models import Prefetch
 
+from .interpolation import CompiledTracks, compile_tracks
 from .models import (
     AnimationProject, AnimationComposition, AnimationLayer,
-    AnimationTrack, AnimationKeyframe, LottieExport
+    AnimationTrack, AnimationKeyframe, AnimationEffect, LottieExport
 )
 
 
+class CompositionTimeline:
+    """
+    A composition's layers with their tracks, keyframes and effects,
+    loaded in one pass (four queries however many layers there are) and
+    indexed in memory.  The timeline API and the Lottie exporter read
+    from it instead of querying per layer, track and property.
+    """
+    
+    def __init__(
+        self,
+        composition: AnimationComposition,
+        start_time: Optional[float] = None,
+        end_time: Optional[float] = None,
+        include_tracks: bool = True,
+    ):
+        self.composition = composition
+        
+        keyframes = AnimationKeyframe.objects.order_by('time')
+        if start_time is not None:
+            keyframes = keyframes.filter(time__gte=start_time)
+        if end_time is not None:
+            keyframes = keyframes.filter(time__lte=end_time)
+        
+        prefetches = [Prefetch('effects', queryset=AnimationEffect.objects.order_by('order'))]
+        if include_tracks:
+            prefetches.append(Prefetch(
+                'tracks',
+                queryset=AnimationTrack.objects.prefetch_related(Prefetch('keyframes', queryset=keyframes)),
+            ))
+        
+        self.layers: List[AnimationLayer] = list(
+            composition.layers.order_by('order').prefetch_related(*prefetches)
+        )
+        self.layers_by_id = {layer.id: layer for layer in self.layers}
+        
+        # (layer id, property) -> track; a property is a track's
+        # property_path, or its property_type when it has no path
+        self.tracks: Dict[tuple, AnimationTrack] = {}
+        if include_tracks:
+            for layer in self.layers:
+                for track in layer.tracks.all():
+                    self.tracks.setdefault((layer.id, track_property(track)), track)
+    
+    def get_track(self, layer: AnimationLayer, property_name: str) -> Optional[AnimationTrack]:
+        return self.tracks.get((layer.id, property_name))
+    
+    def get_parent(self, layer: AnimationLayer) -> Optional[AnimationLayer]:
+        return self.layers_by_id.get(layer.parent_layer_id)
+    
+    def compile_tracks(self) -> CompiledTracks:
+        """Enabled tracks of every layer, compiled for frame sampling."""
+        return compile_tracks(
+            track for layer in self.layers for track in layer.tracks.all() if track.enabled
+        )
+
+
+def track_property(track: AnimationTrack) -> str:
+    """Name a track's property is addressed by."""
+    return track.property_path or track.property_type
+
+
+def layer_transform(layer: AnimationLayer) -> Dict[str, Any]:
+    """Static 2D transform of a layer."""
+    return {
+        'position': [layer.position_x, layer.position_y],
+        'anchor': [layer.anchor_x, layer.anchor_y],
+        'scale': [layer.scale_x, layer.scale_y],
+        'rotation': layer.rotation,
+        'opacity': layer.opacity,
+    }
+
+
+def keyframe_bezier(keyframe: AnimationKeyframe) -> Optional[List[float]]:
+    """Out and in handles ``[ox, oy, ix, iy]`` of a bezier keyframe."""
+    if keyframe.interpolation != AnimationKeyframe.INTERPOLATION_BEZIER:
+        return None
+    return [keyframe.handle_out_x, keyframe.handle_out_y, keyframe.handle_in_x, keyframe.handle_in_y]
+
+
 class AnimationTimelineService:
     """
     Service for animation timeline operations.
@@ -26,65 +107,71 @@ class AnimationTimelineService:
         include_keyframes: bool = True,
     ) -> Dict[str, Any]:
         """Get timeline data for a composition."""
+        frame_rate = composition.get_frame_rate()
         if end_frame is None:
-            end_frame = composition.duration_frames
+            end_frame = composition.get_total_frames()
         
+        timeline = CompositionTimeline(
+            composition,
+            start_time=start_frame / frame_rate,
+            end_time=end_frame / frame_rate,
+            include_tracks=include_keyframes,
+        )
         layers_data = []
         
-        for layer in composition.layers.filter(is_shy=False).order_by('order'):
+        for layer in timeline.layers:
+            if layer.shy:
+                continue
             layer_data = {
                 'id': str(layer.id),
                 'name': layer.name,
                 'type': layer.layer_type,
                 'in_point': layer.in_point,
                 'out_point': layer.out_point,
-                'is_visible': layer.is_visible,
-                'is_locked': layer.is_locked,
-                'is_solo': layer.is_solo,
-                'color': layer.color,
-                'transform': layer.transform,
+                'is_visible': layer.visible,
+                'is_locked': layer.locked,
+                'is_solo': layer.solo,
+                'color': layer.color_label,
+                'transform': layer_transform(layer),
                 'opacity': layer.opacity,
                 'blend_mode': layer.blend_mode,
             }
             
             if include_keyframes:
                 tracks_data = []
-                for track in layer.tracks.filter(is_muted=False):
-                    keyframes = track.keyframes.filter(
-                        frame_number__gte=start_frame,
-                        frame_number__lte=end_frame
-                    ).order_by('frame_number')
-                    
+                for track in layer.tracks.all():
+                    if not track.enabled:
+                        continue
                     tracks_data.append({
                         'id': str(track.id),
-                        'property': track.property_path,
+                        'property': track_property(track),
                         'type': track.property_type,
                         'color': track.color,
                         'keyframes': [
                             {
                                 'id': str(kf.id),
-                                'frame': kf.frame_number,
+                                'frame': round(kf.time * frame_rate),
                                 'value': kf.value,
                                 'interpolation': kf.interpolation,
-                                'bezier': kf.bezier_control_points,
+                                'bezier': keyframe_bezier(kf),
                             }
-                            for kf in keyframes
+                            for kf in track.keyframes.all()
                         ]
                     })
                 
                 layer_data['tracks'] = tracks_data
             
             # Add effects
-            effects_data = []
-            for effect in layer.effects.filter(is_enabled=True).order_by('order'):
-                effects_data.append({
+            layer_data['effects'] = [
+                {
                     'id': str(effect.id),
                     'type': effect.effect_type,
+                    'name': effect.name,
                     'parameters': effect.parameters,
-                    'start_frame': effect.start_frame,
-                    'end_frame': effect.end_frame,
-                })
-            layer_data['effects'] = effects_data
+                }
+                for effect in layer.effects.all()
+                if effect.enabled
+            ]
             
             layers_data.append(layer_data)
         
@@ -94,8 +181,8 @@ class AnimationTimelineService:
                 'name': composition.name,
                 'width': composition.width,
                 'height': composition.height,
-                'frame_rate': composition.frame_rate,
-                'duration': composition.duration_frames,
+                'frame_rate': frame_rate,
+                'duration': composition.get_total_frames(),
                 'background': composition.background_color,
             },
             'layers': layers_data,
@@ -215,7 +302,6 @@ class AnimationTimelineService:
         
         # Duplicate effects
         for effect in layer.effects.all():
-            from .models import AnimationEffect
             AnimationEffect.objects.create(
                 layer=new_layer,
                 effect_type=effect.effect_type,
@@ -271,11 +357,13 @@ class LottieExporter:
     
     def generate_lottie_json(self) -> Dict[str, Any]:
         """Generate Lottie JSON data."""
+        self.frame_rate = self.composition.get_frame_rate()
+        self.timeline = CompositionTimeline(self.composition)
         lottie = {
             'v': '5.7.1',  # Lottie version
-            'fr': self.composition.frame_rate,
+            'fr': self.frame_rate,
             'ip': 0,
-            'op': self.composition.duration_frames,
+            'op': self.composition.get_total_frames(),
             'w': self.composition.width,
             'h': self.composition.height,
             'nm': self.composition.name,
@@ -284,10 +372,10 @@ class LottieExporter:
             'layers': [],
         }
         
-        # Convert layers
-        for layer in self.composition.layers.filter(is_visible=True).order_by('-order'):
-            lottie_layer = self._convert_layer(layer)
-            lottie['layers'].append(lottie_layer)
+        # Convert layers, topmost first
+        for layer in reversed(self.timeline.layers):
+            if layer.visible:
+                lottie['layers'].append(self._convert_layer(layer))
         
         return lottie
     
@@ -298,9 +386,11 @@ class LottieExporter:
             'text': 5,
             'image': 2,
             'null': 3,
-            'precomp': 0,
+            'composition': 0,
+            'solid': 1,
         }
         
+        out_point = layer.out_point if layer.out_point is not None else self.composition.duration
         lottie_layer = {
             'ddd': 0,
             'ind': layer.order,
@@ -309,28 +399,41 @@ class LottieExporter:
             'sr': 1,
             'ks': self._convert_transform(layer),
             'ao': 0,
-            'ip': layer.in_point,
-            'op': layer.out_point,
-            'st': layer.start_frame,
+            'ip': round(layer.in_point * self.frame_rate),
+            'op': round(out_point * self.frame_rate),
+            'st': round(layer.start_offset * self.frame_rate),
             'bm': 0,  # Blend mode
         }
         
         # Add parent reference
-        if layer.parent_layer:
-            lottie_layer['parent'] = layer.parent_layer.order
+        parent = self.timeline.get_parent(layer)
+        if parent:
+            lottie_layer['parent'] = parent.order
         
         return lottie_layer
     
     def _convert_transform(self, layer: AnimationLayer) -> Dict[str, Any]:
         """Convert transform with keyframes to Lottie format."""
-        transform = layer.transform or {}
+        transform = layer_transform(layer)
+        
+        if self.timeline.get_track(layer, 'position') or not (
+            self.timeline.get_track(layer, 'position_x') or self.timeline.get_track(layer, 'position_y')
+        ):
+            position = self._convert_property(layer, 'position', transform['position'])
+        else:
+            # Separate dimensions
+            position = {
+                's': True,
+                'x': self._convert_property(layer, 'position_x', layer.position_x),
+                'y': self._convert_property(layer, 'position_y', layer.position_y),
+            }
         
         ks = {
-            'o': self._convert_property(layer, 'opacity', transform.get('opacity', 100)),
-            'r': self._convert_property(layer, 'rotation', transform.get('rotation', 0)),
-            'p': self._convert_property(layer, 'position', transform.get('position', [0, 0])),
-            's': self._convert_property(layer, 'scale', transform.get('scale', [100, 100])),
-            'a': {'a': 0, 'k': transform.get('anchor', [0, 0])},
+            'o': self._convert_property(layer, 'opacity', transform['opacity']),
+            'r': self._convert_property(layer, 'rotation', transform['rotation']),
+            'p': position,
+            's': self._convert_property(layer, 'scale', transform['scale']),
+            'a': {'a': 0, 'k': transform['anchor']},
         }
         
         return ks
@@ -343,25 +446,30 @@ class LottieExporter:
     ) -> Dict[str, Any]:
         """Convert an animated property with keyframes."""
         # Find track for this property
-        track = layer.tracks.filter(property_path=property_name).first()
+        track = self.timeline.get_track(layer, property_name)
+        keyframes = track.keyframes.all() if track else []
         
-        if not track or not track.keyframes.exists():
+        if not keyframes:
             # Static value
             return {'a': 0, 'k': default_value}
         
         # Animated value
-        keyframes = []
-        for kf in track.keyframes.order_by('frame_number'):
+        lottie_keyframes = []
+        for kf in keyframes:
+            value = kf.value.get('value', kf.value) if isinstance(kf.value, dict) else kf.value
             kf_data = {
-                't': kf.frame_number,
-                's': [kf.value] if not isinstance(kf.value, list) else kf.value,
+                't': round(kf.time * self.frame_rate),
+                's': value if isinstance(value, list) else [value],
             }
             
-            if kf.bezier_control_points:
-                bp = kf.bezier_control_points
+            if kf.interpolation == AnimationKeyframe.INTERPOLATION_HOLD:
+                kf_data['h'] = 1
+            
+            bp = keyframe_bezier(kf)
+            if bp:
                 kf_data['o'] = {'x': [bp[0]], 'y': [bp[1]]}
                 kf_data['i'] = {'x': [bp[2]], 'y': [bp[3]]}
             
-            keyframes.append(kf_data)
+            lottie_keyframes.append(kf_data)
         
-        return {'a': 1, 'k': keyframes}
+        return {'a': 1, 'k': lottie_keyframes}
@@ -0,0 +1,90 @@
+"""
+Unit tests for the vectorized keyframe interpolation engine.
+"""
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from animation_timeline.interpolation import (
+    EASING_PRESETS, compile_tracks, cubic_bezier_ease, evaluate, keyframe_vector, sample_frames,
+)
+from animation_timeline.models import AnimationKeyframe, AnimationTrack
+from animation_timeline.services import CompositionTimeline
+from animation_timeline.test_timeline_loader import make_composition
+
+
+def keyframe(time, value, interpolation='linear', handles=(0, 0, 1, 1)):
+    return SimpleNamespace(
+        time=time, value=value, interpolation=interpolation,
+        handle_out_x=handles[0], handle_out_y=handles[1], handle_in_x=handles[2], handle_in_y=handles[3],
+    )
+
+
+def track(track_id, *keyframes):
+    return SimpleNamespace(id=track_id, keyframes=SimpleNamespace(all=lambda: list(keyframes)))
+
+
+@pytest.mark.unit
+class TestInterpolation:
+
+    def test_keyframe_vector(self):
+        assert keyframe_vector(5) == [5.0]
+        assert keyframe_vector({'value': [1, 2]}) == [1.0, 2.0]
+        assert keyframe_vector({'r': 255, 'g': 0, 'b': 10}) == [255.0, 0.0, 10.0, 1.0]
+        assert keyframe_vector({'points': []}) is None
+        assert keyframe_vector('text') is None
+
+    def test_linear_and_hold(self):
+        compiled = compile_tracks([
+            track('a', keyframe(1.0, 10), keyframe(0.0, 0), keyframe(2.0, 30)),
+            track('b', keyframe(0.5, [0, 0], 'hold'), keyframe(1.5, [4, 8])),
+        ])
+        values = evaluate(compiled, [-1.0, 0.0, 0.5, 1.0, 1.5, 2.0, 3.0])
+        assert values.shape == (2, 7, 2)
+        np.testing.assert_allclose(values[0, :, 0], [0, 0, 5, 10, 20, 30, 30])
+        np.testing.assert_allclose(values[1, :, :2], [[0, 0]] * 4 + [[4, 8]] * 3)
+        assert np.isnan(values[0, :, 1]).all()
+
+    def test_cubic_bezier_matches_curve(self):
+        x1, y1, x2, y2 = 0.1, 0.9, 0.95, 0.05
+        s = np.linspace(0, 1, 2001)
+        curve_x = 3 * (1 - s) ** 2 * s * x1 + 3 * (1 - s) * s ** 2 * x2 + s ** 3
+        curve_y = 3 * (1 - s) ** 2 * s * y1 + 3 * (1 - s) * s ** 2 * y2 + s ** 3
+        progress = np.linspace(0, 1, 101)
+        eased = cubic_bezier_ease(progress, np.tile([x1, y1, x2, y2], (101, 1)))
+        np.testing.assert_allclose(eased, np.interp(progress, curve_x, curve_y), atol=1e-4)
+
+    def test_easing_presets_and_bezier_keyframes(self):
+        compiled = compile_tracks([
+            track('ease', keyframe(0, 0, 'ease_in_out'), keyframe(1, 100)),
+            track('bezier', keyframe(0, 0, 'bezier', EASING_PRESETS['ease_in']), keyframe(1, 100)),
+            track('spring', keyframe(0, 0, 'spring'), keyframe(1, 100)),
+        ])
+        values = evaluate(compiled, [0.25, 0.5])[:, :, 0]
+        assert values[0, 0] < 25 and values[0, 1] == pytest.approx(50)
+        assert values[1, 1] < 50
+        np.testing.assert_allclose(values[2], [25, 50])
+
+    def test_skips_tracks_that_cannot_be_interpolated(self):
+        compiled = compile_tracks([
+            track('text', keyframe(0, 'a'), keyframe(1, 'b')),
+            track('empty'),
+            track('mixed', keyframe(0, 1), keyframe(1, [1, 2])),
+            track('ok', keyframe(0, 1)),
+        ])
+        assert compiled.track_ids == ['ok']
+        np.testing.assert_allclose(sample_frames(compiled, range(3), 30)[0, :, 0], [1, 1, 1])
+
+    @pytest.mark.django_db
+    def test_composition_timeline_sampling(self, user):
+        composition = make_composition(user, 3)
+        AnimationTrack.objects.filter(property_type='rotation').update(enabled=False)
+        AnimationKeyframe.objects.filter(track__property_type='opacity', time=1.0).update(interpolation='hold')
+        compiled = CompositionTimeline(composition).compile_tracks()
+        assert len(compiled) == 9
+        values = sample_frames(compiled, [0, 15, 30, 40, 45], composition.get_frame_rate())
+        opacity = compiled.track_ids.index(
+            AnimationTrack.objects.get(layer__order=0, property_type='opacity').id
+        )
+        np.testing.assert_allclose(values[opacity, :, 0], [0, 50, 100, 100, 150])
@@ -0,0 +1,93 @@
+"""
+Unit tests for the batched composition timeline loader.
+"""
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from animation_timeline.models import (
+    AnimationComposition, AnimationEffect, AnimationKeyframe, AnimationLayer,
+    AnimationProject, AnimationTrack,
+)
+from animation_timeline.services import AnimationTimelineService, LottieExporter
+from projects.models import Project
+
+PROPERTIES = ['opacity', 'rotation', 'position_x', 'position_y']
+
+
+def make_composition(user, layer_count):
+    project = Project.objects.create(user=user, name='Motion')
+    animation_project = AnimationProject.objects.create(project=project, user=user, name='Motion')
+    composition = AnimationComposition.objects.create(
+        animation_project=animation_project, name='Main', frame_rate=30, duration=2,
+    )
+    layers = AnimationLayer.objects.bulk_create([
+        AnimationLayer(composition=composition, name=f'Layer {i}', layer_type='shape', order=i)
+        for i in range(layer_count)
+    ])
+    tracks = AnimationTrack.objects.bulk_create([
+        AnimationTrack(layer=layer, property_type=name) for layer in layers for name in PROPERTIES
+    ])
+    AnimationKeyframe.objects.bulk_create([
+        AnimationKeyframe(track=track, time=time, value={'value': time * 100}, interpolation='linear')
+        for track in tracks for time in (1.0, 0.0, 1.5)
+    ])
+    AnimationEffect.objects.bulk_create([AnimationEffect(layer=layer, effect_type='blur') for layer in layers])
+    return composition
+
+
+@pytest.mark.unit
+@pytest.mark.django_db
+class TestCompositionTimeline:
+
+    @pytest.mark.parametrize('layer_count', [2, 30])
+    def test_timeline_query_count(self, user, layer_count):
+        composition = make_composition(user, layer_count)
+        service = AnimationTimelineService(composition.animation_project)
+        with CaptureQueriesContext(connection) as ctx:
+            data = service.get_timeline_data(composition, start_frame=0, end_frame=30)
+        # layers, tracks, keyframes, effects
+        assert len(ctx.captured_queries) == 4
+        assert len(data['layers']) == layer_count
+        track = data['layers'][0]['tracks'][0]
+        assert [kf['frame'] for kf in track['keyframes']] == [0, 30]
+        assert len(data['layers'][0]['effects']) == 1
+
+    def test_timeline_filters(self, user):
+        composition = make_composition(user, 2)
+        AnimationLayer.objects.filter(order=1).update(shy=True)
+        AnimationTrack.objects.filter(property_type='opacity').update(enabled=False)
+        service = AnimationTimelineService(composition.animation_project)
+        data = service.get_timeline_data(composition, include_keyframes=False)
+        assert [layer['name'] for layer in data['layers']] == ['Layer 0']
+        assert 'tracks' not in data['layers'][0]
+
+        data = service.get_timeline_data(composition)
+        assert [track['property'] for track in data['layers'][0]['tracks']] == sorted(PROPERTIES[1:])
+
+    @pytest.mark.parametrize('layer_count', [2, 30])
+    def test_lottie_query_count(self, user, layer_count):
+        composition = make_composition(user, layer_count)
+        with CaptureQueriesContext(connection) as ctx:
+            lottie = LottieExporter(composition).generate_lottie_json()
+        assert len(ctx.captured_queries) == 4
+        names = [layer['nm'] for layer in lottie['layers']]
+        assert names[:2] == [f'Layer {layer_count - 1}', f'Layer {layer_count - 2}']
+
+        ks = lottie['layers'][0]['ks']
+        assert ks['o'] == {'a': 1, 'k': [{'t': 0, 's': [0.0]}, {'t': 30, 's': [100.0]}, {'t': 45, 's': [150.0]}]}
+        assert ks['p']['s'] is True and ks['p']['x']['a'] == 1
+        assert ks['s'] == {'a': 0, 'k': [100, 100]}
+
+    def test_lottie_parent_and_bezier(self, user):
+        composition = make_composition(user, 2)
+        first, second = composition.layers.order_by('order')
+        second.parent_layer = first
+        second.save()
+        AnimationKeyframe.objects.filter(track__layer=first, track__property_type='rotation').update(
+            interpolation='bezier', handle_out_x=0.4, handle_out_y=0, handle_in_x=0.6, handle_in_y=1,
+        )
+        lottie = LottieExporter(composition).generate_lottie_json()
+        assert lottie['layers'][0]['parent'] == first.order
+        keyframe = lottie['layers'][1]['ks']['r']['k'][0]
+        assert keyframe['o'] == {'x': [0.4], 'y': [0]} and keyframe['i'] == {'x': [0.6], 'y': [1]}
@@ -100,11 +100,11 @@ class AnimationCompositionViewSet(viewsets.ModelViewSet):
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         
-        service = AnimationTimelineService(composition.project)
+        service = AnimationTimelineService(composition.animation_project)
         timeline_data = service.get_timeline_data(
             composition,
             start_frame=serializer.validated_data.get('start_frame', 0),
-            end_frame=serializer.validated_data.get('end_frame', composition.duration_frames),
+            end_frame=serializer.validated_data.get('end_frame'),
             include_keyframes=serializer.validated_data.get('include_keyframes', True),
         )
         
@@ -0,0 +1,514 @@
+"""
+Tree-Wide Auto-Layout
+
+Lays out a whole hierarchy of auto-layout frames in one go.
+
+A frame nests inside another through ``parent_frame``.  In the parent's
+flow it takes the slot of the child row that shares its component, so a
+hugging slot is as large as the nested frame's content.  The engine works
+in two passes:
+
+* measure  – bottom-up intrinsic (hug) size of every frame, memoized on
+             the node until something below it changes
+* arrange  – top-down boxes for every child, each nested frame laid out
+             inside the box its slot received
+
+The hierarchy below the root is found with a recursive query on
+``parent_frame`` and read with one query for frames and one for
+children, whatever its depth.  Edits (``update_child``/``update_frame``)
+mark only the changed frame and its ancestors dirty; on a tree that has
+been computed, ``compute`` re-arranges those and any frame whose box
+changed size.  A freshly loaded tree is laid out in full.  ``save``
+writes the computed boxes that moved in one bulk UPDATE (edited child
+fields go out with it).
+Adding, hiding or re-parenting rows changes the tree itself and needs a
+fresh ``load``.
+
+Usage:
+    tree = LayoutTree.load(frame, viewport_width=1440)
+    tree.compute()
+    tree.save()
+    tree.result()
+
+    tree.update_child(child_id, fixed_width=240)
+    tree.compute()   # only the affected frames
+    tree.save()
+"""
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from django.db import connection, connections, router, transaction
+from django.db.models.expressions import RawSQL
+from django.utils import timezone
+
+from .models import AutoLayoutChild, AutoLayoutFrame
+
+COMPUTED_FIELDS = ['computed_x', 'computed_y', 'computed_width', 'computed_height']
+
+# Ids of a frame and every frame nested below it.  UNION skips rows
+# already seen, so a parent_frame cycle cannot recurse forever.
+SUBTREE_CTE = """
+WITH RECURSIVE subtree(id) AS (
+    SELECT f.id FROM {table} f WHERE f.id = %s
+    UNION
+    SELECT f.id FROM {table} f JOIN subtree s ON f.{parent} = s.id
+)
+SELECT id FROM subtree
+"""
+
+# The outermost frame a frame is nested in
+OUTERMOST_CTE = """
+WITH RECURSIVE ancestors(id, parent) AS (
+    SELECT f.id, f.{parent} FROM {table} f WHERE f.id = %s
+    UNION
+    SELECT f.id, f.{parent} FROM {table} f JOIN ancestors a ON f.id = a.parent
+)
+SELECT id FROM ancestors WHERE parent IS NULL
+"""
+
+
+def _frame_ids(cte: str, frame_id) -> RawSQL:
+    """Frame ids selected by one of the hierarchy CTEs, for ``pk__in``."""
+    meta = AutoLayoutFrame._meta
+    sql = cte.format(
+        table=connection.ops.quote_name(meta.db_table),
+        parent=meta.get_field('parent_frame').column,
+    )
+    return RawSQL(sql, [meta.pk.get_db_prep_value(frame_id, connection)])
+
+
+def bulk_update_by_value(model, objs: Sequence, fields: Sequence[str]) -> None:
+    """
+    ``QuerySet.bulk_update`` with one ``WHEN pk IN (...)`` per distinct
+    value instead of one ``WHEN pk = ...`` per row.  Computed boxes repeat
+    a lot (a row shares its y, siblings share sizes), so the statement is
+    shorter; it is still one UPDATE per batch.  The SQL is written out
+    directly: compiling thousands of ``When`` expressions through the ORM
+    cost more than running the statement.
+    """
+    if not objs:
+        return
+    connection = connections[router.db_for_write(model)]
+    meta = model._meta
+    quote = connection.ops.quote_name
+    pk_column = quote(meta.pk.column)
+    # At most a pk and a value per field and row, plus the pk in WHERE
+    batch_size = connection.ops.bulk_batch_size(['pk'] * (1 + 2 * len(fields)), objs) or len(objs)
+    casted = connection.features.requires_casted_case_in_updates
+    with transaction.atomic(using=connection.alias, savepoint=False), connection.cursor() as cursor:
+        for start in range(0, len(objs), batch_size):
+            batch = objs[start:start + batch_size]
+            pks = [meta.pk.get_db_prep_value(obj.pk, connection) for obj in batch]
+            assignments, params = [], []
+            for name in fields:
+                field = meta.get_field(name)
+                placeholder = f'CAST(%s AS {field.db_type(connection)})' if casted else '%s'
+                groups: Dict[Any, list] = {}
+                for obj, pk in zip(batch, pks):
+                    groups.setdefault(getattr(obj, name), []).append(pk)
+                whens = []
+                for value, group in groups.items():
+                    whens.append(f'WHEN {pk_column} IN ({", ".join(["%s"] * len(group))}) THEN {placeholder}')
+                    params.extend(group)
+                    params.append(field.get_db_prep_save(value, connection))
+                column = quote(field.column)
+                assignments.append(f'{column} = CASE {" ".join(whens)} ELSE {column} END')
+            params.extend(pks)
+            cursor.execute(
+                f'UPDATE {quote(meta.db_table)} SET {", ".join(assignments)} '
+                f'WHERE {pk_column} IN ({", ".join(["%s"] * len(pks))})',
+                params,
+            )
+
+
+class FrameNode:
+    """One frame of the tree with its visible children and cached layout."""
+    __slots__ = ('frame', 'parent', 'slot', 'children', 'hosted', 'nested',
+                 'intrinsic', 'size', 'boxes', 'dirty')
+
+    def __init__(self, frame: AutoLayoutFrame):
+        self.frame = frame
+        self.parent: Optional['FrameNode'] = None
+        # Id of the parent's child row this frame sits in, if any
+        self.slot: Optional[str] = None
+        self.children: List[AutoLayoutChild] = []
+        # Child id -> nested frame occupying that child's slot
+        self.hosted: Dict[str, 'FrameNode'] = {}
+        # Every nested frame, with or without a slot
+        self.nested: List['FrameNode'] = []
+        self.intrinsic: Optional[Tuple[float, float]] = None
+        self.size: Optional[Tuple[float, float]] = None
+        self.boxes: Dict[str, Dict[str, float]] = {}
+        self.dirty = True
+
+
+class LayoutTree:
+    """
+    Measure/arrange engine for a frame and everything nested below it.
+    Implements the Figma-like rules of ``AutoLayoutEngine`` per frame.
+    """
+
+    def __init__(self, root: AutoLayoutFrame, frames: Iterable[AutoLayoutFrame],
+                 children: Iterable[AutoLayoutChild],
+                 viewport_width: int = 1920, viewport_height: int = 1080):
+        self.viewport_width = viewport_width
+        self.viewport_height = viewport_height
+        self._children: Dict[str, AutoLayoutChild] = {}
+        self._changed: Dict[str, AutoLayoutChild] = {}
+        self._edited_fields: set = set()
+        self._edited_frames: Dict[str, AutoLayoutFrame] = {}
+        self._edited_frame_fields: set = set()
+
+        by_parent: Dict[Any, List[AutoLayoutFrame]] = {}
+        for frame in frames:
+            if frame.pk != root.pk:
+                by_parent.setdefault(frame.parent_frame_id, []).append(frame)
+        rows: Dict[Any, List[AutoLayoutChild]] = {}
+        for child in children:
+            rows.setdefault(child.parent_frame_id, []).append(child)
+
+        self.root = FrameNode(root)
+        self.nodes: Dict[str, FrameNode] = {str(root.pk): self.root}
+        pending = [self.root]
+        while pending:
+            node = pending.pop()
+            node.children = rows.get(node.frame.pk, [])
+            slots = {c.component_id: c for c in node.children if c.component_id is not None}
+            for child in node.children:
+                self._children[str(child.id)] = child
+            for frame in by_parent.get(node.frame.pk, []):
+                nested = FrameNode(frame)
+                nested.parent = node
+                node.nested.append(nested)
+                slot = slots.get(frame.component_id) if frame.component_id else None
+                if slot is not None:
+                    nested.slot = str(slot.id)
+                    node.hosted[nested.slot] = nested
+                self.nodes[str(frame.pk)] = nested
+                pending.append(nested)
+
+    @classmethod
+    def load(cls, root: AutoLayoutFrame, viewport_width: int = 1920,
+             viewport_height: int = 1080) -> 'LayoutTree':
+        """Read ``root``'s hierarchy: one query for frames, one for children."""
+        frames = AutoLayoutFrame.objects.filter(pk__in=_frame_ids(SUBTREE_CTE, root.pk))
+        children = AutoLayoutChild.objects.filter(
+            parent_frame_id__in=_frame_ids(SUBTREE_CTE, root.pk), visible=True
+        ).order_by('order')
+        return cls(root, frames, children, viewport_width, viewport_height)
+
+    @classmethod
+    def load_outermost(cls, frame: AutoLayoutFrame, viewport_width: int = 1920,
+                       viewport_height: int = 1080) -> 'LayoutTree':
+        """
+        Read the hierarchy of the outermost frame ``frame`` is nested in,
+        so edits below it reach every frame whose size depends on them.
+        """
+        root = frame
+        if frame.parent_frame_id is not None:
+            root = AutoLayoutFrame.objects.filter(pk__in=_frame_ids(OUTERMOST_CTE, frame.pk)).first() or frame
+        return cls.load(root, viewport_width, viewport_height)
+
+    # ------------------------------------------------------------------
+    # Invalidation
+    # ------------------------------------------------------------------
+
+    def mark_dirty(self, frame_id) -> None:
+        """Drop cached sizes of a frame and every frame it is nested in."""
+        node = self.nodes.get(str(frame_id))
+        while node is not None:
+            node.dirty = True
+            node.intrinsic = None
+            node = node.parent
+
+    def get_child(self, child_id) -> Optional[AutoLayoutChild]:
+        """A laid-out child of the tree, or None (hidden or elsewhere)."""
+        return self._children.get(str(child_id))
+
+    def update_child(self, child_id, **fields) -> AutoLayoutChild:
+        """Change fields of a child in memory and invalidate its frame."""
+        child = self._children[str(child_id)]
+        # save() writes with UPDATE, which skips auto_now
+        fields = {**fields, 'updated_at': timezone.now()}
+        for name, value in fields.items():
+            setattr(child, name, value)
+        self._changed[str(child.id)] = child
+        self._edited_fields.update(fields)
+        if 'order' in fields:
+            node = self.nodes[str(child.parent_frame_id)]
+            node.children.sort(key=lambda c: c.order)
+        self.mark_dirty(child.parent_frame_id)
+        return child
+
+    def update_frame(self, frame_id, **fields) -> AutoLayoutFrame:
+        """Change fields of a frame in memory and invalidate it."""
+        node = self.nodes[str(frame_id)]
+        fields = {**fields, 'updated_at': timezone.now()}
+        for name, value in fields.items():
+            setattr(node.frame, name, value)
+        self._edited_frames[str(frame_id)] = node.frame
+        self._edited_frame_fields.update(fields)
+        self.mark_dirty(frame_id)
+        return node.frame
+
+    # ------------------------------------------------------------------
+    # Passes
+    # ------------------------------------------------------------------
+
+    def compute(self) -> int:
+        """Lay out every dirty or resized frame; returns how many were arranged."""
+        self._measure()
+        arranged = 0
+        stack = [(self.root, self._frame_size(self.root, self.viewport_width, self.viewport_height))]
+        while stack:
+            node, size = stack.pop()
+            if not node.dirty and node.size == size:
+                continue  # nothing below a clean frame can be dirty
+            self._arrange(node, *size)
+            arranged += 1
+            for nested in node.nested:
+                box = node.boxes.get(nested.slot)
+                if box is None:
+                    # No slot in the parent: the frame keeps its own size
+                    nested_size = self._frame_size(nested, self.viewport_width, self.viewport_height)
+                else:
+                    nested_size = self._frame_size(nested, box['width'], box['height'])
+                stack.append((nested, nested_size))
+        return arranged
+
+    def _measure(self) -> None:
+        """Post-order pass filling in missing intrinsic sizes."""
+        stack = [(self.root, False)]
+        while stack:
+            node, expanded = stack.pop()
+            if node.intrinsic is not None:
+                continue
+            if expanded:
+                node.intrinsic = self._frame_size(node, self.viewport_width, self.viewport_height)
+            else:
+                stack.append((node, True))
+                stack.extend((nested, False) for nested in node.nested)
+
+    def _arrange(self, node: FrameNode, width: float, height: float) -> None:
+        flow = [c for c in node.children if not c.is_absolute]
+        absolute = [c for c in node.children if c.is_absolute]
+        boxes = self._flow_layout(node, flow, width, height)
+        boxes.update(self._absolute_layout(absolute, width, height))
+
+        for child_id, box in boxes.items():
+            child = self._children[child_id]
+            if (child.computed_x, child.computed_y, child.computed_width, child.computed_height) != (
+                    box['x'], box['y'], box['width'], box['height']):
+                child.computed_x, child.computed_y = box['x'], box['y']
+                child.computed_width, child.computed_height = box['width'], box['height']
+                self._changed[child_id] = child
+        node.boxes = boxes
+        node.size = (width, height)
+        node.dirty = False
+
+    # ------------------------------------------------------------------
+    # Results
+    # ------------------------------------------------------------------
+
+    def save(self) -> int:
+        """
+        Persist computed boxes that changed since the last save, together
+        with edited child fields; returns the number of child rows written.
+        """
+        bulk_update_by_value(AutoLayoutFrame, list(self._edited_frames.values()),
+                             sorted(self._edited_frame_fields))
+        changed = list(self._changed.values())
+        bulk_update_by_value(AutoLayoutChild, changed, COMPUTED_FIELDS + sorted(self._edited_fields))
+        self._changed.clear()
+        self._edited_fields.clear()
+        self._edited_frames.clear()
+        self._edited_frame_fields.clear()
+        return len(changed)
+
+    def result(self) -> Dict[str, Any]:
+        """
+        Root frame size and child boxes, in the shape ``AutoLayoutEngine``
+        returns, plus the same for every nested frame under ``frames``.
+        Nested frame positions are relative to the frame they sit in.
+        """
+        output = self._frame_result(self.root, self.root.frame.position_x, self.root.frame.position_y)
+        frames = {}
+        for node in self.nodes.values():
+            for nested in node.nested:
+                box = node.boxes.get(nested.slot) or {}
+                frames[str(nested.frame.pk)] = self._frame_result(
+                    nested, box.get('x', nested.frame.position_x), box.get('y', nested.frame.position_y)
+                )
+        output['frames'] = frames
+        return output
+
+    @staticmethod
+    def _frame_result(node: FrameNode, x: float, y: float) -> Dict[str, Any]:
+        width, height = node.size or node.intrinsic or (0, 0)
+        return {
+            'frame': {'width': width, 'height': height, 'x': x, 'y': y},
+            'children': dict(node.boxes),
+        }
+
+    # ------------------------------------------------------------------
+    # Sizing rules
+    # ------------------------------------------------------------------
+
+    def _frame_size(self, node: FrameNode, available_width: float,
+                    available_height: float) -> Tuple[float, float]:
+        """Frame width and height; ``fill`` takes the available space."""
+        frame = node.frame
+        padding_h = frame.padding_left + frame.padding_right
+        padding_v = frame.padding_top + frame.padding_bottom
+
+        if not node.children:
+            return (frame.width or 100) + padding_h, (frame.height or 100) + padding_v
+
+        flow = [c for c in node.children if not c.is_absolute]
+        if frame.horizontal_sizing == 'fixed':
+            width = frame.width or 100
+        elif frame.horizontal_sizing == 'fill':
+            width = available_width
+        else:  # hug
+            width = self._content_width(node, flow) + padding_h
+
+        if frame.vertical_sizing == 'fixed':
+            height = frame.height or 100
+        elif frame.vertical_sizing == 'fill':
+            height = available_height
+        else:  # hug
+            height = self._content_height(node, flow) + padding_v
+
+        if frame.min_width:
+            width = max(width, frame.min_width)
+        if frame.max_width:
+            width = min(width, frame.max_width)
+        if frame.min_height:
+            height = max(height, frame.min_height)
+        if frame.max_height:
+            height = min(height, frame.max_height)
+        return width, height
+
+    def _content_width(self, node: FrameNode, children: List[AutoLayoutChild]) -> float:
+        if not children:
+            return 0
+        widths = [self._child_width(node, c) for c in children]
+        if node.frame.direction == 'horizontal':
+            return sum(widths) + node.frame.item_spacing * (len(children) - 1)
+        return max(widths)
+
+    def _content_height(self, node: FrameNode, children: List[AutoLayoutChild]) -> float:
+        if not children:
+            return 0
+        heights = [self._child_height(node, c) for c in children]
+        if node.frame.direction == 'vertical':
+            return sum(heights) + node.frame.item_spacing * (len(children) - 1)
+        return max(heights)
+
+    def _child_width(self, node: FrameNode, child: AutoLayoutChild) -> float:
+        if child.horizontal_sizing == 'fixed':
+            return child.fixed_width or 100
+        if child.horizontal_sizing == 'fill':
+            return 0  # assigned during arrange
+        nested = node.hosted.get(str(child.id))
+        if nested is not None:
+            return nested.intrinsic[0]
+        return child.computed_width or child.fixed_width or 100
+
+    def _child_height(self, node: FrameNode, child: AutoLayoutChild) -> float:
+        if child.vertical_sizing == 'fixed':
+            return child.fixed_height or 100
+        if child.vertical_sizing == 'fill':
+            return 0
+        nested = node.hosted.get(str(child.id))
+        if nested is not None:
+            return nested.intrinsic[1]
+        return child.computed_height or child.fixed_height or 100
+
+    # ------------------------------------------------------------------
+    # Arrange rules
+    # ------------------------------------------------------------------
+
+    def _flow_layout(self, node: FrameNode, children: List[AutoLayoutChild],
+                     frame_width: float, frame_height: float) -> Dict[str, Dict[str, float]]:
+        frame = node.frame
+        if not children:
+            return {}
+        horizontal = frame.direction == 'horizontal'
+        content_width = frame_width - frame.padding_left - frame.padding_right
+        content_height = frame_height - frame.padding_top - frame.padding_bottom
+        gaps = frame.item_spacing * (len(children) - 1)
+
+        # Natural sizes, then the leftover main-axis space shared by fill ratio
+        sizes = [[self._child_width(node, c), self._child_height(node, c)] for c in children]
+        axis = 0 if horizontal else 1
+        fill_sizing = [(c.horizontal_sizing if horizontal else c.vertical_sizing) == 'fill'
+                       for c in children]
+        remaining = (content_width if horizontal else content_height) - gaps - sum(
+            size[axis] for size, fill in zip(sizes, fill_sizing) if not fill
+        )
+        total_ratio = sum(c.fill_ratio for c, fill in zip(children, fill_sizing) if fill) or 1
+        for child, size, fill in zip(children, sizes, fill_sizing):
+            if fill:
+                size[axis] = (remaining * child.fill_ratio) / total_ratio or size[axis]
+
+        total = sum(size[axis] for size in sizes) + gaps
+        available = content_width if horizontal else content_height
+        if frame.primary_axis_alignment == 'center':
+            cursor = (available - total) / 2
+        elif frame.primary_axis_alignment == 'end':
+            cursor = available - total
+        else:
+            cursor = 0
+
+        boxes = {}
+        for child, (width, height) in zip(children, sizes):
+            if horizontal:
+                x = frame.padding_left + cursor
+                y = self._cross_axis_position(frame, child, height, content_height, frame.padding_top)
+                cursor += width + frame.item_spacing
+            else:
+                x = self._cross_axis_position(frame, child, width, content_width, frame.padding_left)
+                y = frame.padding_top + cursor
+                cursor += height + frame.item_spacing
+            boxes[str(child.id)] = {'x': x, 'y': y, 'width': width, 'height': height}
+        return boxes
+
+    @staticmethod
+    def _cross_axis_position(frame: AutoLayoutFrame, child: AutoLayoutChild, child_size: float,
+                             content_size: float, padding: float) -> float:
+        alignment = child.align_self
+        if alignment == 'auto':
+            alignment = frame.cross_axis_alignment
+        if alignment == 'center':
+            return padding + (content_size - child_size) / 2
+        if alignment == 'end':
+            return padding + content_size - child_size
+        return padding  # start, stretch
+
+    @staticmethod
+    def _absolute_layout(children: List[AutoLayoutChild], frame_width: float,
+                         frame_height: float) -> Dict[str, Dict[str, float]]:
+        boxes = {}
+        for child in children:
+            width = child.fixed_width or 100
+            height = child.fixed_height or 100
+            anchor = child.absolute_anchor
+            offset_x = child.absolute_x or 0
+            offset_y = child.absolute_y or 0
+
+            if 'left' in anchor:
+                x = offset_x
+            elif 'right' in anchor:
+                x = frame_width - width - offset_x
+            else:  # center
+                x = (frame_width - width) / 2 + offset_x
+
+            if 'top' in anchor:
+                y = offset_y
+            elif 'bottom' in anchor:
+                y = frame_height - height - offset_y
+            else:  # center
+                y = (frame_height - height) / 2 + offset_y
+
+            boxes[str(child.id)] = {'x': x, 'y': y, 'width': width, 'height': height}
+        return boxes
@@ -0,0 +1,166 @@
+"""
+Unit tests for the tree-wide auto-layout engine.
+"""
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from auto_layout.layout_tree import LayoutTree
+from auto_layout.models import AutoLayoutChild, AutoLayoutFrame
+from auto_layout.services import AutoLayoutEngine
+from projects.models import DesignComponent, Project
+
+
+@pytest.fixture
+def project(user):
+    return Project.objects.create(user=user, name='Layout Test')
+
+
+def make_frame(project, parent=None, **fields):
+    component = DesignComponent.objects.create(project=project, component_type='frame')
+    frame = AutoLayoutFrame.objects.create(project=project, component=component, parent_frame=parent, **fields)
+    if parent is not None:
+        # The nested frame's slot in its parent's flow
+        order = parent.children.count()
+        AutoLayoutChild.objects.create(parent_frame=parent, component=component, order=order)
+    return frame
+
+
+def add_leaf(frame, order, **fields):
+    fields.setdefault('horizontal_sizing', 'fixed')
+    fields.setdefault('vertical_sizing', 'fixed')
+    return AutoLayoutChild.objects.create(parent_frame=frame, order=order, **fields)
+
+
+def slot_of(frame):
+    return AutoLayoutChild.objects.get(component=frame.component, parent_frame=frame.parent_frame)
+
+
+@pytest.mark.unit
+@pytest.mark.django_db
+class TestLayoutTree:
+
+    def test_single_frame_rules(self, project):
+        frame = make_frame(project, direction='horizontal', horizontal_sizing='fixed', width=400,
+                           vertical_sizing='hug', item_spacing=10, padding_left=20, padding_right=20,
+                           cross_axis_alignment='center')
+        first = add_leaf(frame, 0, fixed_width=100, fixed_height=40)
+        fill = add_leaf(frame, 1, horizontal_sizing='fill', fixed_height=20)
+        badge = add_leaf(frame, 2, is_absolute=True, absolute_anchor='top-right',
+                         fixed_width=10, fixed_height=10, absolute_x=5, absolute_y=5)
+
+        computed = AutoLayoutEngine(frame).compute()
+        assert computed['frame'] == {'width': 400, 'height': 40, 'x': 0, 'y': 0}
+        assert computed['children'] == {
+            str(first.id): {'x': 20, 'y': 0, 'width': 100, 'height': 40},
+            str(fill.id): {'x': 130, 'y': 10, 'width': 250, 'height': 20},
+            str(badge.id): {'x': 385, 'y': 5, 'width': 10, 'height': 10},
+        }
+        fill.refresh_from_db()
+        assert (fill.computed_x, fill.computed_width) == (130, 250)
+
+    def test_nested_hug_frames_measure_bottom_up(self, project):
+        outer = make_frame(project, direction='vertical', padding_top=8, padding_bottom=8, item_spacing=4)
+        add_leaf(outer, 0, fixed_width=30, fixed_height=30)
+        inner = make_frame(project, parent=outer, direction='horizontal', item_spacing=10)
+        add_leaf(inner, 0, fixed_width=50, fixed_height=20)
+        add_leaf(inner, 1, fixed_width=50, fixed_height=25)
+
+        computed = AutoLayoutEngine(outer).compute()
+        assert computed['children'][str(slot_of(inner).id)] == {'x': 0, 'y': 42, 'width': 110, 'height': 25}
+        assert computed['frame']['width'] == 110
+        assert computed['frame']['height'] == 8 + 30 + 4 + 25 + 8
+        assert computed['frames'][str(inner.id)]['frame'] == {'width': 110, 'height': 25, 'x': 0, 'y': 42}
+
+    def test_fill_frame_takes_its_slot(self, project):
+        outer = make_frame(project, direction='horizontal', horizontal_sizing='fixed', width=300, item_spacing=0)
+        add_leaf(outer, 0, fixed_width=100, fixed_height=50)
+        inner = make_frame(project, parent=outer, direction='vertical', horizontal_sizing='fill')
+        AutoLayoutChild.objects.filter(id=slot_of(inner).id).update(horizontal_sizing='fill')
+        leaf = add_leaf(inner, 0, fixed_width=80, fixed_height=10)
+
+        tree = LayoutTree.load(outer)
+        tree.compute()
+        nested = tree.result()['frames'][str(inner.id)]
+        assert nested['frame']['width'] == 200
+        assert nested['children'][str(leaf.id)] == {'x': 0, 'y': 0, 'width': 80, 'height': 10}
+
+    def test_loads_and_saves_in_constant_queries(self, project):
+        root = make_frame(project, direction='vertical')
+        frame = root
+        for depth in range(6):
+            for i in range(3):
+                add_leaf(frame, i + 1, fixed_width=10 + depth, fixed_height=10)
+            frame = make_frame(project, parent=frame, direction='horizontal')
+
+        with CaptureQueriesContext(connection) as ctx:
+            AutoLayoutEngine(root).compute()
+        statements = [q['sql'].split()[0] for q in ctx.captured_queries]
+        assert statements.count('SELECT') == 2
+        assert statements.count('UPDATE') == 1
+        assert not AutoLayoutChild.objects.filter(computed_width__isnull=True).exists()
+
+    def test_edit_relayouts_only_dirty_path(self, project):
+        root = make_frame(project, direction='horizontal', item_spacing=0)
+        left = make_frame(project, parent=root, direction='vertical')
+        right = make_frame(project, parent=root, direction='vertical')
+        deep = make_frame(project, parent=left, direction='horizontal')
+        for frame in (left, right, deep):
+            add_leaf(frame, 5, fixed_width=40, fixed_height=40)
+        leaf = add_leaf(deep, 6, fixed_width=40, fixed_height=40)
+
+        tree = LayoutTree.load(root)
+        assert tree.compute() == 4
+        tree.save()
+        assert tree.compute() == 0
+
+        tree.update_child(leaf.id, fixed_width=100)
+        # root and left change size; right only moves, so keeps its layout
+        assert tree.compute() == 3
+        assert tree.save() == 4  # leaf, deep's and left's slots, right's slot moved
+
+        fresh = LayoutTree.load(AutoLayoutFrame.objects.get(id=root.id))
+        fresh.compute()
+        assert fresh.result() == tree.result()
+        assert tree.result()['frame']['width'] == 150 + 40
+        assert slot_of(right).computed_x == 150
+
+    def test_load_reads_only_the_root_subtree(self, project):
+        root = make_frame(project, direction='vertical')
+        inner = make_frame(project, parent=root, direction='horizontal')
+        deep = make_frame(project, parent=inner, direction='horizontal')
+        add_leaf(deep, 0, fixed_width=10, fixed_height=10)
+        other = make_frame(project, direction='vertical')
+        other_leaf = add_leaf(other, 0, fixed_width=10, fixed_height=10)
+
+        tree = LayoutTree.load(inner)
+        assert set(tree.nodes) == {str(inner.id), str(deep.id)}
+        assert tree.get_child(other_leaf.id) is None
+        assert set(LayoutTree.load_outermost(deep).nodes) == {str(root.id), str(inner.id), str(deep.id)}
+
+    def test_child_edits_relayout_through_the_tree(self, project, auth_client):
+        root = make_frame(project, direction='horizontal', item_spacing=0)
+        inner = make_frame(project, parent=root, direction='horizontal', item_spacing=0,
+                           horizontal_sizing='fixed', width=200)
+        first = add_leaf(inner, 0, fixed_width=40, fixed_height=40)
+        second = add_leaf(inner, 1, fixed_width=60, fixed_height=40)
+        hidden = add_leaf(inner, 2, visible=False)
+        AutoLayoutEngine(root).compute()
+
+        response = auth_client.post(
+            f'/api/v1/auto-layout/frames/{inner.id}/reorder_children/',
+            {'child_ids': [str(hidden.id), str(second.id), str(first.id)]}, format='json',
+        )
+        assert response.status_code == 200
+        first.refresh_from_db()
+        hidden.refresh_from_db()
+        assert (first.order, first.computed_x, hidden.order) == (2, 60, 0)
+
+        response = auth_client.post(
+            f'/api/v1/auto-layout/children/{first.id}/set_sizing/',
+            {'horizontal_sizing': 'fill'}, format='json',
+        )
+        assert response.status_code == 200
+        assert (response.data['horizontal_sizing'], response.data['computed_width']) == ('fill', 140)
+        first.refresh_from_db()
+        assert (first.horizontal_sizing, first.computed_width) == ('fill', 140)
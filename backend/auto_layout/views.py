@@ -19,6 +19,10 @@ from .serializers import (
 from .services import AutoLayoutEngine
 
 
+def _viewport(request):
+    return request.data.get('viewport_width', 1920), request.data.get('viewport_height', 1080)
+
+
 class AutoLayoutFrameViewSet(viewsets.ModelViewSet):
     """ViewSet for managing auto-layout frames."""
     
@@ -58,10 +62,16 @@ class AutoLayoutFrameViewSet(viewsets.ModelViewSet):
         frame = self.get_object()
         child_ids = request.data.get('child_ids', [])
         
+        # Visible children are reordered and laid out in one write
+        engine = AutoLayoutEngine(frame, *_viewport(request))
+        updated = engine.update_children({
+            child_id: {'order': index} for index, child_id in enumerate(child_ids)
+        })
         for index, child_id in enumerate(child_ids):
-            AutoLayoutChild.objects.filter(
-                id=child_id, parent_frame=frame
-            ).update(order=index)
+            if str(child_id) not in updated:
+                AutoLayoutChild.objects.filter(
+                    id=child_id, parent_frame=frame
+                ).update(order=index)
         
         return Response({'status': 'reordered'})
     
@@ -69,10 +79,7 @@ class AutoLayoutFrameViewSet(viewsets.ModelViewSet):
     def compute_layout(self, request, pk=None):
         """Compute the layout and return computed positions."""
         frame = self.get_object()
-        viewport_width = request.data.get('viewport_width', 1920)
-        viewport_height = request.data.get('viewport_height', 1080)
-        
-        engine = AutoLayoutEngine(frame, viewport_width, viewport_height)
+        engine = AutoLayoutEngine(frame, *_viewport(request))
         computed = engine.compute()
         
         return Response({
@@ -109,16 +116,25 @@ class AutoLayoutChildViewSet(viewsets.ModelViewSet):
         """Set sizing mode for a child."""
         child = self.get_object()
         
+        changes = {}
         horizontal = request.data.get('horizontal_sizing')
         vertical = request.data.get('vertical_sizing')
         
         if horizontal:
-            child.horizontal_sizing = horizontal
+            changes['horizontal_sizing'] = horizontal
         if vertical:
-            child.vertical_sizing = vertical
-        
-        child.save()
-        return Response(AutoLayoutChildSerializer(child).data)
+            changes['vertical_sizing'] = vertical
+        
+        # Saved together with the layout it changes
+        engine = AutoLayoutEngine(child.parent_frame, *_viewport(request))
+        updated = engine.update_children({child.id: changes}).get(str(child.id))
+        if updated is None:
+            # Hidden children are not laid out
+            for name, value in changes.items():
+                setattr(child, name, value)
+            child.save()
+            updated = child
+        return Response(AutoLayoutChildSerializer(updated).data)
 
 
 class LayoutConstraintViewSet(viewsets.ModelViewSet):
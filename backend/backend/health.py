@@ -170,6 +170,14 @@ def detailed_health_check(request):
     except Exception as e:
         system_metrics = {'error': str(e)}
     
+    # Request inspection cost (this worker only)
+    from backend.security_middleware import RequestValidationMiddleware
+    request_validation = RequestValidationMiddleware.get_stats()
+    
+    # Write-behind backpressure of collaboration history (this worker only)
+    from projects.write_buffer import write_buffer_stats
+    write_buffers = write_buffer_stats()
+    
     # Check AI services
     ai_services = {}
     
@@ -195,6 +203,8 @@ def detailed_health_check(request):
         'checks': checks,
         'latencies_ms': latencies,
         'system': system_metrics,
+        'request_validation': request_validation,
+        'write_buffers': write_buffers,
         'ai_services': ai_services,
         'errors': errors if errors else None,
         'timestamp': time.time()
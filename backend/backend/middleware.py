@@ -199,6 +199,7 @@ class PerformanceMonitoringMiddleware(MiddlewareMixin):
                     'method': request.method,
                     'path': request.path,
                     'duration_seconds': round(duration, 2),
+                    'validation_us': getattr(request, 'validation_us', None),
                     'user': str(request.user) if hasattr(request, 'user') else 'Anonymous',
                 })
         
@@ -0,0 +1,335 @@
+"""
+Rate limiting engine for the security middleware.
+
+Every scope that applies to a request (burst, global, per-path) plus the
+IP blocklist is evaluated in a single call.  Each scope is a sliding
+window counter: the current fixed window's count plus the previous
+window's count weighted by how much of it still overlaps the sliding
+window.  That keeps two integers per scope instead of a list of
+timestamps, and the check-and-increment is atomic across workers.
+
+Backends:
+    LocalMemoryRateLimiter – process-local, for dev and tests
+    RedisRateLimiter       – one Lua script call per request
+
+Select with ``RATE_LIMIT_BACKEND`` ('memory' or 'redis').
+"""
+
+import logging
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from django.conf import settings
+
+security_logger = logging.getLogger('security')
+
+ACTIVITY_WINDOW = 300  # seconds covered by anomaly tracking
+
+
+@dataclass(frozen=True, slots=True)
+class RateLimit:
+    """``limit`` requests per ``window`` seconds for one scope."""
+    scope: str
+    limit: int
+    window: int
+
+
+@dataclass(slots=True)
+class RateLimitResult:
+    allowed: bool
+    blocked: bool = False
+    exceeded: Optional[RateLimit] = None
+
+
+@dataclass(slots=True)
+class Activity:
+    """Sliding-window activity of one client for anomaly detection."""
+    requests: int
+    unique_paths: int
+    errors: int
+
+
+class RateLimitRouter:
+    """
+    Match a path against ordered ``{regex: {'requests', 'window'}}``
+    rules with one precompiled alternation; the first rule wins.
+    """
+
+    def __init__(self, rules: dict[str, dict]):
+        self.limits = [
+            RateLimit(f'path:{i}', conf['requests'], conf['window'])
+            for i, conf in enumerate(rules.values())
+        ]
+        self.patterns = list(rules)
+        self._regex = re.compile('|'.join(
+            f'(?P<r{i}>{pattern})' for i, pattern in enumerate(self.patterns)
+        )) if rules else None
+
+    def match(self, path: str) -> Optional[RateLimit]:
+        if self._regex is None:
+            return None
+        m = self._regex.match(path)
+        if m is None:
+            return None
+        return self.limits[int(m.lastgroup[1:])]
+
+
+def _window_weight(now: float, window: int) -> float:
+    """Share of the previous fixed window still inside the sliding window."""
+    return (window - now % window) / window
+
+
+class BaseRateLimiter:
+    """Interface shared by all rate limiter backends."""
+
+    def hit(self, client: str, limits: list[RateLimit]) -> RateLimitResult:
+        """
+        Count one request from ``client`` against every limit, unless the
+        client is blocked or any limit is already exhausted (in which case
+        nothing is counted).
+        """
+        raise NotImplementedError
+
+    def record_violation(self, client: str, threshold: int, window: int,
+                         block_for: int) -> bool:
+        """Count a violation; block the client once ``threshold`` is reached."""
+        raise NotImplementedError
+
+    def track_activity(self, client: str, path: str) -> Activity:
+        """Count a request and return the client's recent activity."""
+        raise NotImplementedError
+
+    def track_error(self, client: str):
+        """Count an error response for the client."""
+        raise NotImplementedError
+
+
+class LocalMemoryRateLimiter(BaseRateLimiter):
+    """Process-local limiter, for development and tests."""
+
+    # Seconds between sweeps of expired counters and path sets
+    SWEEP_INTERVAL = 60
+
+    def __init__(self):
+        self._counters: dict[str, tuple[float, float]] = {}  # key -> (value, expires_at)
+        self._paths: dict[str, tuple[set, float]] = {}
+        self._lock = threading.Lock()
+        self._next_sweep = 0.0
+
+    def _sweep(self, now: float):
+        """Drop expired entries, as the cache TTLs would (called under the lock)."""
+        if now < self._next_sweep:
+            return
+        self._next_sweep = now + self.SWEEP_INTERVAL
+        for store in (self._counters, self._paths):
+            for key in [key for key, entry in store.items() if entry[1] <= now]:
+                del store[key]
+
+    def _get(self, key: str, now: float) -> float:
+        entry = self._counters.get(key)
+        if entry is None or entry[1] <= now:
+            return 0
+        return entry[0]
+
+    def _incr(self, key: str, now: float, ttl: float):
+        self._sweep(now)
+        self._counters[key] = (self._get(key, now) + 1, now + ttl)
+
+    def _estimate(self, scope_key: str, window: int, now: float) -> float:
+        idx = int(now // window)
+        return (self._get(f'{scope_key}:{idx - 1}', now) * _window_weight(now, window)
+                + self._get(f'{scope_key}:{idx}', now))
+
+    def _count(self, scope_key: str, window: int, now: float):
+        self._incr(f'{scope_key}:{int(now // window)}', now, window * 2)
+
+    def hit(self, client: str, limits: list[RateLimit]) -> RateLimitResult:
+        now = time.time()
+        with self._lock:
+            if self._get(f'{client}:blocked', now):
+                return RateLimitResult(allowed=False, blocked=True)
+            for limit in limits:
+                if self._estimate(f'{client}:{limit.scope}', limit.window, now) >= limit.limit:
+                    return RateLimitResult(allowed=False, exceeded=limit)
+            for limit in limits:
+                self._count(f'{client}:{limit.scope}', limit.window, now)
+        return RateLimitResult(allowed=True)
+
+    def record_violation(self, client, threshold, window, block_for):
+        now = time.time()
+        with self._lock:
+            self._count(f'{client}:violations', window, now)
+            if self._estimate(f'{client}:violations', window, now) >= threshold:
+                self._counters[f'{client}:blocked'] = (1, now + block_for)
+                return True
+        return False
+
+    def track_activity(self, client, path):
+        now = time.time()
+        with self._lock:
+            self._count(f'{client}:activity', ACTIVITY_WINDOW, now)
+            paths, expires = self._paths.get(client, (set(), 0))
+            if expires <= now:
+                paths = set()
+            paths.add(path)
+            self._paths[client] = (paths, now + ACTIVITY_WINDOW * 2)
+            return Activity(
+                requests=int(self._estimate(f'{client}:activity', ACTIVITY_WINDOW, now)),
+                unique_paths=len(paths),
+                errors=int(self._estimate(f'{client}:errors', ACTIVITY_WINDOW, now)),
+            )
+
+    def track_error(self, client):
+        now = time.time()
+        with self._lock:
+            self._count(f'{client}:errors', ACTIVITY_WINDOW, now)
+
+
+# KEYS[1] = block key, then per limit: current and previous window keys
+# ARGV[1] = now (ms), then per limit: limit, window (ms)
+HIT_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return -1
+end
+local now = tonumber(ARGV[1])
+local n = math.floor((#KEYS - 1) / 2)
+for i = 1, n do
+    local limit = tonumber(ARGV[i * 2])
+    local window = tonumber(ARGV[i * 2 + 1])
+    local curr = tonumber(redis.call('GET', KEYS[i * 2]) or '0')
+    local prev = tonumber(redis.call('GET', KEYS[i * 2 + 1]) or '0')
+    if prev * (window - now % window) / window + curr >= limit then
+        return i
+    end
+end
+for i = 1, n do
+    redis.call('INCR', KEYS[i * 2])
+    redis.call('PEXPIRE', KEYS[i * 2], tonumber(ARGV[i * 2 + 1]) * 2)
+end
+return 0
+"""
+
+# KEYS = violations current, violations previous, block key
+# ARGV = now (ms), window (ms), threshold, block duration (ms)
+VIOLATION_SCRIPT = """
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local curr = redis.call('INCR', KEYS[1])
+redis.call('PEXPIRE', KEYS[1], window * 2)
+local prev = tonumber(redis.call('GET', KEYS[2]) or '0')
+if prev * (window - now % window) / window + curr >= tonumber(ARGV[3]) then
+    redis.call('SET', KEYS[3], 1, 'PX', ARGV[4])
+    return 1
+end
+return 0
+"""
+
+# KEYS = requests current, requests previous, paths HLL, errors current, errors previous
+# ARGV = now (ms), window (ms), path
+ACTIVITY_SCRIPT = """
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local weight = (window - now % window) / window
+local requests = redis.call('INCR', KEYS[1])
+redis.call('PEXPIRE', KEYS[1], window * 2)
+redis.call('PFADD', KEYS[3], ARGV[3])
+redis.call('PEXPIRE', KEYS[3], window * 2)
+requests = requests + tonumber(redis.call('GET', KEYS[2]) or '0') * weight
+local errors = tonumber(redis.call('GET', KEYS[4]) or '0')
+    + tonumber(redis.call('GET', KEYS[5]) or '0') * weight
+return {math.floor(requests), redis.call('PFCOUNT', KEYS[3]), math.floor(errors)}
+"""
+
+
+class RedisRateLimiter(BaseRateLimiter):
+    """
+    Shared limiter: each call is one atomic Lua script.  Keys carry the
+    client in a hash tag so all of a client's keys live on one slot.
+
+    Redis errors fail open so an outage does not take the API down.
+    """
+
+    KEY_PREFIX = 'rl'
+
+    def __init__(self, url: Optional[str] = None, client=None):
+        if client is None:
+            import redis
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self._hit = client.register_script(HIT_SCRIPT)
+        self._violation = client.register_script(VIOLATION_SCRIPT)
+        self._activity = client.register_script(ACTIVITY_SCRIPT)
+
+    def _key(self, client: str, scope: str) -> str:
+        return f'{self.KEY_PREFIX}:{{{client}}}:{scope}'
+
+    def _window_keys(self, client: str, scope: str, window: int, now: float) -> list[str]:
+        idx = int(now // window)
+        base = self._key(client, scope)
+        return [f'{base}:{idx}', f'{base}:{idx - 1}']
+
+    def hit(self, client, limits):
+        now = time.time()
+        keys = [self._key(client, 'blocked')]
+        args = [int(now * 1000)]
+        for limit in limits:
+            keys += self._window_keys(client, limit.scope, limit.window, now)
+            args += [limit.limit, limit.window * 1000]
+        try:
+            result = int(self._hit(keys=keys, args=args))
+        except Exception as e:
+            security_logger.error(f"Rate limiter unavailable: {e}")
+            return RateLimitResult(allowed=True)
+        if result == -1:
+            return RateLimitResult(allowed=False, blocked=True)
+        if result > 0:
+            return RateLimitResult(allowed=False, exceeded=limits[result - 1])
+        return RateLimitResult(allowed=True)
+
+    def record_violation(self, client, threshold, window, block_for):
+        now = time.time()
+        keys = self._window_keys(client, 'violations', window, now) + [self._key(client, 'blocked')]
+        try:
+            return bool(self._violation(
+                keys=keys, args=[int(now * 1000), window * 1000, threshold, block_for * 1000],
+            ))
+        except Exception as e:
+            security_logger.error(f"Rate limiter unavailable: {e}")
+            return False
+
+    def track_activity(self, client, path):
+        now = time.time()
+        keys = (
+            self._window_keys(client, 'activity', ACTIVITY_WINDOW, now)
+            + [self._key(client, 'paths')]
+            + self._window_keys(client, 'errors', ACTIVITY_WINDOW, now)
+        )
+        try:
+            requests, paths, errors = self._activity(
+                keys=keys, args=[int(now * 1000), ACTIVITY_WINDOW * 1000, path],
+            )
+        except Exception as e:
+            security_logger.error(f"Rate limiter unavailable: {e}")
+            return Activity(0, 0, 0)
+        return Activity(int(requests), int(paths), int(errors))
+
+    def track_error(self, client):
+        now = time.time()
+        key = self._window_keys(client, 'errors', ACTIVITY_WINDOW, now)[0]
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            pipe.incr(key)
+            pipe.expire(key, ACTIVITY_WINDOW * 2)
+            pipe.execute()
+        except Exception as e:
+            security_logger.error(f"Rate limiter unavailable: {e}")
+
+
+def get_rate_limiter() -> BaseRateLimiter:
+    """Build the limiter configured in settings."""
+    if getattr(settings, 'RATE_LIMIT_BACKEND', 'memory') == 'redis':
+        return RedisRateLimiter(getattr(settings, 'RATE_LIMIT_REDIS_URL', None) or settings.REDIS_URL)
+    return LocalMemoryRateLimiter()
@@ -8,13 +8,17 @@ Implements comprehensive security measures:
 - Anomaly detection
 """
 import re
+import json
 import time
 import logging
+import threading
 from django.conf import settings
 from django.core.cache import cache
 from django.http import JsonResponse
 from django.utils.deprecation import MiddlewareMixin
 
+from backend.rate_limit import RateLimit, RateLimitRouter, get_rate_limiter
+
 security_logger = logging.getLogger('security')
 
 
@@ -42,6 +46,18 @@ class AdvancedRateLimitMiddleware(MiddlewareMixin):
     GLOBAL_RATE_LIMIT = 500  # requests per minute per IP
     BURST_LIMIT = 20  # max requests per second
     
+    # Auto-block after this many burst violations within 5 minutes
+    VIOLATION_THRESHOLD = 10
+    VIOLATION_WINDOW = 300
+    BLOCK_DURATION = 3600
+    
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.router = RateLimitRouter(self.RATE_LIMITS)
+        self.limiter = get_rate_limiter()
+        self._burst = RateLimit('burst', self.BURST_LIMIT, 1)
+        self._global = RateLimit('global', self.GLOBAL_RATE_LIMIT, 60)
+    
     def process_request(self, request):
         """Apply rate limiting checks"""
         # Skip for health checks, static files, and CORS preflight OPTIONS requests
@@ -50,97 +66,51 @@ class AdvancedRateLimitMiddleware(MiddlewareMixin):
         
         ip = self._get_client_ip(request)
         
-        # Check if IP is blocked
-        if self._is_ip_blocked(ip):
+        # Blocklist, burst, global and path limits in one atomic call
+        limits = [self._burst, self._global]
+        path_limit = self.router.match(request.path)
+        if path_limit is not None:
+            limits.append(path_limit)
+        result = self.limiter.hit(ip, limits)
+        
+        if result.allowed:
+            return None
+        
+        if result.blocked:
             security_logger.warning(f"Blocked IP attempted access: {ip}")
             return JsonResponse(
                 {'error': 'Access denied', 'code': 'IP_BLOCKED'},
                 status=403
             )
         
-        # Apply burst protection
-        burst_key = f'burst:{ip}'
-        burst_count = cache.get(burst_key, 0)
-        if burst_count >= self.BURST_LIMIT:
+        if result.exceeded is self._burst:
             self._record_rate_limit_violation(ip, 'burst')
             return JsonResponse(
                 {'error': 'Too many requests', 'code': 'BURST_LIMIT_EXCEEDED', 'retry_after': 1},
                 status=429
             )
-        cache.set(burst_key, burst_count + 1, 1)  # 1 second window
         
-        # Apply global rate limit
-        if not self._check_rate_limit(ip, 'global', self.GLOBAL_RATE_LIMIT, 60):
+        if result.exceeded is self._global:
             return JsonResponse(
                 {'error': 'Rate limit exceeded', 'code': 'GLOBAL_RATE_LIMIT', 'retry_after': 60},
                 status=429
             )
         
-        # Apply path-specific rate limit
-        for pattern, limits in self.RATE_LIMITS.items():
-            if re.match(pattern, request.path):
-                # key not used
-                _ = f"ratelimit:{ip}:{pattern}"
-                if not self._check_rate_limit(ip, pattern, limits['requests'], limits['window']):
-                    return JsonResponse(
-                        {'error': 'Rate limit exceeded', 'code': 'ENDPOINT_RATE_LIMIT', 'retry_after': limits['window']},
-                        status=429
-                    )
-                break
-        
-        return None
-    
-    def _check_rate_limit(self, ip, scope, max_requests, window_seconds):
-        """
-        Sliding window rate limiting algorithm
-        Returns True if request is allowed, False if rate limited
-        """
-        key = f"ratelimit:{ip}:{scope}"
-        now = time.time()
-        window_start = now - window_seconds
-        
-        # Get current window data
-        data = cache.get(key, {'requests': []})
-        
-        # Clean old requests
-        data['requests'] = [ts for ts in data['requests'] if ts > window_start]
-        
-        # Check if limit exceeded
-        if len(data['requests']) >= max_requests:
-            return False
-        
-        # Add current request
-        data['requests'].append(now)
-        cache.set(key, data, window_seconds * 2)
-        
-        return True
-    
-    def _is_ip_blocked(self, ip):
-        """Check if IP is in blocklist"""
-        return cache.get(f'ip_blocked:{ip}', False)
+        return JsonResponse(
+            {'error': 'Rate limit exceeded', 'code': 'ENDPOINT_RATE_LIMIT', 'retry_after': result.exceeded.window},
+            status=429
+        )
     
     def _record_rate_limit_violation(self, ip, violation_type):
-        """Record rate limit violation for anomaly detection"""
-        key = f'rate_violations:{ip}'
-        violations = cache.get(key, [])
-        violations.append({
-            'type': violation_type,
-            'timestamp': time.time()
-        })
-        
-        # Keep last 100 violations
-        violations = violations[-100:]
-        cache.set(key, violations, 3600)
-        
-        # Auto-block if too many violations
-        recent_violations = [v for v in violations if time.time() - v['timestamp'] < 300]
-        if len(recent_violations) >= 10:
-            self._block_ip(ip, 'Excessive rate limit violations', 3600)
-    
-    def _block_ip(self, ip, reason, duration=3600):
-        """Block an IP address"""
-        cache.set(f'ip_blocked:{ip}', True, duration)
-        security_logger.warning(f"IP blocked: {ip} - Reason: {reason} - Duration: {duration}s")
+        """Record rate limit violation; auto-block on repeated violations"""
+        blocked = self.limiter.record_violation(
+            ip, self.VIOLATION_THRESHOLD, self.VIOLATION_WINDOW, self.BLOCK_DURATION
+        )
+        if blocked:
+            security_logger.warning(
+                f"IP blocked: {ip} - Reason: Excessive rate limit violations ({violation_type}) - "
+                f"Duration: {self.BLOCK_DURATION}s"
+            )
     
     @staticmethod
     def _get_client_ip(request):
@@ -280,89 +250,221 @@ class RequestValidationMiddleware(MiddlewareMixin):
         r"%2e%2e\\",
     ]
     
+    # Literals (lowercase) one of which must occur for a pattern to
+    # match.  A pattern is only run when its literals are present, so
+    # clean input costs a few substring scans instead of regex passes.
+    PATTERN_LITERALS = {
+        r"(\%27)|(\')|(\-\-)|(\%23)|(#)": ("%27", "'", "--", "%23", "#"),
+        r"((\%3D)|(=))[^\n]*((\%27)|(\')|(\-\-)|(\%3B)|(;))": ("%3d", "="),
+        r"\w*((\%27)|(\'))((\%6F)|o|(\%4F))((\%72)|r|(\%52))": ("%27", "'"),
+        r"union.+select": ("union",),
+        r"insert\s+into": ("insert",),
+        r"drop\s+table": ("drop",),
+        r"delete\s+from": ("delete",),
+        r"<script[^>]*>.*?</script>": ("<script",),
+        r"javascript:": ("javascript:",),
+        r"on\w+\s*=": ("=",),
+        r"<iframe[^>]*>": ("<iframe",),
+        r"<object[^>]*>": ("<object",),
+        r"data:text/html": ("data:text/html",),
+    }
+    
     # Maximum request body size (10MB)
     MAX_BODY_SIZE = 10 * 1024 * 1024
     
+    # Top-level JSON fields that carry design documents rather than user
+    # text (hex colors, SVG paths, ...), keyed by path regex.  String
+    # leaves under these fields are not scanned.  Override with the
+    # REQUEST_VALIDATION_SKIP_FIELDS setting.
+    SKIP_FIELDS = {
+        r'^/api/(v1/)?projects/': ['design_data', 'properties', 'color_palette', 'suggested_fonts'],
+    }
+    
+    # Per-process inspection timings, see get_stats()
+    _stats = {'requests': 0, 'scanned_bytes': 0, 'total_us': 0, 'max_us': 0}
+    _stats_lock = threading.Lock()
+    
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self._malicious_rules = self._compile(self.SQL_INJECTION_PATTERNS + self.XSS_PATTERNS)
+        self._path_traversal_rules = self._compile(self.PATH_TRAVERSAL_PATTERNS)
+        skip_fields = getattr(settings, 'REQUEST_VALIDATION_SKIP_FIELDS', self.SKIP_FIELDS)
+        self._skip_fields = [
+            (re.compile(pattern), frozenset(fields))
+            for pattern, fields in skip_fields.items()
+        ]
+    
+    def _compile(self, patterns):
+        """Precompile patterns, paired with their prefilter literals"""
+        return [
+            (self.PATTERN_LITERALS.get(pattern), re.compile(pattern, re.IGNORECASE))
+            for pattern in patterns
+        ]
+    
+    @staticmethod
+    def _matches(rules, text):
+        """Check text against compiled rules in a single lowercase pass"""
+        text_lower = text.lower()
+        for literals, regex in rules:
+            if literals is not None and not any(lit in text_lower for lit in literals):
+                continue
+            if regex.search(text_lower):
+                return True
+        return False
+    
     def process_request(self, request):
         """Validate and sanitize request"""
         # Skip for CORS preflight OPTIONS requests
         if request.method == 'OPTIONS':
             return None
         
-        # Check request size
-        content_length = request.META.get('CONTENT_LENGTH')
-        if content_length:
-            try:
-                if int(content_length) > self.MAX_BODY_SIZE:
-                    return JsonResponse(
-                        {'error': 'Request too large', 'code': 'REQUEST_TOO_LARGE'},
-                        status=413
-                    )
-            except ValueError:
-                pass
-        
-        # Check for path traversal in URL
-        if self._contains_pattern(request.path, self.PATH_TRAVERSAL_PATTERNS):
-            security_logger.warning(f"Path traversal attempt: {request.path}")
-            return JsonResponse(
-                {'error': 'Invalid request', 'code': 'INVALID_PATH'},
-                status=400
-            )
-        
-        # Check query parameters
-        query_string = request.META.get('QUERY_STRING', '')
-        if self._is_malicious_input(query_string):
-            ip = self._get_client_ip(request)
-            security_logger.warning(f"Malicious query string from {ip}: {query_string[:200]}")
-            return JsonResponse(
-                {'error': 'Invalid request', 'code': 'MALICIOUS_INPUT'},
-                status=400
-            )
-        
-        # Check POST body for JSON requests
-        if request.method in ('POST', 'PUT', 'PATCH'):
-            content_type = request.content_type
-            if content_type and 'application/json' in content_type:
+        started = time.perf_counter_ns()
+        scanned = 0
+        try:
+            # Check request size
+            content_length = request.META.get('CONTENT_LENGTH')
+            if content_length:
                 try:
-                    body = request.body.decode('utf-8')
-                    if self._is_malicious_input(body):
+                    if int(content_length) > self.MAX_BODY_SIZE:
+                        return self._too_large()
+                except ValueError:
+                    pass
+            
+            # Check for path traversal in URL
+            if self._matches(self._path_traversal_rules, request.path):
+                security_logger.warning(f"Path traversal attempt: {request.path}")
+                return JsonResponse(
+                    {'error': 'Invalid request', 'code': 'INVALID_PATH'},
+                    status=400
+                )
+            
+            # Check query parameters
+            query_string = request.META.get('QUERY_STRING', '')
+            scanned += len(query_string)
+            if self._is_malicious_input(query_string):
+                ip = self._get_client_ip(request)
+                security_logger.warning(f"Malicious query string from {ip}: {query_string[:200]}")
+                return JsonResponse(
+                    {'error': 'Invalid request', 'code': 'MALICIOUS_INPUT'},
+                    status=400
+                )
+            
+            # Check POST body for JSON requests
+            if request.method in ('POST', 'PUT', 'PATCH'):
+                content_type = request.content_type
+                if content_type and 'application/json' in content_type:
+                    try:
+                        body = request.body
+                    except Exception:
+                        return None
+                    # Content-Length can be absent (chunked uploads), so
+                    # cap on what was actually received as well.
+                    if len(body) > self.MAX_BODY_SIZE:
+                        return self._too_large()
+                    scanned += len(body)
+                    if self._is_malicious_body(body, request.path):
                         ip = self._get_client_ip(request)
                         security_logger.warning(f"Malicious JSON body from {ip}")
                         return JsonResponse(
                             {'error': 'Invalid request', 'code': 'MALICIOUS_INPUT'},
                             status=400
                         )
-                except Exception:
-                    pass
-        
-        return None
+            
+            return None
+        finally:
+            elapsed_us = (time.perf_counter_ns() - started) // 1000
+            request.validation_us = elapsed_us
+            self._record(elapsed_us, scanned)
+    
+    def process_response(self, request, response):
+        """Expose inspection time as a Server-Timing metric"""
+        elapsed_us = getattr(request, 'validation_us', None)
+        if elapsed_us is not None:
+            timing = f'reqval;desc="request validation";dur={elapsed_us / 1000:.3f}'
+            existing = response.get('Server-Timing')
+            response['Server-Timing'] = f'{existing}, {timing}' if existing else timing
+        return response
+    
+    @staticmethod
+    def _too_large():
+        return JsonResponse(
+            {'error': 'Request too large', 'code': 'REQUEST_TOO_LARGE'},
+            status=413
+        )
     
     def _is_malicious_input(self, text):
         """Check if text contains malicious patterns"""
         if not text:
             return False
-        
-        text_lower = text.lower()
-        
-        # Check SQL injection patterns
-        for pattern in self.SQL_INJECTION_PATTERNS:
-            if re.search(pattern, text_lower, re.IGNORECASE):
-                return True
-        
-        # Check XSS patterns
-        for pattern in self.XSS_PATTERNS:
-            if re.search(pattern, text_lower, re.IGNORECASE):
-                return True
-        
-        return False
+        return self._matches(self._malicious_rules, text)
     
-    def _contains_pattern(self, text, patterns):
-        """Check if text contains any of the patterns"""
-        text_lower = text.lower()
-        for pattern in patterns:
-            if re.search(pattern, text_lower, re.IGNORECASE):
-                return True
-        return False
+    def _is_malicious_body(self, body, path):
+        """
+        Check the string keys and values of a JSON body, skipping design
+        payload fields allowlisted for this path.  Bodies that are not
+        valid JSON are scanned as raw text.
+        """
+        try:
+            data = json.loads(body)
+        except (ValueError, RecursionError):
+            return self._is_malicious_input(body.decode('utf-8', errors='replace'))
+        
+        skip = set()
+        for pattern, fields in self._skip_fields:
+            if pattern.match(path):
+                skip |= fields
+        
+        if isinstance(data, dict):
+            strings = list(data)
+            stack = [value for key, value in data.items() if key not in skip]
+        else:
+            strings = []
+            stack = [data]
+        
+        while stack:
+            node = stack.pop()
+            if isinstance(node, str):
+                strings.append(node)
+            elif isinstance(node, dict):
+                strings.extend(node)
+                stack.extend(node.values())
+            elif isinstance(node, list):
+                stack.extend(node)
+        
+        return self._matches_any(self._malicious_rules, strings)
+    
+    @staticmethod
+    def _matches_any(rules, strings):
+        """
+        Check each string against compiled rules.  One pass over the
+        joined strings finds candidate rules; since some patterns can
+        span the separator (``\\s``, ``[^>]*``), a candidate only counts
+        when it matches within a single string.
+        """
+        joined = '\n'.join(strings).lower()
+        candidates = [
+            regex for literals, regex in rules
+            if (literals is None or any(lit in joined for lit in literals)) and regex.search(joined)
+        ]
+        return any(regex.search(string) for regex in candidates for string in strings)
+    
+    @classmethod
+    def _record(cls, elapsed_us, scanned_bytes):
+        with cls._stats_lock:
+            stats = cls._stats
+            stats['requests'] += 1
+            stats['scanned_bytes'] += scanned_bytes
+            stats['total_us'] += elapsed_us
+            if elapsed_us > stats['max_us']:
+                stats['max_us'] = elapsed_us
+    
+    @classmethod
+    def get_stats(cls):
+        """Inspection time per request in this process (microseconds)"""
+        with cls._stats_lock:
+            stats = dict(cls._stats)
+        stats['avg_us'] = round(stats['total_us'] / stats['requests'], 1) if stats['requests'] else 0
+        return stats
     
     @staticmethod
     def _get_client_ip(request):
@@ -385,6 +487,10 @@ class AnomalyDetectionMiddleware(MiddlewareMixin):
     ERROR_RATE_THRESHOLD = 0.3  # 30% error rate
     UNIQUE_PATHS_THRESHOLD = 50  # Too many unique paths in short time
     
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.limiter = get_rate_limiter()
+    
     def process_request(self, request):
         """Track request patterns for anomaly detection"""
         # Skip for CORS preflight OPTIONS requests
@@ -392,88 +498,44 @@ class AnomalyDetectionMiddleware(MiddlewareMixin):
             return None
         
         ip = self._get_client_ip(request)
-        now = time.time()
-        
-        # Track request patterns
-        self._track_request(ip, request.path, now)
         
-        # Check for anomalies
-        anomalies = self._detect_anomalies(ip)
+        # Track request patterns and check for anomalies
+        activity = self.limiter.track_activity(ip, request.path)
+        anomalies = self._detect_anomalies(activity)
         if anomalies:
             security_logger.warning(f"Anomalies detected for {ip}: {anomalies}")
             # Store anomaly report
             cache.set(f'anomaly_report:{ip}', {
                 'anomalies': anomalies,
-                'timestamp': now
+                'timestamp': time.time()
             }, 3600)
         
         return None
     
     def process_response(self, request, response):
         """Track response status for anomaly detection"""
-        ip = self._get_client_ip(request)
-        
         # Track error responses
         if response.status_code >= 400:
-            self._track_error(ip, response.status_code)
+            self.limiter.track_error(self._get_client_ip(request))
         
         return response
     
-    def _track_request(self, ip, path, timestamp):
-        """Track request for pattern analysis"""
-        key = f'request_tracking:{ip}'
-        data = cache.get(key, {'requests': [], 'paths': set()})
-        
-        # Convert set to list for JSON serialization
-        if isinstance(data.get('paths'), set):
-            data['paths'] = list(data['paths'])
-        
-        # Add current request
-        data['requests'].append(timestamp)
-        if path not in data['paths']:
-            data['paths'].append(path)
-        
-        # Keep only last 5 minutes of data
-        cutoff = timestamp - 300
-        data['requests'] = [ts for ts in data['requests'] if ts > cutoff]
-        
-        cache.set(key, data, 600)
-    
-    def _track_error(self, ip, status_code):
-        """Track error response"""
-        key = f'error_tracking:{ip}'
-        errors = cache.get(key, [])
-        errors.append({
-            'status': status_code,
-            'timestamp': time.time()
-        })
-        
-        # Keep last 100 errors
-        errors = errors[-100:]
-        cache.set(key, errors, 3600)
-    
-    def _detect_anomalies(self, ip):
+    def _detect_anomalies(self, activity):
         """Detect anomalies in request patterns"""
         anomalies = []
         
-        # Get tracking data
-        request_data = cache.get(f'request_tracking:{ip}', {'requests': [], 'paths': []})
-        error_data = cache.get(f'error_tracking:{ip}', [])
-        
         # Check request rate
-        requests_count = len(request_data['requests'])
+        requests_count = activity.requests
         if requests_count > self.REQUESTS_PER_MINUTE_THRESHOLD:
             anomalies.append(f'high_request_rate:{requests_count}/min')
         
         # Check unique paths
-        paths_count = len(request_data.get('paths', []))
-        if paths_count > self.UNIQUE_PATHS_THRESHOLD:
-            anomalies.append(f'path_enumeration:{paths_count}_unique_paths')
+        if activity.unique_paths > self.UNIQUE_PATHS_THRESHOLD:
+            anomalies.append(f'path_enumeration:{activity.unique_paths}_unique_paths')
         
         # Check error rate
         if requests_count > 10:  # Only check if sufficient data
-            recent_errors = [e for e in error_data if time.time() - e['timestamp'] < 300]
-            error_rate = len(recent_errors) / requests_count
+            error_rate = activity.errors / requests_count
             if error_rate > self.ERROR_RATE_THRESHOLD:
                 anomalies.append(f'high_error_rate:{error_rate:.2%}')
         
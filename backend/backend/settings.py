@@ -349,6 +349,57 @@ REDIS_PORT = int(os.getenv('REDIS_PORT', 6379))
 REDIS_DB = int(os.getenv('REDIS_DB', 0))
 REDIS_URL = f'redis://{REDIS_HOST}:{REDIS_PORT}/{REDIS_DB}'
 
+# CRDT document store: 'memory' (single process) or 'redis' (shared by all
+# ASGI workers). Op-logs are checkpointed every CRDT_CHECKPOINT_INTERVAL ops.
+CRDT_STORE_BACKEND = os.getenv('CRDT_STORE_BACKEND', 'memory' if DEBUG else 'redis')
+CRDT_STORE_REDIS_URLS = [
+    u.strip() for u in os.getenv('CRDT_STORE_REDIS_URLS', REDIS_URL).split(',') if u.strip()
+]
+CRDT_CHECKPOINT_INTERVAL = int(os.getenv('CRDT_CHECKPOINT_INTERVAL', 500))
+CRDT_DOCUMENT_TTL = int(os.getenv('CRDT_DOCUMENT_TTL', 7 * 24 * 3600))
+# Outbound CRDT ops are coalesced per room and broadcast once per tick
+# (0 disables coalescing).
+CRDT_BROADCAST_TICK_MS = int(os.getenv('CRDT_BROADCAST_TICK_MS', 25))
+CRDT_BROADCAST_MAX_OPS = int(os.getenv('CRDT_BROADCAST_MAX_OPS', 500))
+
+# Rate limiter for the security middleware: 'memory' (per process) or
+# 'redis' (shared, one Lua script call per request).
+RATE_LIMIT_BACKEND = os.getenv('RATE_LIMIT_BACKEND', 'memory' if DEBUG else 'redis')
+RATE_LIMIT_REDIS_URL = os.getenv('RATE_LIMIT_REDIS_URL', REDIS_URL)
+
+# Presence, cursors and component locks of collaboration rooms: 'memory'
+# (single process) or 'redis' (shared). Locks expire COLLAB_LOCK_TTL seconds
+# after they were last acquired or used.
+COLLAB_ROOM_STATE_BACKEND = os.getenv('COLLAB_ROOM_STATE_BACKEND', 'memory' if DEBUG else 'redis')
+COLLAB_ROOM_STATE_REDIS_URL = os.getenv('COLLAB_ROOM_STATE_REDIS_URL', REDIS_URL)
+COLLAB_LOCK_TTL = int(os.getenv('COLLAB_LOCK_TTL', 30))
+# Canvas cursor/selection fan-out is throttled per user to one update per
+# CANVAS_EPHEMERAL_INTERVAL_MS; session rows are written behind every
+# CANVAS_SESSION_FLUSH_SECONDS and on disconnect.
+CANVAS_EPHEMERAL_INTERVAL_MS = int(os.getenv('CANVAS_EPHEMERAL_INTERVAL_MS', 50))
+CANVAS_SESSION_FLUSH_SECONDS = float(os.getenv('CANVAS_SESSION_FLUSH_SECONDS', 10))
+# WebSocket connects cache the JWT user row per worker for WS_USER_CACHE_TTL
+# seconds and project access answers in the shared cache for
+# WS_ACCESS_CACHE_TTL seconds (invalidated on collaborator changes).
+WS_USER_CACHE_TTL = int(os.getenv('WS_USER_CACHE_TTL', 60))
+WS_ACCESS_CACHE_TTL = int(os.getenv('WS_ACCESS_CACHE_TTL', 60))
+# Canvas edits and collaboration chat messages are queued per process and
+# bulk-inserted every COLLAB_WRITE_BUFFER_FLUSH_MS or once
+# COLLAB_WRITE_BUFFER_BATCH_SIZE rows are waiting; producers wait for the
+# running flush when more than COLLAB_WRITE_BUFFER_MAX_PENDING are queued.
+COLLAB_WRITE_BUFFER_FLUSH_MS = int(os.getenv('COLLAB_WRITE_BUFFER_FLUSH_MS', 200))
+COLLAB_WRITE_BUFFER_BATCH_SIZE = int(os.getenv('COLLAB_WRITE_BUFFER_BATCH_SIZE', 500))
+COLLAB_WRITE_BUFFER_MAX_PENDING = int(os.getenv('COLLAB_WRITE_BUFFER_MAX_PENDING', 5000))
+# Outgoing webhooks share a keep-alive pool of WEBHOOK_MAX_CONNECTIONS per
+# worker process, with at most WEBHOOK_PER_HOST_CONCURRENCY requests per
+# host. After WEBHOOK_CIRCUIT_FAILURES consecutive failures a host is
+# skipped for WEBHOOK_CIRCUIT_COOLDOWN seconds.
+WEBHOOK_MAX_CONNECTIONS = int(os.getenv('WEBHOOK_MAX_CONNECTIONS', 100))
+WEBHOOK_PER_HOST_CONCURRENCY = int(os.getenv('WEBHOOK_PER_HOST_CONCURRENCY', 8))
+WEBHOOK_TIMEOUT = float(os.getenv('WEBHOOK_TIMEOUT', 10))
+WEBHOOK_CIRCUIT_FAILURES = int(os.getenv('WEBHOOK_CIRCUIT_FAILURES', 5))
+WEBHOOK_CIRCUIT_COOLDOWN = float(os.getenv('WEBHOOK_CIRCUIT_COOLDOWN', 30))
+
 # Caching Configuration
 # Cache Configuration
 if DEBUG:
@@ -3,28 +3,88 @@ JWT authentication middleware for Django Channels WebSockets.
 
 Accepts `?token=<jwt>` on the WebSocket URL so the Next.js client can
 authenticate without relying on session cookies.
+
+Tokens are signature- and expiry-checked on every connect, but the user
+row behind them is cached per worker for `WS_USER_CACHE_TTL` seconds
+and concurrent connects for the same user share one lookup, so a
+reconnect storm costs one query per user instead of one per socket.
+Saving or deleting a user drops its entry.
 """
+import asyncio
+import copy
+import time
 from urllib.parse import parse_qs
 
 from channels.db import database_sync_to_async
 from channels.middleware import BaseMiddleware
+from django.conf import settings
 from django.contrib.auth.models import AnonymousUser
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from rest_framework_simplejwt.tokens import AccessToken
 
+DEFAULT_USER_CACHE_TTL = 60
+USER_CACHE_MAX_ENTRIES = 10000
+
+# user_id -> (user or None, expires_at monotonic)
+_users: dict[str, tuple] = {}
+_pending: dict[str, asyncio.Future] = {}
+# Bumped by invalidation so lookups already in flight are not cached
+_generation = 0
+
 
 @database_sync_to_async
-def _user_from_token(token: str):
+def _load_user(user_id: str):
     from django.contrib.auth import get_user_model
 
     User = get_user_model()
+    try:
+        return User.objects.get(id=user_id)
+    except (User.DoesNotExist, ValueError):
+        return None
+
+
+async def _cached_user(user_id: str):
+    now = time.monotonic()
+    entry = _users.get(user_id)
+    if entry is not None and entry[1] > now:
+        return entry[0]
+
+    pending = _pending.get(user_id)
+    if pending is None:
+        pending = asyncio.ensure_future(_load_user(user_id))
+        _pending[user_id] = pending
+        pending.add_done_callback(lambda _: _pending.pop(user_id, None))
+    generation = _generation
+    user = await asyncio.shield(pending)
+
+    ttl = getattr(settings, 'WS_USER_CACHE_TTL', DEFAULT_USER_CACHE_TTL)
+    if ttl > 0 and generation == _generation:
+        if len(_users) >= USER_CACHE_MAX_ENTRIES:
+            _users.clear()
+        _users[user_id] = (user, now + ttl)
+    return user
+
+
+async def _user_from_token(token: str):
     try:
         access = AccessToken(token)
         user_id = access.get('user_id')
         if not user_id:
             return AnonymousUser()
-        return User.objects.get(id=user_id)
+        user = await _cached_user(str(user_id))
     except Exception:
         return AnonymousUser()
+    # Each connection gets its own instance of the cached row
+    return copy.copy(user) if user is not None else AnonymousUser()
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def _invalidate_cached_user(sender, instance, **kwargs):
+    global _generation
+    _generation += 1
+    _users.pop(str(instance.pk), None)
 
 
 class JwtAuthMiddleware(BaseMiddleware):
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:36
+
+from django.db import migrations, models
+
+def set_generations(apps, schema_editor):
+    """Number existing commits one above their highest parent."""
+    DesignCommit = apps.get_model('design_branches', 'DesignCommit')
+    parents = {
+        pk: [p for p in (parent, merge_parent) if p]
+        for pk, parent, merge_parent in DesignCommit.objects.values_list('id', 'parent_commit_id', 'merge_parent_id')
+    }
+    generations = {}
+    for start in parents:
+        stack = [start]
+        while stack:
+            pk = stack[-1]
+            if pk in generations:
+                stack.pop()
+                continue
+            pending = [p for p in parents[pk] if p in parents and p not in generations]
+            if pending:
+                stack.extend(pending)
+                continue
+            generations[pk] = 1 + max((generations[p] for p in parents[pk] if p in parents), default=0)
+            stack.pop()
+    commits = [DesignCommit(id=pk, generation=generation) for pk, generation in generations.items()]
+    DesignCommit.objects.bulk_update(commits, ['generation'], batch_size=500)
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('design_branches', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='designcommit',
+            name='generation',
+            field=models.PositiveIntegerField(db_index=True, default=0),
+        ),
+        migrations.RunPython(set_generations, migrations.RunPython.noop),
+    ]
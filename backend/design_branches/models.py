@@ -4,7 +4,7 @@ Design Branching System
 Git-like branching for design exploration, allowing designers to
 create feature branches, experiment safely, and merge changes.
 """
-from django.db import models
+from django.db import connection, models
 from django.contrib.auth.models import User
 import uuid
 import hashlib
@@ -143,42 +143,33 @@ class DesignBranch(models.Model):
         if not target_branch:
             return {'ahead': 0, 'behind': 0}
         
-        # Get common ancestor
-        common_ancestor = self._find_common_ancestor(target_branch)
-        
-        # Count commits since common ancestor
-        our_commits = self._get_commits_since(common_ancestor)
-        their_commits = target_branch._get_commits_since(common_ancestor)
-        
-        return {
-            'ahead': len(our_commits),
-            'behind': len(their_commits)
-        }
+        ahead, behind = DesignCommit.ahead_behind(self.head_commit_id, target_branch.head_commit_id)
+        return {'ahead': ahead, 'behind': behind}
     
     def _find_common_ancestor(self, other_branch):
         """Find the common ancestor commit between two branches."""
-        our_commits = set(str(c.id) for c in self.commits.all())
-        
-        current = other_branch.head_commit
-        while current:
-            if str(current.id) in our_commits:
-                return current
-            current = current.parent_commit
-        
-        return None
+        return DesignCommit.merge_base(self.head_commit_id, other_branch.head_commit_id)
     
     def _get_commits_since(self, ancestor):
-        """Get all commits since an ancestor."""
-        if not ancestor:
-            return list(self.commits.all())
-        
-        commits = []
-        current = self.head_commit
-        while current and current != ancestor:
-            commits.append(current)
-            current = current.parent_commit
-        
-        return commits
+        """Get all commits since an ancestor, newest first."""
+        return DesignCommit.commits_between(self.head_commit_id, ancestor.id if ancestor else None)
+
+
+# Commits reachable from two heads, tagged with the side they were reached
+# from (1 for the first head, 2 for the second); a commit reachable from
+# both appears once per side.  Parents are followed through parent_commit
+# and merge_parent, so history stays one query however long it is.
+ANCESTRY_CTE = """
+WITH RECURSIVE reachable(id, side) AS (
+    SELECT c.id, 1 FROM {table} c WHERE c.id = %s
+    UNION
+    SELECT c.id, 2 FROM {table} c WHERE c.id = %s
+    UNION
+    SELECT p.id, r.side FROM reachable r
+    JOIN {table} c ON c.id = r.id
+    JOIN {table} p ON p.id = c.{parent} OR p.id = c.{merge_parent}
+)
+"""
 
 
 class DesignCommit(models.Model):
@@ -220,6 +211,10 @@ class DesignCommit(models.Model):
         related_name='merged_into'
     )
     
+    # Longest path to a root commit (roots are 1); a commit is always one
+    # generation above its parents, which gives a topological order
+    generation = models.PositiveIntegerField(default=0, db_index=True)
+    
     # Full design snapshot
     design_data = models.JSONField(default=dict)
     
@@ -263,6 +258,12 @@ class DesignCommit(models.Model):
         return f"{self.short_hash}: {self.message[:50]}"
     
     def save(self, *args, **kwargs):
+        if not self.generation:
+            parents = [pk for pk in (self.parent_commit_id, self.merge_parent_id) if pk]
+            top = DesignCommit.objects.filter(pk__in=parents).aggregate(
+                top=models.Max('generation')
+            )['top'] if parents else 0
+            self.generation = (top or 0) + 1
         if not self.commit_hash:
             self.commit_hash = self._generate_hash()
             self.short_hash = self.commit_hash[:8]
@@ -278,6 +279,58 @@ class DesignCommit(models.Model):
         }
         content_str = json.dumps(content, sort_keys=True)
         return hashlib.sha256(content_str.encode()).hexdigest()
+    
+    @classmethod
+    def _ancestry_query(cls, sql, first_id, second_id):
+        meta = cls._meta
+        cte = ANCESTRY_CTE.format(
+            table=connection.ops.quote_name(meta.db_table),
+            parent=meta.get_field('parent_commit').column,
+            merge_parent=meta.get_field('merge_parent').column,
+        )
+        params = [meta.pk.get_db_prep_value(pk, connection) if pk else None for pk in (first_id, second_id)]
+        return cte + sql.format(table=connection.ops.quote_name(meta.db_table)), params
+    
+    @classmethod
+    def ahead_behind(cls, head_id, base_id):
+        """
+        Number of commits reachable only from ``head_id`` and only from
+        ``base_id`` (either may be None), in one query.
+        """
+        sql, params = cls._ancestry_query("""
+            SELECT COALESCE(SUM(CASE WHEN lo = 1 AND hi = 1 THEN 1 ELSE 0 END), 0),
+                   COALESCE(SUM(CASE WHEN lo = 2 THEN 1 ELSE 0 END), 0)
+            FROM (SELECT id, MIN(side) AS lo, MAX(side) AS hi FROM reachable GROUP BY id) sides
+        """, head_id, base_id)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            ahead, behind = cursor.fetchone()
+        return int(ahead), int(behind)
+    
+    @classmethod
+    def merge_base(cls, first_id, second_id):
+        """The newest (highest generation) commit reachable from both heads."""
+        sql, params = cls._ancestry_query("""
+            SELECT c.* FROM {table} c
+            JOIN (SELECT id FROM reachable GROUP BY id HAVING COUNT(*) = 2) common ON common.id = c.id
+            ORDER BY c.generation DESC, c.created_at DESC
+            LIMIT 1
+        """, first_id, second_id)
+        return next(iter(cls.objects.raw(sql, params)), None)
+    
+    @classmethod
+    def commits_between(cls, head_id, ancestor_id=None):
+        """
+        Commits reachable from ``head_id`` but not from ``ancestor_id``
+        (everything reachable when it is None), newest first.
+        """
+        sql, params = cls._ancestry_query("""
+            SELECT c.* FROM {table} c
+            JOIN (SELECT id FROM reachable GROUP BY id HAVING MAX(side) = 1) ours
+                ON ours.id = c.id
+            ORDER BY c.generation DESC, c.created_at DESC
+        """, head_id, ancestor_id)
+        return list(cls.objects.raw(sql, params))
 
 
 class BranchMerge(models.Model):
@@ -188,6 +188,9 @@ class DesignBranchListSerializer(serializers.ModelSerializer):
         ]
     
     def get_commit_count(self, obj):
+        # Annotated by the list queryset
+        if hasattr(obj, 'commit_total'):
+            return obj.commit_total
         return obj.commits.count()
 
 
@@ -9,6 +9,8 @@ from typing import Optional, Dict, Any
 from django.utils import timezone
 from django.db import transaction
 
+from projects.design_diff import NodeChange, cached_node_hashes, diff_documents, diff_value
+
 from .models import (
     DesignBranch, DesignCommit, BranchMerge, MergeConflict, BranchComparison
 )
@@ -98,40 +100,27 @@ class BranchingService:
         new_snapshot: Dict
     ) -> tuple:
         """Calculate diff between two snapshots."""
+        diff = diff_documents(old_snapshot, new_snapshot, key='nodes')
         diff_data = {
-            'added': [],
-            'modified': [],
-            'deleted': [],
+            'added': [
+                {'id': node.get('id'), 'type': node.get('type'), 'name': node.get('name')}
+                for _, node in diff.added
+            ],
+            'modified': [
+                {
+                    'id': change.id,
+                    'type': change.new.get('type'),
+                    'name': change.new.get('name'),
+                    'changes': self._get_changes(change.old, change.new, change),
+                }
+                for change in diff.modified
+            ],
+            'deleted': [
+                {'id': node.get('id'), 'type': node.get('type'), 'name': node.get('name')}
+                for _, node in diff.removed
+            ],
         }
         
-        old_nodes = {n.get('id'): n for n in old_snapshot.get('nodes', [])}
-        new_nodes = {n.get('id'): n for n in new_snapshot.get('nodes', [])}
-        
-        # Find added and modified
-        for node_id, node in new_nodes.items():
-            if node_id not in old_nodes:
-                diff_data['added'].append({
-                    'id': node_id,
-                    'type': node.get('type'),
-                    'name': node.get('name'),
-                })
-            elif node != old_nodes[node_id]:
-                diff_data['modified'].append({
-                    'id': node_id,
-                    'type': node.get('type'),
-                    'name': node.get('name'),
-                    'changes': self._get_changes(old_nodes[node_id], node),
-                })
-        
-        # Find deleted
-        for node_id, node in old_nodes.items():
-            if node_id not in new_nodes:
-                diff_data['deleted'].append({
-                    'id': node_id,
-                    'type': node.get('type'),
-                    'name': node.get('name'),
-                })
-        
         files_changed = (
             len(diff_data['added']) +
             len(diff_data['modified']) +
@@ -142,22 +131,33 @@ class BranchingService:
         
         return diff_data, files_changed, insertions, deletions
     
-    def _get_changes(self, old_node: Dict, new_node: Dict) -> list:
+    def _get_changes(self, old_node: Dict, new_node: Dict, change: Optional[NodeChange] = None) -> list:
         """Get list of changed properties between nodes."""
-        changes = []
-        all_keys = set(old_node.keys()) | set(new_node.keys())
-        
-        for key in all_keys:
-            if key in ['id', 'children']:
-                continue
-            if old_node.get(key) != new_node.get(key):
-                changes.append({
-                    'property': key,
-                    'old_value': old_node.get(key),
-                    'new_value': new_node.get(key),
-                })
-        
-        return changes
+        if change is None:
+            change = NodeChange(new_node.get('id'), old_node, new_node, diff_value(old_node, new_node))
+        return [
+            {
+                'property': key,
+                'old_value': old_node.get(key),
+                'new_value': new_node.get(key),
+            }
+            for key in change.changed_keys()
+            if key not in ['id', 'children']
+        ]
+    
+    @staticmethod
+    def _head_diff(base_branch: DesignBranch, compare_branch: DesignBranch):
+        """Node diff between two branch heads, skipping nodes with equal cached hashes."""
+        documents, hashes = [], []
+        for branch in (base_branch, compare_branch):
+            commit = branch.head_commit
+            snapshot = commit.snapshot_data if commit else {}
+            documents.append(snapshot)
+            hashes.append(
+                cached_node_hashes(f'design_diff:design_commit:{commit.pk}', snapshot.get('nodes', []))
+                if commit else None
+            )
+        return diff_documents(documents[0], documents[1], key='nodes', old_hashes=hashes[0], new_hashes=hashes[1])
     
     def create_child_branch(
         self,
@@ -235,31 +235,21 @@ class BranchingService:
         """Detect merge conflicts between branches."""
         conflicts = []
         
-        source_snapshot = self.branch.head_commit.snapshot_data if self.branch.head_commit else {}
-        target_snapshot = target_branch.head_commit.snapshot_data if target_branch.head_commit else {}
-        
-        source_nodes = {n.get('id'): n for n in source_snapshot.get('nodes', [])}
-        target_nodes = {n.get('id'): n for n in target_snapshot.get('nodes', [])}
-        
         # Check for nodes modified in both branches
-        for node_id in set(source_nodes.keys()) & set(target_nodes.keys()):
-            source_node = source_nodes[node_id]
-            target_node = target_nodes[node_id]
-            
-            if source_node != target_node:
-                # Check if same properties were modified
-                for key in set(source_node.keys()) & set(target_node.keys()):
-                    if key in ['id', 'children']:
-                        continue
-                    if source_node.get(key) != target_node.get(key):
-                        conflicts.append({
-                            'node_id': node_id,
-                            'node_type': source_node.get('type'),
-                            'node_name': source_node.get('name'),
-                            'source_value': {key: source_node.get(key)},
-                            'target_value': {key: target_node.get(key)},
-                            'conflict_type': 'property',
-                        })
+        for change in self._head_diff(self.branch, target_branch).modified:
+            source_node, target_node = change.old, change.new
+            # Check if same properties were modified
+            for key in change.changed_keys():
+                if key in ['id', 'children'] or key not in source_node or key not in target_node:
+                    continue
+                conflicts.append({
+                    'node_id': change.id,
+                    'node_type': source_node.get('type'),
+                    'node_name': source_node.get('name'),
+                    'source_value': {key: source_node.get(key)},
+                    'target_value': {key: target_node.get(key)},
+                    'conflict_type': 'property',
+                })
         
         return conflicts
     
@@ -335,33 +325,20 @@ class BranchingService:
             return existing
         
         # Generate comparison
-        base_snapshot = self.branch.head_commit.snapshot_data if self.branch.head_commit else {}
-        compare_snapshot = other_branch.head_commit.snapshot_data if other_branch.head_commit else {}
-        
-        base_nodes = {n.get('id'): n for n in base_snapshot.get('nodes', [])}
-        compare_nodes = {n.get('id'): n for n in compare_snapshot.get('nodes', [])}
-        
-        nodes_added = []
-        nodes_modified = []
-        nodes_deleted = []
-        conflict_nodes = []
-        
-        # Find added and modified
-        for node_id, node in compare_nodes.items():
-            if node_id not in base_nodes:
-                nodes_added.append(node_id)
-            elif node != base_nodes[node_id]:
-                nodes_modified.append(node_id)
-                # Check for potential conflicts
-                for key in set(node.keys()) & set(base_nodes[node_id].keys()):
-                    if key not in ['id', 'children'] and node.get(key) != base_nodes[node_id].get(key):
-                        conflict_nodes.append(node_id)
-                        break
-        
-        # Find deleted
-        for node_id in base_nodes:
-            if node_id not in compare_nodes:
-                nodes_deleted.append(node_id)
+        diff = self._head_diff(self.branch, other_branch)
+        
+        nodes_added = [node.get('id') for _, node in diff.added]
+        nodes_modified = [change.id for change in diff.modified]
+        nodes_deleted = [node.get('id') for _, node in diff.removed]
+        
+        # Check for potential conflicts
+        conflict_nodes = [
+            change.id for change in diff.modified
+            if any(
+                key not in ['id', 'children'] and key in change.old and key in change.new
+                for key in change.changed_keys()
+            )
+        ]
         
         comparison = BranchComparison.objects.create(
             base_branch=self.branch,
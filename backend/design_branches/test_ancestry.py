@@ -0,0 +1,86 @@
+"""
+Unit tests for design commit ancestry queries.
+"""
+import importlib
+
+import pytest
+from django.apps import apps
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from design_branches.models import DesignBranch, DesignCommit
+from projects.models import Project
+
+
+@pytest.fixture
+def history(user):
+    """
+    main:     r1 - r2 - r3 ------- m
+                     \\           /
+    feature:          f1 - f2 -- f3
+    """
+    project = Project.objects.create(user=user, name='Branches')
+    main = DesignBranch.objects.create(project=project, name='main', is_default=True)
+    feature = DesignBranch.objects.create(project=project, name='feature', parent_branch=main)
+    commits = {}
+
+    def commit(name, branch, parent=None, merge_parent=None):
+        commits[name] = DesignCommit.objects.create(
+            branch=branch, message=name, author=user,
+            parent_commit=commits.get(parent), merge_parent=commits.get(merge_parent),
+        )
+        branch.head_commit = commits[name]
+
+    commit('r1', main)
+    commit('r2', main, 'r1')
+    commit('f1', feature, 'r2')
+    commit('r3', main, 'r2')
+    commit('f2', feature, 'f1')
+    commit('f3', feature, 'f2')
+    main.save()
+    feature.save()
+    return main, feature, commits
+
+
+@pytest.mark.unit
+@pytest.mark.django_db
+class TestCommitAncestry:
+
+    def test_generations(self, history):
+        _, _, commits = history
+        assert [commits[name].generation for name in ('r1', 'r2', 'r3', 'f1', 'f3')] == [1, 2, 3, 3, 5]
+
+    def test_ahead_behind_and_merge_base(self, history):
+        main, feature, commits = history
+        with CaptureQueriesContext(connection) as ctx:
+            assert feature.get_ahead_behind(main) == {'ahead': 3, 'behind': 1}
+        assert len(ctx.captured_queries) == 1
+        assert feature._find_common_ancestor(main) == commits['r2']
+        assert [c.message for c in feature._get_commits_since(commits['r2'])] == ['f3', 'f2', 'f1']
+        assert [c.message for c in main._get_commits_since(None)] == ['r3', 'r2', 'r1']
+
+    def test_after_merge(self, history):
+        main, feature, commits = history
+        main.head_commit = DesignCommit.objects.create(
+            branch=main, message='m', parent_commit=commits['r3'], merge_parent=commits['f3'],
+        )
+        main.save()
+        assert main.head_commit.generation == 6
+        assert main.get_ahead_behind(feature) == {'ahead': 2, 'behind': 0}
+        assert feature.get_ahead_behind(main) == {'ahead': 0, 'behind': 2}
+        assert main._find_common_ancestor(feature) == commits['f3']
+
+    def test_unrelated_and_empty_heads(self, history):
+        main, _, _ = history
+        other = DesignBranch.objects.create(project=main.project, name='empty')
+        assert main.get_ahead_behind(other) == {'ahead': 3, 'behind': 0}
+        assert main._find_common_ancestor(other) is None
+        assert other._get_commits_since(None) == []
+
+    def test_migration_backfills_generations(self, history):
+        _, _, commits = history
+        DesignCommit.objects.update(generation=0)
+        migration = importlib.import_module('design_branches.migrations.0002_commit_generation')
+        migration.set_generations(apps, None)
+        assert DesignCommit.objects.get(pk=commits['f3'].pk).generation == 5
+        assert DesignCommit.objects.get(pk=commits['r3'].pk).generation == 3
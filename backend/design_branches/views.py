@@ -6,7 +6,7 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q
+from django.db.models import Count, Q
 from django.utils import timezone
 
 from .models import (
@@ -40,10 +40,13 @@ class DesignBranchViewSet(viewsets.ModelViewSet):
     
     def get_queryset(self):
         user = self.request.user
-        return DesignBranch.objects.filter(
+        queryset = DesignBranch.objects.filter(
             Q(project__owner=user) |
             Q(project__team__members=user)
         ).distinct().select_related('parent_branch', 'created_by')
+        if self.action == 'list':
+            queryset = queryset.annotate(commit_total=Count('commits', distinct=True))
+        return queryset
     
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user)
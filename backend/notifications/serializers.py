@@ -28,6 +28,19 @@ class WebhookSerializer(serializers.ModelSerializer):
             'secret_key': {'write_only': True}
         }
 
+    def validate_headers(self, value):
+        """Extra request headers: ASCII names mapped to string values."""
+        if value in (None, ''):
+            return {}
+        if not isinstance(value, dict):
+            raise serializers.ValidationError('Headers must be an object of name/value pairs.')
+        for name, header_value in value.items():
+            if not isinstance(header_value, str):
+                raise serializers.ValidationError(f'Header "{name}" must have a string value.')
+            if not (name + header_value).isascii() or '\r' in header_value or '\n' in header_value:
+                raise serializers.ValidationError(f'Header "{name}" must be single-line ASCII.')
+        return value
+
 
 class WebhookDeliverySerializer(serializers.ModelSerializer):
     webhook_name = serializers.CharField(source='webhook.name', read_only=True)
@@ -1,15 +1,95 @@
-import hmac
-import hashlib
-import json
-import requests
 from celery import shared_task
+from django.db import connection
+from django.db.models import Case, CharField, F, IntegerField, Q, Value, When
 from django.utils import timezone
 from django.contrib.auth.models import User
 from .models import Webhook, WebhookDelivery
+from .webhook_dispatcher import build_request, get_dispatcher
 
+# First attempt plus three retries, backing off 60s, 120s, 240s
+MAX_DELIVERY_ATTEMPTS = 4
 
-@shared_task(bind=True, max_retries=3)
-def send_webhook(self, webhook_id, event_type, payload):
+
+def subscribed_webhooks(user_id, event_type):
+    """Active webhooks of a user subscribed to ``event_type`` (or ``*``)."""
+    webhooks = Webhook.objects.filter(user_id=user_id, active=True)
+    if connection.features.supports_json_field_contains:
+        return list(webhooks.filter(Q(events__contains=[event_type]) | Q(events__contains=['*'])))
+    # SQLite has no JSON containment lookup
+    return [w for w in webhooks if event_type in w.events or '*' in w.events]
+
+
+def deliver_webhooks(deliveries, attempt=1):
+    """
+    Send ``deliveries`` (with their webhooks loaded) in one pooled batch,
+    record every outcome with two bulk queries and schedule a retry for
+    the failures.  Returns the results in delivery order.
+    """
+    results = get_dispatcher().dispatch_sync([
+        build_request(
+            d.webhook.url, d.event_type, d.payload, d.id,
+            secret_key=d.webhook.secret_key, extra_headers=d.webhook.headers,
+        )
+        for d in deliveries
+    ])
+
+    now = timezone.now()
+    retry_ids = []
+    for delivery, result in zip(deliveries, results):
+        delivery.status_code = result.status_code
+        delivery.response_body = result.response_body
+        delivery.error_message = result.error
+        delivery.attempt_count = attempt
+        if result.ok:
+            delivery.status = 'success'
+            delivery.delivered_at = now
+        elif attempt < MAX_DELIVERY_ATTEMPTS:
+            delivery.status = 'retrying'
+            retry_ids.append(delivery.id)
+        else:
+            delivery.status = 'failed'
+    WebhookDelivery.objects.bulk_update(
+        deliveries,
+        ['status', 'status_code', 'response_body', 'error_message', 'attempt_count', 'delivered_at'],
+    )
+    _record_webhook_stats(deliveries, results, now)
+
+    if retry_ids:
+        retry_webhook_deliveries.apply_async(
+            (retry_ids, attempt + 1), countdown=60 * (2 ** (attempt - 1)),
+        )
+    return results
+
+
+def _record_webhook_stats(deliveries, results, now):
+    """Add this batch to each webhook's counters in one UPDATE."""
+    stats = {}
+    for delivery, result in zip(deliveries, results):
+        total, successful, failed, _ = stats.get(delivery.webhook_id, (0, 0, 0, ''))
+        stats[delivery.webhook_id] = (
+            total + 1, successful + result.ok, failed + (not result.ok),
+            'success' if result.ok else 'failed',
+        )
+    if not stats:
+        return
+
+    def per_webhook(index, output_field=IntegerField()):
+        return Case(
+            *(When(id=webhook_id, then=Value(values[index])) for webhook_id, values in stats.items()),
+            output_field=output_field,
+        )
+
+    Webhook.objects.filter(id__in=stats).update(
+        total_deliveries=F('total_deliveries') + per_webhook(0),
+        successful_deliveries=F('successful_deliveries') + per_webhook(1),
+        failed_deliveries=F('failed_deliveries') + per_webhook(2),
+        last_status=per_webhook(3, CharField()),
+        last_delivery_at=now,
+    )
+
+
+@shared_task
+def send_webhook(webhook_id, event_type, payload):
     """
     Send webhook to external URL
     """
@@ -18,94 +98,42 @@ def send_webhook(self, webhook_id, event_type, payload):
     except Webhook.DoesNotExist:
         return {'status': 'error', 'message': 'Webhook not found or inactive'}
 
-    # Create delivery record
     delivery = WebhookDelivery.objects.create(
         webhook=webhook,
         event_type=event_type,
         payload=payload,
         status='pending'
     )
+    result = deliver_webhooks([delivery])[0]
 
-    try:
-        # Prepare request
-        headers = {
-            'Content-Type': 'application/json',
-            'User-Agent': 'DesignPlatform-Webhook/1.0',
-            'X-Webhook-Event': event_type,
-            'X-Webhook-Delivery': str(delivery.id),
-        }
-        
-        # Add custom headers
-        if webhook.headers:
-            headers.update(webhook.headers)
-        
-        # Add HMAC signature if secret key is set
-        if webhook.secret_key:
-            payload_json = json.dumps(payload)
-            signature = hmac.new(
-                webhook.secret_key.encode(),
-                payload_json.encode(),
-                hashlib.sha256
-            ).hexdigest()
-            headers['X-Webhook-Signature'] = f'sha256={signature}'
-        
-        # Send request
-        response = requests.post(
-            webhook.url,
-            json=payload,
-            headers=headers,
-            timeout=30
-        )
-        
-        # Update delivery record
-        delivery.status = 'success' if response.status_code < 400 else 'failed'
-        delivery.status_code = response.status_code
-        delivery.response_body = response.text[:1000]  # Limit size
-        delivery.attempt_count = self.request.retries + 1
-        delivery.delivered_at = timezone.now()
-        delivery.save()
-        
-        # Update webhook statistics
-        webhook.total_deliveries += 1
-        if delivery.status == 'success':
-            webhook.successful_deliveries += 1
-        else:
-            webhook.failed_deliveries += 1
-        webhook.last_delivery_at = timezone.now()
-        webhook.last_status = delivery.status
-        webhook.save()
-        
-        # Retry if failed
-        if response.status_code >= 400:
-            raise Exception(f'Webhook delivery failed with status {response.status_code}')
-        
+    if result.ok:
         return {
             'status': 'success',
             'delivery_id': delivery.id,
-            'status_code': response.status_code
-        }
-        
-    except Exception as exc:
-        delivery.status = 'failed'
-        delivery.error_message = str(exc)
-        delivery.attempt_count = self.request.retries + 1
-        delivery.save()
-        
-        webhook.failed_deliveries += 1
-        webhook.last_status = 'failed'
-        webhook.save()
-        
-        # Retry with exponential backoff
-        if self.request.retries < self.max_retries:
-            delivery.status = 'retrying'
-            delivery.save()
-            raise self.retry(exc=exc, countdown=60 * (2 ** self.request.retries))
-        
-        return {
-            'status': 'error',
-            'message': str(exc),
-            'delivery_id': delivery.id
+            'status_code': result.status_code
         }
+    return {
+        'status': 'error',
+        'message': result.error,
+        'delivery_id': delivery.id
+    }
+
+
+@shared_task
+def retry_webhook_deliveries(delivery_ids, attempt):
+    """
+    Resend failed deliveries that are still pending a retry
+    """
+    deliveries = list(
+        WebhookDelivery.objects.select_related('webhook')
+        .filter(id__in=delivery_ids, status='retrying', webhook__active=True)
+    )
+    results = deliver_webhooks(deliveries, attempt)
+    return {
+        'status': 'success',
+        'delivered': sum(result.ok for result in results),
+        'failed': sum(not result.ok for result in results),
+    }
 
 
 @shared_task
@@ -113,30 +141,21 @@ def send_webhook_for_event(user_id, event_type, payload):
     """
     Send webhooks to all subscribed endpoints for a user and event
     """
-    try:
-        user = User.objects.get(id=user_id)
-        webhooks = Webhook.objects.filter(
-            user=user,
-            active=True
-        )
-        
-        # Filter webhooks subscribed to this event
-        matching_webhooks = [
-            w for w in webhooks 
-            if event_type in w.events or '*' in w.events
-        ]
-        
-        for webhook in matching_webhooks:
-            send_webhook.delay(webhook.id, event_type, payload)
-        
-        return {
-            'status': 'success',
-            'webhooks_triggered': len(matching_webhooks)
-        }
-        
-    except User.DoesNotExist:
+    if not User.objects.filter(id=user_id).exists():
         return {'status': 'error', 'message': 'User not found'}
 
+    webhooks = subscribed_webhooks(user_id, event_type)
+    deliveries = WebhookDelivery.objects.bulk_create([
+        WebhookDelivery(webhook=webhook, event_type=event_type, payload=payload, status='pending')
+        for webhook in webhooks
+    ])
+    deliver_webhooks(deliveries)
+
+    return {
+        'status': 'success',
+        'webhooks_triggered': len(webhooks)
+    }
+
 
 @shared_task
 def cleanup_old_webhook_deliveries():
@@ -0,0 +1,190 @@
+"""
+Tests for pooled webhook delivery against a local HTTP stand-in server.
+"""
+import hashlib
+import hmac
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from notifications import tasks
+from notifications.models import Webhook, WebhookDelivery
+from notifications.webhook_dispatcher import WebhookDispatcher, build_request
+
+
+class StandInServer(ThreadingHTTPServer):
+    """Records requests; ``/fail`` answers 500, ``/slow`` sleeps first."""
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), StandInHandler)
+        self.received = []
+        self.connections = set()
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    def url(self, path='/hook'):
+        return f'http://127.0.0.1:{self.server_address[1]}{path}'
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        server = self.server
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        with server.lock:
+            server.received.append((self.path, dict(self.headers), body))
+            server.connections.add(self.client_address)
+            server.active += 1
+            server.max_active = max(server.max_active, server.active)
+        if self.path == '/slow':
+            time.sleep(0.05)
+        with server.lock:
+            server.active -= 1
+        status = 500 if self.path == '/fail' else 200
+        self.send_response(status)
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'ok')
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = StandInServer()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def dispatcher():
+    dispatcher = WebhookDispatcher(per_host=2, timeout=5, failure_threshold=3, cooldown=60)
+    yield dispatcher
+    dispatcher.close()
+
+
+@pytest.mark.unit
+class TestWebhookDispatcher:
+    """Pooling, per-host limits and circuit breaking."""
+
+    def test_signed_requests_reuse_connections(self, server, dispatcher):
+        requests = [
+            build_request(server.url(), 'project.created', {'n': i}, i, secret_key='s3cret')
+            for i in range(20)
+        ]
+        results = dispatcher.dispatch_sync(requests)
+        assert all(r.ok and r.response_body == 'ok' for r in results)
+        assert len(server.received) == 20
+        # Never more sockets than the per-host limit allows
+        assert len(server.connections) <= 2
+
+        _, headers, body = server.received[0]
+        expected = hmac.new(b's3cret', body, hashlib.sha256).hexdigest()
+        assert headers['X-Webhook-Signature'] == f'sha256={expected}'
+        assert json.loads(body)['n'] in range(20)
+
+    def test_per_host_concurrency(self, server, dispatcher):
+        dispatcher.dispatch_sync([build_request(server.url('/slow'), 'e', {}, i) for i in range(8)])
+        assert server.max_active == 2
+
+    def test_circuit_opens_after_consecutive_failures(self, server, dispatcher):
+        first = dispatcher.dispatch_sync([build_request(server.url('/fail'), 'e', {}, i) for i in range(3)])
+        assert [r.status_code for r in first] == [500, 500, 500]
+        assert dispatcher.breaker(f'127.0.0.1:{server.server_address[1]}').is_open
+
+        skipped = dispatcher.dispatch_sync([build_request(server.url(), 'e', {}, 9)])
+        assert skipped[0].error.startswith('Circuit open')
+        assert len(server.received) == 3
+
+    def test_unreachable_host_is_an_error(self, dispatcher):
+        result = dispatcher.dispatch_sync([build_request('http://127.0.0.1:9/hook', 'e', {}, 1)])[0]
+        assert not result.ok and result.status_code is None and result.error
+
+    def test_bad_request_fails_alone(self, server, dispatcher):
+        requests = [
+            build_request(server.url(), 'e', {}, 1, extra_headers={'X-N': 5}),
+            build_request(server.url(), 'e', {}, 2, extra_headers={'X-Name': 'café'}),
+            build_request('http://[::1/hook', 'e', {}, 3),
+            build_request('ftp://127.0.0.1/hook', 'e', {}, 4),
+            build_request(server.url(), 'e', {}, 5),
+        ]
+        results = dispatcher.dispatch_sync(requests)
+        assert [r.ok for r in results] == [True, False, False, False, True]
+        assert all(r.error for r in results[1:4])
+        assert any(headers.get('X-N') == '5' for _, headers, _ in server.received)
+
+
+@pytest.mark.unit
+@pytest.mark.django_db
+class TestWebhookTasks:
+    """Event fan-out and batched bookkeeping."""
+
+    @pytest.fixture(autouse=True)
+    def local_dispatcher(self, monkeypatch, dispatcher):
+        monkeypatch.setattr(tasks, 'get_dispatcher', lambda: dispatcher)
+        self.retries = []
+        monkeypatch.setattr(
+            tasks.retry_webhook_deliveries, 'apply_async',
+            lambda args, countdown: self.retries.append((args, countdown)),
+        )
+
+    def test_event_fan_out_updates_counters(self, user, user2, server):
+        ok = Webhook.objects.create(user=user, name='ok', url=server.url(), events=['project.created'])
+        wildcard = Webhook.objects.create(user=user, name='all', url=server.url('/fail'), events=['*'])
+        Webhook.objects.create(user=user, name='other', url=server.url(), events=['export.completed'])
+        Webhook.objects.create(user=user, name='off', url=server.url(), events=['*'], active=False)
+        Webhook.objects.create(user=user2, name='theirs', url=server.url(), events=['*'])
+
+        result = tasks.send_webhook_for_event(user.id, 'project.created', {'id': 1})
+        assert result == {'status': 'success', 'webhooks_triggered': 2}
+        assert len(server.received) == 2
+
+        ok.refresh_from_db()
+        wildcard.refresh_from_db()
+        assert (ok.total_deliveries, ok.successful_deliveries, ok.failed_deliveries) == (1, 1, 0)
+        assert ok.last_status == 'success' and ok.last_delivery_at is not None
+        assert (wildcard.total_deliveries, wildcard.failed_deliveries) == (1, 1)
+        assert wildcard.last_status == 'failed'
+
+        failed = WebhookDelivery.objects.get(webhook=wildcard)
+        assert failed.status == 'retrying' and failed.status_code == 500
+        assert self.retries == [(([failed.id], 2), 60)]
+
+    def test_retry_gives_up_after_last_attempt(self, user, server):
+        webhook = Webhook.objects.create(user=user, name='x', url=server.url('/fail'), events=['*'])
+        delivery = WebhookDelivery.objects.create(
+            webhook=webhook, event_type='e', payload={}, status='retrying',
+        )
+        tasks.retry_webhook_deliveries([delivery.id], tasks.MAX_DELIVERY_ATTEMPTS)
+        delivery.refresh_from_db()
+        assert delivery.status == 'failed'
+        assert delivery.attempt_count == tasks.MAX_DELIVERY_ATTEMPTS
+        assert self.retries == []
+
+    def test_bad_webhook_does_not_abort_batch(self, user, server):
+        good = Webhook.objects.create(user=user, name='ok', url=server.url(), events=['*'])
+        bad = Webhook.objects.create(user=user, name='bad', url=server.url(), events=['*'],
+                                     headers={'X-Name': 'café'})
+
+        tasks.send_webhook_for_event(user.id, 'project.created', {'id': 1})
+        assert WebhookDelivery.objects.get(webhook=good).status == 'success'
+        assert WebhookDelivery.objects.get(webhook=bad).status == 'retrying'
+
+    def test_serializer_validates_headers(self):
+        from notifications.serializers import WebhookSerializer
+
+        data = {'name': 'x', 'url': 'https://example.com/hook', 'events': ['*']}
+        assert WebhookSerializer(data={**data, 'headers': {'X-Key': 'abc'}}).is_valid()
+        for headers in ({'X-N': 5}, {'X-Name': 'café'}, {'X-A': 'a\r\nX-B: b'}, ['X-N']):
+            serializer = WebhookSerializer(data={**data, 'headers': headers})
+            assert not serializer.is_valid() and 'headers' in serializer.errors
@@ -0,0 +1,231 @@
+"""
+Pooled webhook delivery.
+
+``WebhookDispatcher`` sends webhook requests from one ``httpx.AsyncClient``
+so connections to a destination are kept alive across deliveries and
+Celery tasks.  The client lives on a background event loop owned by the
+worker process; synchronous callers hand it a batch with
+``dispatch_sync``.
+
+* At most ``per_host`` requests run against one host at a time, so one
+  endpoint cannot take the whole pool.
+* After ``failure_threshold`` consecutive transport errors or 5xx
+  responses from a host its circuit opens: deliveries to it fail fast
+  for ``cooldown`` seconds, then one trial request decides whether it
+  closes again.
+
+Delivery bookkeeping is not done here; see ``notifications.tasks``.
+"""
+
+import asyncio
+import hashlib
+import hmac
+import json
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+from urllib.parse import urlsplit
+
+import httpx
+from django.conf import settings
+
+USER_AGENT = 'DesignPlatform-Webhook/1.0'
+RESPONSE_BODY_LIMIT = 1000
+
+
+@dataclass
+class WebhookRequest:
+    url: str
+    body: bytes
+    headers: dict = field(default_factory=dict)
+
+
+@dataclass
+class WebhookResult:
+    status_code: Optional[int] = None
+    response_body: str = ''
+    error: str = ''
+
+    @property
+    def ok(self) -> bool:
+        return not self.error and self.status_code is not None and self.status_code < 400
+
+
+def build_request(url: str, event_type: str, payload, delivery_id,
+                  secret_key: str = '', extra_headers: Optional[dict] = None) -> WebhookRequest:
+    """Serialize, sign and address one delivery."""
+    body = json.dumps(payload).encode()
+    headers = {
+        'Content-Type': 'application/json',
+        'User-Agent': USER_AGENT,
+        'X-Webhook-Event': event_type,
+        'X-Webhook-Delivery': str(delivery_id),
+    }
+    if isinstance(extra_headers, dict):
+        # User-supplied JSON; header values must be strings
+        headers.update({
+            str(name): str(value) for name, value in extra_headers.items() if value is not None
+        })
+    if secret_key:
+        signature = hmac.new(secret_key.encode(), body, hashlib.sha256).hexdigest()
+        headers['X-Webhook-Signature'] = f'sha256={signature}'
+    return WebhookRequest(url=url, body=body, headers=headers)
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker for one destination host."""
+
+    def __init__(self, failure_threshold: int, cooldown: float):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial_running = False
+
+    def allow(self) -> bool:
+        if self.opened_at is None:
+            return True
+        if self.trial_running or time.monotonic() - self.opened_at < self.cooldown:
+            return False
+        self.trial_running = True
+        return True
+
+    def record(self, healthy: bool):
+        self.trial_running = False
+        if healthy:
+            self.failures = 0
+            self.opened_at = None
+            return
+        self.failures += 1
+        if self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+    def release(self):
+        """End a trial request that said nothing about the host's health."""
+        self.trial_running = False
+
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None
+
+
+class WebhookDispatcher:
+    """Send webhook requests over pooled keep-alive connections."""
+
+    def __init__(self, max_connections: int = 100, per_host: int = 8, timeout: float = 10.0,
+                 failure_threshold: int = 5, cooldown: float = 30.0):
+        self.max_connections = max_connections
+        self.per_host = per_host
+        self.timeout = timeout
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._client: Optional[httpx.AsyncClient] = None
+        self._host_limits: dict[str, asyncio.Semaphore] = {}
+        self._breakers: dict[str, CircuitBreaker] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.timeout, connect=min(self.timeout, 5.0)),
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+                follow_redirects=False,
+            )
+        return self._client
+
+    def breaker(self, host: str) -> CircuitBreaker:
+        if host not in self._breakers:
+            self._breakers[host] = CircuitBreaker(self.failure_threshold, self.cooldown)
+        return self._breakers[host]
+
+    async def send(self, request: WebhookRequest) -> WebhookResult:
+        try:
+            host = urlsplit(request.url).netloc
+        except ValueError as exc:
+            return WebhookResult(error=f'Invalid URL: {exc}')
+        breaker = self.breaker(host)
+        if not breaker.allow():
+            return WebhookResult(error=f'Circuit open for {host}')
+
+        if host not in self._host_limits:
+            self._host_limits[host] = asyncio.Semaphore(self.per_host)
+        async with self._host_limits[host]:
+            try:
+                response = await self.client.post(request.url, content=request.body, headers=request.headers)
+            except httpx.HTTPError as exc:
+                breaker.record(False)
+                return WebhookResult(error=f'{type(exc).__name__}: {exc}')
+            except Exception as exc:
+                # The request itself is bad (URL, header encoding); fail this
+                # delivery only, without counting it against the host
+                breaker.release()
+                return WebhookResult(error=f'{type(exc).__name__}: {exc}')
+
+        breaker.record(response.status_code < 500)
+        result = WebhookResult(
+            status_code=response.status_code,
+            response_body=response.text[:RESPONSE_BODY_LIMIT],
+        )
+        if not result.ok:
+            result.error = f'Webhook delivery failed with status {response.status_code}'
+        return result
+
+    async def dispatch(self, requests: list[WebhookRequest]) -> list[WebhookResult]:
+        """Send a batch concurrently; results are in request order."""
+        return list(await asyncio.gather(*(self.send(r) for r in requests)))
+
+    def dispatch_sync(self, requests: list[WebhookRequest]) -> list[WebhookResult]:
+        """Run ``dispatch`` on the dispatcher's loop from synchronous code."""
+        if not requests:
+            return []
+        future = asyncio.run_coroutine_threadsafe(self.dispatch(requests), self._ensure_loop())
+        return future.result()
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None or not self._thread.is_alive():
+                self._loop = asyncio.new_event_loop()
+                self._client = None
+                self._host_limits.clear()
+                self._thread = threading.Thread(
+                    target=self._loop.run_forever, name='webhook-dispatcher', daemon=True,
+                )
+                self._thread.start()
+            return self._loop
+
+    def close(self):
+        """Close pooled connections and stop the background loop."""
+        with self._lock:
+            if self._loop is None:
+                return
+            if self._client is not None:
+                asyncio.run_coroutine_threadsafe(self._client.aclose(), self._loop).result()
+                self._client = None
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
+            self._loop = None
+
+
+_dispatcher: Optional[WebhookDispatcher] = None
+
+
+def get_dispatcher() -> WebhookDispatcher:
+    """The process-wide dispatcher, configured from settings."""
+    global _dispatcher
+    if _dispatcher is None:
+        _dispatcher = WebhookDispatcher(
+            max_connections=getattr(settings, 'WEBHOOK_MAX_CONNECTIONS', 100),
+            per_host=getattr(settings, 'WEBHOOK_PER_HOST_CONCURRENCY', 8),
+            timeout=getattr(settings, 'WEBHOOK_TIMEOUT', 10.0),
+            failure_threshold=getattr(settings, 'WEBHOOK_CIRCUIT_FAILURES', 5),
+            cooldown=getattr(settings, 'WEBHOOK_CIRCUIT_COOLDOWN', 30.0),
+        )
+    return _dispatcher
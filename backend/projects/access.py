@@ -0,0 +1,91 @@
+"""
+Cached project access checks for WebSocket consumers.
+
+Every connect used to load the project and materialize its collaborator
+list; after a deploy, reconnecting clients did that all at once.
+``has_project_access`` answers with one EXISTS query and caches the
+answer per (project, user) in the shared cache for
+``WS_ACCESS_CACHE_TTL`` seconds.
+
+Cache keys carry a per-project generation.  Changing a project's owner,
+visibility or collaborators bumps the generation (see the receivers
+below), which invalidates every cached answer for that project at once
+on all workers.
+"""
+
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Project
+
+DEFAULT_ACCESS_CACHE_TTL = 60
+
+
+def _generation_key(project_id) -> str:
+    return f'project_access_gen:{project_id}'
+
+
+def _access_key(project_id, generation, user_id, allow_public) -> str:
+    return f'project_access:{project_id}:{generation}:{user_id}:{int(allow_public)}'
+
+
+def has_project_access(user, project_id, allow_public: bool = False) -> bool:
+    """
+    Whether ``user`` owns or collaborates on the project (or it is public,
+    with ``allow_public``).
+    """
+    if not user or not user.is_authenticated:
+        return False
+
+    ttl = getattr(settings, 'WS_ACCESS_CACHE_TTL', DEFAULT_ACCESS_CACHE_TTL)
+    generation = cache.get(_generation_key(project_id), 0)
+    key = _access_key(project_id, generation, user.pk, allow_public)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    condition = Q(user=user) | Q(collaborators=user)
+    if allow_public:
+        condition |= Q(is_public=True)
+    allowed = Project.objects.filter(condition, id=project_id).exists()
+    if ttl > 0:
+        cache.set(key, allowed, ttl)
+    return allowed
+
+
+def invalidate_project_access(*project_ids):
+    """Drop cached access answers for the given projects."""
+    ttl = getattr(settings, 'WS_ACCESS_CACHE_TTL', DEFAULT_ACCESS_CACHE_TTL)
+    if ttl <= 0:
+        return
+    # A fresh, never reused generation.  Answers cached while the key is
+    # missing use generation 0, so the key must outlive them.
+    generation = time.time_ns()
+    cache.set_many({_generation_key(pk): generation for pk in project_ids}, ttl * 2)
+
+
+@receiver(post_save, sender=Project)
+@receiver(post_delete, sender=Project)
+def project_changed(sender, instance, **kwargs):
+    update_fields = kwargs.get('update_fields')
+    if kwargs.get('created') or (update_fields and not {'user', 'is_public'} & set(update_fields)):
+        return
+    invalidate_project_access(instance.pk)
+
+
+@receiver(m2m_changed, sender=Project.collaborators.through)
+def collaborators_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:
+        invalidate_project_access(instance.pk)
+    elif action == 'pre_clear':
+        # user.collaborated_projects.clear(): the projects are only known now
+        invalidate_project_access(*instance.collaborated_projects.values_list('pk', flat=True))
+    else:
+        invalidate_project_access(*(pk_set or ()))
@@ -51,7 +51,7 @@ class ProjectVersionAdmin(admin.ModelAdmin):
     list_filter = ['created_at']
     search_fields = ['project__name', 'created_by__username']
     date_hierarchy = 'created_at'
-    readonly_fields = ['created_at']
+    readonly_fields = ['content_hash', 'created_at']
 
 
 @admin.register(ExportTemplate)
@@ -7,9 +7,11 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
 from django.db import transaction
-from typing import Dict, Any, List, Optional
+from typing import Callable, Dict, Any, List, Optional
 import copy
 
+from . import geometry
+
 
 class BatchOperation(models.Model):
     """
@@ -95,25 +97,81 @@ class BatchOperation(models.Model):
 class BatchOperationService:
     """
     Service for executing batch operations on components.
+    
+    Update operations mutate the selected components in memory and write
+    them back with a single ``bulk_update``.  Their before/after state is
+    a per-component diff of only the top-level property keys the
+    operation touches::
+    
+        {"<id>": {"patch": {"position": {...}}, "unset": ["size"], "z_index": 3}}
+    
+    ``unset`` lists keys that did not exist and must be removed on undo.
+    Delete operations still store full component state so it can be
+    restored.
     """
     
+    UPDATE_FIELDS = ['properties', 'z_index', 'updated_at']
+    
     def __init__(self, project, user):
         self.project = project
         self.user = user
     
+    def _get_components(self, component_ids: List[int]):
+        from projects.models import DesignComponent
+        
+        return list(DesignComponent.objects.filter(
+            project=self.project,
+            id__in=component_ids
+        ))
+    
     def _save_state(self, components) -> Dict[str, Any]:
         """
-        Save current state of components for undo.
+        Save full state of components that are about to be deleted.
         """
         return {
             str(c.id): {
-                'properties': copy.deepcopy(c.properties),
+                'properties': c.properties,
                 'z_index': c.z_index,
                 'component_type': c.component_type,
             }
             for c in components
         }
     
+    def _diff_state(self, components, keys, snapshot: bool = True) -> Dict[str, Any]:
+        """
+        Capture the given top-level property keys and z_index of each
+        component.  ``snapshot`` copies the values so later in-place
+        edits do not leak into the recorded state.
+        """
+        state = {}
+        for c in components:
+            patch = {}
+            unset = []
+            for key in keys:
+                if key in c.properties:
+                    value = c.properties[key]
+                    patch[key] = copy.deepcopy(value) if snapshot else value
+                else:
+                    unset.append(key)
+            entry = {'patch': patch, 'z_index': c.z_index}
+            if unset:
+                entry['unset'] = unset
+            state[str(c.id)] = entry
+        return state
+    
+    def _bulk_save(self, components) -> None:
+        """
+        Write properties and z_index of all components in one query.
+        """
+        from projects.models import DesignComponent
+        
+        if not components:
+            return
+        now = timezone.now()
+        for comp in components:
+            comp.updated_at = now
+        DesignComponent.objects.bulk_update(components, self.UPDATE_FIELDS)
+    
     def _create_operation(
         self,
         operation_type: str,
@@ -134,43 +192,33 @@ class BatchOperationService:
             before_state=before_state,
         )
     
-    def bulk_move(
+    def _run_update(
         self,
+        operation_type: str,
         component_ids: List[int],
-        delta_x: float,
-        delta_y: float
+        parameters: Dict[str, Any],
+        components,
+        keys: List[str],
+        apply: Callable[[BatchOperation], None],
     ) -> BatchOperation:
         """
-        Move multiple components by a delta.
+        Record before-state for ``keys``, run ``apply`` to mutate the
+        components in memory, then persist them with one bulk update.
         """
-        from projects.models import DesignComponent
-        
-        components = list(DesignComponent.objects.filter(
-            project=self.project,
-            id__in=component_ids
-        ))
-        
-        before_state = self._save_state(components)
         operation = self._create_operation(
-            'move',
+            operation_type,
             component_ids,
-            {'delta_x': delta_x, 'delta_y': delta_y},
-            before_state
+            parameters,
+            self._diff_state(components, keys)
         )
         
         try:
             with transaction.atomic():
-                for comp in components:
-                    pos = comp.properties.get('position', {'x': 0, 'y': 0})
-                    comp.properties['position'] = {
-                        'x': pos.get('x', 0) + delta_x,
-                        'y': pos.get('y', 0) + delta_y,
-                    }
-                    comp.save()
-                    operation.success_count += 1
+                apply(operation)
+                self._bulk_save(components)
                 
                 operation.status = 'completed'
-                operation.after_state = self._save_state(components)
+                operation.after_state = self._diff_state(components, keys, snapshot=False)
                 operation.completed_at = timezone.now()
                 operation.save()
                 
@@ -182,6 +230,35 @@ class BatchOperationService:
         
         return operation
     
+    def bulk_move(
+        self,
+        component_ids: List[int],
+        delta_x: float,
+        delta_y: float
+    ) -> BatchOperation:
+        """
+        Move multiple components by a delta.
+        """
+        components = self._get_components(component_ids)
+        
+        def apply(operation):
+            for comp in components:
+                pos = comp.properties.get('position', {'x': 0, 'y': 0})
+                comp.properties['position'] = {
+                    'x': pos.get('x', 0) + delta_x,
+                    'y': pos.get('y', 0) + delta_y,
+                }
+                operation.success_count += 1
+        
+        return self._run_update(
+            'move',
+            component_ids,
+            {'delta_x': delta_x, 'delta_y': delta_y},
+            components,
+            ['position'],
+            apply
+        )
+    
     def bulk_resize(
         self,
         component_ids: List[int],
@@ -192,84 +269,29 @@ class BatchOperationService:
         """
         Resize multiple components.
         """
-        from projects.models import DesignComponent
-        
-        components = list(DesignComponent.objects.filter(
-            project=self.project,
-            id__in=component_ids
-        ))
-        
-        before_state = self._save_state(components)
-        operation = self._create_operation(
+        components = self._get_components(component_ids)
+        
+        def apply(operation):
+            props = [comp.properties for comp in components]
+            boxes = geometry.Boxes.from_properties(props)
+            # 'center' scales around the group center; other anchors keep
+            # each component's own position.
+            origin = geometry.centroid(boxes) if anchor == 'center' and len(boxes) else None
+            resized = geometry.scale(boxes, scale_x, scale_y, origin)
+            
+            if origin is not None:
+                resized.write_positions(props)
+            resized.write_sizes(props)
+            operation.success_count += len(components)
+        
+        return self._run_update(
             'resize',
             component_ids,
             {'scale_x': scale_x, 'scale_y': scale_y, 'anchor': anchor},
-            before_state
+            components,
+            ['position', 'size'],
+            apply
         )
-        
-        try:
-            with transaction.atomic():
-                # Calculate group center for anchor
-                all_positions = []
-                for comp in components:
-                    pos = comp.properties.get('position', {'x': 0, 'y': 0})
-                    size = comp.properties.get('size', {'width': 100, 'height': 100})
-                    all_positions.append({
-                        'x': pos.get('x', 0),
-                        'y': pos.get('y', 0),
-                        'width': size.get('width', 100),
-                        'height': size.get('height', 100),
-                    })
-                
-                if all_positions:
-                    center_x = sum(p['x'] + p['width']/2 for p in all_positions) / len(all_positions)
-                    center_y = sum(p['y'] + p['height']/2 for p in all_positions) / len(all_positions)
-                else:
-                    center_x, center_y = 0, 0
-                
-                for comp in components:
-                    pos = comp.properties.get('position', {'x': 0, 'y': 0})
-                    size = comp.properties.get('size', {'width': 100, 'height': 100})
-                    
-                    old_width = size.get('width', 100)
-                    old_height = size.get('height', 100)
-                    
-                    new_width = old_width * scale_x
-                    new_height = old_height * scale_y
-                    
-                    # Adjust position based on anchor
-                    if anchor == 'center':
-                        old_center_x = pos.get('x', 0) + old_width / 2
-                        old_center_y = pos.get('y', 0) + old_height / 2
-                        
-                        # Scale position relative to group center
-                        new_center_x = center_x + (old_center_x - center_x) * scale_x
-                        new_center_y = center_y + (old_center_y - center_y) * scale_y
-                        
-                        comp.properties['position'] = {
-                            'x': new_center_x - new_width / 2,
-                            'y': new_center_y - new_height / 2,
-                        }
-                    
-                    comp.properties['size'] = {
-                        'width': new_width,
-                        'height': new_height,
-                    }
-                    comp.save()
-                    operation.success_count += 1
-                
-                operation.status = 'completed'
-                operation.after_state = self._save_state(components)
-                operation.completed_at = timezone.now()
-                operation.save()
-                
-        except Exception as e:
-            operation.status = 'failed'
-            operation.errors = [str(e)]
-            operation.error_count = len(component_ids)
-            operation.save()
-        
-        return operation
     
     def bulk_style(
         self,
@@ -279,52 +301,34 @@ class BatchOperationService:
         """
         Apply style changes to multiple components.
         """
-        from projects.models import DesignComponent
-        
-        components = list(DesignComponent.objects.filter(
-            project=self.project,
-            id__in=component_ids
-        ))
+        components = self._get_components(component_ids)
+        keys = list(dict.fromkeys(key.split('.')[0] for key in style_updates))
+        
+        def apply(operation):
+            for comp in components:
+                for key, value in style_updates.items():
+                    # Handle nested properties
+                    if '.' in key:
+                        parts = key.split('.')
+                        target = comp.properties
+                        for part in parts[:-1]:
+                            if part not in target:
+                                target[part] = {}
+                            target = target[part]
+                        target[parts[-1]] = value
+                    else:
+                        comp.properties[key] = value
+                
+                operation.success_count += 1
         
-        before_state = self._save_state(components)
-        operation = self._create_operation(
+        return self._run_update(
             'style',
             component_ids,
             {'style_updates': style_updates},
-            before_state
+            components,
+            keys,
+            apply
         )
-        
-        try:
-            with transaction.atomic():
-                for comp in components:
-                    for key, value in style_updates.items():
-                        # Handle nested properties
-                        if '.' in key:
-                            parts = key.split('.')
-                            target = comp.properties
-                            for part in parts[:-1]:
-                                if part not in target:
-                                    target[part] = {}
-                                target = target[part]
-                            target[parts[-1]] = value
-                        else:
-                            comp.properties[key] = value
-                    
-                    comp.save()
-                    operation.success_count += 1
-                
-                operation.status = 'completed'
-                operation.after_state = self._save_state(components)
-                operation.completed_at = timezone.now()
-                operation.save()
-                
-        except Exception as e:
-            operation.status = 'failed'
-            operation.errors = [str(e)]
-            operation.error_count = len(component_ids)
-            operation.save()
-        
-        return operation
     
     def bulk_delete(
         self,
@@ -335,10 +339,7 @@ class BatchOperationService:
         """
         from projects.models import DesignComponent
         
-        components = list(DesignComponent.objects.filter(
-            project=self.project,
-            id__in=component_ids
-        ))
+        components = self._get_components(component_ids)
         
         before_state = self._save_state(components)
         operation = self._create_operation(
@@ -379,17 +380,13 @@ class BatchOperationService:
         """
         from projects.models import DesignComponent
         
-        components = list(DesignComponent.objects.filter(
-            project=self.project,
-            id__in=component_ids
-        ))
+        components = self._get_components(component_ids)
         
-        before_state = self._save_state(components)
         operation = self._create_operation(
             'duplicate',
             component_ids,
             {'offset_x': offset_x, 'offset_y': offset_y},
-            before_state
+            {}
         )
         
         new_component_ids = []
@@ -443,12 +440,7 @@ class BatchOperationService:
         """
         Align multiple components.
         """
-        from projects.models import DesignComponent
-        
-        components = list(DesignComponent.objects.filter(
-            project=self.project,
-            id__in=component_ids
-        ))
+        components = self._get_components(component_ids)
         
         if len(components) < 2:
             operation = self._create_operation('align', component_ids, {'alignment': alignment}, {})
@@ -457,69 +449,19 @@ class BatchOperationService:
             operation.save()
             return operation
         
-        before_state = self._save_state(components)
-        operation = self._create_operation(
+        def apply(operation):
+            props = [comp.properties for comp in components]
+            geometry.align(geometry.Boxes.from_properties(props), alignment).write_positions(props)
+            operation.success_count += len(components)
+        
+        return self._run_update(
             'align',
             component_ids,
             {'alignment': alignment},
-            before_state
+            components,
+            ['position'],
+            apply
         )
-        
-        try:
-            with transaction.atomic():
-                # Calculate bounds
-                positions = []
-                for comp in components:
-                    pos = comp.properties.get('position', {'x': 0, 'y': 0})
-                    size = comp.properties.get('size', {'width': 100, 'height': 100})
-                    positions.append({
-                        'comp': comp,
-                        'x': pos.get('x', 0),
-                        'y': pos.get('y', 0),
-                        'width': size.get('width', 100),
-                        'height': size.get('height', 100),
-                    })
-                
-                min_x = min(p['x'] for p in positions)
-                max_x = max(p['x'] + p['width'] for p in positions)
-                min_y = min(p['y'] for p in positions)
-                max_y = max(p['y'] + p['height'] for p in positions)
-                center_x = (min_x + max_x) / 2
-                center_y = (min_y + max_y) / 2
-                
-                for p in positions:
-                    comp = p['comp']
-                    new_pos = comp.properties.get('position', {'x': 0, 'y': 0}).copy()
-                    
-                    if alignment == 'left':
-                        new_pos['x'] = min_x
-                    elif alignment == 'center':
-                        new_pos['x'] = center_x - p['width'] / 2
-                    elif alignment == 'right':
-                        new_pos['x'] = max_x - p['width']
-                    elif alignment == 'top':
-                        new_pos['y'] = min_y
-                    elif alignment == 'middle':
-                        new_pos['y'] = center_y - p['height'] / 2
-                    elif alignment == 'bottom':
-                        new_pos['y'] = max_y - p['height']
-                    
-                    comp.properties['position'] = new_pos
-                    comp.save()
-                    operation.success_count += 1
-                
-                operation.status = 'completed'
-                operation.after_state = self._save_state(components)
-                operation.completed_at = timezone.now()
-                operation.save()
-                
-        except Exception as e:
-            operation.status = 'failed'
-            operation.errors = [str(e)]
-            operation.error_count = len(component_ids)
-            operation.save()
-        
-        return operation
     
     def bulk_distribute(
         self,
@@ -530,12 +472,7 @@ class BatchOperationService:
         """
         Distribute components evenly.
         """
-        from projects.models import DesignComponent
-        
-        components = list(DesignComponent.objects.filter(
-            project=self.project,
-            id__in=component_ids
-        ))
+        components = self._get_components(component_ids)
         
         if len(components) < 3:
             operation = self._create_operation('distribute', component_ids, {'direction': direction}, {})
@@ -544,75 +481,20 @@ class BatchOperationService:
             operation.save()
             return operation
         
-        before_state = self._save_state(components)
-        operation = self._create_operation(
+        def apply(operation):
+            props = [comp.properties for comp in components]
+            boxes = geometry.Boxes.from_properties(props)
+            geometry.distribute(boxes, direction, spacing).write_positions(props)
+            operation.success_count += len(components)
+        
+        return self._run_update(
             'distribute',
             component_ids,
             {'direction': direction, 'spacing': spacing},
-            before_state
+            components,
+            ['position'],
+            apply
         )
-        
-        try:
-            with transaction.atomic():
-                # Sort by position
-                if direction == 'horizontal':
-                    components.sort(key=lambda c: c.properties.get('position', {}).get('x', 0))
-                else:
-                    components.sort(key=lambda c: c.properties.get('position', {}).get('y', 0))
-                
-                # Calculate positions
-                first_pos = components[0].properties.get('position', {'x': 0, 'y': 0})
-                first_size = components[0].properties.get('size', {'width': 100, 'height': 100})
-                last_pos = components[-1].properties.get('position', {'x': 0, 'y': 0})
-                
-                if direction == 'horizontal':
-                    start = first_pos.get('x', 0) + first_size.get('width', 100)
-                    end = last_pos.get('x', 0)
-                    total_width = sum(
-                        c.properties.get('size', {}).get('width', 100)
-                        for c in components[1:-1]
-                    )
-                    available_space = end - start - total_width
-                    gap = available_space / (len(components) - 1) if spacing is None else spacing
-                    
-                    current_x = start + gap
-                    for comp in components[1:-1]:
-                        size = comp.properties.get('size', {'width': 100, 'height': 100})
-                        comp.properties['position']['x'] = current_x
-                        current_x += size.get('width', 100) + gap
-                        comp.save()
-                        operation.success_count += 1
-                else:
-                    start = first_pos.get('y', 0) + first_size.get('height', 100)
-                    end = last_pos.get('y', 0)
-                    total_height = sum(
-                        c.properties.get('size', {}).get('height', 100)
-                        for c in components[1:-1]
-                    )
-                    available_space = end - start - total_height
-                    gap = available_space / (len(components) - 1) if spacing is None else spacing
-                    
-                    current_y = start + gap
-                    for comp in components[1:-1]:
-                        size = comp.properties.get('size', {'width': 100, 'height': 100})
-                        comp.properties['position']['y'] = current_y
-                        current_y += size.get('height', 100) + gap
-                        comp.save()
-                        operation.success_count += 1
-                
-                operation.success_count += 2  # First and last don't move but count as success
-                operation.status = 'completed'
-                operation.after_state = self._save_state(components)
-                operation.completed_at = timezone.now()
-                operation.save()
-                
-        except Exception as e:
-            operation.status = 'failed'
-            operation.errors = [str(e)]
-            operation.error_count = len(component_ids)
-            operation.save()
-        
-        return operation
     
     def bulk_change_order(
         self,
@@ -624,58 +506,33 @@ class BatchOperationService:
         """
         from projects.models import DesignComponent
         
-        components = list(DesignComponent.objects.filter(
-            project=self.project,
-            id__in=component_ids
-        ))
+        components = self._get_components(component_ids)
         
-        before_state = self._save_state(components)
-        operation = self._create_operation(
+        def apply(operation):
+            if action == 'bring_front':
+                max_z = DesignComponent.objects.filter(project=self.project).count() - 1
+                for i, comp in enumerate(components):
+                    comp.z_index = max_z - len(components) + i + 1
+                    
+            elif action == 'send_back':
+                for i, comp in enumerate(components):
+                    comp.z_index = i
+                    
+            elif action in ['bring_forward', 'send_backward']:
+                delta = 1 if action == 'bring_forward' else -1
+                for comp in components:
+                    comp.z_index = max(0, comp.z_index + delta)
+            
+            operation.success_count = len(components)
+        
+        return self._run_update(
             'order',
             component_ids,
             {'action': action},
-            before_state
+            components,
+            [],
+            apply
         )
-        
-        try:
-            with transaction.atomic():
-                all_components = list(DesignComponent.objects.filter(
-                    project=self.project
-                ).order_by('z_index'))
-                
-                # selected_ids unused
-                _ = set(component_ids)
-                
-                if action == 'bring_front':
-                    max_z = len(all_components) - 1
-                    for i, comp in enumerate(components):
-                        comp.z_index = max_z - len(components) + i + 1
-                        comp.save()
-                        
-                elif action == 'send_back':
-                    for i, comp in enumerate(components):
-                        comp.z_index = i
-                        comp.save()
-                        
-                elif action in ['bring_forward', 'send_backward']:
-                    delta = 1 if action == 'bring_forward' else -1
-                    for comp in components:
-                        comp.z_index = max(0, comp.z_index + delta)
-                        comp.save()
-                
-                operation.success_count = len(components)
-                operation.status = 'completed'
-                operation.after_state = self._save_state(components)
-                operation.completed_at = timezone.now()
-                operation.save()
-                
-        except Exception as e:
-            operation.status = 'failed'
-            operation.errors = [str(e)]
-            operation.error_count = len(component_ids)
-            operation.save()
-        
-        return operation
     
     def find_and_replace(
         self,
@@ -688,16 +545,34 @@ class BatchOperationService:
         """
         Find and replace property values.
         """
-        from projects.models import DesignComponent
         import re
         
-        components = list(DesignComponent.objects.filter(
-            project=self.project,
-            id__in=component_ids
-        ))
+        components = self._get_components(component_ids)
+        parts = property_path.split('.')
         
-        before_state = self._save_state(components)
-        operation = self._create_operation(
+        def apply(operation):
+            for comp in components:
+                # Navigate to property
+                target = comp.properties
+                
+                for part in parts[:-1]:
+                    if part in target:
+                        target = target[part]
+                    else:
+                        continue
+                
+                if parts[-1] in target:
+                    current_value = target[parts[-1]]
+                    
+                    if use_regex and isinstance(current_value, str):
+                        new_value = re.sub(find_value, replace_value, current_value)
+                        target[parts[-1]] = new_value
+                        operation.success_count += 1
+                    elif current_value == find_value:
+                        target[parts[-1]] = replace_value
+                        operation.success_count += 1
+        
+        return self._run_update(
             'replace',
             component_ids,
             {
@@ -706,47 +581,10 @@ class BatchOperationService:
                 'replace_value': replace_value,
                 'use_regex': use_regex,
             },
-            before_state
+            components,
+            parts[:1],
+            apply
         )
-        
-        try:
-            with transaction.atomic():
-                for comp in components:
-                    # Navigate to property
-                    parts = property_path.split('.')
-                    target = comp.properties
-                    
-                    for part in parts[:-1]:
-                        if part in target:
-                            target = target[part]
-                        else:
-                            continue
-                    
-                    if parts[-1] in target:
-                        current_value = target[parts[-1]]
-                        
-                        if use_regex and isinstance(current_value, str):
-                            new_value = re.sub(find_value, replace_value, current_value)
-                            target[parts[-1]] = new_value
-                            operation.success_count += 1
-                        elif current_value == find_value:
-                            target[parts[-1]] = replace_value
-                            operation.success_count += 1
-                        
-                        comp.save()
-                
-                operation.status = 'completed'
-                operation.after_state = self._save_state(components)
-                operation.completed_at = timezone.now()
-                operation.save()
-                
-        except Exception as e:
-            operation.status = 'failed'
-            operation.errors = [str(e)]
-            operation.error_count = len(component_ids)
-            operation.save()
-        
-        return operation
     
     def undo(self, operation: BatchOperation) -> bool:
         """
@@ -761,14 +599,16 @@ class BatchOperationService:
             with transaction.atomic():
                 if operation.operation_type == 'delete':
                     # Restore deleted components
-                    for comp_id, state in operation.before_state.items():
-                        DesignComponent.objects.create(
+                    DesignComponent.objects.bulk_create([
+                        DesignComponent(
                             id=int(comp_id),
                             project=self.project,
                             component_type=state['component_type'],
                             properties=state['properties'],
                             z_index=state['z_index'],
                         )
+                        for comp_id, state in operation.before_state.items()
+                    ])
                         
                 elif operation.operation_type == 'duplicate':
                     # Delete duplicated components
@@ -779,18 +619,25 @@ class BatchOperationService:
                     ).delete()
                     
                 else:
-                    # Restore previous state
+                    # Restore previous state; components deleted since are skipped
+                    components = DesignComponent.objects.filter(
+                        project=self.project
+                    ).in_bulk([int(comp_id) for comp_id in operation.before_state])
+                    
                     for comp_id, state in operation.before_state.items():
-                        try:
-                            comp = DesignComponent.objects.get(
-                                id=int(comp_id),
-                                project=self.project
-                            )
+                        comp = components.get(int(comp_id))
+                        if comp is None:
+                            continue
+                        if 'patch' in state:
+                            comp.properties.update(state['patch'])
+                            for key in state.get('unset', []):
+                                comp.properties.pop(key, None)
+                        else:
+                            # Full-state records from before diffs were stored
                             comp.properties = state['properties']
-                            comp.z_index = state['z_index']
-                            comp.save()
-                        except DesignComponent.DoesNotExist:
-                            pass
+                        comp.z_index = state['z_index']
+                    
+                    self._bulk_save(list(components.values()))
                 
                 operation.status = 'undone'
                 operation.save()
@@ -3,22 +3,78 @@ WebSocket consumer for real-time collaborative canvas editing
 """
 import json
 import uuid
+from urllib.parse import parse_qs
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
-from .models import Project
+from django.conf import settings
+from .access import has_project_access
 from .collaboration_models import CollaborationSession, CanvasEdit
+from .design_delta import apply_patch, canonical_json, make_delta, state_hash
+from .ephemeral_state import (
+    DEFAULT_FLUSH_SECONDS, DEFAULT_INTERVAL_MS, EphemeralThrottle, WriteBehind,
+)
+from .room_state import get_room_state
+from .write_buffer import get_write_buffer
 
 
 class CollaborativeCanvasConsumer(AsyncWebsocketConsumer):
     """
     WebSocket consumer for real-time collaborative editing
     Handles cursor positions, element updates, and user presence
+
+    Cursor, selection and viewport changes are ephemeral: they are kept
+    in the room state store, fanned out through a per-connection
+    throttle and written to the CollaborationSession row only
+    periodically and on disconnect. Canvas edits go through the
+    process-wide ``BulkWriteBuffer`` and are bulk-inserted in batches.
+
+    ``design_sync`` snapshots are diffed against the room's last synced
+    design and only the JSON Patch travels through the channel layer.
+    Clients connecting with ``?sync=patch`` receive ``design_patch``
+    deltas against the design they last saw; others (and patch clients
+    whose base is stale) receive full ``design_synced`` snapshots.
     """
     
+    # Ephemeral state store shared by all connections of this worker
+    _room_state = None
+    
+    # room -> (hash, design) of the last synced design seen by this worker,
+    # kept while the worker has connections in the room
+    _documents = {}
+    
+    # room -> number of this worker's connections in it
+    _connections = {}
+    
+    # Whether this connection is counted in _connections
+    joined = False
+    
+    @property
+    def room_state(self):
+        if CollaborativeCanvasConsumer._room_state is None:
+            CollaborativeCanvasConsumer._room_state = get_room_state()
+        return CollaborativeCanvasConsumer._room_state
+    
+    @classmethod
+    def set_room_state(cls, backend):
+        """Swap the room state backend (tests)."""
+        cls._room_state = backend
+    
     async def connect(self):
         self.user = self.scope["user"]
         self.project_id = self.scope['url_route']['kwargs']['project_id']
         self.room_group_name = f'canvas_{self.project_id}'
+        params = parse_qs(self.scope.get('query_string', b'').decode())
+        self.patch_sync = params.get('sync', [''])[0] == 'patch'
+        self.client_design_hash = None
+        self.live_state = {}
+        self.throttle = EphemeralThrottle(
+            self.emit_ephemeral,
+            interval_ms=getattr(settings, 'CANVAS_EPHEMERAL_INTERVAL_MS', DEFAULT_INTERVAL_MS),
+        )
+        self.write_behind = WriteBehind(
+            self.save_session_state,
+            interval=getattr(settings, 'CANVAS_SESSION_FLUSH_SECONDS', DEFAULT_FLUSH_SECONDS),
+        )
         
         if self.user.is_anonymous:
             await self.close()
@@ -37,6 +93,8 @@ class CollaborativeCanvasConsumer(AsyncWebsocketConsumer):
         )
         
         await self.accept()
+        self.joined = True
+        self._connections[self.room_group_name] = self._connections.get(self.room_group_name, 0) + 1
         
         # Create or update collaboration session
         self.session_id = str(uuid.uuid4())
@@ -55,14 +113,18 @@ class CollaborativeCanvasConsumer(AsyncWebsocketConsumer):
         
         # Send active users to newly connected user
         active_users = await self.get_active_users()
+        await self.merge_live_state(active_users)
         await self.send(text_data=json.dumps({
             'type': 'active_users',
             'users': active_users
         }))
 
     async def disconnect(self, close_code):
-        # Remove session
-        await self.remove_collaboration_session()
+        # Remove session, persisting the last ephemeral state with it
+        self.throttle.close()
+        await get_write_buffer(CanvasEdit).flush()
+        await self.remove_collaboration_session(self.write_behind.drain())
+        await self.room_state.remove_cursor(self.room_group_name, self.user.id)
         
         # Notify others that user left
         await self.channel_layer.group_send(
@@ -79,6 +141,19 @@ class CollaborativeCanvasConsumer(AsyncWebsocketConsumer):
             self.room_group_name,
             self.channel_name
         )
+        self.release_room()
+
+    def release_room(self):
+        """Forget the room's cached design once its last local connection leaves."""
+        if not self.joined:
+            return
+        self.joined = False
+        remaining = self._connections.get(self.room_group_name, 0) - 1
+        if remaining > 0:
+            self._connections[self.room_group_name] = remaining
+        else:
+            self._connections.pop(self.room_group_name, None)
+            self._documents.pop(self.room_group_name, None)
 
     async def receive(self, text_data):
         """Handle messages from WebSocket"""
@@ -101,6 +176,8 @@ class CollaborativeCanvasConsumer(AsyncWebsocketConsumer):
                 await self.handle_viewport_change(data)
             elif action == 'design_sync':
                 await self.handle_design_sync(data)
+            elif action == 'design_resync':
+                await self.handle_design_resync(data)
             elif action == 'ping':
                 await self.send(text_data=json.dumps({'type': 'pong'}))
                 
@@ -108,39 +185,91 @@ class CollaborativeCanvasConsumer(AsyncWebsocketConsumer):
             pass
 
     async def handle_design_sync(self, data):
-        """Broadcast a full Fabric JSON snapshot to collaborators."""
+        """Broadcast a Fabric JSON snapshot to collaborators as a delta."""
         design_data = data.get('design_data')
         if design_data is None:
             return
 
-        await self.channel_layer.group_send(
-            self.room_group_name,
-            {
-                'type': 'design_synced',
-                'user_id': self.user.id,
-                'username': self.user.username,
-                'design_data': design_data,
-                'timestamp': data.get('timestamp')
-            }
-        )
+        encoded = canonical_json(design_data)
+        version = state_hash(design_data, encoded)
+        base = await self.get_room_document()
+        patch = make_delta(base[1], design_data, encoded) if base else None
+
+        await self.store_room_document(version, design_data)
+        self.client_design_hash = version
+
+        message = {
+            'type': 'design_synced',
+            'user_id': self.user.id,
+            'username': self.user.username,
+            'hash': version,
+            'timestamp': data.get('timestamp')
+        }
+        if patch is None:
+            message['design_data'] = design_data
+        else:
+            message['base_hash'] = base[0]
+            message['patch'] = patch
+        await self.channel_layer.group_send(self.room_group_name, message)
+
+    async def handle_design_resync(self, data):
+        """Send the room's current design to a client that lost its base."""
+        document = await self.get_room_document()
+        if document is None:
+            return
+        self.client_design_hash = document[0]
+        await self.send(text_data=json.dumps({
+            'type': 'design_synced',
+            'hash': document[0],
+            'design_data': document[1],
+        }))
+
+    async def get_room_document(self):
+        """(hash, design) of the room's last synced design, if any."""
+        document = self._documents.get(self.room_group_name)
+        if document is None:
+            document = await self.room_state.get_document(self.room_group_name)
+            if document is not None:
+                self._documents[self.room_group_name] = document
+        return document
+
+    async def store_room_document(self, version, design_data):
+        self._documents[self.room_group_name] = (version, design_data)
+        await self.room_state.set_document(self.room_group_name, version, design_data)
+
+    async def resolve_synced_design(self, event):
+        """Rebuild the full design a ``design_synced`` event describes."""
+        version = event['hash']
+        cached = self._documents.get(self.room_group_name)
+        if cached is not None and cached[0] == version:
+            return cached
+        if 'design_data' in event:
+            document = (version, event['design_data'])
+        elif cached is not None and cached[0] == event['base_hash']:
+            document = (version, apply_patch(cached[1], event['patch']))
+        else:
+            # This worker missed the base; the store has the latest design.
+            document = await self.room_state.get_document(self.room_group_name)
+            if document is None or document[0] != version:
+                # Not the version the event describes; send it uncached
+                return document
+        self._documents[self.room_group_name] = document
+        return document
 
     async def handle_cursor_move(self, data):
         """Broadcast cursor position to other users"""
         position = data.get('position', {})
         
-        # Update session cursor position
-        await self.update_session_cursor(position)
+        self.live_state['cursor_position'] = position
+        self.write_behind.update(cursor_position=position)
         
-        # Broadcast to others
-        await self.channel_layer.group_send(
-            self.room_group_name,
-            {
-                'type': 'cursor_update',
-                'user_id': self.user.id,
-                'username': self.user.username,
-                'position': position
-            }
-        )
+        # Broadcast to others (throttled, newest position wins)
+        await self.throttle.push('cursor', {
+            'type': 'cursor_update',
+            'user_id': self.user.id,
+            'username': self.user.username,
+            'position': position
+        })
 
     async def handle_element_update(self, data):
         """Handle element property updates"""
@@ -208,26 +337,39 @@ class CollaborativeCanvasConsumer(AsyncWebsocketConsumer):
         """Handle user selection changes"""
         selected_elements = data.get('selected_elements', [])
         
-        # Update session
-        await self.update_session_selection(selected_elements)
+        self.live_state['selected_elements'] = selected_elements
+        self.write_behind.update(selected_elements=selected_elements)
         
-        # Broadcast to others
-        await self.channel_layer.group_send(
-            self.room_group_name,
-            {
-                'type': 'selection_changed',
-                'user_id': self.user.id,
-                'username': self.user.username,
-                'selected_elements': selected_elements
-            }
-        )
+        # Broadcast to others (throttled, newest selection wins)
+        await self.throttle.push('selection', {
+            'type': 'selection_changed',
+            'user_id': self.user.id,
+            'username': self.user.username,
+            'selected_elements': selected_elements
+        })
 
     async def handle_viewport_change(self, data):
         """Handle viewport (zoom/pan) changes"""
         viewport = data.get('viewport', {})
         
-        # Update session
-        await self.update_session_viewport(viewport)
+        self.live_state['viewport'] = viewport
+        self.write_behind.update(viewport=viewport)
+        await self.throttle.push('viewport', None)
+
+    async def emit_ephemeral(self, kind, message):
+        """Publish the newest ephemeral state and fan out ``message``."""
+        await self.room_state.set_cursor(self.room_group_name, self.user.id, dict(self.live_state))
+        if message is not None:
+            await self.channel_layer.group_send(self.room_group_name, message)
+
+    async def merge_live_state(self, users):
+        """Overlay state not yet written behind onto session rows."""
+        live = await self.room_state.get_cursors(self.room_group_name)
+        for user in users:
+            state = live.get(str(user['user_id']))
+            if state:
+                user['cursor_position'] = state.get('cursor_position', user['cursor_position'])
+                user['selected_elements'] = state.get('selected_elements', user['selected_elements'])
 
     # Channel layer event handlers
     async def user_joined(self, event):
@@ -304,28 +446,45 @@ class CollaborativeCanvasConsumer(AsyncWebsocketConsumer):
             }))
 
     async def design_synced(self, event):
-        """Send full design snapshot to collaborators"""
-        if event['user_id'] != self.user.id:
+        """Send a design delta, or the full snapshot, to collaborators"""
+        if event['user_id'] == self.user.id:
+            return
+
+        document = await self.resolve_synced_design(event)
+        if document is None:
+            return
+        base_hash, self.client_design_hash = self.client_design_hash, document[0]
+
+        if (
+            self.patch_sync
+            and 'patch' in event
+            and base_hash == event['base_hash']
+            and document[0] == event['hash']
+        ):
+            await self.send(text_data=json.dumps({
+                'type': 'design_patch',
+                'user_id': event['user_id'],
+                'username': event['username'],
+                'base_hash': event['base_hash'],
+                'hash': event['hash'],
+                'patch': event['patch'],
+                'timestamp': event.get('timestamp')
+            }))
+        else:
             await self.send(text_data=json.dumps({
                 'type': 'design_synced',
                 'user_id': event['user_id'],
                 'username': event['username'],
-                'design_data': event['design_data'],
+                'hash': document[0],
+                'design_data': document[1],
                 'timestamp': event.get('timestamp')
             }))
 
     # Database operations
     @database_sync_to_async
     def check_project_access(self):
-        """Check if user has access to project"""
-        try:
-            project = Project.objects.get(id=self.project_id)
-            return (
-                project.user == self.user or 
-                self.user in project.collaborators.all()
-            )
-        except Project.DoesNotExist:
-            return False
+        """Check if user owns or collaborates on the project (cached)"""
+        return has_project_access(self.user, self.project_id)
 
     @database_sync_to_async
     def create_collaboration_session(self):
@@ -340,12 +499,12 @@ class CollaborativeCanvasConsumer(AsyncWebsocketConsumer):
         )
 
     @database_sync_to_async
-    def remove_collaboration_session(self):
-        """Remove collaboration session"""
+    def remove_collaboration_session(self, state=None):
+        """Remove collaboration session, saving its final ephemeral state"""
         CollaborationSession.objects.filter(
             project_id=self.project_id,
             user=self.user
-        ).update(is_active=False)
+        ).update(is_active=False, **(state or {}))
 
     @database_sync_to_async
     def get_active_users(self):
@@ -366,37 +525,20 @@ class CollaborativeCanvasConsumer(AsyncWebsocketConsumer):
         ]
 
     @database_sync_to_async
-    def update_session_cursor(self, position):
-        """Update session cursor position"""
-        CollaborationSession.objects.filter(
-            project_id=self.project_id,
-            user=self.user
-        ).update(cursor_position=position)
-
-    @database_sync_to_async
-    def update_session_selection(self, selected_elements):
-        """Update session selection"""
+    def save_session_state(self, fields):
+        """Write behind cursor/selection/viewport to the session"""
         CollaborationSession.objects.filter(
             project_id=self.project_id,
             user=self.user
-        ).update(selected_elements=selected_elements)
+        ).update(**fields)
 
-    @database_sync_to_async
-    def update_session_viewport(self, viewport):
-        """Update session viewport"""
-        CollaborationSession.objects.filter(
-            project_id=self.project_id,
-            user=self.user
-        ).update(viewport=viewport)
-
-    @database_sync_to_async
-    def save_canvas_edit(self, edit_type, element_id, previous_data, new_data):
-        """Save canvas edit to database"""
-        CanvasEdit.objects.create(
+    async def save_canvas_edit(self, edit_type, element_id, previous_data, new_data):
+        """Queue canvas edit for the batched write-behind"""
+        await get_write_buffer(CanvasEdit).add(CanvasEdit(
             project_id=self.project_id,
             user=self.user,
             edit_type=edit_type,
             element_id=element_id,
             previous_data=previous_data,
             new_data=new_data
-        )
+        ))
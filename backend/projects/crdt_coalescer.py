@@ -0,0 +1,112 @@
+"""
+Outbound op coalescing for CRDT rooms.
+
+A drag emits a ``set x/y`` op per animation frame from every user; sent
+one by one, each becomes a channel-layer publish fanned out to every
+listener.  ``RoomOpCoalescer`` buffers the ops a worker applies for a
+room during one tick, keeps only the newest write per
+``(element_id, prop)`` register and broadcasts a single ``crdt_ops``
+frame per tick.  Clients merge with LWW, so dropping superseded writes
+converges to the same state.
+"""
+
+import asyncio
+import logging
+from typing import Optional
+
+from django.conf import settings
+
+from .crdt_engine import CRDTOperation
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TICK_MS = 25
+DEFAULT_MAX_OPS = 500
+
+
+class RoomOpCoalescer:
+    """Per-room, per-process buffer flushed once per tick."""
+
+    _rooms: dict[str, 'RoomOpCoalescer'] = {}
+
+    def __init__(self, room: str, channel_layer, tick_ms: int = DEFAULT_TICK_MS,
+                 max_ops: int = DEFAULT_MAX_OPS):
+        self.room = room
+        self.channel_layer = channel_layer
+        self.tick = tick_ms / 1000
+        self.max_ops = max_ops
+        self.pending: dict[tuple, CRDTOperation] = {}
+        self.version = 0
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._flush_tasks: set[asyncio.Task] = set()
+
+    @classmethod
+    def for_room(cls, room: str, channel_layer) -> 'RoomOpCoalescer':
+        coalescer = cls._rooms.get(room)
+        if coalescer is None:
+            coalescer = cls._rooms[room] = cls(
+                room,
+                channel_layer,
+                tick_ms=getattr(settings, 'CRDT_BROADCAST_TICK_MS', DEFAULT_TICK_MS),
+                max_ops=getattr(settings, 'CRDT_BROADCAST_MAX_OPS', DEFAULT_MAX_OPS),
+            )
+        return coalescer
+
+    @staticmethod
+    def _key(op: CRDTOperation) -> tuple:
+        if op.op_type in ('set', 'delete'):
+            return (op.element_id, op.prop)
+        if op.op_type == 'remove_element':
+            return (op.element_id, None)
+        # add_element may carry initial props; never drop it.
+        return (op.element_id, None, id(op))
+
+    async def add(self, ops: list[CRDTOperation], version: int):
+        """Queue ops that were just applied at ``version``."""
+        for op in ops:
+            key = self._key(op)
+            current = self.pending.get(key)
+            if current is None or op.clock > current.clock:
+                self.pending.pop(key, None)
+                self.pending[key] = op
+        self.version = max(self.version, version)
+
+        if self.tick <= 0 or len(self.pending) >= self.max_ops:
+            await self.flush()
+        elif self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(self.tick, self._start_flush)
+
+    def _start_flush(self):
+        # The loop only holds tasks weakly; keep this one until it is done
+        task = asyncio.get_running_loop().create_task(self.flush())
+        self._flush_tasks.add(task)
+        task.add_done_callback(self._flush_done)
+
+    def _flush_done(self, task: asyncio.Task):
+        self._flush_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error('CRDT flush for %s failed', self.room, exc_info=task.exception())
+
+    async def flush(self):
+        """Broadcast pending ops as one ``crdt_ops`` frame."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if not self.pending:
+            return
+
+        ops = list(self.pending.values())
+        self.pending = {}
+        origins = {op.origin for op in ops}
+        try:
+            await self.channel_layer.group_send(self.room, {
+                'type': 'crdt.broadcast',
+                'ops': [op.to_dict() for op in ops],
+                'version': self.version,
+                'origin': origins.pop() if len(origins) == 1 else '',
+            })
+        except Exception:
+            logger.exception('CRDT broadcast for %s failed', self.room)
+
+        if not self.pending and self._flush_handle is None:
+            self._rooms.pop(self.room, None)
@@ -9,7 +9,10 @@ Logical Clock.
 
 import uuid
 import logging
+from urllib.parse import parse_qs
+
 from channels.generic.websocket import AsyncJsonWebsocketConsumer
+from asgiref.sync import sync_to_async
 from channels.db import database_sync_to_async
 
 from .crdt_engine import (
@@ -17,6 +20,8 @@ from .crdt_engine import (
     CRDTOperation,
     CRDTDocumentStore,
 )
+from .crdt_coalescer import RoomOpCoalescer
+from .crdt_wire import MSGPACK_AVAILABLE, WireFormatError, decode_frame, encode_ops_frame
 
 logger = logging.getLogger(__name__)
 
@@ -42,6 +47,14 @@ class CRDTCollaborationConsumer(AsyncJsonWebsocketConsumer):
       { "type": "user_joined",   ... }
       { "type": "user_left",     ... }
       { "type": "pong" }
+
+    Applied ops are not broadcast one by one: ``RoomOpCoalescer`` sends
+    one ``crdt_ops`` frame per room every ``CRDT_BROADCAST_TICK_MS`` with
+    superseded writes to the same property dropped.
+
+    Connecting with ``?wire=msgpack`` switches ``crdt_batch`` (client →
+    server) and live ``crdt_ops`` broadcasts (server → client) to the
+    compact binary frames from ``crdt_wire``; all other messages stay JSON.
     """
 
     async def connect(self):
@@ -49,6 +62,8 @@ class CRDTCollaborationConsumer(AsyncJsonWebsocketConsumer):
         self.project_id = self.scope['url_route']['kwargs']['project_id']
         self.room = f'crdt_{self.project_id}'
         self.session_id = str(uuid.uuid4())
+        params = parse_qs(self.scope.get('query_string', b'').decode())
+        self.binary_wire = MSGPACK_AVAILABLE and params.get('wire', [''])[0] == 'msgpack'
 
         if self.user.is_anonymous:
             await self.close()
@@ -64,19 +79,20 @@ class CRDTCollaborationConsumer(AsyncJsonWebsocketConsumer):
         await self.accept()
 
         # Get (or create) the CRDT document for this project
-        self.doc = CRDTDocumentStore.get_or_create(self.project_id)
+        self.doc = await sync_to_async(CRDTDocumentStore.get_or_create)(self.project_id)
 
         # Initialise per-session HLC
         self.clock = CRDTClock(node_id=self.session_id)
 
         # Send current state to the newly connected client
+        snapshot, state_vector = await sync_to_async(self._read_state)()
         await self.send_json({
             'type': 'snapshot',
-            'data': self.doc.snapshot(),
+            'data': snapshot,
         })
         await self.send_json({
             'type': 'state_vector',
-            'data': self.doc.state_vector(),
+            'data': state_vector,
         })
 
         # Announce presence
@@ -105,6 +121,20 @@ class CRDTCollaborationConsumer(AsyncJsonWebsocketConsumer):
     # Receive dispatcher
     # ------------------------------------------------------------------
 
+    async def receive(self, text_data=None, bytes_data=None, **kwargs):
+        if bytes_data is None:
+            await super().receive(text_data=text_data, bytes_data=bytes_data, **kwargs)
+            return
+        if not self.binary_wire:
+            return
+        try:
+            frame = decode_frame(bytes_data)
+        except WireFormatError as exc:
+            logger.warning('Dropping CRDT frame from %s: %s', self.session_id, exc)
+            return
+        if frame.get('action') == 'crdt_batch':
+            await self._apply_ops(frame['ops'])
+
     async def receive_json(self, content: dict, **kwargs):
         action = content.get('action', '')
 
@@ -128,52 +158,42 @@ class CRDTCollaborationConsumer(AsyncJsonWebsocketConsumer):
 
     async def _handle_crdt_op(self, content: dict):
         op_dict = content.get('op', {})
-        op = CRDTOperation.from_dict(op_dict)
-        op.origin = self.session_id
-
-        # Merge clocks
-        self.clock = self.clock.merge(op.clock)
-        op.clock = self.clock.tick()
-
-        changed = self.doc.apply(op)
-        if changed:
-            await self.channel_layer.group_send(self.room, {
-                'type': 'crdt.broadcast',
-                'ops': [op.to_dict()],
-                'version': self.doc.version,
-                'origin': self.session_id,
-            })
+        await self._apply_ops([CRDTOperation.from_dict(op_dict)])
 
     async def _handle_crdt_batch(self, content: dict):
         raw_ops = content.get('ops', [])
-        ops = [CRDTOperation.from_dict(d) for d in raw_ops]
+        await self._apply_ops([CRDTOperation.from_dict(d) for d in raw_ops])
+
+    async def _apply_ops(self, ops: list[CRDTOperation]):
+        # Merge clocks
         for op in ops:
             op.origin = self.session_id
             self.clock = self.clock.merge(op.clock)
             op.clock = self.clock.tick()
 
-        applied = self.doc.apply_batch(ops)
+        applied, version = await sync_to_async(self._apply_and_commit)(ops)
         if applied:
-            await self.channel_layer.group_send(self.room, {
-                'type': 'crdt.broadcast',
-                'ops': [op.to_dict() for op in applied],
-                'version': self.doc.version,
-                'origin': self.session_id,
-            })
+            coalescer = RoomOpCoalescer.for_room(self.room, self.channel_layer)
+            await coalescer.add(applied, version)
 
     async def _handle_sync_request(self, content: dict):
         since = content.get('since_version', 0)
-        ops = self.doc.ops_since(since)
+        ops, version = await sync_to_async(self._read_ops_since)(since)
+        if ops is None:
+            # Requested version was compacted into a checkpoint.
+            await self._handle_snapshot_request(content)
+            return
         await self.send_json({
             'type': 'crdt_ops',
             'ops': ops,
-            'version': self.doc.version,
+            'version': version,
         })
 
     async def _handle_snapshot_request(self, _content: dict):
+        snapshot = await sync_to_async(self._read_snapshot)()
         await self.send_json({
             'type': 'snapshot',
-            'data': self.doc.snapshot(),
+            'data': snapshot,
         })
 
     async def _handle_cursor_move(self, content: dict):
@@ -203,6 +223,12 @@ class CRDTCollaborationConsumer(AsyncJsonWebsocketConsumer):
 
     async def crdt_broadcast(self, event: dict):
         """Forward CRDT ops to all clients (including origin for ack)."""
+        if self.binary_wire:
+            ops = [CRDTOperation.from_dict(d) for d in event['ops']]
+            await self.send(bytes_data=encode_ops_frame(
+                ops, event['version'], event.get('origin', ''),
+            ))
+            return
         await self.send_json({
             'type': 'crdt_ops',
             'ops': event['ops'],
@@ -247,6 +273,26 @@ class CRDTCollaborationConsumer(AsyncJsonWebsocketConsumer):
     # Helpers
     # ------------------------------------------------------------------
 
+    # Document access runs on the shared sync thread so store round-trips
+    # never block the event loop and edits to ``self.doc`` stay serialized.
+
+    def _apply_and_commit(self, ops: list[CRDTOperation]) -> tuple[list[CRDTOperation], int]:
+        CRDTDocumentStore.refresh(self.doc)
+        applied = self.doc.apply_batch(ops)
+        version = CRDTDocumentStore.commit(self.doc, applied)
+        return applied, version
+
+    def _read_ops_since(self, since: int):
+        return CRDTDocumentStore.ops_since(self.doc, since), self.doc.version
+
+    def _read_snapshot(self) -> dict:
+        CRDTDocumentStore.refresh(self.doc)
+        return self.doc.snapshot()
+
+    def _read_state(self) -> tuple[dict, dict]:
+        CRDTDocumentStore.refresh(self.doc)
+        return self.doc.snapshot(), self.doc.state_vector()
+
     @database_sync_to_async
     def _check_access(self) -> bool:
         from .models import Project
@@ -8,14 +8,15 @@ without operational conflicts.
 Reference: https://en.wikipedia.org/wiki/Conflict-free_replicated_data_type
 """
 
+import sys
 import time
 import json
 import hashlib
 from typing import Any, Optional
-from dataclasses import dataclass, field, asdict
+from dataclasses import dataclass, field
 
 
-@dataclass
+@dataclass(slots=True)
 class CRDTClock:
     """Hybrid Logical Clock (HLC) – ensures causal ordering across peers."""
 
@@ -49,6 +50,10 @@ class CRDTClock:
     def to_tuple(self):
         return (self.physical, self.logical, self.node_id)
 
+    @classmethod
+    def from_tuple(cls, t: tuple) -> 'CRDTClock':
+        return cls(t[0], t[1], t[2])
+
     def __gt__(self, other: 'CRDTClock'):
         if self.physical != other.physical:
             return self.physical > other.physical
@@ -57,18 +62,20 @@ class CRDTClock:
         return self.node_id > other.node_id  # deterministic tie-break
 
     def to_dict(self):
-        return asdict(self)
+        return {'physical': self.physical, 'logical': self.logical, 'node_id': self.node_id}
 
     @classmethod
     def from_dict(cls, d: dict) -> 'CRDTClock':
-        return cls(d.get('physical', 0), d.get('logical', 0), d.get('node_id', ''))
+        # Node ids repeat on every op of a session; intern them so the
+        # registers of a document share one string per peer.
+        return cls(d.get('physical', 0), d.get('logical', 0), sys.intern(d.get('node_id', '')))
 
 
 # ---------------------------------------------------------------------------
 # Operations
 # ---------------------------------------------------------------------------
 
-@dataclass
+@dataclass(slots=True)
 class CRDTOperation:
     """An individual CRDT operation broadcast over the wire."""
     op_type: str          # 'set', 'delete', 'add_element', 'remove_element'
@@ -79,9 +86,14 @@ class CRDTOperation:
     origin: str = ''      # session that produced this op
 
     def to_dict(self):
-        d = asdict(self)
-        d['clock'] = self.clock.to_dict()
-        return d
+        return {
+            'op_type': self.op_type,
+            'element_id': self.element_id,
+            'prop': self.prop,
+            'value': self.value,
+            'clock': self.clock.to_dict(),
+            'origin': self.origin,
+        }
 
     @classmethod
     def from_dict(cls, d: dict) -> 'CRDTOperation':
@@ -100,23 +112,53 @@ class CRDTOperation:
 # LWW Register
 # ---------------------------------------------------------------------------
 
+def register_hash(element_id: str, prop: str, value: Any) -> int:
+    """
+    Stable 64-bit hash of one live property value.
+
+    Document checksums are the XOR of these, so they can be updated in
+    O(1) per write and agree across processes (unlike ``hash()``).
+    """
+    if value is None:
+        return 0
+    payload = json.dumps([element_id, prop, value], sort_keys=True, default=str)
+    return int.from_bytes(hashlib.blake2b(payload.encode(), digest_size=8).digest(), 'big')
+
+
 class LWWRegister:
-    """Last-Writer-Wins register for a single property."""
+    """
+    Last-Writer-Wins register for a single property.
+
+    The clock is kept as a packed ``(physical, logical, node_id)`` tuple:
+    tuple ordering matches ``CRDTClock.__gt__`` and avoids holding a
+    clock object per property.
+    """
+
+    __slots__ = ('value', 'stamp')
 
     def __init__(self, value: Any = None, clock: Optional[CRDTClock] = None):
         self.value = value
-        self.clock = clock or CRDTClock()
+        self.stamp = clock.to_tuple() if clock else (0, 0, '')
+
+    @property
+    def clock(self) -> CRDTClock:
+        return CRDTClock.from_tuple(self.stamp)
 
     def set(self, value: Any, clock: CRDTClock) -> bool:
         """Returns True if the incoming write wins."""
-        if self.clock is None or clock > self.clock:
+        stamp = (clock.physical, clock.logical, clock.node_id)
+        if stamp > self.stamp:
             self.value = value
-            self.clock = clock
+            self.stamp = stamp
             return True
         return False
 
     def to_dict(self):
-        return {'value': self.value, 'clock': self.clock.to_dict()}
+        physical, logical, node_id = self.stamp
+        return {
+            'value': self.value,
+            'clock': {'physical': physical, 'logical': logical, 'node_id': node_id},
+        }
 
     @classmethod
     def from_dict(cls, d: dict) -> 'LWWRegister':
@@ -133,11 +175,14 @@ class LWWElementMap:
     Supports add/remove semantics with bias toward add (add-wins on tie).
     """
 
+    __slots__ = ('element_id', 'registers', 'add_clock', 'remove_clock', 'digest')
+
     def __init__(self, element_id: str):
         self.element_id = element_id
         self.registers: dict[str, LWWRegister] = {}
         self.add_clock: Optional[CRDTClock] = None
         self.remove_clock: Optional[CRDTClock] = None
+        self.digest: int = 0  # XOR of register_hash() over live registers
 
     @property
     def is_alive(self) -> bool:
@@ -176,7 +221,15 @@ class LWWElementMap:
     def _set_prop(self, prop: str, value: Any, clock: CRDTClock) -> bool:
         if prop not in self.registers:
             self.registers[prop] = LWWRegister()
-        return self.registers[prop].set(value, clock)
+        register = self.registers[prop]
+        old_value = register.value
+        if not register.set(value, clock):
+            return False
+        self.digest ^= (
+            register_hash(self.element_id, prop, old_value)
+            ^ register_hash(self.element_id, prop, value)
+        )
+        return True
 
     def snapshot(self) -> dict:
         """Return a plain dict of current property values."""
@@ -191,6 +244,20 @@ class LWWElementMap:
             'registers': {k: v.to_dict() for k, v in self.registers.items()},
         }
 
+    @classmethod
+    def from_dict(cls, d: dict) -> 'LWWElementMap':
+        elem = cls(d.get('element_id', ''))
+        if d.get('add_clock'):
+            elem.add_clock = CRDTClock.from_dict(d['add_clock'])
+        if d.get('remove_clock'):
+            elem.remove_clock = CRDTClock.from_dict(d['remove_clock'])
+        elem.registers = {
+            k: LWWRegister.from_dict(v) for k, v in d.get('registers', {}).items()
+        }
+        for prop, register in elem.registers.items():
+            elem.digest ^= register_hash(elem.element_id, prop, register.value)
+        return elem
+
 
 # ---------------------------------------------------------------------------
 # CRDT Document (the whole canvas state)
@@ -200,23 +267,30 @@ class CRDTDocument:
     """
     A full canvas CRDT document.  Holds an LWWElementMap for each canvas
     element and provides a high-level API for the WebSocket consumer.
+
+    ``version`` counts every op ever logged for the document, while
+    ``op_log`` only holds the ops after ``base_version`` (the last
+    checkpoint).  Older ops are folded into the element state by
+    ``compact()`` so the log stays bounded during long sessions.
+
+    Snapshots and checksums are maintained incrementally: each merge
+    updates the document digest in O(1) and marks the element dirty, so
+    ``snapshot()`` and ``state_vector()`` only re-read changed elements.
     """
 
     def __init__(self, document_id: str):
         self.document_id = document_id
         self.elements: dict[str, LWWElementMap] = {}
         self.op_log: list[CRDTOperation] = []
+        self.base_version: int = 0
         self.version: int = 0
+        self._digest: int = 0  # XOR of digests of live elements
+        self._live: dict[str, dict] = {}  # cached snapshots of live elements
+        self._dirty: set[str] = set()
 
     def apply(self, op: CRDTOperation) -> bool:
         """Apply a single operation coming from any peer."""
-        eid = op.element_id
-
-        # Ensure element exists
-        if eid not in self.elements:
-            self.elements[eid] = LWWElementMap(eid)
-
-        changed = self.elements[eid].apply_op(op)
+        changed = self._merge(op)
         if changed:
             self.op_log.append(op)
             self.version += 1
@@ -230,35 +304,102 @@ class CRDTDocument:
                 applied.append(op)
         return applied
 
+    def replay(self, ops: list[CRDTOperation]):
+        """
+        Merge ops read back from a shared op-log.
+
+        Every entry advances ``version`` whether or not it still wins
+        locally, so the version stays aligned with the log position.
+        """
+        for op in ops:
+            self._merge(op)
+            self.op_log.append(op)
+            self.version += 1
+
+    def _merge(self, op: CRDTOperation) -> bool:
+        eid = op.element_id
+
+        # Ensure element exists
+        if eid not in self.elements:
+            self.elements[eid] = LWWElementMap(eid)
+
+        elem = self.elements[eid]
+        was_alive, old_digest = elem.is_alive, elem.digest
+        changed = elem.apply_op(op)
+        if changed:
+            if was_alive:
+                self._digest ^= old_digest
+            if elem.is_alive:
+                self._digest ^= elem.digest
+            self._dirty.add(eid)
+        return changed
+
+    def _flush_dirty(self):
+        """Refresh cached snapshots of elements changed since the last read."""
+        for eid in self._dirty:
+            elem = self.elements[eid]
+            if elem.is_alive:
+                self._live[eid] = elem.snapshot()
+            else:
+                self._live.pop(eid, None)
+        self._dirty.clear()
+
+    def _reindex(self):
+        """Rebuild digest and snapshot caches after bulk-loading elements."""
+        self._digest = 0
+        self._live = {}
+        self._dirty = set(self.elements)
+        for elem in self.elements.values():
+            if elem.is_alive:
+                self._digest ^= elem.digest
+
+    def load_state(self, other: 'CRDTDocument'):
+        """Replace this document's state in place with ``other``'s."""
+        self.elements = other.elements
+        self.op_log = other.op_log
+        self.base_version = other.base_version
+        self.version = other.version
+        self._reindex()
+
+    def compact(self):
+        """Fold the op-log into the element state (checkpoint)."""
+        self.op_log = []
+        self.base_version = self.version
+
     def snapshot(self) -> dict:
         """Return the full document state as a plain dict."""
+        self._flush_dirty()
         return {
             'document_id': self.document_id,
             'version': self.version,
-            'elements': {
-                eid: elem.snapshot()
-                for eid, elem in self.elements.items()
-                if elem.is_alive
-            },
+            'elements': dict(self._live),
         }
 
-    def ops_since(self, since_version: int) -> list[dict]:
-        """Return serialized ops since a given version."""
-        return [op.to_dict() for op in self.op_log[since_version:]]
+    def ops_since(self, since_version: int) -> Optional[list[dict]]:
+        """
+        Return serialized ops since a given version, or None when that
+        version predates the last checkpoint and a snapshot is required.
+        """
+        if since_version < self.base_version:
+            return None
+        return [op.to_dict() for op in self.op_log[since_version - self.base_version:]]
 
     def state_vector(self) -> dict:
         """Return a state vector for sync protocol."""
         return {
             'document_id': self.document_id,
             'version': self.version,
-            'element_count': sum(1 for e in self.elements.values() if e.is_alive),
+            'element_count': self._live_count(),
             'checksum': self._checksum(),
         }
 
+    def _live_count(self) -> int:
+        self._flush_dirty()
+        return len(self._live)
+
     def _checksum(self) -> str:
         """Quick integrity checksum of live elements."""
-        snap = json.dumps(self.snapshot(), sort_keys=True)
-        return hashlib.md5(snap.encode()).hexdigest()[:12]
+        return f'{self._digest:016x}'[:12]
 
     def to_dict(self):
         return {
@@ -267,28 +408,106 @@ class CRDTDocument:
             'elements': {eid: elem.to_dict() for eid, elem in self.elements.items()},
         }
 
+    @classmethod
+    def from_dict(cls, d: dict) -> 'CRDTDocument':
+        """Restore a document from a ``to_dict()`` checkpoint."""
+        doc = cls(d.get('document_id', ''))
+        doc.elements = {
+            eid: LWWElementMap.from_dict(e) for eid, e in d.get('elements', {}).items()
+        }
+        doc.version = doc.base_version = d.get('version', 0)
+        doc._reindex()
+        return doc
+
 
 # ---------------------------------------------------------------------------
-# Document Store (in-memory per server; backed by Redis in production)
+# Document Store (local cache; op-log persisted by a store backend)
 # ---------------------------------------------------------------------------
 
 class CRDTDocumentStore:
     """
-    In-memory store keyed by project/document ID.
-    In production you would persist the op-log to Redis or Postgres.
+    Per-process cache of CRDT documents in front of a pluggable store
+    backend (see ``projects.crdt_store``).
+
+    The backend holds the authoritative op-log and checkpoints so that
+    any worker can serve any room; the local documents are only a
+    materialised view that is brought up to date with ``refresh()``.
     """
 
     _docs: dict[str, CRDTDocument] = {}
+    _backend = None
+
+    @classmethod
+    def get_backend(cls):
+        if cls._backend is None:
+            from .crdt_store import get_store_backend
+            cls._backend = get_store_backend()
+        return cls._backend
+
+    @classmethod
+    def set_backend(cls, backend):
+        """Swap the store backend (tests, management commands)."""
+        cls._backend = backend
+        cls._docs.clear()
 
     @classmethod
     def get_or_create(cls, document_id: str) -> CRDTDocument:
-        if document_id not in cls._docs:
-            cls._docs[document_id] = CRDTDocument(document_id)
-        return cls._docs[document_id]
+        doc = cls._docs.get(document_id)
+        if doc is None:
+            doc = cls.get_backend().load(document_id) or CRDTDocument(document_id)
+            cls._docs[document_id] = doc
+        else:
+            cls.refresh(doc)
+        return doc
+
+    @classmethod
+    def refresh(cls, doc: CRDTDocument) -> CRDTDocument:
+        """Pull ops appended by other workers since ``doc.version``."""
+        raw_ops = cls.get_backend().read_ops(doc.document_id, doc.version)
+        if raw_ops is None:
+            # Another worker checkpointed past our version; reload.
+            fresh = cls.get_backend().load(doc.document_id) or CRDTDocument(doc.document_id)
+            doc.load_state(fresh)
+        elif raw_ops:
+            doc.replay([CRDTOperation.from_dict(d) for d in raw_ops])
+        return doc
+
+    @classmethod
+    def commit(cls, doc: CRDTDocument, applied: list[CRDTOperation]) -> int:
+        """
+        Persist ops that ``doc.apply``/``apply_batch`` just accepted and
+        checkpoint the document once its op-log reaches the configured
+        interval.  Returns the document version after the append.
+        """
+        if not applied:
+            return doc.version
+
+        backend = cls.get_backend()
+        start = doc.version - len(applied)
+        new_version = backend.append_ops(doc.document_id, [op.to_dict() for op in applied])
+
+        if new_version != doc.version:
+            # Ops from other workers were interleaved with ours: rebuild
+            # the local tail in log order.  LWW merges commute, so
+            # re-merging our own ops is harmless.
+            del doc.op_log[start - doc.base_version:]
+            doc.version = start
+            cls.refresh(doc)
+
+        if doc.version - doc.base_version >= backend.checkpoint_interval:
+            backend.write_checkpoint(doc.document_id, doc.to_dict(), doc.version)
+            doc.compact()
+        return doc.version
+
+    @classmethod
+    def ops_since(cls, doc: CRDTDocument, since_version: int) -> Optional[list[dict]]:
+        cls.refresh(doc)
+        return doc.ops_since(since_version)
 
     @classmethod
     def remove(cls, document_id: str):
         cls._docs.pop(document_id, None)
+        cls.get_backend().delete(document_id)
 
     @classmethod
     def list_active(cls) -> list[str]:
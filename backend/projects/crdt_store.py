@@ -0,0 +1,223 @@
+"""
+Store backends for CRDT documents.
+
+A backend persists each document's op-log plus periodic checkpoints
+(full ``CRDTDocument.to_dict()`` state) so that:
+
+* every Daphne/Uvicorn worker can rebuild and serve any room, and
+* the op-log is trimmed at each checkpoint, keeping memory bounded
+  during long editing sessions.
+
+Backends:
+    LocalMemoryCRDTStoreBackend – process-local, for dev and tests
+    RedisCRDTStoreBackend       – shared across workers, sharded by document
+
+Select with ``CRDT_STORE_BACKEND`` ('memory' or 'redis').
+"""
+
+import json
+import logging
+import zlib
+from typing import Optional
+
+from django.conf import settings
+
+from .crdt_engine import CRDTDocument, CRDTOperation
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHECKPOINT_INTERVAL = 500
+DEFAULT_DOCUMENT_TTL = 7 * 24 * 3600  # 7 days
+
+
+class BaseCRDTStoreBackend:
+    """Interface shared by all CRDT store backends."""
+
+    def __init__(self, checkpoint_interval: int = DEFAULT_CHECKPOINT_INTERVAL):
+        self.checkpoint_interval = checkpoint_interval
+
+    def load(self, document_id: str) -> Optional[CRDTDocument]:
+        """Rebuild a document from its last checkpoint and op-log tail."""
+        raise NotImplementedError
+
+    def append_ops(self, document_id: str, ops: list[dict]) -> int:
+        """Append serialized ops; return the document version afterwards."""
+        raise NotImplementedError
+
+    def read_ops(self, document_id: str, since_version: int) -> Optional[list[dict]]:
+        """Return ops after ``since_version``; None if already checkpointed away."""
+        raise NotImplementedError
+
+    def write_checkpoint(self, document_id: str, state: dict, version: int):
+        """Store a checkpoint at ``version`` and drop the ops it covers."""
+        raise NotImplementedError
+
+    def delete(self, document_id: str):
+        raise NotImplementedError
+
+    @staticmethod
+    def _build(document_id: str, checkpoint: Optional[dict], base: int, ops: list[dict]) -> CRDTDocument:
+        if checkpoint:
+            doc = CRDTDocument.from_dict(checkpoint)
+        else:
+            doc = CRDTDocument(document_id)
+        doc.version = doc.base_version = base
+        doc.replay([CRDTOperation.from_dict(d) for d in ops])
+        return doc
+
+
+class LocalMemoryCRDTStoreBackend(BaseCRDTStoreBackend):
+    """Process-local backend; only suitable for a single worker."""
+
+    def __init__(self, checkpoint_interval: int = DEFAULT_CHECKPOINT_INTERVAL):
+        super().__init__(checkpoint_interval)
+        self._records: dict[str, dict] = {}
+
+    def _record(self, document_id: str) -> dict:
+        return self._records.setdefault(
+            document_id, {'checkpoint': None, 'base': 0, 'ops': []}
+        )
+
+    def load(self, document_id: str) -> Optional[CRDTDocument]:
+        record = self._records.get(document_id)
+        if record is None:
+            return None
+        return self._build(document_id, record['checkpoint'], record['base'], record['ops'])
+
+    def append_ops(self, document_id: str, ops: list[dict]) -> int:
+        record = self._record(document_id)
+        record['ops'].extend(ops)
+        return record['base'] + len(record['ops'])
+
+    def read_ops(self, document_id: str, since_version: int) -> Optional[list[dict]]:
+        record = self._records.get(document_id)
+        if record is None:
+            return [] if since_version == 0 else None
+        if since_version < record['base']:
+            return None
+        return record['ops'][since_version - record['base']:]
+
+    def write_checkpoint(self, document_id: str, state: dict, version: int):
+        record = self._record(document_id)
+        if version <= record['base']:
+            return
+        del record['ops'][:version - record['base']]
+        record['base'] = version
+        record['checkpoint'] = state
+
+    def delete(self, document_id: str):
+        self._records.pop(document_id, None)
+
+
+class RedisCRDTStoreBackend(BaseCRDTStoreBackend):
+    """
+    Redis-backed store shared by all workers.
+
+    Each document uses three keys with a ``{document_id}`` hash tag so
+    they always land on the same Redis Cluster slot:
+
+        crdt:{id}:ops   LIST of JSON ops after the checkpoint
+        crdt:{id}:base  version at which ``ops`` starts
+        crdt:{id}:ckpt  JSON checkpoint of the document state
+
+    Documents are additionally spread across ``urls`` by CRC32 of the
+    document id, so independent Redis instances can share the load.
+    """
+
+    KEY_PREFIX = 'crdt'
+
+    def __init__(self, urls: Optional[list[str]] = None, clients: Optional[list] = None,
+                 checkpoint_interval: int = DEFAULT_CHECKPOINT_INTERVAL,
+                 ttl: int = DEFAULT_DOCUMENT_TTL):
+        super().__init__(checkpoint_interval)
+        if clients is None:
+            import redis
+            clients = [redis.Redis.from_url(url) for url in (urls or [])]
+        if not clients:
+            raise ValueError('RedisCRDTStoreBackend needs at least one Redis URL or client')
+        self.clients = clients
+        self.ttl = ttl
+
+    def _client(self, document_id: str):
+        shard = zlib.crc32(str(document_id).encode()) % len(self.clients)
+        return self.clients[shard]
+
+    def _keys(self, document_id: str) -> tuple[str, str, str]:
+        tag = f'{self.KEY_PREFIX}:{{{document_id}}}'
+        return f'{tag}:ops', f'{tag}:base', f'{tag}:ckpt'
+
+    def load(self, document_id: str) -> Optional[CRDTDocument]:
+        ops_key, base_key, ckpt_key = self._keys(document_id)
+        pipe = self._client(document_id).pipeline(transaction=True)
+        pipe.get(ckpt_key)
+        pipe.get(base_key)
+        pipe.lrange(ops_key, 0, -1)
+        ckpt, base, raw_ops = pipe.execute()
+        if ckpt is None and base is None and not raw_ops:
+            return None
+        return self._build(
+            document_id,
+            json.loads(ckpt) if ckpt else None,
+            int(base or 0),
+            [json.loads(o) for o in raw_ops],
+        )
+
+    def append_ops(self, document_id: str, ops: list[dict]) -> int:
+        ops_key, base_key, ckpt_key = self._keys(document_id)
+        pipe = self._client(document_id).pipeline(transaction=True)
+        pipe.rpush(ops_key, *[json.dumps(op, separators=(',', ':')) for op in ops])
+        pipe.get(base_key)
+        for key in (ops_key, base_key, ckpt_key):
+            pipe.expire(key, self.ttl)
+        length, base = pipe.execute()[:2]
+        return int(base or 0) + length
+
+    def read_ops(self, document_id: str, since_version: int) -> Optional[list[dict]]:
+        ops_key, base_key, _ = self._keys(document_id)
+        client = self._client(document_id)
+        base = int(client.get(base_key) or 0)
+        if since_version < base:
+            return None
+        raw_ops = client.lrange(ops_key, since_version - base, -1)
+        # A checkpoint may have trimmed the list between the two calls.
+        if int(client.get(base_key) or 0) != base:
+            return self.read_ops(document_id, since_version)
+        return [json.loads(o) for o in raw_ops]
+
+    def write_checkpoint(self, document_id: str, state: dict, version: int):
+        import redis
+
+        ops_key, base_key, ckpt_key = self._keys(document_id)
+        payload = json.dumps(state, separators=(',', ':'))
+
+        def _checkpoint(pipe):
+            base = int(pipe.get(base_key) or 0)
+            if version <= base:
+                return
+            pipe.multi()
+            pipe.ltrim(ops_key, version - base, -1)
+            pipe.set(base_key, version, ex=self.ttl)
+            pipe.set(ckpt_key, payload, ex=self.ttl)
+
+        try:
+            self._client(document_id).transaction(_checkpoint, base_key)
+        except redis.WatchError:
+            # A concurrent checkpoint won; the next one will catch up.
+            logger.debug('CRDT checkpoint for %s lost a race', document_id)
+
+    def delete(self, document_id: str):
+        self._client(document_id).delete(*self._keys(document_id))
+
+
+def get_store_backend() -> BaseCRDTStoreBackend:
+    """Build the backend configured in settings."""
+    kind = getattr(settings, 'CRDT_STORE_BACKEND', 'memory')
+    interval = getattr(settings, 'CRDT_CHECKPOINT_INTERVAL', DEFAULT_CHECKPOINT_INTERVAL)
+    if kind == 'redis':
+        urls = getattr(settings, 'CRDT_STORE_REDIS_URLS', None) or [settings.REDIS_URL]
+        return RedisCRDTStoreBackend(
+            urls=urls,
+            checkpoint_interval=interval,
+            ttl=getattr(settings, 'CRDT_DOCUMENT_TTL', DEFAULT_DOCUMENT_TTL),
+        )
+    return LocalMemoryCRDTStoreBackend(checkpoint_interval=interval)
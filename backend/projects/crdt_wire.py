@@ -0,0 +1,111 @@
+"""
+Compact binary wire format for CRDT operations.
+
+JSON frames repeat every key name and a full clock object per op.  The
+binary frames are msgpack arrays instead:
+
+    client → server   [MSG_BATCH, nodes, ops]
+    server → client   [MSG_OPS, version, origin, nodes, ops]
+
+where ``nodes`` is a per-frame table of node ids and every op is
+
+    [op_code, element_id, prop, value, physical, logical, node_idx]
+
+Binary frames are only used when msgpack is installed; the JSON protocol
+remains the fallback.
+"""
+
+import sys
+from typing import Any
+
+from .crdt_engine import CRDTClock, CRDTOperation
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+MSG_BATCH = 1
+MSG_OPS = 2
+
+OP_CODES = {'set': 0, 'delete': 1, 'add_element': 2, 'remove_element': 3}
+OP_TYPES = {code: name for name, code in OP_CODES.items()}
+
+
+class WireFormatError(ValueError):
+    """Raised for binary frames that cannot be decoded."""
+
+
+def _pack_ops(ops: list[CRDTOperation]) -> tuple[list[str], list[list]]:
+    nodes: list[str] = []
+    node_index: dict[str, int] = {}
+    packed = []
+    for op in ops:
+        node_id = op.clock.node_id
+        idx = node_index.get(node_id)
+        if idx is None:
+            idx = node_index[node_id] = len(nodes)
+            nodes.append(node_id)
+        packed.append([
+            OP_CODES[op.op_type], op.element_id, op.prop, op.value,
+            op.clock.physical, op.clock.logical, idx,
+        ])
+    return nodes, packed
+
+
+def _unpack_ops(nodes: list, packed: list, origin: str = '') -> list[CRDTOperation]:
+    if not isinstance(nodes, list) or not isinstance(packed, list):
+        raise WireFormatError('Node ids and ops must be arrays')
+    nodes = [sys.intern(str(n)) for n in nodes]
+    try:
+        return [
+            CRDTOperation(
+                op_type=OP_TYPES[code],
+                element_id=element_id,
+                prop=prop,
+                value=value,
+                clock=CRDTClock(physical, logical, nodes[node_idx]),
+                origin=origin,
+            )
+            for code, element_id, prop, value, physical, logical, node_idx in packed
+        ]
+    except (KeyError, IndexError, TypeError, ValueError) as exc:
+        raise WireFormatError(f'Malformed CRDT op: {exc}') from exc
+
+
+def encode_batch(ops: list[CRDTOperation]) -> bytes:
+    """Encode a client → server batch frame."""
+    nodes, packed = _pack_ops(ops)
+    return msgpack.packb([MSG_BATCH, nodes, packed], use_bin_type=True)
+
+
+def encode_ops_frame(ops: list[CRDTOperation], version: int, origin: str = '') -> bytes:
+    """Encode a server → client ``crdt_ops`` frame."""
+    nodes, packed = _pack_ops(ops)
+    return msgpack.packb([MSG_OPS, version, origin, nodes, packed], use_bin_type=True)
+
+
+def decode_frame(data: bytes) -> dict[str, Any]:
+    """
+    Decode a binary frame into the same shape as its JSON counterpart,
+    with ``ops`` as ``CRDTOperation`` objects.
+    """
+    try:
+        frame = msgpack.unpackb(data, raw=False, strict_map_key=False)
+    except Exception as exc:
+        raise WireFormatError(f'Invalid msgpack frame: {exc}') from exc
+    if not isinstance(frame, list) or not frame:
+        raise WireFormatError('Binary frame must be a non-empty array')
+
+    kind = frame[0]
+    if kind == MSG_BATCH and len(frame) == 3:
+        return {'action': 'crdt_batch', 'ops': _unpack_ops(frame[1], frame[2])}
+    if kind == MSG_OPS and len(frame) == 5:
+        return {
+            'type': 'crdt_ops',
+            'version': frame[1],
+            'origin': frame[2],
+            'ops': _unpack_ops(frame[3], frame[4], origin=frame[2]),
+        }
+    raise WireFormatError(f'Unknown binary frame type: {kind!r}')
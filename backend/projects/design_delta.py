@@ -0,0 +1,200 @@
+"""
+JSON deltas for canvas design sync.
+
+``diff`` turns two Fabric JSON snapshots into RFC 6902 (JSON Patch)
+operations and ``apply_patch`` replays them.  Lists of objects carrying
+an ``id`` are matched by id, so inserting or deleting an element costs
+one operation instead of shifting every later index, and a z-order
+change moves only the reordered elements; other lists are compared
+position by position.  Only ``add``, ``remove`` and ``replace``
+are emitted, so any JSON Patch implementation can apply the result.
+
+``state_hash`` names a snapshot so receivers can check that a delta
+applies to the state they hold.
+"""
+
+import hashlib
+import json
+from typing import Any, Optional
+
+# Deltas larger than this share of the snapshot are sent as a snapshot.
+MAX_PATCH_RATIO = 0.5
+
+
+def canonical_json(data: Any) -> str:
+    return json.dumps(data, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+
+
+def state_hash(data: Any, encoded: Optional[str] = None) -> str:
+    """Short content hash of a design snapshot (``encoded``: its canonical JSON)."""
+    if encoded is None:
+        encoded = canonical_json(data)
+    return hashlib.blake2b(encoded.encode(), digest_size=12).hexdigest()
+
+
+def make_delta(old: Any, new: Any, new_encoded: str) -> Optional[list[dict]]:
+    """
+    Patch from ``old`` to ``new``, or None when it would not be much
+    smaller than the snapshot itself.
+    """
+    patch = diff(old, new)
+    limit = len(new_encoded) * MAX_PATCH_RATIO
+    if len(json.dumps(patch, separators=(',', ':'))) > limit:
+        return None
+    return patch
+
+
+def _escape(token: Any) -> str:
+    return str(token).replace('~', '~0').replace('/', '~1')
+
+
+def _unescape(token: str) -> str:
+    return token.replace('~1', '/').replace('~0', '~')
+
+
+def _keyed_ids(items: list):
+    """Element ids of a list of objects, or None if it is not id-keyed."""
+    if not items or not all(isinstance(item, dict) and 'id' in item for item in items):
+        return None
+    ids = [item['id'] for item in items]
+    try:
+        if len(set(ids)) != len(ids):
+            return None
+    except TypeError:
+        return None
+    return ids
+
+
+def diff(old: Any, new: Any, path: str = '') -> list[dict]:
+    """JSON Patch operations transforming ``old`` into ``new``."""
+    if type(old) is not type(new):
+        return [{'op': 'replace', 'path': path, 'value': new}]
+    if isinstance(old, dict):
+        return _diff_dict(old, new, path)
+    if isinstance(old, list):
+        return _diff_list(old, new, path)
+    if old != new:
+        return [{'op': 'replace', 'path': path, 'value': new}]
+    return []
+
+
+def _diff_dict(old: dict, new: dict, path: str) -> list[dict]:
+    ops = []
+    for key, value in old.items():
+        child = f'{path}/{_escape(key)}'
+        if key not in new:
+            ops.append({'op': 'remove', 'path': child})
+        elif new[key] is not value:
+            ops.extend(diff(value, new[key], child))
+    for key, value in new.items():
+        if key not in old:
+            ops.append({'op': 'add', 'path': f'{path}/{_escape(key)}', 'value': value})
+    return ops
+
+
+def _diff_list(old: list, new: list, path: str) -> list[dict]:
+    old_ids, new_ids = _keyed_ids(old), _keyed_ids(new)
+    if old_ids is not None and new_ids is not None:
+        return _diff_keyed_list(old, new, old_ids, new_ids, path)
+
+    ops = []
+    common = min(len(old), len(new))
+    for i in range(common):
+        if old[i] != new[i]:
+            ops.extend(diff(old[i], new[i], f'{path}/{i}'))
+    for i in range(len(old) - 1, common - 1, -1):
+        ops.append({'op': 'remove', 'path': f'{path}/{i}'})
+    for item in new[common:]:
+        ops.append({'op': 'add', 'path': f'{path}/-', 'value': item})
+    return ops
+
+
+def _stable_ids(old_ids: list, new_ids: list) -> set:
+    """
+    Ids that keep their relative order (a longest increasing subsequence
+    of old positions in new order); everything else is removed and
+    re-added, so moving one element is two operations.
+    """
+    old_pos = {element_id: i for i, element_id in enumerate(old_ids)}
+    seq = [old_pos[i] for i in new_ids if i in old_pos]
+    tails: list[int] = []        # smallest tail index (into seq) per length
+    parent = [-1] * len(seq)
+    for i, pos in enumerate(seq):
+        lo, hi = 0, len(tails)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if seq[tails[mid]] < pos:
+                lo = mid + 1
+            else:
+                hi = mid
+        parent[i] = tails[lo - 1] if lo else -1
+        if lo == len(tails):
+            tails.append(i)
+        else:
+            tails[lo] = i
+    stable = set()
+    i = tails[-1] if tails else -1
+    while i != -1:
+        stable.add(old_ids[seq[i]])
+        i = parent[i]
+    return stable
+
+
+def _diff_keyed_list(old, new, old_ids, new_ids, path):
+    stable = _stable_ids(old_ids, new_ids)
+    ops = []
+    for index in range(len(old_ids) - 1, -1, -1):
+        if old_ids[index] not in stable:
+            ops.append({'op': 'remove', 'path': f'{path}/{index}'})
+    old_by_id = dict(zip(old_ids, old))
+    # After the removals the list holds the stable items in order;
+    # walking ``new`` left to right, ``index`` is always the next slot.
+    for index, (element_id, item) in enumerate(zip(new_ids, new)):
+        if element_id not in stable:
+            ops.append({'op': 'add', 'path': f'{path}/{index}', 'value': item})
+        elif old_by_id[element_id] != item:
+            ops.extend(diff(old_by_id[element_id], item, f'{path}/{index}'))
+    return ops
+
+
+def apply_patch(doc: Any, ops: list[dict]) -> Any:
+    """
+    Return a new document with ``ops`` applied.  ``doc`` is not modified:
+    only the containers along each operation's path are copied, the rest
+    is shared with the original.
+    """
+    copied: set[int] = set()
+
+    def own(container):
+        if id(container) in copied:
+            return container
+        container = list(container) if isinstance(container, list) else dict(container)
+        copied.add(id(container))
+        return container
+
+    for op in ops:
+        if op['path'] == '':
+            doc = op['value']
+            continue
+        tokens = [_unescape(t) for t in op['path'].split('/')[1:]]
+        doc = parent = own(doc)
+        for token in tokens[:-1]:
+            key = int(token) if isinstance(parent, list) else token
+            parent[key] = own(parent[key])
+            parent = parent[key]
+
+        last, kind = tokens[-1], op['op']
+        if isinstance(parent, list):
+            if kind == 'add' and last == '-':
+                parent.append(op['value'])
+            elif kind == 'add':
+                parent.insert(int(last), op['value'])
+            elif kind == 'remove':
+                del parent[int(last)]
+            else:
+                parent[int(last)] = op['value']
+        elif kind == 'remove':
+            del parent[last]
+        else:
+            parent[last] = op['value']
+    return doc
@@ -0,0 +1,308 @@
+"""
+Structural Design Diff
+
+One diff engine for the version, branch and merge services.  Documents
+hold a list of nodes with ids (``components``, ``nodes``, ``elements``);
+nodes are matched by id and compared key by key, and everything else in
+the document is compared as plain JSON.
+
+Work follows the size of the change, not of the document:
+
+* nodes that are the same object are skipped without being visited
+  (snapshots read together from the object store share every unchanged
+  component)
+* nodes whose canonical hashes are equal are skipped; immutable
+  documents such as commits keep their hashes in the cache
+  (``cached_node_hashes``), so comparing them again only looks at nodes
+  whose hash differs
+* remaining nodes are compared with ``!=`` and, when they differ,
+  descended one key at a time
+
+The result converts to a compact patch that ``apply_patch`` replays and
+``revert_patch`` undoes.  Operations address dict keys only; lists
+inside a node are replaced whole.
+
+    ['=', path, old, new]   replace a value
+    ['+', path, new]        add a key
+    ['-', path, old]        remove a key
+
+Usage:
+    result = diff_documents(old, new, key='components')
+    result.modified[0].changed_keys('properties')
+    patch = result.patch()
+    apply_patch(old, patch) == new and revert_patch(new, patch) == old
+"""
+import hashlib
+import json
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from django.core.cache import cache
+
+# Cached hashes of immutable documents are kept for a week
+NODE_HASHES_TIMEOUT = 7 * 24 * 3600
+
+
+def node_digest(node: Any) -> str:
+    """Canonical hash of one node."""
+    encoded = json.dumps(node, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.blake2b(encoded.encode(), digest_size=16).hexdigest()
+
+
+def node_hashes(nodes: Sequence[dict], id_field: str = 'id') -> Dict[Any, str]:
+    return {node.get(id_field): node_digest(node) for node in nodes}
+
+
+def cached_node_hashes(cache_key: str, nodes: Sequence[dict], id_field: str = 'id') -> Dict[Any, str]:
+    """
+    Node hashes of an immutable document, computed once per ``cache_key``
+    (e.g. ``design_diff:commit:<pk>``).
+    """
+    hashes = cache.get(cache_key)
+    if hashes is None:
+        hashes = node_hashes(nodes, id_field)
+        cache.set(cache_key, hashes, NODE_HASHES_TIMEOUT)
+    return hashes
+
+
+def diff_value(old: Any, new: Any, path: Optional[list] = None) -> List[list]:
+    """Operations turning ``old`` into ``new``; equal subtrees are not visited."""
+    ops: List[list] = []
+    _diff_value(old, new, path or [], ops)
+    return ops
+
+
+def _diff_value(old, new, path, ops):
+    if old is new:
+        return
+    if isinstance(old, dict) and isinstance(new, dict):
+        for key, value in old.items():
+            if key not in new:
+                ops.append(['-', path + [key], value])
+                continue
+            other = new[key]
+            if value is not other and value != other:
+                _diff_value(value, other, path + [key], ops)
+        for key, value in new.items():
+            if key not in old:
+                ops.append(['+', path + [key], value])
+    elif old != new:
+        ops.append(['=', path, old, new])
+
+
+class NodeChange:
+    """A node present on both sides whose content differs."""
+    __slots__ = ('id', 'old', 'new', 'ops')
+
+    def __init__(self, node_id, old: dict, new: dict, ops: List[list]):
+        self.id = node_id
+        self.old = old
+        self.new = new
+        self.ops = ops
+
+    def changed_keys(self, *prefix) -> List[Any]:
+        """
+        Keys directly under ``prefix`` (e.g. ``'properties'``) whose values
+        differ, in the order the diff met them.
+        """
+        depth = len(prefix)
+        keys = []
+        for op in self.ops:
+            path = op[1]
+            if len(path) < depth or tuple(path[:depth]) != prefix:
+                continue
+            if len(path) == depth:
+                # The container itself was replaced: compare its keys
+                old, new = _lookup(self.old, prefix), _lookup(self.new, prefix)
+                old = old if isinstance(old, dict) else {}
+                new = new if isinstance(new, dict) else {}
+                keys.extend(key for key in {**old, **new} if old.get(key) != new.get(key))
+            else:
+                keys.append(path[depth])
+        return list(dict.fromkeys(keys))
+
+
+def _lookup(value, path):
+    for key in path:
+        value = value.get(key) if isinstance(value, dict) else None
+    return value
+
+
+class DesignDiff:
+    """Node-level result of ``diff_documents``."""
+
+    def __init__(self, key: str, id_field: str = 'id'):
+        self.key = key
+        self.id_field = id_field
+        self.added: List[Tuple[int, dict]] = []     # (index in new, node)
+        self.removed: List[Tuple[int, dict]] = []   # (index in old, node)
+        self.modified: List[NodeChange] = []        # in new order
+        self.order: Optional[Tuple[list, list]] = None
+        self.doc_ops: List[list] = []
+        # Set when the node list is patched as one value: it is missing on
+        # one side or its ids are not unique
+        self.whole_list = False
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.modified or self.order or self.doc_ops)
+
+    def patch(self) -> Dict[str, Any]:
+        """JSON-serializable patch for ``apply_patch`` / ``revert_patch``."""
+        patch: Dict[str, Any] = {'key': self.key, 'doc': self.doc_ops}
+        if self.id_field != 'id':
+            patch['id'] = self.id_field
+        if self.whole_list:
+            return patch
+        nodes: Dict[str, Any] = {}
+        if self.added:
+            nodes['+'] = [list(entry) for entry in self.added]
+        if self.removed:
+            nodes['-'] = [list(entry) for entry in self.removed]
+        if self.modified:
+            nodes['~'] = [[change.id, change.ops] for change in self.modified]
+        if self.order:
+            nodes['order'] = list(self.order)
+        if nodes:
+            patch['nodes'] = nodes
+        return patch
+
+
+def diff_documents(
+    old: Dict[str, Any],
+    new: Dict[str, Any],
+    key: str,
+    id_field: str = 'id',
+    old_hashes: Optional[Dict[Any, str]] = None,
+    new_hashes: Optional[Dict[Any, str]] = None,
+) -> DesignDiff:
+    """
+    Compare two documents whose ``key`` holds a list of nodes with
+    ``id_field``.  Pass hashes of both sides (``node_hashes``) to skip
+    unchanged nodes without comparing them.
+    """
+    result = DesignDiff(key, id_field)
+    old = old if isinstance(old, dict) else {}
+    new = new if isinstance(new, dict) else {}
+    old_nodes = old.get(key) or []
+    new_nodes = new.get(key) or []
+
+    old_by_id = {node.get(id_field): (i, node) for i, node in enumerate(old_nodes)}
+    new_by_id = {node.get(id_field): (i, node) for i, node in enumerate(new_nodes)}
+    hashed = old_hashes is not None and new_hashes is not None
+
+    for index, node in enumerate(new_nodes):
+        node_id = node.get(id_field)
+        if new_by_id[node_id][0] != index:
+            continue
+        entry = old_by_id.get(node_id)
+        if entry is None:
+            result.added.append((index, node))
+            continue
+        previous = entry[1]
+        if previous is node:
+            continue
+        if hashed and old_hashes.get(node_id) is not None and old_hashes.get(node_id) == new_hashes.get(node_id):
+            continue
+        if previous != node:
+            result.modified.append(NodeChange(node_id, previous, node, diff_value(previous, node)))
+    for index, node in enumerate(old_nodes):
+        node_id = node.get(id_field)
+        if old_by_id[node_id][0] == index and node_id not in new_by_id:
+            result.removed.append((index, node))
+
+    if key not in old or key not in new:
+        result.whole_list = True
+    elif (len(old_by_id) != len(old_nodes) or len(new_by_id) != len(new_nodes)
+          or None in old_by_id or None in new_by_id):
+        result.whole_list = True
+        if old_nodes != new_nodes:
+            result.doc_ops.append(['=', [key], old[key], new[key]])
+    else:
+        kept_old = [node_id for node_id in old_by_id if node_id in new_by_id]
+        kept_new = [node_id for node_id in new_by_id if node_id in old_by_id]
+        if kept_old != kept_new:
+            result.order = (list(old_by_id), list(new_by_id))
+
+    if result.whole_list:
+        _diff_value({key: old[key]} if key in old else {}, {key: new[key]} if key in new else {}, [], result.doc_ops)
+    _diff_value(
+        {name: value for name, value in old.items() if name != key},
+        {name: value for name, value in new.items() if name != key},
+        [], result.doc_ops,
+    )
+    return result
+
+
+def apply_patch(doc: Dict[str, Any], patch: Dict[str, Any]) -> Dict[str, Any]:
+    """The document ``patch`` was computed towards; ``doc`` is not modified."""
+    return _apply(doc, patch, forward=True)
+
+
+def revert_patch(doc: Dict[str, Any], patch: Dict[str, Any]) -> Dict[str, Any]:
+    """The document ``patch`` was computed from; ``doc`` is not modified."""
+    return _apply(doc, patch, forward=False)
+
+
+def _apply(doc, patch, forward):
+    key = patch.get('key')
+    id_field = patch.get('id', 'id')
+    nodes = patch.get('nodes')
+    result = doc
+
+    if nodes:
+        added, removed = nodes.get('+', []), nodes.get('-', [])
+        if not forward:
+            added, removed = removed, added
+        dropped = {node.get(id_field) for _, node in removed}
+        changes = {node_id: ops if forward else _invert(ops) for node_id, ops in nodes.get('~', [])}
+        current = []
+        for node in result.get(key) or []:
+            node_id = node.get(id_field)
+            if node_id in dropped:
+                continue
+            for op in changes.get(node_id, ()):
+                node = _apply_op(node, op)
+            current.append(node)
+        for index, node in sorted(added, key=lambda entry: entry[0]):
+            current.insert(index, node)
+        if 'order' in nodes:
+            position = {node_id: i for i, node_id in enumerate(nodes['order'][1 if forward else 0])}
+            current.sort(key=lambda node: position.get(node.get(id_field), len(position)))
+        result = dict(result)
+        result[key] = current
+
+    doc_ops = patch.get('doc', [])
+    for op in doc_ops if forward else _invert(doc_ops):
+        result = _apply_op(result, op)
+    return result
+
+
+def _invert(ops: Iterable[list]) -> List[list]:
+    inverted = []
+    for op in reversed(list(ops)):
+        if op[0] == '=':
+            inverted.append(['=', op[1], op[3], op[2]])
+        elif op[0] == '+':
+            inverted.append(['-', op[1], op[2]])
+        else:
+            inverted.append(['+', op[1], op[2]])
+    return inverted
+
+
+def _apply_op(value, op):
+    return _set_in(value, op[1], op[-1], delete=op[0] == '-')
+
+
+def _set_in(value, path, new, delete=False):
+    """Copy of ``value`` with ``path`` set to ``new`` (or removed)."""
+    if not path:
+        return new
+    head = path[0]
+    copy = dict(value)
+    if len(path) == 1:
+        if delete:
+            copy.pop(head, None)
+        else:
+            copy[head] = new
+    else:
+        copy[head] = _set_in(copy.get(head) or {}, path[1:], new, delete)
+    return copy
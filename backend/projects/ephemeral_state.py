@@ -0,0 +1,109 @@
+"""
+Ephemeral collaboration state: cursors, selections and viewports.
+
+These stream at 30–60 Hz per user and only their latest value matters,
+so they are never written to the database per event:
+
+* ``EphemeralThrottle`` fans an update out at most once per interval per
+  key, like a client-side throttle: the first update goes out at once,
+  later ones inside the interval collapse into one trailing update that
+  carries the newest value (last value wins).
+* ``WriteBehind`` collects the newest values and persists them at most
+  once per interval, plus whatever is left when the connection closes.
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INTERVAL_MS = 50
+DEFAULT_FLUSH_SECONDS = 10
+
+
+class EphemeralThrottle:
+    """Per-connection leading/trailing-edge throttle keyed by update kind."""
+
+    def __init__(self, emit: Callable[[str, Any], Awaitable], interval_ms: int = DEFAULT_INTERVAL_MS):
+        self.emit = emit
+        self.interval = interval_ms / 1000
+        self.pending: dict[str, Any] = {}
+        self._last_sent: dict[str, float] = {}
+        self._handles: dict[str, asyncio.TimerHandle] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+    async def push(self, key: str, value: Any):
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        wait = self._last_sent.get(key, float('-inf')) + self.interval - now
+        if wait <= 0 and key not in self._handles:
+            self._last_sent[key] = now
+            await self.emit(key, value)
+            return
+
+        self.pending[key] = value
+        if key not in self._handles:
+            self._handles[key] = loop.call_later(wait, self._schedule, key)
+
+    def _schedule(self, key: str):
+        task = asyncio.get_running_loop().create_task(self._fire(key))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _fire(self, key: str):
+        self._handles.pop(key, None)
+        if key not in self.pending:
+            return
+        value = self.pending.pop(key)
+        self._last_sent[key] = asyncio.get_running_loop().time()
+        try:
+            await self.emit(key, value)
+        except Exception:
+            logger.exception('Ephemeral %s update failed', key)
+
+    def close(self):
+        """Drop pending updates and cancel their timers."""
+        for handle in self._handles.values():
+            handle.cancel()
+        self._handles.clear()
+        self.pending.clear()
+
+
+class WriteBehind:
+    """Coalesce field updates and persist them once per interval."""
+
+    def __init__(self, persist: Callable[[dict], Awaitable],
+                 interval: float = DEFAULT_FLUSH_SECONDS):
+        self.persist = persist
+        self.interval = interval
+        self.pending: dict[str, Any] = {}
+        self._handle: Optional[asyncio.TimerHandle] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def update(self, **fields):
+        self.pending.update(fields)
+        if self._handle is None:
+            loop = asyncio.get_running_loop()
+            self._handle = loop.call_later(self.interval, self._schedule)
+
+    def _schedule(self):
+        self._task = asyncio.get_running_loop().create_task(self.flush())
+
+    async def flush(self):
+        """Persist pending fields now."""
+        fields = self.drain()
+        if not fields:
+            return
+        try:
+            await self.persist(fields)
+        except Exception:
+            logger.exception('Ephemeral state write-behind failed')
+
+    def drain(self) -> dict:
+        """Cancel the timer and hand back the pending fields."""
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        fields, self.pending = self.pending, {}
+        return fields
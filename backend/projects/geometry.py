@@ -0,0 +1,239 @@
+"""
+Vectorized Geometry Kernel
+
+Shared layout math for batch operations and magic resize.
+Component boxes are pulled out of their JSON properties once into NumPy
+arrays, transformed with array operations, and written back in one pass.
+
+Usage:
+    boxes = Boxes.from_properties([c.properties for c in components])
+    aligned = align(boxes, 'left')
+    aligned.write_positions([c.properties for c in components])
+"""
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+DEFAULT_SIZE = 100
+
+
+def _to_json_numbers(values: np.ndarray) -> List[Any]:
+    """Convert an array to JSON-friendly numbers, keeping integers as int."""
+    if np.all(np.mod(values, 1) == 0):
+        return values.astype(np.int64).tolist()
+    return [int(v) if v.is_integer() else v for v in values.tolist()]
+
+
+def _column(values: List[Any]) -> np.ndarray:
+    return np.fromiter(values, dtype=np.float64, count=len(values))
+
+
+class Boxes:
+    """
+    Axis-aligned boxes for N components as four float64 arrays.
+    """
+    __slots__ = ('x', 'y', 'width', 'height')
+
+    def __init__(self, x, y, width, height):
+        self.x = np.asarray(x, dtype=np.float64)
+        self.y = np.asarray(y, dtype=np.float64)
+        self.width = np.asarray(width, dtype=np.float64)
+        self.height = np.asarray(height, dtype=np.float64)
+
+    def __len__(self) -> int:
+        return len(self.x)
+
+    def copy(self) -> 'Boxes':
+        return Boxes(self.x.copy(), self.y.copy(), self.width.copy(), self.height.copy())
+
+    @classmethod
+    def from_properties(
+        cls,
+        properties: Sequence[Dict[str, Any]],
+        default_size: float = DEFAULT_SIZE
+    ) -> 'Boxes':
+        """
+        Read ``position``/``size`` from DesignComponent.properties dicts.
+        """
+        pos = [props.get('position') or {} for props in properties]
+        size = [props.get('size') or {} for props in properties]
+        return cls(
+            _column([p.get('x', 0) for p in pos]),
+            _column([p.get('y', 0) for p in pos]),
+            _column([s.get('width', default_size) for s in size]),
+            _column([s.get('height', default_size) for s in size]),
+        )
+
+    @classmethod
+    def from_elements(
+        cls,
+        elements: Sequence[Dict[str, Any]],
+        default_size: float = DEFAULT_SIZE
+    ) -> 'Boxes':
+        """
+        Read design_data elements, which use either ``position``/``size``
+        dicts or Fabric-style ``left``/``top``/``width``/``height`` keys.
+        """
+        pos = [elem.get('position') or {} for elem in elements]
+        size = [elem.get('size') or {} for elem in elements]
+        return cls(
+            _column([p.get('x', e.get('left', 0)) for p, e in zip(pos, elements)]),
+            _column([p.get('y', e.get('top', 0)) for p, e in zip(pos, elements)]),
+            _column([s.get('width', e.get('width', default_size)) for s, e in zip(size, elements)]),
+            _column([s.get('height', e.get('height', default_size)) for s, e in zip(size, elements)]),
+        )
+
+    def write_positions(self, properties: Sequence[Dict[str, Any]]) -> None:
+        """
+        Store x/y into each ``position`` dict, keeping any other keys.
+        """
+        for props, x, y in zip(properties, _to_json_numbers(self.x), _to_json_numbers(self.y)):
+            pos = props.get('position')
+            props['position'] = {**pos, 'x': x, 'y': y} if isinstance(pos, dict) else {'x': x, 'y': y}
+
+    def write_sizes(self, properties: Sequence[Dict[str, Any]]) -> None:
+        """Store width/height into each ``size`` dict."""
+        for props, w, h in zip(
+            properties, _to_json_numbers(self.width), _to_json_numbers(self.height)
+        ):
+            props['size'] = {'width': w, 'height': h}
+
+    def write_elements(self, elements: Sequence[Dict[str, Any]]) -> None:
+        """
+        Write boxes back to design_data elements in whichever form each
+        element already uses (``position``/``size`` or left/top/width/height).
+        """
+        columns = zip(
+            elements,
+            _to_json_numbers(self.x), _to_json_numbers(self.y),
+            _to_json_numbers(self.width), _to_json_numbers(self.height),
+        )
+        for elem, x, y, w, h in columns:
+            if 'position' in elem:
+                elem['position'] = {**(elem['position'] or {}), 'x': x, 'y': y}
+            else:
+                elem['left'] = x
+                elem['top'] = y
+            if 'size' in elem:
+                elem['size'] = {**(elem['size'] or {}), 'width': w, 'height': h}
+            else:
+                elem['width'] = w
+                elem['height'] = h
+
+
+# ---------------------------------------------------------------------------
+# Kernel operations (all return new Boxes)
+# ---------------------------------------------------------------------------
+
+def bounds(boxes: Boxes) -> Tuple[float, float, float, float]:
+    """Return (min_x, min_y, max_x, max_y) of the selection."""
+    return (
+        float(boxes.x.min()),
+        float(boxes.y.min()),
+        float((boxes.x + boxes.width).max()),
+        float((boxes.y + boxes.height).max()),
+    )
+
+
+def centroid(boxes: Boxes) -> Tuple[float, float]:
+    """Mean of the box centers."""
+    return (
+        float((boxes.x + boxes.width / 2).mean()),
+        float((boxes.y + boxes.height / 2).mean()),
+    )
+
+
+def translate(boxes: Boxes, dx: float, dy: float) -> Boxes:
+    return Boxes(boxes.x + dx, boxes.y + dy, boxes.width, boxes.height)
+
+
+def align(boxes: Boxes, alignment: str) -> Boxes:
+    """
+    Align boxes to the selection bounds.
+
+    ``alignment`` is one of left, center, right, top, middle, bottom.
+    """
+    min_x, min_y, max_x, max_y = bounds(boxes)
+    x, y = boxes.x.copy(), boxes.y.copy()
+
+    if alignment == 'left':
+        x[:] = min_x
+    elif alignment == 'center':
+        x = (min_x + max_x) / 2 - boxes.width / 2
+    elif alignment == 'right':
+        x = max_x - boxes.width
+    elif alignment == 'top':
+        y[:] = min_y
+    elif alignment == 'middle':
+        y = (min_y + max_y) / 2 - boxes.height / 2
+    elif alignment == 'bottom':
+        y = max_y - boxes.height
+
+    return Boxes(x, y, boxes.width, boxes.height)
+
+
+def distribute(boxes: Boxes, direction: str, spacing: Optional[float] = None) -> Boxes:
+    """
+    Distribute boxes along an axis between the first and last box
+    (ordered by position).  The outer boxes stay put; ``spacing`` forces
+    a fixed gap instead of equal spacing.
+    """
+    horizontal = direction == 'horizontal'
+    pos = boxes.x if horizontal else boxes.y
+    extent = boxes.width if horizontal else boxes.height
+
+    order = np.argsort(pos, kind='stable')
+    sorted_pos = pos[order]
+    sorted_extent = extent[order]
+
+    start = sorted_pos[0] + sorted_extent[0]
+    end = sorted_pos[-1]
+    middle = sorted_extent[1:-1]
+    if spacing is None:
+        gap = (end - start - middle.sum()) / (len(order) - 1)
+    else:
+        gap = spacing
+
+    new_pos = pos.copy()
+    # Each middle box starts one gap after the end of the one before it
+    steps = middle + gap
+    new_pos[order[1:-1]] = start + gap + np.cumsum(steps) - steps
+
+    if horizontal:
+        return Boxes(new_pos, boxes.y, boxes.width, boxes.height)
+    return Boxes(boxes.x, new_pos, boxes.width, boxes.height)
+
+
+def scale(
+    boxes: Boxes,
+    scale_x: float,
+    scale_y: float,
+    origin: Optional[Tuple[float, float]] = None
+) -> Boxes:
+    """
+    Scale box sizes.  With an ``origin`` positions scale around that
+    point too; without one each box keeps its own top-left corner.
+    """
+    width = boxes.width * scale_x
+    height = boxes.height * scale_y
+    if origin is None:
+        return Boxes(boxes.x, boxes.y, width, height)
+    ox, oy = origin
+    return Boxes(ox + (boxes.x - ox) * scale_x, oy + (boxes.y - oy) * scale_y, width, height)
+
+
+def snap_to_grid(boxes: Boxes, grid: float, include_size: bool = False) -> Boxes:
+    """Round positions (and optionally sizes) to the nearest grid step."""
+    def snap(values):
+        return np.round(values / grid) * grid
+
+    if include_size:
+        return Boxes(
+            snap(boxes.x), snap(boxes.y),
+            np.maximum(snap(boxes.width), grid), np.maximum(snap(boxes.height), grid),
+        )
+    return Boxes(snap(boxes.x), snap(boxes.y), boxes.width, boxes.height)
+
+
+def round_boxes(boxes: Boxes) -> Boxes:
+    return Boxes(np.round(boxes.x), np.round(boxes.y), np.round(boxes.width), np.round(boxes.height))
@@ -8,6 +8,10 @@ import copy
 import logging
 from typing import Optional
 
+import numpy as np
+
+from . import geometry
+
 logger = logging.getLogger('projects')
 
 # Standard format presets organized by category
@@ -176,74 +180,44 @@ class MagicResizeService:
         scale_y = th / sh
         uniform_scale = min(scale_x, scale_y)
 
-        new_elements = []
-        for elem in elements:
-            new_elem = copy.deepcopy(elem)
-            pos = elem.get('position', {})
-            size = elem.get('size', {})
-            ex = pos.get('x', elem.get('left', 0))
-            ey = pos.get('y', elem.get('top', 0))
-            ew = size.get('width', elem.get('width', 100))
-            eh = size.get('height', elem.get('height', 100))
-            elem_type = elem.get('type', elem.get('component_type', ''))
-
-            # Determine element position zone (edge vs center)
-            cx_ratio = (ex + ew / 2) / sw  # 0–1 how far right
-            cy_ratio = (ey + eh / 2) / sh  # 0–1 how far down
-
-            if elem_type in ('background', 'bg'):
-                # Background: scale to fill
-                new_ew = tw
-                new_eh = th
-                new_ex = 0
-                new_ey = 0
-            else:
-                # Scale dimensions
-                new_ew = ew * uniform_scale
-                new_eh = eh * uniform_scale
-
-                # Reposition: maintain relative position
-                new_ex = cx_ratio * tw - new_ew / 2
-                new_ey = cy_ratio * th - new_eh / 2
-
-                # Clamp to canvas
-                new_ex = max(0, min(new_ex, tw - new_ew))
-                new_ey = max(0, min(new_ey, th - new_eh))
+        boxes = geometry.Boxes.from_elements(elements)
+        elem_types = [elem.get('type', elem.get('component_type', '')) for elem in elements]
+        is_background = np.array([t in ('background', 'bg') for t in elem_types])
+
+        # Determine element position zone (edge vs center): 0–1 how far right/down
+        cx_ratio = (boxes.x + boxes.width / 2) / sw
+        cy_ratio = (boxes.y + boxes.height / 2) / sh
+
+        # Scale dimensions, keep relative position and clamp to canvas
+        new_w = boxes.width * uniform_scale
+        new_h = boxes.height * uniform_scale
+        new_x = np.maximum(0, np.minimum(cx_ratio * tw - new_w / 2, tw - new_w))
+        new_y = np.maximum(0, np.minimum(cy_ratio * th - new_h / 2, th - new_h))
+
+        # Background: scale to fill
+        new_x[is_background] = 0
+        new_y[is_background] = 0
+        new_w[is_background] = tw
+        new_h[is_background] = th
 
+        # ``data`` is already a deep copy made by resize(); edit in place.
+        geometry.round_boxes(geometry.Boxes(new_x, new_y, new_w, new_h)).write_elements(elements)
+
+        for elem, elem_type in zip(elements, elem_types):
             # Text: ensure readability
             if elem_type in ('text', 'i-text', 'textbox'):
                 font_size = elem.get('fontSize', elem.get('properties', {}).get('fontSize', 16))
                 new_font_size = max(10, round(font_size * uniform_scale))
-                if 'fontSize' in new_elem:
-                    new_elem['fontSize'] = new_font_size
-                if 'properties' in new_elem and 'fontSize' in new_elem['properties']:
-                    new_elem['properties']['fontSize'] = new_font_size
-
-            # Write back position
-            if 'position' in new_elem:
-                new_elem['position'] = {'x': round(new_ex), 'y': round(new_ey)}
-            else:
-                new_elem['left'] = round(new_ex)
-                new_elem['top'] = round(new_ey)
-
-            if 'size' in new_elem:
-                new_elem['size'] = {'width': round(new_ew), 'height': round(new_eh)}
-            else:
-                new_elem['width'] = round(new_ew)
-                new_elem['height'] = round(new_eh)
+                if 'fontSize' in elem:
+                    elem['fontSize'] = new_font_size
+                if 'properties' in elem and 'fontSize' in elem['properties']:
+                    elem['properties']['fontSize'] = new_font_size
 
             # Scale other properties
-            if 'scaleX' in new_elem:
-                new_elem['scaleX'] = new_elem.get('scaleX', 1) * uniform_scale
-            if 'scaleY' in new_elem:
-                new_elem['scaleY'] = new_elem.get('scaleY', 1) * uniform_scale
-
-            new_elements.append(new_elem)
-
-        if 'elements' in data:
-            data['elements'] = new_elements
-        elif 'objects' in data:
-            data['objects'] = new_elements
+            if 'scaleX' in elem:
+                elem['scaleX'] = elem.get('scaleX', 1) * uniform_scale
+            if 'scaleY' in elem:
+                elem['scaleY'] = elem.get('scaleY', 1) * uniform_scale
 
         data['_resized'] = {'target_width': tw, 'target_height': th, 'strategy': 'smart'}
         return data
@@ -251,11 +225,7 @@ class MagicResizeService:
     def _scale_resize(self, data, sw, sh, tw, th):
         """Simple proportional scale of all elements."""
         elements = data.get('elements', data.get('objects', []))
-        scale_x = tw / sw
-        scale_y = th / sh
-
-        for elem in elements:
-            self._apply_scale(elem, scale_x, scale_y)
+        self._transform(elements, tw / sw, th / sh, 0, 0)
 
         data['_resized'] = {'target_width': tw, 'target_height': th, 'strategy': 'scale'}
         return data
@@ -266,10 +236,7 @@ class MagicResizeService:
         uniform = min(tw / sw, th / sh)
         offset_x = (tw - sw * uniform) / 2
         offset_y = (th - sh * uniform) / 2
-
-        for elem in elements:
-            self._apply_scale(elem, uniform, uniform)
-            self._apply_offset(elem, offset_x, offset_y)
+        self._transform(elements, uniform, uniform, offset_x, offset_y)
 
         data['_resized'] = {'target_width': tw, 'target_height': th, 'strategy': 'center'}
         return data
@@ -280,10 +247,7 @@ class MagicResizeService:
         scale = max(tw / sw, th / sh)
         offset_x = (tw - sw * scale) / 2
         offset_y = (th - sh * scale) / 2
-
-        for elem in elements:
-            self._apply_scale(elem, scale, scale)
-            self._apply_offset(elem, offset_x, offset_y)
+        self._transform(elements, scale, scale, offset_x, offset_y)
 
         data['_resized'] = {'target_width': tw, 'target_height': th, 'strategy': 'fill'}
         return data
@@ -293,26 +257,11 @@ class MagicResizeService:
     # ------------------------------------------------------------------
 
     @staticmethod
-    def _apply_scale(elem, sx, sy):
-        if 'position' in elem:
-            elem['position']['x'] = round(elem['position'].get('x', 0) * sx)
-            elem['position']['y'] = round(elem['position'].get('y', 0) * sy)
-        else:
-            elem['left'] = round(elem.get('left', 0) * sx)
-            elem['top'] = round(elem.get('top', 0) * sy)
-
-        if 'size' in elem:
-            elem['size']['width'] = round(elem['size'].get('width', 100) * sx)
-            elem['size']['height'] = round(elem['size'].get('height', 100) * sy)
-        else:
-            elem['width'] = round(elem.get('width', 100) * sx)
-            elem['height'] = round(elem.get('height', 100) * sy)
-
-    @staticmethod
-    def _apply_offset(elem, ox, oy):
-        if 'position' in elem:
-            elem['position']['x'] = round(elem['position'].get('x', 0) + ox)
-            elem['position']['y'] = round(elem['position'].get('y', 0) + oy)
-        else:
-            elem['left'] = round(elem.get('left', 0) + ox)
-            elem['top'] = round(elem.get('top', 0) + oy)
+    def _transform(elements, sx, sy, ox, oy):
+        """Scale all elements about the canvas origin, then offset (rounded)."""
+        if not elements:
+            return
+        boxes = geometry.round_boxes(geometry.scale(
+            geometry.Boxes.from_elements(elements), sx, sy, origin=(0, 0),
+        ))
+        geometry.round_boxes(geometry.translate(boxes, ox, oy)).write_elements(elements)
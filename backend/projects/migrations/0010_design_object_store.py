@@ -0,0 +1,83 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:11
+
+from django.db import migrations, models
+
+from projects.object_store import ObjectStore
+
+
+def move_design_data_to_store(apps, schema_editor):
+    """Write every stored design into the object store and keep its root."""
+    store = ObjectStore(apps.get_model('projects', 'DesignObject'))
+    for model_name, size_field in (('ProjectVersion', None), ('ProjectSnapshot', 'data_size_bytes')):
+        model = apps.get_model('projects', model_name)
+        fields = ['content_hash'] + ([size_field] if size_field else [])
+        for row in model.objects.all().iterator(chunk_size=200):
+            tree = store.prepare(row.design_data or {})
+            store.commit(tree)
+            row.content_hash = tree.root
+            if size_field:
+                setattr(row, size_field, tree.size)
+            row.save(update_fields=fields)
+
+
+def restore_design_data(apps, schema_editor):
+    store = ObjectStore(apps.get_model('projects', 'DesignObject'))
+    for model_name in ('ProjectVersion', 'ProjectSnapshot'):
+        model = apps.get_model('projects', model_name)
+        for row in model.objects.exclude(content_hash='').iterator(chunk_size=200):
+            row.design_data = store.read(row.content_hash)
+            row.save(update_fields=['design_data'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0009_alter_userpreference_user'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DesignObject',
+            fields=[
+                ('hash', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('kind', models.CharField(default='node', max_length=10)),
+                ('data', models.JSONField()),
+                ('size_bytes', models.IntegerField(default=0, help_text='Length of the canonical JSON')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Design Object',
+                'verbose_name_plural': 'Design Objects',
+            },
+        ),
+        migrations.AddField(
+            model_name='projectversion',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+        migrations.AlterField(
+            model_name='projectsnapshot',
+            name='content_hash',
+            field=models.CharField(db_index=True, help_text='Merkle root of design_data in the design object store', max_length=64),
+        ),
+        # Defaults let the columns be re-added when migrating backwards
+        migrations.AlterField(
+            model_name='projectsnapshot',
+            name='design_data',
+            field=models.JSONField(default=dict, help_text='Complete design state at this version'),
+        ),
+        migrations.AlterField(
+            model_name='projectversion',
+            name='design_data',
+            field=models.JSONField(default=dict),
+        ),
+        migrations.RunPython(move_design_data_to_store, restore_design_data),
+        migrations.RemoveField(
+            model_name='projectsnapshot',
+            name='design_data',
+        ),
+        migrations.RemoveField(
+            model_name='projectversion',
+            name='design_data',
+        ),
+    ]
@@ -1,6 +1,8 @@
 from django.db import models
 from django.contrib.auth.models import User
 
+from .object_store import DesignObject, StoredDesignData  # noqa: F401
+
 
 class Project(models.Model):
     """Main project model for storing user designs"""
@@ -97,11 +99,11 @@ class DesignComponent(models.Model):
         return f"{self.component_type} in {self.project.name}"
 
 
-class ProjectVersion(models.Model):
-    """Version control for projects"""
+class ProjectVersion(StoredDesignData, models.Model):
+    """Version control for projects; design_data lives in the object store"""
     project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='versions')
     version_number = models.IntegerField()
-    design_data = models.JSONField()
+    content_hash = models.CharField(max_length=64, blank=True, db_index=True)
     created_at = models.DateTimeField(auto_now_add=True)
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
     
@@ -111,6 +113,17 @@ class ProjectVersion(models.Model):
     
     def __str__(self):
         return f"{self.project.name} v{self.version_number}"
+    
+    @classmethod
+    def prune(cls, project, keep):
+        """Delete all but the newest ``keep`` versions of ``project`` in one query."""
+        cutoff = list(
+            cls.objects.filter(project=project)
+            .order_by('-version_number')
+            .values_list('version_number', flat=True)[keep:keep + 1]
+        )
+        if cutoff:
+            cls.objects.filter(project=project, version_number__lte=cutoff[0]).delete()
 
 
 class ExportTemplate(models.Model):
@@ -0,0 +1,381 @@
+"""
+Content-Addressed Design Object Store
+
+Design documents are kept as a Merkle tree of immutable, deduplicated
+objects keyed by the SHA-256 of their canonical JSON:
+
+* a dict or list whose JSON is at least ``MIN_OBJECT_BYTES`` long (a
+  component, its properties, a layer list) becomes an object of its own;
+  smaller values stay inline in their parent
+* each node lists which of its entries are references, so a string that
+  merely looks like a hash is never followed
+* lists longer than ``2 * LIST_FANOUT`` are cut into chunks at
+  content-defined boundaries, so inserting or editing one element
+  rewrites one chunk rather than the whole list
+
+An object is written in the same transaction as everything it refers
+to, so a hash found in the store implies its whole subtree is there.
+``commit`` walks a new tree top-down and stops wherever a subtree already
+exists: saving a version costs queries and rows in proportion to what
+changed, not to the size of the document.  Equal hashes mean equal
+content, which lets diffs skip whole subtrees.
+
+Usage:
+    store = ObjectStore()
+    tree = store.prepare(design_data)   # hashes only, nothing written
+    if tree.root != previous.content_hash:
+        store.commit(tree)
+    store.read(tree.root) == design_data
+"""
+import hashlib
+import json
+import zlib
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from django.db import models, transaction
+
+# Containers shorter than this (canonical JSON) are stored inline
+MIN_OBJECT_BYTES = 256
+# Expected number of entries per chunk of a long list
+LIST_FANOUT = 64
+# Hashes per IN (...) lookup
+QUERY_BATCH = 500
+
+NODE = 'node'
+CHUNKS = 'chunks'
+
+
+class DesignObject(models.Model):
+    """
+    One immutable node of a stored design document.
+    ``node`` data is ``{'r': [ref keys], 'v': value}`` where the entries of
+    ``v`` named in ``r`` hold child hashes; ``chunks`` data is
+    ``{'c': [child hashes], 'n': length}`` for a list split in pieces.
+    """
+    hash = models.CharField(max_length=64, primary_key=True)
+    kind = models.CharField(max_length=10, default=NODE)
+    data = models.JSONField()
+    size_bytes = models.IntegerField(default=0, help_text="Length of the canonical JSON")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        app_label = 'projects'
+        verbose_name = 'Design Object'
+        verbose_name_plural = 'Design Objects'
+
+    def __str__(self):
+        return f"{self.kind} {self.hash[:12]}"
+
+
+class ObjectNotFound(LookupError):
+    """A referenced object is missing from the store."""
+
+
+def canonical_json(value) -> str:
+    return json.dumps(value, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+
+
+_json_string = json.encoder.encode_basestring
+
+
+def _scalar_json(value) -> Optional[str]:
+    """Canonical JSON of common scalars without a ``json.dumps`` call."""
+    if isinstance(value, str):
+        return _json_string(value)
+    if value is None:
+        return 'null'
+    if value is True:
+        return 'true'
+    if value is False:
+        return 'false'
+    if type(value) is int:
+        return int.__repr__(value)
+    if isinstance(value, (dict, list, tuple)):
+        return None
+    return canonical_json(value)
+
+
+def _digest(kind: str, canonical: str) -> str:
+    return hashlib.sha256(f'{kind}:{canonical}'.encode()).hexdigest()
+
+
+class PreparedTree:
+    """An encoded value: its root hash and the objects it needs, unsaved."""
+    __slots__ = ('root', 'objects', 'size')
+
+    def __init__(self, root: str, objects: Dict[str, tuple], size: int):
+        self.root = root
+        # hash -> (kind, data, child hashes, canonical length)
+        self.objects = objects
+        self.size = size
+
+
+class _Encoder:
+    """Post-order encoder; ``encode`` returns (stored, canonical, is_ref, size)."""
+
+    def __init__(self):
+        self.objects: Dict[str, tuple] = {}
+
+    def encode(self, value) -> Tuple[Any, str, bool, int]:
+        scalar = _scalar_json(value)
+        if scalar is not None:
+            return value, scalar, False, len(scalar)
+        if isinstance(value, dict):
+            stored = {}
+            texts = []
+            refs = []
+            size = 1 + max(len(value), 1)
+            for key in sorted(value, key=str):
+                item, text, is_ref, item_size = self.encode(value[key])
+                key = str(key)
+                key_text = _json_string(key)
+                stored[key] = item
+                texts.append(f'{key_text}:{text}')
+                size += len(key_text) + 1 + item_size
+                if is_ref:
+                    refs.append(key)
+            return self._node(stored, '{' + ','.join(texts) + '}', refs, size)
+        if isinstance(value, (list, tuple)):
+            parts = [self.encode(item) for item in value]
+            size = 1 + max(len(parts), 1) + sum(part[3] for part in parts)
+            if len(parts) > 2 * LIST_FANOUT:
+                return self._chunked(parts, size)
+            return self._node(
+                [part[0] for part in parts],
+                '[' + ','.join([part[1] for part in parts]) + ']',
+                [i for i, part in enumerate(parts) if part[2]],
+                size,
+            )
+        raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+    def root(self, value) -> PreparedTree:
+        stored, text, is_ref, size = self.encode(value)
+        if not is_ref:
+            stored = self._store(NODE, {'r': [], 'v': stored}, f'{{"r":[],"v":{text}}}', [])
+        return PreparedTree(stored, self.objects, size)
+
+    def _node(self, stored, text: str, refs: list, size: int, force: bool = False):
+        if not refs and not force and len(text) < MIN_OBJECT_BYTES:
+            return stored, text, False, size
+        children = [stored[key] for key in refs]
+        digest = self._store(NODE, {'r': refs, 'v': stored}, f'{{"r":{canonical_json(refs)},"v":{text}}}', children)
+        return digest, f'"{digest}"', True, size
+
+    def _chunked(self, parts: list, size: int):
+        pieces = []
+        for piece in _split(parts, key=lambda part: part[1]):
+            digest, _, _, _ = self._node(
+                [part[0] for part in piece],
+                '[' + ','.join(part[1] for part in piece) + ']',
+                [i for i, part in enumerate(piece) if part[2]],
+                0, force=True,
+            )
+            pieces.append((digest, len(piece)))
+        # Long chunk lists are chunked again, like the levels of a B-tree
+        while len(pieces) > 2 * LIST_FANOUT:
+            pieces = [self._chunks(group) for group in _split(pieces, key=lambda piece: piece[0])]
+        digest, _ = self._chunks(pieces)
+        return digest, f'"{digest}"', True, size
+
+    def _chunks(self, pieces: Sequence[Tuple[str, int]]) -> Tuple[str, int]:
+        hashes = [digest for digest, _ in pieces]
+        length = sum(count for _, count in pieces)
+        data = {'c': hashes, 'n': length}
+        return self._store(CHUNKS, data, canonical_json(data), hashes), length
+
+    def _store(self, kind: str, data: dict, canonical: str, children: list) -> str:
+        digest = _digest(kind, canonical)
+        if digest not in self.objects:
+            self.objects[digest] = (kind, data, children, len(canonical))
+        return digest
+
+
+def _split(items: Sequence, key) -> List[Sequence]:
+    """
+    Cut ``items`` after every entry whose checksum is 0 mod LIST_FANOUT,
+    so boundaries depend on content and survive inserts elsewhere.
+    """
+    chunks = []
+    start = 0
+    for i, item in enumerate(items):
+        boundary = zlib.crc32(key(item).encode()) % LIST_FANOUT == 0
+        if boundary or i - start + 1 >= 4 * LIST_FANOUT:
+            chunks.append(items[start:i + 1])
+            start = i + 1
+    if start < len(items):
+        chunks.append(items[start:])
+    return chunks
+
+
+class ObjectStore:
+    """Reads and writes design documents as trees of ``DesignObject`` rows."""
+
+    def __init__(self, model=None):
+        # Migrations pass their historical model
+        self.model = model or DesignObject
+
+    def prepare(self, value) -> PreparedTree:
+        """Encode ``value`` and hash every object without touching the database."""
+        return _Encoder().root(value)
+
+    def hash_of(self, value) -> str:
+        return self.prepare(value).root
+
+    def write(self, value) -> str:
+        tree = self.prepare(value)
+        self.commit(tree)
+        return tree.root
+
+    def commit(self, tree: PreparedTree) -> int:
+        """
+        Persist the objects of ``tree`` the store does not have yet, looking
+        one level deeper only below objects that turned out to be missing.
+        Returns the number of objects written.
+        """
+        missing: List[str] = []
+        seen = set()
+        level = [tree.root]
+        while level:
+            present = self._existing(level)
+            new = [digest for digest in level if digest not in present and digest not in seen]
+            seen.update(new)
+            missing.extend(new)
+            level = list(dict.fromkeys(
+                child for digest in new for child in tree.objects[digest][2] if child not in seen
+            ))
+
+        if missing:
+            with transaction.atomic(using=self._db()):
+                self.model.objects.bulk_create(
+                    [
+                        self.model(hash=digest, kind=tree.objects[digest][0],
+                                   data=tree.objects[digest][1], size_bytes=tree.objects[digest][3])
+                        for digest in missing
+                    ],
+                    batch_size=QUERY_BATCH,
+                    ignore_conflicts=True,
+                )
+        return len(missing)
+
+    def read(self, root: str) -> Any:
+        """The value stored under ``root``."""
+        return self.read_many([root])[0]
+
+    def read_many(self, roots: Sequence[str]) -> List[Any]:
+        """
+        Several values, loading shared objects once.  Equal subtrees come
+        back as the same Python object, so comparing them is immediate;
+        copy before mutating in place.
+        """
+        loaded: Dict[str, tuple] = {}
+        level = list(dict.fromkeys(roots))
+        while level:
+            rows = self._fetch(level)
+            absent = set(level) - set(rows)
+            if absent:
+                raise ObjectNotFound(f"Design object {sorted(absent)[0]} is missing")
+            loaded.update(rows)
+            level = list(dict.fromkeys(
+                child for kind, data in rows.values() for child in _children(kind, data)
+                if child not in loaded
+            ))
+
+        decoded: Dict[str, Any] = {}
+
+        def decode(digest):
+            if digest in decoded:
+                return decoded[digest]
+            kind, data = loaded[digest]
+            if kind == CHUNKS:
+                value = []
+                for child in data['c']:
+                    value.extend(decode(child))
+            else:
+                value = data['v']
+                if data['r']:
+                    value = dict(value) if isinstance(value, dict) else list(value)
+                    for key in data['r']:
+                        value[key] = decode(value[key])
+            decoded[digest] = value
+            return value
+
+        return [decode(root) for root in roots]
+
+    def _existing(self, hashes: Sequence[str]) -> set:
+        present = set()
+        for start in range(0, len(hashes), QUERY_BATCH):
+            present.update(self.model.objects.filter(
+                hash__in=hashes[start:start + QUERY_BATCH]
+            ).values_list('hash', flat=True))
+        return present
+
+    def _fetch(self, hashes: Sequence[str]) -> Dict[str, tuple]:
+        rows = {}
+        for start in range(0, len(hashes), QUERY_BATCH):
+            for digest, kind, data in self.model.objects.filter(
+                hash__in=hashes[start:start + QUERY_BATCH]
+            ).values_list('hash', 'kind', 'data'):
+                rows[digest] = (kind, data)
+        return rows
+
+    def _db(self) -> str:
+        return self.model.objects.db
+
+
+def _children(kind: str, data: dict) -> Iterable[str]:
+    if kind == CHUNKS:
+        return data['c']
+    return [data['v'][key] for key in data['r']]
+
+
+class StoredDesignData:
+    """
+    Model mixin keeping ``design_data`` in the object store: the row holds
+    only ``content_hash`` (the Merkle root) and the document is read back
+    on first access.
+    """
+    _design_data = None
+    _prepared: Optional[PreparedTree] = None
+    _design_data_changed = False
+
+    @property
+    def design_data(self):
+        if self._design_data is None and self.content_hash:
+            self._design_data = ObjectStore().read(self.content_hash)
+        return self._design_data
+
+    @design_data.setter
+    def design_data(self, value):
+        self._design_data = value
+        self._prepared = None
+        self._design_data_changed = True
+
+    def prepared_design_data(self) -> PreparedTree:
+        """Hashes of the pending ``design_data``, computed once."""
+        if self._prepared is None:
+            self._prepared = ObjectStore().prepare(self._design_data)
+        return self._prepared
+
+    def store_design_data(self) -> Optional[PreparedTree]:
+        """Write pending ``design_data`` to the store and point the row at it."""
+        if not self._design_data_changed:
+            return None
+        tree = self.prepared_design_data()
+        ObjectStore().commit(tree)
+        self.content_hash = tree.root
+        self._design_data_changed = False
+        return tree
+
+    @classmethod
+    def prefetch_design_data(cls, instances):
+        """Load ``design_data`` of many rows at once, sharing common objects."""
+        instances = list(instances)
+        pending = [obj for obj in instances if obj._design_data is None and obj.content_hash]
+        values = ObjectStore().read_many([obj.content_hash for obj in pending])
+        for obj, value in zip(pending, values):
+            obj._design_data = value
+        return instances
+
+    def save(self, *args, **kwargs):
+        self.store_design_data()
+        super().save(*args, **kwargs)
@@ -5,15 +5,17 @@ Provides live editing capabilities with presence tracking,
 cursor synchronization, and conflict resolution.
 """
 import logging
-from datetime import datetime, timedelta
 from typing import Dict, Any, Optional
 from channels.generic.websocket import AsyncJsonWebsocketConsumer
 from channels.db import database_sync_to_async
 from django.contrib.auth.models import User
-from django.core.cache import cache
 from django.db import models
 from django.utils import timezone
 
+from .access import has_project_access
+from .room_state import get_room_state
+from .write_buffer import get_write_buffer
+
 logger = logging.getLogger('collaboration')
 
 
@@ -32,16 +34,27 @@ class CollaborationConsumer(AsyncJsonWebsocketConsumer):
     # Room prefix for channel groups
     ROOM_PREFIX = "project_collab_"
     
-    # Cache keys
-    PRESENCE_KEY = "collab:presence:{project_id}"
-    LOCKS_KEY = "collab:locks:{project_id}"
-    CURSORS_KEY = "collab:cursors:{project_id}"
+    # Presence/cursor/lock store shared by all connections of this worker
+    _room_state = None
+    
+    @property
+    def room_state(self):
+        if CollaborationConsumer._room_state is None:
+            CollaborationConsumer._room_state = get_room_state()
+        return CollaborationConsumer._room_state
+    
+    @classmethod
+    def set_room_state(cls, backend):
+        """Swap the room state backend (tests, load tests)."""
+        cls._room_state = backend
     
     async def connect(self):
         """Handle WebSocket connection."""
         self.project_id = self.scope['url_route']['kwargs']['project_id']
         self.room_group_name = f"{self.ROOM_PREFIX}{self.project_id}"
         self.user = self.scope.get('user')
+        # Components this connection locked, to re-acquire locks that lapsed
+        self.held_locks = set()
         
         # Check authentication
         if not self.user or not self.user.is_authenticated:
@@ -82,6 +95,9 @@ class CollaborationConsumer(AsyncJsonWebsocketConsumer):
             # Release any component locks held by this user
             await self.release_all_locks()
             
+            # Persist this user's queued chat messages
+            await get_write_buffer(CollaborationChatMessage).flush()
+            
             # Notify others
             await self.broadcast_presence_update()
             
@@ -142,7 +158,7 @@ class CollaborationConsumer(AsyncJsonWebsocketConsumer):
             'timestamp': timezone.now().isoformat(),
         }
         
-        # Update cursor in cache
+        # Record cursor position
         await self.update_cursor(cursor_data)
         
         # Broadcast to others
@@ -163,6 +179,7 @@ class CollaborationConsumer(AsyncJsonWebsocketConsumer):
         success, holder = await self.try_acquire_lock(component_id)
         
         if success:
+            self.held_locks.add(component_id)
             # Broadcast lock to all
             await self.channel_layer.group_send(
                 self.room_group_name,
@@ -188,6 +205,7 @@ class CollaborationConsumer(AsyncJsonWebsocketConsumer):
             return
         
         released = await self.release_lock(component_id)
+        self.held_locks.discard(component_id)
         
         if released:
             await self.channel_layer.group_send(
@@ -206,12 +224,12 @@ class CollaborationConsumer(AsyncJsonWebsocketConsumer):
         version = content.get('version', 0)
         
         # Check if user has lock
-        has_lock = await self.check_has_lock(component_id)
-        if not has_lock:
+        rejection = await self.ensure_lock(component_id)
+        if rejection:
             await self.send_json({
                 'type': 'update_rejected',
                 'component_id': component_id,
-                'reason': 'Component is locked by another user',
+                'reason': rejection,
             })
             return
         
@@ -421,56 +439,34 @@ class CollaborationConsumer(AsyncJsonWebsocketConsumer):
     
     @database_sync_to_async
     def check_project_access(self) -> bool:
-        """Check if user has access to the project."""
-        from projects.models import Project
-        try:
-            project = Project.objects.get(id=self.project_id)
-            return (
-                project.user == self.user or
-                self.user in project.collaborators.all() or
-                project.is_public
-            )
-        except Project.DoesNotExist:
-            return False
+        """Check if user has access to the project (cached)."""
+        return has_project_access(self.user, self.project_id, allow_public=True)
     
     async def add_presence(self):
         """Add user to presence list."""
-        cache_key = self.PRESENCE_KEY.format(project_id=self.project_id)
-        presence = cache.get(cache_key, {})
-        
-        presence[str(self.user.id)] = {
+        now = timezone.now().isoformat()
+        await self.room_state.add_presence(self.project_id, self.user.id, {
             'user_id': self.user.id,
             'username': self.user.username,
             'channel_name': self.channel_name,
-            'connected_at': timezone.now().isoformat(),
-            'last_seen': timezone.now().isoformat(),
+            'connected_at': now,
+            'last_seen': now,
             'color': self._get_user_color(self.user.id),
-        }
-        
-        cache.set(cache_key, presence, 3600)  # 1 hour TTL
+        })
     
     async def remove_presence(self):
         """Remove user from presence list."""
-        cache_key = self.PRESENCE_KEY.format(project_id=self.project_id)
-        presence = cache.get(cache_key, {})
-        
-        presence.pop(str(self.user.id), None)
-        
-        cache.set(cache_key, presence, 3600)
+        await self.room_state.remove_presence(self.project_id, self.user.id)
     
     async def update_presence_timestamp(self):
         """Update user's last seen timestamp."""
-        cache_key = self.PRESENCE_KEY.format(project_id=self.project_id)
-        presence = cache.get(cache_key, {})
-        
-        if str(self.user.id) in presence:
-            presence[str(self.user.id)]['last_seen'] = timezone.now().isoformat()
-            cache.set(cache_key, presence, 3600)
+        await self.room_state.touch_presence(
+            self.project_id, self.user.id, timezone.now().isoformat()
+        )
     
     async def get_presence(self) -> Dict[str, Any]:
         """Get current presence list."""
-        cache_key = self.PRESENCE_KEY.format(project_id=self.project_id)
-        return cache.get(cache_key, {})
+        return await self.room_state.get_presence(self.project_id)
     
     async def broadcast_presence_update(self):
         """Broadcast presence update to all users."""
@@ -485,71 +481,28 @@ class CollaborationConsumer(AsyncJsonWebsocketConsumer):
         )
     
     async def update_cursor(self, cursor_data: Dict[str, Any]):
-        """Update cursor position in cache."""
-        cache_key = self.CURSORS_KEY.format(project_id=self.project_id)
-        cursors = cache.get(cache_key, {})
-        
-        cursors[str(self.user.id)] = cursor_data
-        
-        cache.set(cache_key, cursors, 300)  # 5 min TTL
+        """Update this user's cursor position."""
+        await self.room_state.set_cursor(self.project_id, self.user.id, cursor_data)
     
     async def get_cursors(self) -> Dict[str, Any]:
         """Get all active cursors."""
-        cache_key = self.CURSORS_KEY.format(project_id=self.project_id)
-        return cache.get(cache_key, {})
+        return await self.room_state.get_cursors(self.project_id)
     
     async def try_acquire_lock(self, component_id: str) -> tuple:
         """Try to acquire a lock on a component."""
-        cache_key = self.LOCKS_KEY.format(project_id=self.project_id)
-        locks = cache.get(cache_key, {})
-        
-        existing_lock = locks.get(component_id)
-        
-        # Check if already locked by someone else
-        if existing_lock and existing_lock['user_id'] != self.user.id:
-            # Check if lock is stale (> 30 seconds without update)
-            lock_time = datetime.fromisoformat(existing_lock['acquired_at'])
-            if timezone.now() - lock_time < timedelta(seconds=30):
-                return False, existing_lock
-        
-        # Acquire lock
-        locks[component_id] = {
+        return await self.room_state.acquire_lock(self.project_id, component_id, {
             'user_id': self.user.id,
             'username': self.user.username,
             'acquired_at': timezone.now().isoformat(),
-        }
-        
-        cache.set(cache_key, locks, 3600)
-        return True, None
+        })
     
     async def release_lock(self, component_id: str) -> bool:
         """Release a lock on a component."""
-        cache_key = self.LOCKS_KEY.format(project_id=self.project_id)
-        locks = cache.get(cache_key, {})
-        
-        existing_lock = locks.get(component_id)
-        
-        if existing_lock and existing_lock['user_id'] == self.user.id:
-            del locks[component_id]
-            cache.set(cache_key, locks, 3600)
-            return True
-        
-        return False
+        return await self.room_state.release_lock(self.project_id, component_id, self.user.id)
     
     async def release_all_locks(self):
         """Release all locks held by this user."""
-        cache_key = self.LOCKS_KEY.format(project_id=self.project_id)
-        locks = cache.get(cache_key, {})
-        
-        to_release = [
-            comp_id for comp_id, lock in locks.items()
-            if lock['user_id'] == self.user.id
-        ]
-        
-        for comp_id in to_release:
-            del locks[comp_id]
-        
-        cache.set(cache_key, locks, 3600)
+        to_release = await self.room_state.release_user_locks(self.project_id, self.user.id)
         
         # Broadcast released locks
         for comp_id in to_release:
@@ -563,25 +516,46 @@ class CollaborationConsumer(AsyncJsonWebsocketConsumer):
             )
     
     async def check_has_lock(self, component_id: str) -> bool:
-        """Check if current user has lock on component."""
-        cache_key = self.LOCKS_KEY.format(project_id=self.project_id)
-        locks = cache.get(cache_key, {})
-        
-        lock = locks.get(component_id)
-        return lock and lock['user_id'] == self.user.id
+        """Check if current user has lock on component (and extend it)."""
+        if not component_id:
+            return False
+        return await self.room_state.refresh_lock(self.project_id, component_id, self.user.id)
+    
+    async def ensure_lock(self, component_id: str) -> Optional[str]:
+        """
+        Extend this user's lock on a component, re-acquiring it if it
+        lapsed while idle.  Returns why the user cannot edit it, or None.
+        """
+        if await self.check_has_lock(component_id):
+            return None
+        if component_id in self.held_locks:
+            success, holder = await self.try_acquire_lock(component_id)
+            if success:
+                await self.channel_layer.group_send(
+                    self.room_group_name,
+                    {
+                        'type': 'lock_acquired',
+                        'component_id': component_id,
+                        'user_id': self.user.id,
+                        'username': self.user.username,
+                    }
+                )
+                return None
+            self.held_locks.discard(component_id)
+            return 'Your lock expired and the component is now locked by another user'
+        holder = await self.get_lock_holder(component_id)
+        if holder is not None and holder != self.user.id:
+            return 'Component is locked by another user'
+        return 'Component is not locked'
     
     async def get_lock_holder(self, component_id: str) -> Optional[int]:
         """Get user ID of lock holder."""
-        cache_key = self.LOCKS_KEY.format(project_id=self.project_id)
-        locks = cache.get(cache_key, {})
-        
-        lock = locks.get(component_id)
+        lock = await self.room_state.get_lock(self.project_id, component_id)
         return lock['user_id'] if lock else None
     
     async def get_locks(self) -> Dict[str, Any]:
         """Get all active locks."""
-        cache_key = self.LOCKS_KEY.format(project_id=self.project_id)
-        return cache.get(cache_key, {})
+        return await self.room_state.get_locks(self.project_id)
     
     async def send_initial_state(self):
         """Send initial state to newly connected user."""
@@ -667,16 +641,13 @@ class CollaborationConsumer(AsyncJsonWebsocketConsumer):
         except DesignComponent.DoesNotExist:
             return False
     
-    @database_sync_to_async
-    def save_chat_message(self, chat_data: Dict[str, Any]):
-        """Save chat message to database."""
-        from .collaboration_models import CollaborationChatMessage
-        
-        CollaborationChatMessage.objects.create(
+    async def save_chat_message(self, chat_data: Dict[str, Any]):
+        """Queue chat message for the batched write-behind."""
+        await get_write_buffer(CollaborationChatMessage).add(CollaborationChatMessage(
             project_id=self.project_id,
             user_id=chat_data['user_id'],
             message=chat_data['message'],
-        )
+        ))
     
     def _get_user_color(self, user_id: int) -> str:
         """Get consistent color for user."""
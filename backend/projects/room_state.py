@@ -0,0 +1,397 @@
+"""
+Room state for the collaboration WebSocket consumer.
+
+Presence, cursors and component locks of a project room are kept one
+field per user/component, so an update touches only its own entry
+instead of reading and rewriting the whole room.  Lock acquisition is an
+atomic compare-and-set and every lock expires ``lock_ttl`` seconds after
+it was last acquired or used, so a crashed client cannot hold a
+component forever.
+
+All methods are coroutines and never block the event loop.
+
+Backends:
+    LocalMemoryRoomStateBackend – process-local, for dev and tests
+    RedisRoomStateBackend       – shared across workers (redis.asyncio)
+
+Select with ``COLLAB_ROOM_STATE_BACKEND`` ('memory' or 'redis').
+"""
+
+import json
+import time
+from typing import Any, Optional
+
+from django.conf import settings
+
+PRESENCE_TTL = 3600  # seconds
+CURSOR_TTL = 300
+DEFAULT_LOCK_TTL = 30
+
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+class BaseRoomStateBackend:
+    """Interface shared by all room state backends."""
+
+    def __init__(self, lock_ttl: int = DEFAULT_LOCK_TTL):
+        self.lock_ttl = lock_ttl
+
+    async def add_presence(self, room: str, user_id: int, info: dict):
+        raise NotImplementedError
+
+    async def remove_presence(self, room: str, user_id: int):
+        raise NotImplementedError
+
+    async def touch_presence(self, room: str, user_id: int, last_seen: str):
+        """Update ``last_seen`` of a user that is present."""
+        raise NotImplementedError
+
+    async def get_presence(self, room: str) -> dict[str, dict]:
+        raise NotImplementedError
+
+    async def set_cursor(self, room: str, user_id: int, cursor: dict):
+        raise NotImplementedError
+
+    async def get_cursors(self, room: str) -> dict[str, dict]:
+        raise NotImplementedError
+
+    async def remove_cursor(self, room: str, user_id: int):
+        raise NotImplementedError
+
+    async def acquire_lock(self, room: str, component_id: str,
+                           lock: dict) -> tuple[bool, Optional[dict]]:
+        """
+        Lock a component for ``lock['user_id']`` unless another user holds
+        an unexpired lock on it.  Returns ``(acquired, current_holder)``;
+        re-acquiring an own lock extends it.
+        """
+        raise NotImplementedError
+
+    async def refresh_lock(self, room: str, component_id: str, user_id: int) -> bool:
+        """Extend the user's lock; False if the user does not hold it."""
+        raise NotImplementedError
+
+    async def release_lock(self, room: str, component_id: str, user_id: int) -> bool:
+        raise NotImplementedError
+
+    async def release_user_locks(self, room: str, user_id: int) -> list[str]:
+        """Release every lock the user holds; return the component ids."""
+        raise NotImplementedError
+
+    async def get_lock(self, room: str, component_id: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    async def get_locks(self, room: str) -> dict[str, dict]:
+        raise NotImplementedError
+
+    async def set_document(self, room: str, version: str, data: Any):
+        """Store the room's last synced design snapshot and its hash."""
+        raise NotImplementedError
+
+    async def get_document(self, room: str) -> Optional[tuple[str, Any]]:
+        """Return ``(version, data)`` of the last synced snapshot."""
+        raise NotImplementedError
+
+
+class LocalMemoryRoomStateBackend(BaseRoomStateBackend):
+    """
+    Process-local backend; only suitable for a single worker.  Methods
+    never await in the middle of an update, so each one is atomic with
+    respect to other coroutines on the loop.
+    """
+
+    def __init__(self, lock_ttl: int = DEFAULT_LOCK_TTL):
+        super().__init__(lock_ttl)
+        self._presence: dict[str, dict[str, dict]] = {}
+        self._cursors: dict[str, dict[str, dict]] = {}
+        # room -> component -> (lock, user_id, expires_at ms)
+        self._locks: dict[str, dict[str, tuple[dict, int, int]]] = {}
+        self._documents: dict[str, tuple[str, Any]] = {}
+
+    async def add_presence(self, room, user_id, info):
+        self._presence.setdefault(room, {})[str(user_id)] = dict(info)
+
+    async def remove_presence(self, room, user_id):
+        self._presence.get(room, {}).pop(str(user_id), None)
+
+    async def touch_presence(self, room, user_id, last_seen):
+        entry = self._presence.get(room, {}).get(str(user_id))
+        if entry is not None:
+            entry['last_seen'] = last_seen
+
+    async def get_presence(self, room):
+        return {uid: dict(info) for uid, info in self._presence.get(room, {}).items()}
+
+    async def set_cursor(self, room, user_id, cursor):
+        self._cursors.setdefault(room, {})[str(user_id)] = cursor
+
+    async def get_cursors(self, room):
+        return dict(self._cursors.get(room, {}))
+
+    async def remove_cursor(self, room, user_id):
+        self._cursors.get(room, {}).pop(str(user_id), None)
+
+    def _live(self, room: str, component_id: str, now: int):
+        entry = self._locks.get(room, {}).get(component_id)
+        if entry is None or entry[2] <= now:
+            return None
+        return entry
+
+    async def acquire_lock(self, room, component_id, lock):
+        now = _now_ms()
+        entry = self._live(room, component_id, now)
+        if entry is not None and entry[1] != lock['user_id']:
+            return False, dict(entry[0])
+        self._locks.setdefault(room, {})[component_id] = (
+            dict(lock), lock['user_id'], now + self.lock_ttl * 1000
+        )
+        return True, None
+
+    async def refresh_lock(self, room, component_id, user_id):
+        now = _now_ms()
+        entry = self._live(room, component_id, now)
+        if entry is None or entry[1] != user_id:
+            return False
+        self._locks[room][component_id] = (entry[0], user_id, now + self.lock_ttl * 1000)
+        return True
+
+    async def release_lock(self, room, component_id, user_id):
+        entry = self._live(room, component_id, _now_ms())
+        if entry is None or entry[1] != user_id:
+            return False
+        del self._locks[room][component_id]
+        return True
+
+    async def release_user_locks(self, room, user_id):
+        now = _now_ms()
+        locks = self._locks.get(room, {})
+        released = [cid for cid, (_, uid, exp) in locks.items() if uid == user_id and exp > now]
+        for cid in [cid for cid, (_, uid, exp) in locks.items() if uid == user_id or exp <= now]:
+            del locks[cid]
+        return released
+
+    async def get_lock(self, room, component_id):
+        entry = self._live(room, component_id, _now_ms())
+        return dict(entry[0]) if entry else None
+
+    async def get_locks(self, room):
+        now = _now_ms()
+        return {
+            cid: dict(lock)
+            for cid, (lock, _, exp) in self._locks.get(room, {}).items() if exp > now
+        }
+
+    async def set_document(self, room, version, data):
+        self._documents[room] = (version, data)
+
+    async def get_document(self, room):
+        return self._documents.get(room)
+
+
+# Locks live in two hashes: ``owners`` maps component -> "user_id:expires_ms"
+# (what the scripts compare) and ``locks`` maps component -> JSON payload.
+
+# KEYS = owners, locks;  ARGV = component, user_id, now (ms), expires (ms), payload, room ttl
+ACQUIRE_SCRIPT = """
+local current = redis.call('HGET', KEYS[1], ARGV[1])
+if current then
+    local owner, expires = string.match(current, '^(.*):(%d+)$')
+    if owner ~= ARGV[2] and tonumber(expires) > tonumber(ARGV[3]) then
+        return redis.call('HGET', KEYS[2], ARGV[1]) or '{}'
+    end
+end
+redis.call('HSET', KEYS[1], ARGV[1], ARGV[2] .. ':' .. ARGV[4])
+redis.call('HSET', KEYS[2], ARGV[1], ARGV[5])
+redis.call('EXPIRE', KEYS[1], ARGV[6])
+redis.call('EXPIRE', KEYS[2], ARGV[6])
+return false
+"""
+
+# KEYS = owners, locks;  ARGV = component, user_id, now (ms), new expiry (ms) or '' to release
+OWNED_SCRIPT = """
+local current = redis.call('HGET', KEYS[1], ARGV[1])
+if not current then
+    return 0
+end
+local owner, expires = string.match(current, '^(.*):(%d+)$')
+if owner ~= ARGV[2] or tonumber(expires) <= tonumber(ARGV[3]) then
+    return 0
+end
+if ARGV[4] == '' then
+    redis.call('HDEL', KEYS[1], ARGV[1])
+    redis.call('HDEL', KEYS[2], ARGV[1])
+else
+    redis.call('HSET', KEYS[1], ARGV[1], ARGV[2] .. ':' .. ARGV[4])
+end
+return 1
+"""
+
+# KEYS = owners, locks;  ARGV = user_id, now (ms)
+# Drops the user's locks and any expired ones; returns the user's live locks.
+RELEASE_USER_SCRIPT = """
+local entries = redis.call('HGETALL', KEYS[1])
+local released = {}
+for i = 1, #entries, 2 do
+    local owner, expires = string.match(entries[i + 1], '^(.*):(%d+)$')
+    local live = tonumber(expires) > tonumber(ARGV[2])
+    if owner == ARGV[1] or not live then
+        redis.call('HDEL', KEYS[1], entries[i])
+        redis.call('HDEL', KEYS[2], entries[i])
+        if owner == ARGV[1] and live then
+            released[#released + 1] = entries[i]
+        end
+    end
+end
+return released
+"""
+
+
+class RedisRoomStateBackend(BaseRoomStateBackend):
+    """
+    Redis-backed room state shared by all workers.
+
+    Each room uses hashes with a ``{room}`` hash tag so they land on the
+    same Redis Cluster slot:
+
+        collab:{room}:presence  user_id -> JSON presence
+        collab:{room}:cursors   user_id -> JSON cursor
+        collab:{room}:owners    component_id -> "user_id:expires_ms"
+        collab:{room}:locks     component_id -> JSON lock
+        collab:{room}:document  hash -> snapshot hash, data -> JSON snapshot
+    """
+
+    KEY_PREFIX = 'collab'
+
+    def __init__(self, url: Optional[str] = None, client=None,
+                 lock_ttl: int = DEFAULT_LOCK_TTL):
+        super().__init__(lock_ttl)
+        if client is None:
+            import redis.asyncio as redis
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self._acquire = client.register_script(ACQUIRE_SCRIPT)
+        self._owned = client.register_script(OWNED_SCRIPT)
+        self._release_user = client.register_script(RELEASE_USER_SCRIPT)
+
+    def _key(self, room: str, name: str) -> str:
+        return f'{self.KEY_PREFIX}:{{{room}}}:{name}'
+
+    def _lock_keys(self, room: str) -> list[str]:
+        return [self._key(room, 'owners'), self._key(room, 'locks')]
+
+    @staticmethod
+    def _dumps(value: dict) -> str:
+        return json.dumps(value, separators=(',', ':'))
+
+    @staticmethod
+    def _decode(entries: dict) -> dict[str, dict]:
+        return {field.decode(): json.loads(value) for field, value in entries.items()}
+
+    async def _hset(self, key: str, field: str, value: dict, ttl: int):
+        pipe = self.client.pipeline(transaction=False)
+        pipe.hset(key, field, self._dumps(value))
+        pipe.expire(key, ttl)
+        await pipe.execute()
+
+    async def add_presence(self, room, user_id, info):
+        await self._hset(self._key(room, 'presence'), str(user_id), info, PRESENCE_TTL)
+
+    async def remove_presence(self, room, user_id):
+        await self.client.hdel(self._key(room, 'presence'), str(user_id))
+
+    async def touch_presence(self, room, user_id, last_seen):
+        key = self._key(room, 'presence')
+        raw = await self.client.hget(key, str(user_id))
+        if raw is not None:
+            info = json.loads(raw)
+            info['last_seen'] = last_seen
+            await self._hset(key, str(user_id), info, PRESENCE_TTL)
+
+    async def get_presence(self, room):
+        return self._decode(await self.client.hgetall(self._key(room, 'presence')))
+
+    async def set_cursor(self, room, user_id, cursor):
+        await self._hset(self._key(room, 'cursors'), str(user_id), cursor, CURSOR_TTL)
+
+    async def get_cursors(self, room):
+        return self._decode(await self.client.hgetall(self._key(room, 'cursors')))
+
+    async def remove_cursor(self, room, user_id):
+        await self.client.hdel(self._key(room, 'cursors'), str(user_id))
+
+    async def acquire_lock(self, room, component_id, lock):
+        now = _now_ms()
+        holder = await self._acquire(
+            keys=self._lock_keys(room),
+            args=[component_id, str(lock['user_id']), now, now + self.lock_ttl * 1000,
+                  self._dumps(lock), PRESENCE_TTL],
+        )
+        if holder is None:
+            return True, None
+        return False, json.loads(holder)
+
+    async def refresh_lock(self, room, component_id, user_id):
+        now = _now_ms()
+        return bool(await self._owned(
+            keys=self._lock_keys(room),
+            args=[component_id, str(user_id), now, now + self.lock_ttl * 1000],
+        ))
+
+    async def release_lock(self, room, component_id, user_id):
+        return bool(await self._owned(
+            keys=self._lock_keys(room),
+            args=[component_id, str(user_id), _now_ms(), ''],
+        ))
+
+    async def release_user_locks(self, room, user_id):
+        released = await self._release_user(
+            keys=self._lock_keys(room), args=[str(user_id), _now_ms()],
+        )
+        return [cid.decode() for cid in released]
+
+    async def get_lock(self, room, component_id):
+        owners_key, locks_key = self._lock_keys(room)
+        pipe = self.client.pipeline(transaction=True)
+        pipe.hget(owners_key, component_id)
+        pipe.hget(locks_key, component_id)
+        owner, lock = await pipe.execute()
+        if owner is None or int(owner.rsplit(b':', 1)[1]) <= _now_ms():
+            return None
+        return json.loads(lock)
+
+    async def get_locks(self, room):
+        owners_key, locks_key = self._lock_keys(room)
+        pipe = self.client.pipeline(transaction=True)
+        pipe.hgetall(owners_key)
+        pipe.hgetall(locks_key)
+        owners, locks = await pipe.execute()
+        now = _now_ms()
+        return {
+            cid.decode(): json.loads(locks[cid])
+            for cid, value in owners.items()
+            if cid in locks and int(value.rsplit(b':', 1)[1]) > now
+        }
+
+    async def set_document(self, room, version, data):
+        key = self._key(room, 'document')
+        pipe = self.client.pipeline(transaction=True)
+        pipe.hset(key, mapping={'hash': version, 'data': json.dumps(data, separators=(',', ':'))})
+        pipe.expire(key, PRESENCE_TTL)
+        await pipe.execute()
+
+    async def get_document(self, room):
+        version, data = await self.client.hmget(self._key(room, 'document'), ['hash', 'data'])
+        if version is None or data is None:
+            return None
+        return version.decode(), json.loads(data)
+
+
+def get_room_state() -> BaseRoomStateBackend:
+    """Build the backend configured in settings."""
+    lock_ttl = getattr(settings, 'COLLAB_LOCK_TTL', DEFAULT_LOCK_TTL)
+    if getattr(settings, 'COLLAB_ROOM_STATE_BACKEND', 'memory') == 'redis':
+        url = getattr(settings, 'COLLAB_ROOM_STATE_REDIS_URL', None) or settings.REDIS_URL
+        return RedisRoomStateBackend(url, lock_ttl=lock_ttl)
+    return LocalMemoryRoomStateBackend(lock_ttl=lock_ttl)
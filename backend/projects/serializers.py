@@ -35,11 +35,12 @@ class ProjectCreateSerializer(serializers.ModelSerializer):
 
 class ProjectVersionSerializer(serializers.ModelSerializer):
     created_by_name = serializers.CharField(source='created_by.username', read_only=True)
+    design_data = serializers.JSONField(read_only=True)
     
     class Meta:
         model = ProjectVersion
         fields = '__all__'
-        read_only_fields = ('created_at', 'created_by')
+        read_only_fields = ('created_at', 'created_by', 'content_hash')
 
 
 class ExportTemplateSerializer(serializers.ModelSerializer):
@@ -257,20 +257,18 @@ def auto_save_version(project_id, user_id=None):
         if not project.design_data:
             return {'success': False, 'error': 'No design data to version'}
         
-        # Check if latest version has same data (skip duplicate saves)
+        # Check if latest version has same data (skip duplicate saves);
+        # comparing Merkle roots avoids loading the stored version
         latest_version = project.versions.first()
-        if latest_version and latest_version.design_data == project.design_data:
+        version = ProjectVersion(project=project, design_data=project.design_data)
+        if latest_version and latest_version.content_hash == version.prepared_design_data().root:
             logger.info(f"Skipping auto-save for project {project_id} - no changes")
             return {'success': True, 'skipped': True, 'reason': 'no_changes'}
         
         next_version = (latest_version.version_number + 1) if latest_version else 1
         
         # Cap versions at 100, delete oldest beyond that
-        version_count = project.versions.count()
-        if version_count >= 100:
-            oldest_versions = project.versions.order_by('version_number')[:version_count - 99]
-            for v in oldest_versions:
-                v.delete()
+        ProjectVersion.prune(project, keep=99)
         
         user = None
         if user_id:
@@ -279,12 +277,10 @@ def auto_save_version(project_id, user_id=None):
             except User.DoesNotExist:
                 pass
         
-        ProjectVersion.objects.create(
-            project=project,
-            version_number=next_version,
-            design_data=project.design_data,
-            created_by=user
-        )
+        # Stores only the components that changed since earlier versions
+        version.version_number = next_version
+        version.created_by = user
+        version.save()
         
         logger.info(f"Auto-saved version {next_version} for project {project_id}")
         return {
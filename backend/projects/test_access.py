@@ -0,0 +1,97 @@
+"""
+Unit tests for cached WebSocket user resolution and project access checks.
+"""
+import asyncio
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework_simplejwt.tokens import AccessToken
+
+from backend import ws_auth
+from projects.access import has_project_access
+from projects.models import Project
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    cache.clear()
+    ws_auth._users.clear()
+    yield
+    cache.clear()
+    ws_auth._users.clear()
+
+
+@pytest.fixture
+def project(user):
+    return Project.objects.create(user=user, name='Access Test')
+
+
+@pytest.mark.unit
+@pytest.mark.django_db
+class TestProjectAccess:
+    """One EXISTS query per (user, project), invalidated on changes."""
+
+    def test_owner_and_collaborator(self, project, user, user2):
+        assert has_project_access(user, project.id)
+        assert not has_project_access(user2, project.id)
+        project.collaborators.add(user2)
+        assert has_project_access(user2, project.id)
+        project.collaborators.remove(user2)
+        assert not has_project_access(user2, project.id)
+
+    def test_answer_is_cached_as_single_exists_query(self, project, user2):
+        with CaptureQueriesContext(connection) as queries:
+            assert not has_project_access(user2, project.id)
+            assert not has_project_access(user2, project.id)
+        assert len(queries) == 1
+        assert 'LIMIT 1' in queries[0]['sql']
+
+    def test_public_and_reverse_changes(self, project, user2):
+        assert not has_project_access(user2, project.id, allow_public=True)
+        project.is_public = True
+        project.save()
+        assert has_project_access(user2, project.id, allow_public=True)
+        assert not has_project_access(user2, project.id)
+
+        user2.collaborated_projects.add(project)
+        assert has_project_access(user2, project.id)
+        user2.collaborated_projects.clear()
+        assert not has_project_access(user2, project.id)
+
+
+@pytest.mark.unit
+@pytest.mark.django_db(transaction=True)
+class TestWebSocketUserCache:
+    """Connects share one verified user lookup per TTL."""
+
+    def test_user_row_is_cached_and_invalidated(self, user, monkeypatch):
+        token = str(AccessToken.for_user(user))
+        loads = []
+        load_user = ws_auth._load_user
+
+        async def counting_load(user_id):
+            loads.append(user_id)
+            return await load_user(user_id)
+
+        monkeypatch.setattr(ws_auth, '_load_user', counting_load)
+
+        async def connect_many():
+            return await asyncio.gather(*(ws_auth._user_from_token(token) for _ in range(20)))
+
+        users = asyncio.run(connect_many())
+        asyncio.run(connect_many())
+        assert {u.pk for u in users} == {user.pk}
+        assert users[0] is not users[1]
+        assert loads == [str(user.pk)]
+
+        user.first_name = 'Renamed'
+        user.save()
+        renamed = asyncio.run(ws_auth._user_from_token(token))
+        assert renamed.first_name == 'Renamed'
+        assert len(loads) == 2
+
+    def test_bad_token_is_anonymous(self):
+        user = asyncio.run(ws_auth._user_from_token('not-a-jwt'))
+        assert not user.is_authenticated
@@ -0,0 +1,85 @@
+"""
+Unit tests for BatchOperationService bulk paths.
+"""
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from projects.batch_operations import BatchOperationService
+from projects.models import DesignComponent, Project
+
+
+@pytest.fixture
+def project(user):
+    return Project.objects.create(user=user, name='Batch Test')
+
+
+@pytest.fixture
+def components(project):
+    return [
+        DesignComponent.objects.create(
+            project=project,
+            component_type='shape',
+            properties={
+                'position': {'x': i * 10, 'y': 0},
+                'size': {'width': 50, 'height': 20},
+                'fill': '#ff0000',
+            },
+            z_index=i,
+        )
+        for i in range(20)
+    ]
+
+
+def component_updates(queries):
+    return [
+        q for q in queries
+        if q['sql'].startswith('UPDATE "projects_designcomponent"')
+    ]
+
+
+@pytest.mark.unit
+class TestBatchOperationService:
+    """Tests for set-based batch updates and diff-based undo."""
+
+    def test_bulk_move_issues_single_update(self, project, user, components):
+        service = BatchOperationService(project, user)
+        ids = [c.id for c in components]
+        with CaptureQueriesContext(connection) as ctx:
+            operation = service.bulk_move(ids, 5, 7)
+
+        assert operation.status == 'completed'
+        assert operation.success_count == 20
+        assert len(component_updates(ctx.captured_queries)) == 1
+        moved = DesignComponent.objects.get(id=components[3].id)
+        assert moved.properties['position'] == {'x': 35, 'y': 7}
+        assert moved.properties['fill'] == '#ff0000'
+
+    def test_state_is_stored_as_diff(self, project, user, components):
+        service = BatchOperationService(project, user)
+        operation = service.bulk_style([components[0].id], {'stroke.width': 2})
+
+        before = operation.before_state[str(components[0].id)]
+        after = operation.after_state[str(components[0].id)]
+        assert before == {'patch': {}, 'unset': ['stroke'], 'z_index': 0}
+        assert after == {'patch': {'stroke': {'width': 2}}, 'z_index': 0}
+
+    def test_undo_restores_patched_keys(self, project, user, components):
+        service = BatchOperationService(project, user)
+        ids = [c.id for c in components]
+        service.bulk_resize(ids, scale_x=2, scale_y=2)
+        operation = service.bulk_style(ids, {'stroke.width': 2, 'fill': '#00ff00'})
+
+        with CaptureQueriesContext(connection) as ctx:
+            assert service.undo(operation)
+        assert len(component_updates(ctx.captured_queries)) == 1
+
+        restored = DesignComponent.objects.get(id=components[0].id)
+        assert restored.properties['fill'] == '#ff0000'
+        assert 'stroke' not in restored.properties
+        assert restored.properties['size'] == {'width': 100, 'height': 40}
+
+    def test_bring_front_updates_z_index(self, project, user, components):
+        service = BatchOperationService(project, user)
+        service.bulk_change_order([components[0].id], 'bring_front')
+        assert DesignComponent.objects.get(id=components[0].id).z_index == 19
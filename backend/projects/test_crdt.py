@@ -0,0 +1,240 @@
+"""
+Unit tests for the CRDT engine and its store backends.
+"""
+import asyncio
+
+import msgpack
+import pytest
+
+from projects.crdt_coalescer import RoomOpCoalescer
+from projects.crdt_engine import CRDTClock, CRDTDocument, CRDTDocumentStore, CRDTOperation
+from projects.crdt_store import LocalMemoryCRDTStoreBackend, RedisCRDTStoreBackend
+from projects import crdt_wire
+
+
+def make_op(element_id, prop, value, physical, node='a', op_type='set'):
+    return CRDTOperation(
+        op_type=op_type,
+        element_id=element_id,
+        prop=prop,
+        value=value,
+        clock=CRDTClock(physical, 0, node),
+    )
+
+
+def add_op(element_id, props, physical, node='a'):
+    return make_op(element_id, '', props, physical, node=node, op_type='add_element')
+
+
+@pytest.fixture
+def memory_store():
+    CRDTDocumentStore.set_backend(LocalMemoryCRDTStoreBackend(checkpoint_interval=5))
+    yield CRDTDocumentStore
+    CRDTDocumentStore.set_backend(None)
+
+
+@pytest.fixture
+def redis_backends():
+    fakeredis = pytest.importorskip('fakeredis')
+    server = fakeredis.FakeServer()
+    return [
+        RedisCRDTStoreBackend(
+            clients=[fakeredis.FakeRedis(server=server)], checkpoint_interval=5,
+        )
+        for _ in range(2)
+    ]
+
+
+@pytest.mark.unit
+class TestCRDTDocument:
+    """Tests for CRDTDocument compaction."""
+
+    def test_compact_bounds_op_log(self):
+        doc = CRDTDocument('1')
+        doc.apply(add_op('e1', {}, physical=1))
+        for i in range(10):
+            doc.apply(make_op('e1', 'x', i, physical=i + 1))
+        doc.compact()
+        assert doc.op_log == []
+        assert doc.version == 11
+        assert doc.snapshot()['elements'] == {'e1': {'x': 9}}
+
+    def test_ops_since_before_checkpoint_requires_snapshot(self):
+        doc = CRDTDocument('1')
+        doc.apply(make_op('e1', 'x', 1, physical=1))
+        doc.compact()
+        doc.apply(make_op('e1', 'y', 2, physical=2))
+        assert doc.ops_since(0) is None
+        assert [op['prop'] for op in doc.ops_since(1)] == ['y']
+
+    def test_round_trip_from_dict(self):
+        doc = CRDTDocument('1')
+        doc.apply(make_op('e1', 'x', 5, physical=10))
+        restored = CRDTDocument.from_dict(doc.to_dict())
+        assert restored.snapshot() == doc.snapshot()
+        # Older writes must still lose against the restored clocks.
+        assert not restored.apply(make_op('e1', 'x', 1, physical=5))
+
+    def test_incremental_checksum_matches_rebuild(self):
+        doc = CRDTDocument('1')
+        doc.apply(add_op('e1', {'x': 1, 'fill': '#fff'}, physical=1))
+        doc.apply(add_op('e2', {'x': 2}, physical=2))
+        doc.apply(make_op('e1', 'x', 5, physical=3))
+        doc.apply(make_op('e2', '', None, physical=4, op_type='remove_element'))
+        doc.apply(make_op('e1', 'fill', None, physical=5, op_type='delete'))
+
+        rebuilt = CRDTDocument.from_dict(doc.to_dict())
+        assert doc.state_vector()['checksum'] == rebuilt.state_vector()['checksum']
+        assert doc.state_vector()['element_count'] == 1
+        assert doc.snapshot()['elements'] == {'e1': {'x': 5}}
+
+    def test_checksum_tracks_state_not_history(self):
+        doc_a, doc_b = CRDTDocument('1'), CRDTDocument('1')
+        doc_a.apply(add_op('e1', {'x': 1}, physical=1))
+        doc_b.apply(add_op('e1', {'x': 0}, physical=1, node='0'))
+        doc_b.apply(make_op('e1', 'x', 1, physical=2))
+        assert doc_a.state_vector()['checksum'] != CRDTDocument('1').state_vector()['checksum']
+        assert doc_a.state_vector()['checksum'] == doc_b.state_vector()['checksum']
+
+
+@pytest.mark.unit
+class TestCRDTDocumentStore:
+    """Tests for checkpointing through the store."""
+
+    def test_commit_checkpoints_at_interval(self, memory_store):
+        doc = memory_store.get_or_create('p1')
+        for i in range(7):
+            applied = doc.apply_batch([make_op('e1', 'x', i, physical=i + 1)])
+            memory_store.commit(doc, applied)
+        assert doc.version == 7
+        assert doc.base_version == 5
+        assert len(doc.op_log) == 2
+        assert memory_store.ops_since(doc, 0) is None
+
+    def test_workers_share_redis_state(self, redis_backends):
+        worker_a, worker_b = redis_backends
+        CRDTDocumentStore.set_backend(worker_a)
+        doc_a = CRDTDocumentStore.get_or_create('p1')
+        for i in range(6):
+            applied = doc_a.apply_batch([add_op(f'e{i}', {'x': i}, physical=i + 1)])
+            CRDTDocumentStore.commit(doc_a, applied)
+
+        # A second worker rebuilds from the checkpoint plus the op-log tail.
+        CRDTDocumentStore.set_backend(worker_b)
+        doc_b = CRDTDocumentStore.get_or_create('p1')
+        assert doc_b.version == 6
+        assert doc_b.snapshot() == doc_a.snapshot()
+        assert len(doc_b.snapshot()['elements']) == 6
+        assert [op['element_id'] for op in CRDTDocumentStore.ops_since(doc_b, 5)] == ['e5']
+        CRDTDocumentStore.set_backend(None)
+
+    def test_interleaved_appends_keep_versions_aligned(self, redis_backends):
+        backend = redis_backends[0]
+        doc_a = backend.load('p1') or CRDTDocument('p1')
+        doc_b = backend.load('p1') or CRDTDocument('p1')
+        CRDTDocumentStore.set_backend(backend)
+
+        CRDTDocumentStore.commit(doc_a, doc_a.apply_batch([add_op('e1', {'x': 1}, physical=1)]))
+        CRDTDocumentStore.commit(doc_b, doc_b.apply_batch([add_op('e2', {'x': 2}, physical=2, node='b')]))
+
+        CRDTDocumentStore.refresh(doc_a)
+        assert doc_a.version == doc_b.version == 2
+        assert doc_a.snapshot()['elements'] == doc_b.snapshot()['elements'] == {
+            'e1': {'x': 1}, 'e2': {'x': 2},
+        }
+        CRDTDocumentStore.set_backend(None)
+
+
+@pytest.mark.unit
+@pytest.mark.skipif(not crdt_wire.MSGPACK_AVAILABLE, reason='msgpack not installed')
+class TestCRDTWireFormat:
+    """Tests for the binary msgpack frames."""
+
+    def test_ops_frame_round_trip(self):
+        ops = [
+            make_op('e1', 'x', 10.5, physical=1, node='a'),
+            make_op('e2', '', {'fill': '#000'}, physical=2, node='b', op_type='add_element'),
+            make_op('e1', 'x', None, physical=3, node='a', op_type='delete'),
+        ]
+        frame = crdt_wire.decode_frame(crdt_wire.encode_ops_frame(ops, 7, 'a'))
+        assert frame['version'] == 7
+        assert [op.to_dict() for op in frame['ops']] == [
+            {**op.to_dict(), 'origin': 'a'} for op in ops
+        ]
+
+    def test_malformed_frame_rejected(self):
+        with pytest.raises(crdt_wire.WireFormatError):
+            crdt_wire.decode_frame(b'\x93\x01\x90\x91\x93')
+
+    @pytest.mark.parametrize('frame', [
+        [crdt_wire.MSG_BATCH, 5, []],
+        [crdt_wire.MSG_BATCH, [], 5],
+        [crdt_wire.MSG_BATCH, None, [[0, 'e1', 'x', 1, 1, 0, 0]]],
+        [crdt_wire.MSG_BATCH, ['n1'], [[0, 'e1', 'x', 1, 1, 0, 3]]],
+        [crdt_wire.MSG_OPS, 1, '', {'n1': 1}, []],
+    ])
+    def test_malformed_op_arrays_rejected(self, frame):
+        with pytest.raises(crdt_wire.WireFormatError):
+            crdt_wire.decode_frame(msgpack.packb(frame))
+
+
+class FakeChannelLayer:
+    def __init__(self):
+        self.sent = []
+
+    async def group_send(self, group, message):
+        self.sent.append((group, message))
+
+
+@pytest.mark.unit
+class TestRoomOpCoalescer:
+    """Tests for per-room outbound op coalescing."""
+
+    def test_superseded_writes_collapse_into_one_frame(self):
+        layer = FakeChannelLayer()
+
+        async def drag():
+            coalescer = RoomOpCoalescer('crdt_1', layer, tick_ms=10)
+            for i in range(30):
+                await coalescer.add([
+                    make_op('e1', 'x', i, physical=2 * i + 1),
+                    make_op('e1', 'y', i, physical=2 * i + 2),
+                ], version=i + 1)
+            assert layer.sent == []
+            await asyncio.sleep(0.05)
+
+        asyncio.run(drag())
+        assert len(layer.sent) == 1
+        message = layer.sent[0][1]
+        assert message['version'] == 30
+        assert [(op['prop'], op['value']) for op in message['ops']] == [('x', 29), ('y', 29)]
+
+    def test_add_element_ops_are_never_dropped(self):
+        layer = FakeChannelLayer()
+
+        async def create():
+            coalescer = RoomOpCoalescer('crdt_1', layer, tick_ms=0)
+            await coalescer.add([
+                add_op('e1', {'x': 1, 'y': 2}, physical=1),
+                add_op('e1', {'x': 3}, physical=2),
+            ], version=2)
+
+        asyncio.run(create())
+        assert len(layer.sent[0][1]['ops']) == 2
+
+    def test_scheduled_flush_task_is_held_and_errors_logged(self, caplog):
+        layer = FakeChannelLayer()
+
+        async def drag():
+            coalescer = RoomOpCoalescer('crdt_1', layer, tick_ms=10)
+            await coalescer.add([make_op('e1', 'x', 1, physical=1)], version=1)
+            coalescer.flush = failing_flush
+            await asyncio.sleep(0.02)
+            assert coalescer._flush_tasks == set()
+
+        async def failing_flush():
+            raise RuntimeError('boom')
+
+        with caplog.at_level('ERROR', logger='projects.crdt_coalescer'):
+            asyncio.run(drag())
+        assert 'CRDT flush for crdt_1 failed' in caplog.text
@@ -0,0 +1,194 @@
+"""
+Unit tests for design JSON deltas and delta-based design_sync.
+"""
+import asyncio
+import copy
+import json
+
+import pytest
+
+from projects.collaboration_consumer import CollaborativeCanvasConsumer
+from projects.design_delta import apply_patch, diff, state_hash
+from projects.room_state import LocalMemoryRoomStateBackend
+
+
+def make_design(count=50):
+    return {
+        'version': '5.3.0',
+        'background': '#ffffff',
+        'objects': [
+            {'id': f'obj-{i}', 'type': 'rect', 'left': i * 10, 'top': 0,
+             'width': 100, 'height': 40, 'fill': '#ff0000'}
+            for i in range(count)
+        ],
+    }
+
+
+class LoopbackChannelLayer:
+    """Delivers group messages to registered consumers after a JSON round-trip."""
+
+    def __init__(self):
+        self.consumers = []
+        self.published = []
+
+    async def group_send(self, group, message):
+        payload = json.dumps(message)
+        self.published.append(payload)
+        for consumer in self.consumers:
+            event = json.loads(payload)
+            await getattr(consumer, event['type'])(event)
+
+
+class FakeUser:
+    def __init__(self, user_id):
+        self.id = user_id
+        self.username = f'user{user_id}'
+
+
+def make_consumer(layer, user_id, query=b''):
+    consumer = CollaborativeCanvasConsumer()
+    consumer.scope = {'query_string': query}
+    consumer.channel_layer = layer
+    consumer.user = FakeUser(user_id)
+    consumer.room_group_name = 'canvas_1'
+    consumer.patch_sync = query == b'sync=patch'
+    consumer.client_design_hash = None
+    consumer.received = []
+
+    async def send(text_data=None, bytes_data=None):
+        consumer.received.append(json.loads(text_data))
+
+    consumer.send = send
+    layer.consumers.append(consumer)
+    return consumer
+
+
+@pytest.fixture
+def room():
+    CollaborativeCanvasConsumer.set_room_state(LocalMemoryRoomStateBackend())
+    CollaborativeCanvasConsumer._documents.clear()
+    CollaborativeCanvasConsumer._connections.clear()
+    yield
+    CollaborativeCanvasConsumer.set_room_state(None)
+    CollaborativeCanvasConsumer._documents.clear()
+    CollaborativeCanvasConsumer._connections.clear()
+
+
+@pytest.mark.unit
+class TestDesignDelta:
+    """Tests for diff/apply_patch."""
+
+    def test_round_trip_keyed_list(self):
+        old = make_design(10)
+        new = copy.deepcopy(old)
+        new['objects'][3]['left'] = 999
+        del new['objects'][5]
+        new['objects'].insert(2, {'id': 'new', 'type': 'circle'})
+        new['background'] = '#000000'
+
+        patch = diff(old, new)
+        assert apply_patch(old, patch) == new
+        assert old == make_design(10)
+        assert {'op': 'add', 'path': '/objects/2', 'value': {'id': 'new', 'type': 'circle'}} in patch
+        assert len(patch) == 4
+
+    def test_reorder_moves_only_reordered_elements(self):
+        old = make_design(6)
+        new = copy.deepcopy(old)
+        new['objects'].append(new['objects'].pop(1))
+        new['objects'][0]['fill'] = '#000000'
+        patch = diff(old, new)
+        assert patch == [
+            {'op': 'remove', 'path': '/objects/1'},
+            {'op': 'replace', 'path': '/objects/0/fill', 'value': '#000000'},
+            {'op': 'add', 'path': '/objects/5', 'value': new['objects'][5]},
+        ]
+        assert apply_patch(old, patch) == new
+
+    def test_hash_is_key_order_independent(self):
+        assert state_hash({'a': 1, 'b': [1, 2]}) == state_hash({'b': [1, 2], 'a': 1})
+        assert state_hash({'a': 1}) != state_hash({'a': 2})
+
+
+@pytest.mark.unit
+class TestDesignSync:
+    """Only deltas travel through the channel layer after the first sync."""
+
+    def test_delta_broadcast_and_fallbacks(self, room):
+        layer = LoopbackChannelLayer()
+        sender = make_consumer(layer, 1)
+        patch_peer = make_consumer(layer, 2, b'sync=patch')
+        legacy_peer = make_consumer(layer, 3)
+
+        first = make_design()
+        second = copy.deepcopy(first)
+        second['objects'][7]['left'] = 12345
+
+        async def scenario():
+            await sender.handle_design_sync({'design_data': first, 'timestamp': 1})
+            await sender.handle_design_sync({'design_data': second, 'timestamp': 2})
+
+        asyncio.run(scenario())
+
+        assert 'design_data' in json.loads(layer.published[0])
+        delta = json.loads(layer.published[1])
+        assert 'design_data' not in delta
+        assert delta['patch'] == [{'op': 'replace', 'path': '/objects/7/left', 'value': 12345}]
+        assert len(layer.published[1]) < len(layer.published[0]) / 20
+
+        # The patch client got the snapshot first, then only the delta.
+        assert [m['type'] for m in patch_peer.received] == ['design_synced', 'design_patch']
+        assert apply_patch(patch_peer.received[0]['design_data'], patch_peer.received[1]['patch']) == second
+        # Legacy clients keep receiving full snapshots rebuilt from the delta.
+        assert [m['design_data'] for m in legacy_peer.received] == [first, second]
+        assert sender.received == []
+
+    def test_stale_base_gets_snapshot(self, room):
+        layer = LoopbackChannelLayer()
+        sender = make_consumer(layer, 1)
+        late = make_consumer(layer, 2, b'sync=patch')
+        first = make_design(5)
+        second = copy.deepcopy(first)
+        second['objects'][0]['fill'] = '#00ff00'
+
+        async def scenario():
+            layer.consumers.remove(late)
+            await sender.handle_design_sync({'design_data': first})
+            layer.consumers.append(late)
+            await sender.handle_design_sync({'design_data': second})
+
+        asyncio.run(scenario())
+        assert late.received[0]['type'] == 'design_synced'
+        assert late.received[0]['design_data'] == second
+        assert late.client_design_hash == state_hash(second)
+
+    def test_room_document_dropped_with_last_connection(self, room):
+        layer = LoopbackChannelLayer()
+        first, second = make_consumer(layer, 1), make_consumer(layer, 2)
+        for consumer in (first, second):
+            consumer.joined = True
+            CollaborativeCanvasConsumer._connections['canvas_1'] = (
+                CollaborativeCanvasConsumer._connections.get('canvas_1', 0) + 1
+            )
+        asyncio.run(first.handle_design_sync({'design_data': make_design(3)}))
+
+        first.release_room()
+        first.release_room()
+        assert 'canvas_1' in CollaborativeCanvasConsumer._documents
+        second.release_room()
+        assert CollaborativeCanvasConsumer._documents == {}
+        assert CollaborativeCanvasConsumer._connections == {}
+
+    def test_store_fallback_not_cached_under_other_hash(self, room):
+        layer = LoopbackChannelLayer()
+        peer = make_consumer(layer, 2)
+        stored = make_design(3)
+
+        async def scenario():
+            await peer.room_state.set_document('canvas_1', state_hash(stored), stored)
+            return await peer.resolve_synced_design({
+                'hash': 'newer', 'base_hash': 'missed', 'patch': [],
+            })
+
+        assert asyncio.run(scenario()) == (state_hash(stored), stored)
+        assert 'canvas_1' not in CollaborativeCanvasConsumer._documents
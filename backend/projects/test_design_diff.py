@@ -0,0 +1,118 @@
+"""
+Unit tests for the structural design diff engine.
+"""
+import copy
+import json
+
+import pytest
+
+from design_branches.services import BranchingService
+from projects.design_diff import apply_patch, diff_documents, node_hashes, revert_patch
+from projects.version_models import VersionService
+
+
+def make_doc(count):
+    return {
+        'components': [
+            {'id': f'c{i}', 'type': 'rect', 'z_index': i, 'properties': {'x': i, 'fill': {'color': '#000'}}}
+            for i in range(count)
+        ],
+        'project_settings': {'name': 'Doc'},
+    }
+
+
+class NoCompare(dict):
+    """A node that fails if the engine compares it by value."""
+
+    def __eq__(self, other):
+        raise AssertionError('compared')
+
+    __ne__ = __eq__
+    __hash__ = None
+
+
+@pytest.mark.unit
+class TestDiffDocuments:
+
+    def test_added_removed_modified(self):
+        old = make_doc(5)
+        new = copy.deepcopy(old)
+        new['components'][2]['properties']['fill']['color'] = '#fff'
+        del new['components'][4]
+        new['components'].insert(0, {'id': 'n', 'type': 'text'})
+
+        diff = diff_documents(old, new, key='components')
+        assert [node['id'] for _, node in diff.added] == ['n']
+        assert [node['id'] for _, node in diff.removed] == ['c4']
+        [change] = diff.modified
+        assert change.id == 'c2'
+        assert change.ops == [['=', ['properties', 'fill', 'color'], '#000', '#fff']]
+        assert change.changed_keys() == ['properties']
+        assert change.changed_keys('properties') == ['fill']
+
+    def test_patch_apply_and_revert(self):
+        old = make_doc(6)
+        new = copy.deepcopy(old)
+        new['components'][1]['properties']['x'] = 99
+        del new['components'][3]['z_index']
+        new['components'].append(new['components'].pop(0))
+        new['components'].insert(2, {'id': 'n', 'type': 'text'})
+        new['project_settings'] = {'name': 'Renamed', 'locale': 'fr'}
+
+        patch = json.loads(json.dumps(diff_documents(old, new, key='components').patch()))
+        assert apply_patch(old, patch) == new
+        assert revert_patch(new, patch) == old
+        assert old == make_doc(6)
+
+    def test_patch_without_unique_ids(self):
+        old = {'components': [{'id': 1}, {'id': 1, 'x': 2}]}
+        new = {'components': [{'id': 1}], 'extra': True}
+        patch = diff_documents(old, new, key='components').patch()
+        assert 'nodes' not in patch
+        assert apply_patch(old, patch) == new
+        assert revert_patch(new, patch) == old
+
+    def test_shared_and_hashed_nodes_are_not_compared(self):
+        shared = NoCompare(id='a', type='rect')
+        old = {'components': [shared, {'id': 'b', 'x': 1}]}
+        new = {'components': [shared, {'id': 'b', 'x': 2}]}
+        assert [change.id for change in diff_documents(old, new, key='components').modified] == ['b']
+
+        old = {'components': [NoCompare(id='a', x=1)]}
+        new = {'components': [NoCompare(id='a', x=1)]}
+        hashes = {'a': 'same'}
+        assert not diff_documents(old, new, key='components', old_hashes=hashes, new_hashes=hashes)
+        assert node_hashes(old['components']) == node_hashes([{'x': 1, 'id': 'a'}])
+
+    def test_identical_documents(self):
+        diff = diff_documents(make_doc(3), make_doc(3), key='components')
+        assert not diff
+        assert diff.patch() == {'key': 'components', 'doc': []}
+
+
+@pytest.mark.unit
+class TestServiceDiffs:
+
+    def test_version_service_diff(self):
+        old = make_doc(3)
+        new = copy.deepcopy(old)
+        new['components'][0]['properties']['x'] = 5
+        new['components'][0]['properties']['stroke'] = 1
+        new['components'][1]['z_index'] = 10
+
+        diff = VersionService(project=None)._compute_diff(old, new)
+        assert diff['summary'] == {'added_count': 0, 'removed_count': 0, 'modified_count': 2}
+        assert diff['total_property_changes'] == 3
+        first = {change['property']: change['type'] for change in diff['modified'][0]['changes']}
+        assert first == {'x': 'modified', 'stroke': 'added'}
+        assert apply_patch(old, diff['patch']) == new
+
+    def test_branching_diff(self):
+        old = {'nodes': [{'id': 'a', 'name': 'A', 'children': [1]}, {'id': 'b', 'name': 'B'}]}
+        new = {'nodes': [{'id': 'a', 'name': 'A2', 'children': [2]}, {'id': 'c', 'name': 'C'}]}
+        diff_data, files_changed, insertions, deletions = BranchingService(branch=None)._calculate_diff(old, new)
+        assert diff_data['modified'] == [{
+            'id': 'a', 'type': None, 'name': 'A2',
+            'changes': [{'property': 'name', 'old_value': 'A', 'new_value': 'A2'}],
+        }]
+        assert (files_changed, insertions, deletions) == (3, 1, 1)
@@ -0,0 +1,121 @@
+"""
+Unit tests for ephemeral cursor/selection state and its write-behind.
+"""
+import asyncio
+
+import pytest
+
+from projects.collaboration_consumer import CollaborativeCanvasConsumer
+from projects.ephemeral_state import EphemeralThrottle, WriteBehind
+from projects.room_state import LocalMemoryRoomStateBackend
+
+
+class FakeChannelLayer:
+    def __init__(self):
+        self.sent = []
+
+    async def group_send(self, group, message):
+        self.sent.append((group, message))
+
+    async def group_discard(self, group, channel):
+        pass
+
+
+class FakeUser:
+    id = 7
+    username = 'alice'
+    is_anonymous = False
+
+
+@pytest.fixture
+def canvas_consumer():
+    CollaborativeCanvasConsumer.set_room_state(LocalMemoryRoomStateBackend())
+    consumer = CollaborativeCanvasConsumer()
+    consumer.channel_layer = FakeChannelLayer()
+    consumer.user = FakeUser()
+    consumer.project_id = 1
+    consumer.room_group_name = 'canvas_1'
+    consumer.channel_name = 'test.channel'
+    consumer.live_state = {}
+    consumer.saved = []
+    consumer.removed = []
+
+    async def save_session_state(fields):
+        consumer.saved.append(fields)
+
+    async def remove_collaboration_session(state=None):
+        consumer.removed.append(state)
+
+    consumer.save_session_state = save_session_state
+    consumer.remove_collaboration_session = remove_collaboration_session
+    consumer.throttle = EphemeralThrottle(consumer.emit_ephemeral, interval_ms=20)
+    consumer.write_behind = WriteBehind(consumer.save_session_state, interval=0.05)
+    yield consumer
+    CollaborativeCanvasConsumer.set_room_state(None)
+
+
+@pytest.mark.unit
+class TestEphemeralThrottle:
+    """Tests for leading/trailing-edge throttling."""
+
+    def test_burst_sends_first_and_newest(self):
+        emitted = []
+
+        async def emit(key, value):
+            emitted.append((key, value))
+
+        async def burst():
+            throttle = EphemeralThrottle(emit, interval_ms=20)
+            for i in range(30):
+                await throttle.push('cursor', i)
+                await throttle.push('selection', -i)
+            await asyncio.sleep(0.05)
+
+        asyncio.run(burst())
+        assert emitted == [('cursor', 0), ('selection', 0), ('cursor', 29), ('selection', -29)]
+
+    def test_write_behind_coalesces(self):
+        persisted = []
+
+        async def persist(fields):
+            persisted.append(fields)
+
+        async def scenario():
+            writer = WriteBehind(persist, interval=0.02)
+            for i in range(10):
+                writer.update(cursor_position={'x': i})
+            writer.update(viewport={'zoom': 2})
+            await asyncio.sleep(0.05)
+            writer.update(cursor_position={'x': 99})
+            return writer.drain()
+
+        remaining = asyncio.run(scenario())
+        assert persisted == [{'cursor_position': {'x': 9}, 'viewport': {'zoom': 2}}]
+        assert remaining == {'cursor_position': {'x': 99}}
+
+
+@pytest.mark.unit
+class TestCanvasConsumerEphemeralState:
+    """Cursor streams must not hit the database per event."""
+
+    def test_cursor_stream_is_throttled_and_written_behind(self, canvas_consumer):
+        consumer = canvas_consumer
+
+        async def stream():
+            for i in range(60):
+                await consumer.handle_cursor_move({'position': {'x': i, 'y': i}})
+            await consumer.handle_viewport_change({'viewport': {'zoom': 2}})
+            assert consumer.saved == []
+            await asyncio.sleep(0.03)
+            live = await consumer.room_state.get_cursors('canvas_1')
+            await asyncio.sleep(0.05)
+            await consumer.handle_cursor_move({'position': {'x': 100, 'y': 100}})
+            await consumer.disconnect(1000)
+            return live
+
+        live = asyncio.run(stream())
+        cursor_updates = [m for _, m in consumer.channel_layer.sent if m['type'] == 'cursor_update']
+        assert [m['position']['x'] for m in cursor_updates] == [0, 59, 100]
+        assert live['7'] == {'cursor_position': {'x': 59, 'y': 59}, 'viewport': {'zoom': 2}}
+        assert consumer.saved == [{'cursor_position': {'x': 59, 'y': 59}, 'viewport': {'zoom': 2}}]
+        assert consumer.removed == [{'cursor_position': {'x': 100, 'y': 100}}]
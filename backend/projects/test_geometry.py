@@ -0,0 +1,50 @@
+"""
+Unit tests for the vectorized geometry kernel.
+"""
+import pytest
+
+from projects import geometry
+
+
+def make_props():
+    return [
+        {'position': {'x': 0, 'y': 0, 'rotation': 15}, 'size': {'width': 10, 'height': 10}},
+        {'position': {'x': 50, 'y': 20}, 'size': {'width': 20, 'height': 10}},
+        {'position': {'x': 100, 'y': 40}},
+    ]
+
+
+@pytest.mark.unit
+class TestGeometryKernel:
+    """Tests for box extraction, transforms and writeback."""
+
+    def test_from_properties_uses_default_size(self):
+        boxes = geometry.Boxes.from_properties(make_props())
+        assert boxes.width.tolist() == [10, 20, 100]
+        assert geometry.bounds(boxes) == (0, 0, 200, 140)
+
+    def test_align_writes_positions_and_keeps_other_keys(self):
+        props = make_props()
+        geometry.align(geometry.Boxes.from_properties(props), 'right').write_positions(props)
+
+        assert [p['position']['x'] for p in props] == [190, 180, 100]
+        assert props[0]['position'] == {'x': 190, 'y': 0, 'rotation': 15}
+        assert isinstance(props[0]['position']['x'], int)
+
+    def test_distribute_keeps_outer_boxes(self):
+        boxes = geometry.Boxes.from_properties(list(reversed(make_props())))
+        result = geometry.distribute(boxes, 'horizontal')
+        # Middle box sits halfway between the outer boxes' edges.
+        assert result.x.tolist() == [100, 45, 0]
+
+    def test_scale_around_centroid(self):
+        boxes = geometry.Boxes([0, 10], [0, 10], [10, 10], [10, 10])
+        result = geometry.scale(boxes, 2, 2, geometry.centroid(boxes))
+        assert result.x.tolist() == [-10, 10]
+        assert result.width.tolist() == [20, 20]
+
+    def test_snap_to_grid_and_write_elements(self):
+        elements = [{'left': 13, 'top': 27, 'width': 31, 'height': 2}]
+        boxes = geometry.snap_to_grid(geometry.Boxes.from_elements(elements), 8, include_size=True)
+        boxes.write_elements(elements)
+        assert elements == [{'left': 16, 'top': 24, 'width': 32, 'height': 8}]
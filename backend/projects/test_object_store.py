@@ -0,0 +1,138 @@
+"""
+Unit tests for the content-addressed design object store.
+"""
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from projects.models import DesignComponent, DesignObject, Project, ProjectVersion
+from projects.object_store import LIST_FANOUT, ObjectStore
+from projects.tasks import auto_save_version
+from projects.version_models import VersionService
+
+
+def make_design(count, text='lorem ipsum ' * 30):
+    return {
+        'components': [
+            {'id': f'c{i}', 'type': 'text', 'properties': {'text': f'{text}{i}', 'x': i, 'y': 2 * i}}
+            for i in range(count)
+        ],
+        'settings': {'width': 1920, 'height': 1080},
+    }
+
+
+@pytest.mark.unit
+@pytest.mark.django_db
+class TestObjectStore:
+
+    def test_round_trip(self):
+        store = ObjectStore()
+        values = [
+            make_design(3 * LIST_FANOUT),
+            {'nested': {'deep': [[1, 2], {'3': None}]}, 'flag': True, 'name': 'ü' * 300},
+            [],
+            'plain',
+            {'looks_like_ref': ObjectStore().hash_of({'x': 'y' * 400})},
+        ]
+        for value in values:
+            assert store.read(store.write(value)) == value
+
+    def test_equal_content_equal_hash(self):
+        store = ObjectStore()
+        design = make_design(10)
+        reordered = {'settings': design['settings'], 'components': design['components']}
+        assert store.hash_of(design) == store.hash_of(reordered)
+        assert store.hash_of(design) != store.hash_of(make_design(11))
+
+    def test_writes_only_changed_objects(self):
+        store = ObjectStore()
+        design = make_design(4 * LIST_FANOUT)
+        store.write(design)
+        total = DesignObject.objects.count()
+
+        design['components'][100]['properties']['x'] = -1
+        tree = store.prepare(design)
+        with CaptureQueriesContext(connection) as ctx:
+            written = store.commit(tree)
+        # component, its properties, the chunk holding it and the chunk
+        # list, document root
+        assert written <= 5
+        assert DesignObject.objects.count() == total + written
+        assert len(ctx.captured_queries) < 15
+        assert store.read(tree.root) == design
+
+        assert store.commit(store.prepare(design)) == 0
+
+    def test_insert_rewrites_one_chunk(self):
+        store = ObjectStore()
+        design = make_design(8 * LIST_FANOUT)
+        store.write(design)
+        design['components'].insert(3, {'id': 'new', 'type': 'rect', 'properties': {}})
+        assert store.commit(store.prepare(design)) <= 4
+
+    def test_read_many_shares_equal_subtrees(self):
+        store = ObjectStore()
+        first = make_design(20)
+        second = make_design(20)
+        second['components'][0]['properties']['x'] = 99
+        old, new = store.read_many([store.write(first), store.write(second)])
+        assert old['components'][5] is new['components'][5]
+        assert old['components'][0] != new['components'][0]
+
+
+@pytest.mark.unit
+@pytest.mark.django_db
+class TestStoredDesignData:
+
+    def test_version_round_trip(self, user):
+        project = Project.objects.create(user=user, name='Stored')
+        design = make_design(5)
+        version = ProjectVersion.objects.create(project=project, version_number=1, design_data=design)
+        assert version.content_hash == ObjectStore().hash_of(design)
+        assert ProjectVersion.objects.get(id=version.id).design_data == design
+
+    def test_identical_versions_share_objects(self, user):
+        project = Project.objects.create(user=user, name='Shared')
+        ProjectVersion.objects.create(project=project, version_number=1, design_data=make_design(50))
+        total = DesignObject.objects.count()
+        ProjectVersion.objects.create(project=project, version_number=2, design_data=make_design(50))
+        assert DesignObject.objects.count() == total
+
+    def test_prefetch_design_data(self, user):
+        project = Project.objects.create(user=user, name='Prefetch')
+        for i in range(5):
+            ProjectVersion.objects.create(project=project, version_number=i + 1, design_data=make_design(i + 1))
+        versions = ProjectVersion.objects.filter(project=project)
+        with CaptureQueriesContext(connection) as ctx:
+            loaded = ProjectVersion.prefetch_design_data(versions)
+            assert [len(v.design_data['components']) for v in loaded] == [5, 4, 3, 2, 1]
+        # the versions, then one query per level: root, list, component, properties
+        assert len(ctx.captured_queries) == 5
+
+    def test_auto_save_skips_unchanged_and_prunes(self, user):
+        project = Project.objects.create(user=user, name='Auto', design_data=make_design(3))
+        for i in range(3):
+            ProjectVersion.objects.create(project=project, version_number=i + 1, design_data={'v': i})
+        ProjectVersion.prune(project, keep=2)
+        assert list(project.versions.values_list('version_number', flat=True)) == [3, 2]
+
+        assert auto_save_version(project.id)['version_number'] == 4
+        assert auto_save_version(project.id)['skipped']
+        assert project.versions.first().design_data == project.design_data
+
+    def test_snapshot_diff_between_versions(self, user):
+        project = Project.objects.create(user=user, name='Snapshots')
+        DesignComponent.objects.filter(project=project).delete()
+        component = DesignComponent.objects.create(project=project, component_type='text', properties={'text': 'a'})
+        service = VersionService(project)
+        first = service.create_snapshot(user)
+        same = service.create_snapshot(user)
+        assert same.change_summary == 'No changes detected'
+        assert same.content_hash == first.content_hash
+
+        component.properties = {'text': 'b'}
+        component.save()
+        second = service.create_snapshot(user)
+        diff = service.get_diff(first, second, use_cache=False)
+        assert diff['summary'] == {'added_count': 0, 'removed_count': 0, 'modified_count': 1}
+        assert service.get_diff(first, same, use_cache=False)['summary']['modified_count'] == 0
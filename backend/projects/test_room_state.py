@@ -0,0 +1,177 @@
+"""
+Unit tests for the collaboration room state backends.
+"""
+import asyncio
+
+import pytest
+
+from projects.room_state import LocalMemoryRoomStateBackend, RedisRoomStateBackend
+
+fakeredis = pytest.importorskip('fakeredis')
+
+
+@pytest.fixture(params=['memory', 'redis'])
+def state(request):
+    if request.param == 'memory':
+        return LocalMemoryRoomStateBackend(lock_ttl=30)
+    from fakeredis import aioredis
+    return RedisRoomStateBackend(client=aioredis.FakeRedis(), lock_ttl=30)
+
+
+def lock_for(user_id):
+    return {'user_id': user_id, 'username': f'user{user_id}', 'acquired_at': 'now'}
+
+
+@pytest.mark.unit
+class TestRoomState:
+    """Tests shared by the local and Redis backends."""
+
+    def test_presence_and_cursors_are_per_user(self, state):
+        async def scenario():
+            await state.add_presence('p1', 1, {'user_id': 1, 'last_seen': 'a'})
+            await state.add_presence('p1', 2, {'user_id': 2, 'last_seen': 'a'})
+            await state.touch_presence('p1', 2, 'b')
+            await state.touch_presence('p1', 3, 'b')  # not present: ignored
+            await state.remove_presence('p1', 1)
+            await state.set_cursor('p1', 1, {'x': 1})
+            await state.set_cursor('p1', 2, {'x': 2})
+            await state.set_cursor('p1', 1, {'x': 3})
+            await state.set_cursor('p1', 3, {'x': 4})
+            await state.remove_cursor('p1', 3)
+            return (
+                await state.get_presence('p1'),
+                await state.get_cursors('p1'),
+                await state.get_presence('p2'),
+            )
+
+        presence, cursors, other = asyncio.run(scenario())
+        assert presence == {'2': {'user_id': 2, 'last_seen': 'b'}}
+        assert cursors == {'1': {'x': 3}, '2': {'x': 2}}
+        assert other == {}
+
+    def test_lock_compare_and_set(self, state):
+        async def scenario():
+            first = await state.acquire_lock('p1', 'c1', lock_for(1))
+            denied = await state.acquire_lock('p1', 'c1', lock_for(2))
+            again = await state.acquire_lock('p1', 'c1', lock_for(1))
+            not_released = await state.release_lock('p1', 'c1', 2)
+            holder = await state.get_lock('p1', 'c1')
+            released = await state.release_lock('p1', 'c1', 1)
+            after = await state.acquire_lock('p1', 'c1', lock_for(2))
+            return first, denied, again, not_released, holder, released, after
+
+        first, denied, again, not_released, holder, released, after = asyncio.run(scenario())
+        assert first == (True, None)
+        assert denied == (False, lock_for(1))
+        assert again == (True, None)
+        assert not not_released
+        assert holder['user_id'] == 1
+        assert released
+        assert after == (True, None)
+
+    def test_concurrent_acquire_has_one_winner(self, state):
+        async def scenario():
+            return await asyncio.gather(*[
+                state.acquire_lock('p1', 'c1', lock_for(uid)) for uid in range(1, 21)
+            ])
+
+        results = asyncio.run(scenario())
+        assert sum(acquired for acquired, _ in results) == 1
+
+    def test_lock_expires(self, state):
+        state.lock_ttl = 0
+
+        async def scenario():
+            await state.acquire_lock('p1', 'c1', lock_for(1))
+            await asyncio.sleep(0.002)
+            return (
+                await state.refresh_lock('p1', 'c1', 1),
+                await state.get_locks('p1'),
+                await state.acquire_lock('p1', 'c1', lock_for(2)),
+            )
+
+        refreshed, locks, taken = asyncio.run(scenario())
+        assert not refreshed
+        assert locks == {}
+        assert taken == (True, None)
+
+    def test_release_user_locks(self, state):
+        async def scenario():
+            await state.acquire_lock('p1', 'c1', lock_for(1))
+            await state.acquire_lock('p1', 'c2', lock_for(1))
+            await state.acquire_lock('p1', 'c3', lock_for(2))
+            released = await state.release_user_locks('p1', 1)
+            return released, await state.get_locks('p1')
+
+        released, locks = asyncio.run(scenario())
+        assert sorted(released) == ['c1', 'c2']
+        assert locks == {'c3': lock_for(2)}
+
+
+class RecordingChannelLayer:
+    def __init__(self):
+        self.sent = []
+
+    async def group_send(self, group, message):
+        self.sent.append(message)
+
+
+def make_lock_consumer(user_id, layer):
+    from types import SimpleNamespace
+
+    from projects.realtime_consumers import CollaborationConsumer
+
+    consumer = CollaborationConsumer()
+    consumer.project_id = 'p1'
+    consumer.room_group_name = 'project_p1'
+    consumer.user = SimpleNamespace(id=user_id, username=f'user{user_id}')
+    consumer.channel_layer = layer
+    consumer.held_locks = set()
+    return consumer
+
+
+@pytest.mark.unit
+class TestLapsedLocks:
+    """An idle holder's lapsed lock is re-acquired, not reported as taken."""
+
+    @pytest.fixture(autouse=True)
+    def backend(self):
+        from projects.realtime_consumers import CollaborationConsumer
+
+        backend = LocalMemoryRoomStateBackend(lock_ttl=0)
+        CollaborationConsumer.set_room_state(backend)
+        yield backend
+        CollaborationConsumer.set_room_state(None)
+
+    def test_lapsed_lock_is_reacquired(self, backend):
+        layer = RecordingChannelLayer()
+        holder = make_lock_consumer(1, layer)
+
+        async def scenario():
+            await holder.handle_component_lock({'component_id': 'c1'})
+            await asyncio.sleep(0.002)
+            backend.lock_ttl = 30
+            return await holder.ensure_lock('c1')
+
+        assert asyncio.run(scenario()) is None
+        assert [m['type'] for m in layer.sent] == ['lock_acquired', 'lock_acquired']
+
+    def test_rejection_reasons(self, backend):
+        layer = RecordingChannelLayer()
+        holder, other = make_lock_consumer(1, layer), make_lock_consumer(2, layer)
+
+        async def scenario():
+            await holder.handle_component_lock({'component_id': 'c1'})
+            await asyncio.sleep(0.002)
+            backend.lock_ttl = 30
+            await other.handle_component_lock({'component_id': 'c1'})
+            return (
+                await holder.ensure_lock('c1'),
+                await holder.ensure_lock('c2'),
+                await holder.ensure_lock('c1'),
+            )
+
+        lost, unlocked, taken = asyncio.run(scenario())
+        assert lost == 'Your lock expired and the component is now locked by another user'
+        assert unlocked == 'Component is not locked'
+        assert taken == 'Component is locked by another user'
@@ -0,0 +1,128 @@
+"""
+Unit tests for the batched write-behind of append-only collaboration rows.
+"""
+import asyncio
+import json
+import threading
+
+import pytest
+
+from projects.write_buffer import BulkWriteBuffer
+
+
+class FakeManager:
+    def __init__(self, delay=0.0):
+        self.batches = []
+        self.delay = delay
+        self.release = threading.Event()
+
+    def bulk_create(self, objs, batch_size=None):
+        if self.delay:
+            self.release.wait(self.delay)
+        self.batches.append(list(objs))
+        return objs
+
+
+class FakeModel:
+    objects = None
+
+
+def make_model(delay=0.0):
+    model = type('FakeRow', (FakeModel,), {})
+    model.objects = FakeManager(delay)
+    return model
+
+
+@pytest.mark.unit
+@pytest.mark.django_db
+class TestBulkWriteBuffer:
+    """Rows are batched, flushed on demand and slow writes apply backpressure."""
+
+    def test_batches_by_size_and_interval(self):
+        model = make_model()
+        buffer = BulkWriteBuffer(model, flush_ms=20, batch_size=10)
+
+        async def scenario():
+            for i in range(25):
+                await buffer.add(i)
+            await asyncio.sleep(0.05)
+
+        asyncio.run(scenario())
+        assert [len(batch) for batch in model.objects.batches] == [10, 10, 5]
+        assert sum(model.objects.batches, []) == list(range(25))
+        stats = buffer.stats()
+        assert stats['written'] == 25
+        assert stats['pending'] == 0
+
+    def test_flush_writes_everything_queued(self):
+        model = make_model()
+        buffer = BulkWriteBuffer(model, flush_ms=10_000, batch_size=100)
+
+        async def scenario():
+            for i in range(3):
+                await buffer.add(i)
+            assert model.objects.batches == []
+            await buffer.flush()
+
+        asyncio.run(scenario())
+        assert model.objects.batches == [[0, 1, 2]]
+
+    def test_full_queue_waits_for_running_flush(self):
+        model = make_model(delay=0.05)
+        buffer = BulkWriteBuffer(model, flush_ms=10_000, batch_size=5, max_pending=5)
+
+        async def scenario():
+            for i in range(12):
+                await buffer.add(i)
+            await buffer.flush()
+
+        asyncio.run(scenario())
+        assert sum(model.objects.batches, []) == list(range(12))
+        stats = buffer.stats()
+        assert stats['backpressure_waits'] > 0
+        assert stats['max_pending'] <= 5
+
+    def test_flush_sync_writes_leftovers(self):
+        model = make_model()
+        buffer = BulkWriteBuffer(model, flush_ms=10_000, batch_size=100)
+        buffer.pending.extend(['a', 'b'])
+        buffer.flush_sync()
+        assert model.objects.batches == [['a', 'b']]
+        assert buffer.stats()['written'] == 2
+
+    def test_failed_batch_loses_only_bad_rows(self):
+        model = make_model()
+        written = model.objects.bulk_create
+
+        def bulk_create(objs, batch_size=None):
+            if 'bad' in objs:
+                raise ValueError('project deleted')
+            return written(objs, batch_size)
+
+        model.objects.bulk_create = bulk_create
+        buffer = BulkWriteBuffer(model, flush_ms=10_000, batch_size=8)
+
+        async def scenario():
+            for row in [0, 1, 'bad', 3, 4, 5, 'bad', 7]:
+                await buffer.add(row)
+            await buffer.flush()
+
+        asyncio.run(scenario())
+        assert sorted(sum(model.objects.batches, [])) == [0, 1, 3, 4, 5, 7]
+        stats = buffer.stats()
+        assert (stats['written'], stats['failed']) == (6, 2)
+
+    def test_stats_in_detailed_health_check(self, monkeypatch):
+        from django.test import RequestFactory
+        from backend import health
+        from backend.celery import app as celery_app
+        from projects import write_buffer
+
+        buffer = BulkWriteBuffer(make_model(), flush_ms=10_000, batch_size=100)
+        buffer.pending.extend(['a', 'b'])
+        monkeypatch.setitem(write_buffer._buffers, 'projects.FakeRow', buffer)
+        monkeypatch.setattr(celery_app.control, 'inspect', lambda: None)
+
+        response = health.detailed_health_check(RequestFactory().get('/health/detailed/'))
+        stats = json.loads(response.content)['write_buffers']['projects.FakeRow']
+        assert (stats['pending'], stats['written'], stats['flushing']) == (2, 0, False)
@@ -14,6 +14,7 @@ from .version_control_models import (
     VersionDiff
 )
 from .models import Project
+from .design_diff import cached_node_hashes, diff_documents
 
 
 class VersionControlService:
@@ -112,35 +113,32 @@ class VersionControlService:
     @staticmethod
     def _calculate_changes(old_data: Dict, new_data: Dict) -> Dict:
         """Calculate changes between two design data versions"""
-        old_elements = {e.get('id'): e for e in old_data.get('elements', [])}
-        new_elements = {e.get('id'): e for e in new_data.get('elements', [])}
+        diff = diff_documents(old_data, new_data, key='elements')
         
-        old_ids = set(old_elements.keys())
-        new_ids = set(new_elements.keys())
-        
-        added = len(new_ids - old_ids)
-        deleted = len(old_ids - new_ids)
-        
-        # Check for modifications
-        modified = 0
+        # Track which properties changed
         properties_changed = set()
-        for elem_id in old_ids & new_ids:
-            old_elem = old_elements[elem_id]
-            new_elem = new_elements[elem_id]
-            if old_elem != new_elem:
-                modified += 1
-                # Track which properties changed
-                for key in set(old_elem.keys()) | set(new_elem.keys()):
-                    if old_elem.get(key) != new_elem.get(key):
-                        properties_changed.add(key)
+        for change in diff.modified:
+            properties_changed.update(change.changed_keys())
         
         return {
-            'elements_added': added,
-            'elements_modified': modified,
-            'elements_deleted': deleted,
+            'elements_added': len(diff.added),
+            'elements_modified': len(diff.modified),
+            'elements_deleted': len(diff.removed),
             'properties_changed': list(properties_changed)
         }
     
+    @staticmethod
+    def _commit_diff(from_commit: VersionCommit, to_commit: VersionCommit):
+        """Element diff between two commits, skipping elements with equal cached hashes."""
+        hashes = [
+            cached_node_hashes(f'design_diff:version_commit:{commit.pk}', commit.design_data.get('elements', []))
+            for commit in (from_commit, to_commit)
+        ]
+        return diff_documents(
+            from_commit.design_data, to_commit.design_data, key='elements',
+            old_hashes=hashes[0], new_hashes=hashes[1],
+        )
+    
     @staticmethod
     def get_commit_history(
         branch: VersionBranch,
@@ -222,24 +220,16 @@ class VersionControlService:
         if not source_commit or not target_commit:
             return False, {}
         
-        source_elements = {e.get('id'): e for e in source_commit.design_data.get('elements', [])}
-        target_elements = {e.get('id'): e for e in target_commit.design_data.get('elements', [])}
-        
-        conflicts = []
-        common_ids = set(source_elements.keys()) & set(target_elements.keys())
-        
-        for elem_id in common_ids:
-            source_elem = source_elements[elem_id]
-            target_elem = target_elements[elem_id]
-            
-            # Check if element was modified in both branches
-            if source_elem != target_elem:
-                conflicts.append({
-                    'element_id': elem_id,
-                    'source_version': source_elem,
-                    'target_version': target_elem,
-                    'conflict_type': 'modification'
-                })
+        # Check if element was modified in both branches
+        conflicts = [
+            {
+                'element_id': change.id,
+                'source_version': change.old,
+                'target_version': change.new,
+                'conflict_type': 'modification'
+            }
+            for change in VersionControlService._commit_diff(source_commit, target_commit).modified
+        ]
         
         has_conflicts = len(conflicts) > 0
         conflicts_data = {
@@ -355,29 +345,25 @@ class VersionControlService:
             return existing_diff
         
         # Compute diff
-        from_elements = {e.get('id'): e for e in from_commit.design_data.get('elements', [])}
-        to_elements = {e.get('id'): e for e in to_commit.design_data.get('elements', [])}
-        
-        from_ids = set(from_elements.keys())
-        to_ids = set(to_elements.keys())
-        
-        added = [to_elements[eid] for eid in (to_ids - from_ids)]
-        deleted = [from_elements[eid] for eid in (from_ids - to_ids)]
-        
-        modified = []
-        for elem_id in from_ids & to_ids:
-            if from_elements[elem_id] != to_elements[elem_id]:
-                modified.append({
-                    'element_id': elem_id,
-                    'from': from_elements[elem_id],
-                    'to': to_elements[elem_id]
-                })
+        diff = VersionControlService._commit_diff(from_commit, to_commit)
+        
+        added = [element for _, element in diff.added]
+        deleted = [element for _, element in diff.removed]
+        modified = [
+            {
+                'element_id': change.id,
+                'from': change.old,
+                'to': change.new
+            }
+            for change in diff.modified
+        ]
         
         diff_data = {
             'added': added,
             'modified': modified,
             'deleted': deleted,
-            'summary': f"{len(added)} added, {len(modified)} modified, {len(deleted)} deleted"
+            'summary': f"{len(added)} added, {len(modified)} modified, {len(deleted)} deleted",
+            'patch': diff.patch(),
         }
         
         # Store diff
@@ -6,15 +6,19 @@ branching, and restore functionality.
 """
 from django.db import models, transaction
 from django.contrib.auth.models import User
-import json
-import hashlib
 from typing import Dict, Any, List, Optional
 
+from .design_diff import NodeChange, diff_documents, diff_value
+from .object_store import ObjectStore, StoredDesignData
 
-class ProjectSnapshot(models.Model):
+
+class ProjectSnapshot(StoredDesignData, models.Model):
     """
     Complete project snapshot for version history.
     Stores full design data with optional thumbnail.
+
+    ``design_data`` lives in the design object store (see ``object_store``);
+    unchanged components are shared with every other snapshot.
     """
     project = models.ForeignKey(
         'projects.Project',
@@ -31,9 +35,6 @@ class ProjectSnapshot(models.Model):
     )
     
     # Snapshot data
-    design_data = models.JSONField(
-        help_text="Complete design state at this version"
-    )
     canvas_settings = models.JSONField(
         default=dict,
         help_text="Canvas width, height, background at this version"
@@ -44,7 +45,7 @@ class ProjectSnapshot(models.Model):
     content_hash = models.CharField(
         max_length=64,
         db_index=True,
-        help_text="SHA-256 hash of design_data for quick comparison"
+        help_text="Merkle root of design_data in the design object store"
     )
     
     # Thumbnail
@@ -122,11 +123,9 @@ class ProjectSnapshot(models.Model):
         return f"{self.project.name} v{self.version_number}{label}"
     
     def save(self, *args, **kwargs):
-        # Calculate content hash
-        if self.design_data:
-            data_str = json.dumps(self.design_data, sort_keys=True)
-            self.content_hash = hashlib.sha256(data_str.encode()).hexdigest()
-            self.data_size_bytes = len(data_str.encode())
+        tree = self.store_design_data()
+        if tree is not None:
+            self.data_size_bytes = tree.size
         
         super().save(*args, **kwargs)
     
@@ -270,14 +269,7 @@ class VersionService:
             'background': self.project.canvas_background,
         }
         
-        # Auto-generate change summary if not provided
-        if not change_summary and last_snapshot:
-            change_summary = self._generate_change_summary(
-                last_snapshot.design_data,
-                design_data
-            )
-        
-        snapshot = ProjectSnapshot.objects.create(
+        snapshot = ProjectSnapshot(
             project=self.project,
             version_number=next_version,
             version_label=label,
@@ -292,6 +284,19 @@ class VersionService:
             is_branch_head=True,
         )
         
+        # Auto-generate change summary if not provided
+        if not change_summary and last_snapshot:
+            if snapshot.prepared_design_data().root == last_snapshot.content_hash:
+                snapshot.change_summary = "No changes detected"
+            else:
+                snapshot.change_summary = self._generate_change_summary(
+                    last_snapshot.design_data,
+                    design_data
+                )
+        
+        # Only components the store has not seen before are written
+        snapshot.save()
+        
         return snapshot
     
     def restore_snapshot(
@@ -397,11 +402,17 @@ class VersionService:
             except VersionDiff.DoesNotExist:
                 pass
         
-        # Compute diff
-        diff_data = self._compute_diff(
-            from_snapshot.design_data,
-            to_snapshot.design_data
-        )
+        # Compute diff; equal roots mean equal designs, and otherwise both
+        # trees are read together so shared components load once and
+        # compare by identity
+        if from_snapshot.content_hash == to_snapshot.content_hash:
+            diff_data = self._compute_diff({}, {})
+        else:
+            old_data, new_data = ObjectStore().read_many([
+                from_snapshot.content_hash,
+                to_snapshot.content_hash,
+            ])
+            diff_data = self._compute_diff(old_data, new_data)
         
         # Cache the diff
         if use_cache:
@@ -424,36 +435,26 @@ class VersionService:
     ) -> Dict[str, Any]:
         """
         Compute detailed diff between two design data objects.
+        Unchanged components are skipped by the shared diff engine; the
+        result carries a reversible ``patch`` between the two designs.
         """
-        old_components = {c['id']: c for c in old_data.get('components', [])}
-        new_components = {c['id']: c for c in new_data.get('components', [])}
-        
-        old_ids = set(old_components.keys())
-        new_ids = set(new_components.keys())
-        
-        added_ids = new_ids - old_ids
-        removed_ids = old_ids - new_ids
-        common_ids = old_ids & new_ids
+        diff = diff_documents(old_data, new_data, key='components')
         
-        added = [new_components[id] for id in added_ids]
-        removed = [old_components[id] for id in removed_ids]
+        added = [node for _, node in diff.added]
+        removed = [node for _, node in diff.removed]
         
         modified = []
         total_property_changes = 0
         
-        for comp_id in common_ids:
-            old_comp = old_components[comp_id]
-            new_comp = new_components[comp_id]
-            
-            if old_comp != new_comp:
-                changes = self._diff_component(old_comp, new_comp)
-                if changes:
-                    modified.append({
-                        'id': comp_id,
-                        'type': new_comp['type'],
-                        'changes': changes
-                    })
-                    total_property_changes += len(changes)
+        for change in diff.modified:
+            changes = self._diff_component(change.old, change.new, change)
+            if changes:
+                modified.append({
+                    'id': change.id,
+                    'type': change.new['type'],
+                    'changes': changes
+                })
+                total_property_changes += len(changes)
         
         # Diff canvas settings
         old_settings = old_data.get('project_settings', {})
@@ -470,40 +471,38 @@ class VersionService:
                 'added_count': len(added),
                 'removed_count': len(removed),
                 'modified_count': len(modified),
-            }
+            },
+            'patch': diff.patch(),
         }
     
     def _diff_component(
         self,
         old_comp: Dict[str, Any],
-        new_comp: Dict[str, Any]
+        new_comp: Dict[str, Any],
+        change: Optional[NodeChange] = None
     ) -> List[Dict[str, Any]]:
         """
         Get property-level differences between two components.
         """
+        if change is None:
+            change = NodeChange(old_comp.get('id'), old_comp, new_comp, diff_value(old_comp, new_comp))
         changes = []
         
         old_props = old_comp.get('properties', {})
         new_props = new_comp.get('properties', {})
         
-        all_keys = set(old_props.keys()) | set(new_props.keys())
-        
-        for key in all_keys:
-            old_val = old_props.get(key)
-            new_val = new_props.get(key)
-            
-            if old_val != new_val:
-                changes.append({
-                    'property': key,
-                    'old_value': old_val,
-                    'new_value': new_val,
-                    'type': 'modified' if key in old_props and key in new_props
-                           else 'added' if key not in old_props
-                           else 'removed'
-                })
+        for key in change.changed_keys('properties'):
+            changes.append({
+                'property': key,
+                'old_value': old_props.get(key),
+                'new_value': new_props.get(key),
+                'type': 'modified' if key in old_props and key in new_props
+                       else 'added' if key not in old_props
+                       else 'removed'
+            })
         
         # Check z_index
-        if old_comp.get('z_index') != new_comp.get('z_index'):
+        if 'z_index' in change.changed_keys():
             changes.append({
                 'property': 'z_index',
                 'old_value': old_comp.get('z_index'),
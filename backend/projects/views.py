@@ -94,11 +94,7 @@ class ProjectViewSet(viewsets.ModelViewSet):
             next_version = (latest_version.version_number + 1) if latest_version else 1
             
             # Cap max versions per project (keep last 50)
-            version_count = project.versions.count()
-            if version_count >= 50:
-                oldest = project.versions.order_by('version_number').first()
-                if oldest:
-                    oldest.delete()
+            ProjectVersion.prune(project, keep=49)
             
             ProjectVersion.objects.create(
                 project=project,
@@ -172,7 +168,7 @@ class ProjectViewSet(viewsets.ModelViewSet):
     def versions(self, request, pk=None):
         """Get all versions of a project"""
         project = self.get_object()
-        versions = project.versions.all()
+        versions = ProjectVersion.prefetch_design_data(project.versions.all())
         serializer = ProjectVersionSerializer(versions, many=True)
         return Response(serializer.data)
     
@@ -0,0 +1,167 @@
+"""
+Write-behind persistence for append-only collaboration rows.
+
+Canvas edits and chat messages are history: nothing reads them back on
+the hot path, so the consumers hand unsaved model instances to a
+per-process ``BulkWriteBuffer`` instead of calling ``objects.create``
+per WebSocket message.  The buffer writes them with one ``bulk_create``
+every ``flush_ms`` or as soon as ``batch_size`` rows are queued, and
+only one flush per buffer runs at a time, so a burst of edits occupies
+one thread-pool slot instead of one per message.
+
+When more than ``max_pending`` rows are waiting (the database is slower
+than the producers), ``add`` waits for the running flush; that is the
+only point where a consumer is slowed down.  ``stats()`` reports queue
+depth, flush latency and how often producers had to wait.
+
+Buffers are flushed when a connection closes and, synchronously, when
+the process exits.
+"""
+
+import asyncio
+import atexit
+import logging
+import time
+from typing import Optional
+
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FLUSH_MS = 200
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_MAX_PENDING = 5000
+
+_buffers: dict[str, 'BulkWriteBuffer'] = {}
+
+
+class BulkWriteBuffer:
+    """Batch unsaved instances of one model into ``bulk_create`` calls."""
+
+    def __init__(self, model, flush_ms: int = DEFAULT_FLUSH_MS,
+                 batch_size: int = DEFAULT_BATCH_SIZE,
+                 max_pending: int = DEFAULT_MAX_PENDING):
+        self.model = model
+        self.interval = flush_ms / 1000
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self.pending: list = []
+        self._handle: Optional[asyncio.TimerHandle] = None
+        self._flushing: Optional[asyncio.Task] = None
+        self._stats = {
+            'queued': 0,
+            'written': 0,
+            'failed': 0,
+            'flushes': 0,
+            'backpressure_waits': 0,
+            'max_pending': 0,
+            'last_flush_ms': 0.0,
+            'max_flush_ms': 0.0,
+        }
+
+    async def add(self, instance):
+        """Queue an unsaved instance; waits only when the queue is full."""
+        while len(self.pending) >= self.max_pending and self._flushing is not None:
+            self._stats['backpressure_waits'] += 1
+            await asyncio.shield(self._flushing)
+
+        self.pending.append(instance)
+        self._stats['queued'] += 1
+        self._stats['max_pending'] = max(self._stats['max_pending'], len(self.pending))
+
+        if len(self.pending) >= self.batch_size:
+            self._start_flush()
+        elif self._handle is None and self._flushing is None:
+            loop = asyncio.get_running_loop()
+            self._handle = loop.call_later(self.interval, self._start_flush)
+
+    def _start_flush(self):
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        if self._flushing is None and self.pending:
+            self._flushing = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        try:
+            while self.pending:
+                batch = self.pending[:self.batch_size]
+                del self.pending[:self.batch_size]
+                await self._write(batch)
+        finally:
+            self._flushing = None
+
+    async def _write(self, batch: list):
+        started = time.perf_counter()
+        await database_sync_to_async(self._bulk_write)(batch)
+        elapsed = (time.perf_counter() - started) * 1000
+        self._stats['flushes'] += 1
+        self._stats['last_flush_ms'] = elapsed
+        self._stats['max_flush_ms'] = max(self._stats['max_flush_ms'], elapsed)
+
+    def _bulk_write(self, batch: list):
+        """
+        ``bulk_create`` a batch; when it fails, write it again in halves so
+        only the rows that cannot be written (e.g. their project was deleted
+        while they were queued) are lost.
+        """
+        try:
+            with transaction.atomic():
+                self.model.objects.bulk_create(batch)
+            self._stats['written'] += len(batch)
+        except Exception:
+            if len(batch) > 1:
+                middle = len(batch) // 2
+                self._bulk_write(batch[:middle])
+                self._bulk_write(batch[middle:])
+                return
+            self._stats['failed'] += 1
+            logger.exception('Write-behind of a %s row failed', self.model.__name__)
+
+    async def flush(self):
+        """Write everything queued so far."""
+        while self._flushing is not None or self.pending:
+            self._start_flush()
+            if self._flushing is not None:
+                await asyncio.shield(self._flushing)
+
+    def flush_sync(self):
+        """Write leftovers without an event loop (process exit)."""
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        batch, self.pending = self.pending, []
+        for start in range(0, len(batch), self.batch_size):
+            self._bulk_write(batch[start:start + self.batch_size])
+
+    def stats(self) -> dict:
+        return {**self._stats, 'pending': len(self.pending), 'flushing': self._flushing is not None}
+
+
+def get_write_buffer(model) -> BulkWriteBuffer:
+    """The process-wide buffer for ``model``, sized from settings."""
+    key = model._meta.label
+    if key not in _buffers:
+        _buffers[key] = BulkWriteBuffer(
+            model,
+            flush_ms=getattr(settings, 'COLLAB_WRITE_BUFFER_FLUSH_MS', DEFAULT_FLUSH_MS),
+            batch_size=getattr(settings, 'COLLAB_WRITE_BUFFER_BATCH_SIZE', DEFAULT_BATCH_SIZE),
+            max_pending=getattr(settings, 'COLLAB_WRITE_BUFFER_MAX_PENDING', DEFAULT_MAX_PENDING),
+        )
+    return _buffers[key]
+
+
+def write_buffer_stats() -> dict[str, dict]:
+    """Backpressure metrics of every buffer in this process, by model label."""
+    return {label: buffer.stats() for label, buffer in _buffers.items()}
+
+
+@atexit.register
+def flush_all_sync():
+    for buffer in _buffers.values():
+        try:
+            buffer.flush_sync()
+        except Exception:
+            logger.exception('Final write-behind of %s failed', buffer.model.__name__)
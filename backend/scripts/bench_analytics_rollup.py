@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+"""
+Analytics Rollup Benchmark
+Seeds synthetic users, projects and AI usage into a throwaway test
+database and reports queries and time for the nightly rollup tasks.
+Query counts should depend on the number of chunks, not users.
+Run: python scripts/bench_analytics_rollup.py [--users 100 1000 5000]
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import timedelta
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.db.models.signals import post_save  # noqa: E402
+from django.test.utils import CaptureQueriesContext, setup_test_environment  # noqa: E402
+from django.utils import timezone  # noqa: E402
+
+
+class DisableMigrations:
+    def __contains__(self, item):
+        return True
+
+    def __getitem__(self, item):
+        return None
+
+
+def seed(count, offset):
+    from django.contrib.auth.models import User
+    from analytics.models import AIUsageMetrics
+    from projects.models import DesignComponent, Project
+
+    yesterday = timezone.now() - timedelta(days=1)
+    # Bypass analytics signals; we only want the raw rows.
+    receivers, post_save.receivers = post_save.receivers, []
+    try:
+        users = User.objects.bulk_create([
+            User(username=f'bench{offset + i}', password='!') for i in range(count)
+        ])
+        projects = Project.objects.bulk_create([
+            Project(user=u, name=f'bench{u.pk}', created_at=yesterday, updated_at=yesterday)
+            for u in users
+        ])
+        DesignComponent.objects.bulk_create([
+            DesignComponent(project=p, component_type='shape', ai_generated=bool(i % 2))
+            for p in projects for i in range(3)
+        ])
+        AIUsageMetrics.objects.bulk_create([
+            AIUsageMetrics(user=u, service_type='color_palette', tokens_used=120,
+                           estimated_cost=0.01, model_used='bench', request_duration_ms=5)
+            for u in users
+        ])
+        AIUsageMetrics.objects.filter(model_used='bench').update(timestamp=yesterday)
+    finally:
+        post_save.receivers = receivers
+
+
+def run(task):
+    with CaptureQueriesContext(connection) as ctx:
+        started = time.perf_counter()
+        task.apply().get()
+        elapsed = time.perf_counter() - started
+    return len(ctx.captured_queries), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, nargs='+', default=[100, 1000, 5000])
+    args = parser.parse_args()
+
+    from analytics.models import DailyUsageStats, ProjectAnalytics
+    from analytics.tasks import aggregate_project_analytics, generate_daily_analytics
+
+    settings.MIGRATION_MODULES = DisableMigrations()
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, serialize=False)
+    try:
+        seeded = 0
+        print(f'{"users":>8}{"daily queries":>16}{"daily s":>10}{"project queries":>18}{"project s":>12}')
+        for total in sorted(args.users):
+            seed(total - seeded, seeded)
+            seeded = total
+            DailyUsageStats.objects.all().delete()
+            ProjectAnalytics.objects.all().delete()
+            daily_queries, daily_time = run(generate_daily_analytics)
+            project_queries, project_time = run(aggregate_project_analytics)
+            print(f'{total:>8}{daily_queries:>16}{daily_time:>10.2f}'
+                  f'{project_queries:>18}{project_time:>12.2f}')
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
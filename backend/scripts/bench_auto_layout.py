@@ -0,0 +1,169 @@
+#!/usr/bin/env python
+"""
+Auto-Layout Tree Benchmark
+Builds two hierarchies of about ``--nodes`` frames and children in a
+throwaway test database and lays each one out from its root frame.
+
+deep – a chain of nested frames, each holding ``--leaves`` fixed children
+wide – one root holding sqrt(nodes) nested frames of equal size
+
+per-frame – the previous engine: one children query per frame, one UPDATE
+            per child, nested frames walked through ``child_frames``
+cold      – auto_layout.layout_tree with no stored boxes: two loads of
+            the root's subtree, every row written by one bulk UPDATE
+            (999-parameter batches on SQLite)
+warm      – the same again: boxes match the stored ones, nothing written
+edit      – the loaded tree after widening the last leaf of the last
+            frame; only the frames on its path are re-arranged
+Run: python scripts/bench_auto_layout.py [--nodes 5000] [--leaves 9]
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test.utils import CaptureQueriesContext, setup_test_environment  # noqa: E402
+
+
+class DisableMigrations:
+    def __contains__(self, item):
+        return True
+
+    def __getitem__(self, item):
+        return None
+
+
+def build(project, shape, frames, leaves):
+    """Create ``frames`` nested frames plus leaves; returns the root."""
+    from auto_layout.models import AutoLayoutChild, AutoLayoutFrame
+    from projects.models import DesignComponent
+
+    components = DesignComponent.objects.bulk_create([
+        DesignComponent(project=project, component_type='frame') for _ in range(frames)
+    ])
+    nodes = []
+    for i, component in enumerate(components):
+        if i == 0:
+            parent = None
+        else:
+            parent = nodes[i - 1] if shape == 'deep' else nodes[0]
+        nodes.append(AutoLayoutFrame(
+            project=project, component=component, parent_frame=parent,
+            direction='horizontal' if i % 2 else 'vertical', item_spacing=8,
+            padding_top=4, padding_right=4, padding_bottom=4, padding_left=4,
+        ))
+    AutoLayoutFrame.objects.bulk_create(nodes)
+
+    rows = []
+    for i, frame in enumerate(nodes):
+        for j in range(leaves):
+            rows.append(AutoLayoutChild(
+                parent_frame=frame, order=j, horizontal_sizing='fixed', vertical_sizing='fixed',
+                fixed_width=20 + j, fixed_height=10 + j % 3,
+            ))
+        if frame.parent_frame_id:
+            rows.append(AutoLayoutChild(parent_frame=frame.parent_frame, component=frame.component, order=leaves + i))
+    AutoLayoutChild.objects.bulk_create(rows, batch_size=500)
+    return nodes[0], len(nodes) + len(rows)
+
+
+def per_frame(root, viewport=(1920, 1080)):
+    from auto_layout.layout_tree import LayoutTree
+    from auto_layout.models import AutoLayoutChild
+
+    pending = [root]
+    while pending:
+        frame = pending.pop()
+        children = list(frame.children.filter(visible=True).order_by('order'))
+        tree = LayoutTree(frame, [frame], children, *viewport)
+        tree.compute()
+        for child_id, pos in tree.result()['children'].items():
+            AutoLayoutChild.objects.filter(id=child_id).update(
+                computed_x=pos['x'], computed_y=pos['y'],
+                computed_width=pos['width'], computed_height=pos['height'],
+            )
+        pending.extend(frame.child_frames.all())
+
+
+def whole_tree(root):
+    from auto_layout.layout_tree import LayoutTree
+
+    tree = LayoutTree.load(root)
+    tree.compute()
+    tree.save()
+    return tree
+
+
+def measured(func):
+    # The query log holds 9000 entries; per-frame runs overflow a shared one
+    connection.queries_log.clear()
+    with CaptureQueriesContext(connection) as ctx:
+        started = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - started
+    return result, len(ctx.captured_queries), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--nodes', type=int, default=5000)
+    parser.add_argument('--leaves', type=int, default=9)
+    args = parser.parse_args()
+
+    from django.contrib.auth.models import User
+    from auto_layout.models import AutoLayoutChild
+    from projects.models import Project
+
+    settings.MIGRATION_MODULES = DisableMigrations()
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, serialize=False)
+    try:
+        user = User.objects.create(username='bench', password='!')
+        print(f'{"tree":<6}{"nodes":>7}{"method":>11}{"queries":>10}{"ms":>10}{"arranged":>10}')
+        for shape in ('deep', 'wide'):
+            frames = args.nodes // (args.leaves + 2)
+            leaves = args.leaves
+            if shape == 'wide':
+                frames = int(args.nodes ** 0.5)
+                leaves = args.nodes // frames - 2
+            project = Project.objects.create(user=user, name=f'bench {shape}')
+            root, nodes = build(project, shape, frames, leaves)
+
+            _, queries, elapsed = measured(lambda: per_frame(root))
+            print(f'{shape:<6}{nodes:>7,}{"per-frame":>11}{queries:>10,}{elapsed * 1000:>10.1f}{frames:>10,}')
+            AutoLayoutChild.objects.filter(parent_frame__project=project).update(
+                computed_x=None, computed_y=None, computed_width=None, computed_height=None,
+            )
+
+            for method in ('cold', 'warm'):
+                tree, queries, elapsed = measured(lambda: whole_tree(root))
+                print(f'{"":<6}{"":>7}{method:>11}{queries:>10,}{elapsed * 1000:>10.1f}{len(tree.nodes):>10,}')
+
+            last = list(tree.nodes.values())[-1]
+            leaf = last.children[leaves - 1]
+
+            def edit():
+                tree.update_child(leaf.id, fixed_width=leaf.fixed_width + 40)
+                arranged = tree.compute()
+                tree.save()
+                return arranged
+
+            arranged, queries, elapsed = measured(edit)
+            print(f'{"":<6}{"":>7}{"edit":>11}{queries:>10,}{elapsed * 1000:>10.1f}{arranged:>10,}')
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
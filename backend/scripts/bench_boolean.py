@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+"""
+Boolean Union Benchmark
+Merges an icon set: ``--icons`` icons laid out on a grid, each made of
+``--shapes`` overlapping circles and rounded rectangles (arcs in the
+path data), so no icon touches another.
+
+concat    – the previous union: path commands concatenated, overlaps left in
+pairwise  – Clipper union folded one path at a time, re-flattening the
+            growing result each step (chaining binary operations)
+one pass  – every operand in a single Clipper call, no prefilter
+clipping  – vector_editing.clipping.union: bbox groups, one call per group,
+            isolated operands passed through
++ refit   – the same with cubics fitted back onto the output
+
+``area`` is the filled area of the result (nonzero rule); overlapping
+shapes counted twice show up as a larger value.
+Run: python scripts/bench_boolean.py [--icons 80] [--shapes 5]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+import pyclipper  # noqa: E402
+
+from vector_editing import clipping, curves  # noqa: E402
+from vector_editing.path_ir import CLOSE, compile_path  # noqa: E402
+from vector_editing.services import SVGPathParser  # noqa: E402
+
+
+def circle(cx, cy, r):
+    return f'M{cx - r:.2f} {cy:.2f}A{r:.2f} {r:.2f} 0 1 1 {cx + r:.2f} {cy:.2f}A{r:.2f} {r:.2f} 0 1 1 {cx - r:.2f} {cy:.2f}Z'
+
+
+def rounded_rect(x, y, w, h, r):
+    return (f'M{x + r:.2f} {y:.2f}H{x + w - r:.2f}A{r} {r} 0 0 1 {x + w:.2f} {y + r:.2f}'
+            f'V{y + h - r:.2f}A{r} {r} 0 0 1 {x + w - r:.2f} {y + h:.2f}H{x + r:.2f}'
+            f'A{r} {r} 0 0 1 {x:.2f} {y + h - r:.2f}V{y + r:.2f}A{r} {r} 0 0 1 {x + r:.2f} {y:.2f}Z')
+
+
+def make_icon_set(icons: int, shapes: int) -> list:
+    rng = random.Random(11)
+    columns = max(1, int(icons ** 0.5))
+    paths = []
+    for i in range(icons):
+        ox, oy = (i % columns) * 40, (i // columns) * 40
+        for _ in range(shapes):
+            if rng.random() < 0.5:
+                paths.append(circle(ox + rng.uniform(10, 22), oy + rng.uniform(10, 22), rng.uniform(4, 8)))
+            else:
+                w, h = rng.uniform(8, 16), rng.uniform(8, 16)
+                paths.append(rounded_rect(ox + rng.uniform(4, 30 - w), oy + rng.uniform(4, 30 - h), w, h, 2))
+    return paths
+
+
+def concat_union(paths):
+    commands = []
+    for path in paths:
+        commands.extend(SVGPathParser.parse(path))
+    return SVGPathParser.generate(commands)
+
+
+def pairwise_union(paths):
+    result = paths[0]
+    for path in paths[1:]:
+        merged = clipping._execute(
+            pyclipper.CT_UNION, [clipping.Operand(result), clipping.Operand(path)], [], 'nonzero',
+        )
+        result = clipping.solution_to_path(merged)
+    return result
+
+
+def one_pass_union(paths):
+    operands = [clipping.Operand(path) for path in paths]
+    return clipping.solution_to_path(clipping._execute(pyclipper.CT_UNION, operands, [], 'nonzero'))
+
+
+def filled_area(path_data):
+    codes, coords = curves.flatten(compile_path(path_data), tolerance=0.01)
+    rings = [[]]
+    points = iter(coords.reshape(-1, 2).tolist())
+    for code in codes.tolist():
+        if code == CLOSE:
+            rings.append([])
+        else:
+            rings[-1].append(next(points))
+    scaled = [[(round(x * 1000), round(y * 1000)) for x, y in ring] for ring in rings if len(ring) >= 3]
+    clipper = pyclipper.Pyclipper()
+    clipper.AddPaths(scaled, pyclipper.PT_SUBJECT, True)
+    solution = clipper.Execute(pyclipper.CT_UNION, pyclipper.PFT_NONZERO, pyclipper.PFT_NONZERO)
+    flattened_overlaps = sum(abs(pyclipper.Area(ring)) for ring in scaled)
+    return sum(pyclipper.Area(ring) for ring in solution) / 1e6, flattened_overlaps / 1e6
+
+
+def timed(func, paths, repeat):
+    best = float('inf')
+    result = ''
+    for _ in range(repeat):
+        clipping._polygonize.cache_clear()
+        started = time.perf_counter()
+        result = func(paths)
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--icons', type=int, default=80)
+    parser.add_argument('--shapes', type=int, default=5)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    paths = make_icon_set(args.icons, args.shapes)
+    cases = [
+        ('concat', concat_union),
+        ('pairwise', pairwise_union),
+        ('one pass', one_pass_union),
+        ('clipping', clipping.union),
+        ('+ refit', lambda p: clipping.union(p, refit=True)),
+    ]
+
+    print(f'{len(paths)} shapes in {args.icons} icons')
+    print(f'{"method":<10}{"ms":>10}{"bytes":>10}{"area":>12}{"ring area":>12}')
+    for name, func in cases:
+        elapsed, result = timed(func, paths, args.repeat)
+        area, ring_area = filled_area(result)
+        print(f'{name:<10}{elapsed * 1000:>10.1f}{len(result):>10,}{area:>12,.1f}{ring_area:>12,.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+"""
+CRDT Wire Format Benchmark
+Compares the JSON protocol with the compact msgpack frames for a drag
+burst (many ``set x/y`` ops from a few sessions).
+Run: python scripts/bench_crdt_wire.py [--ops 20000]
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from projects.crdt_engine import CRDTClock, CRDTOperation  # noqa: E402
+from projects.crdt_wire import MSGPACK_AVAILABLE, decode_frame, encode_ops_frame  # noqa: E402
+
+FRAME_SIZE = 20  # ops per broadcast frame
+
+
+def make_ops(count: int) -> list[CRDTOperation]:
+    sessions = [f'session-{i:02d}-3f2a9c1e-7d4b-4e0a-9b61' for i in range(4)]
+    now = int(time.time() * 1000)
+    return [
+        CRDTOperation(
+            op_type='set',
+            element_id=f'rect-{i % 50}',
+            prop='x' if i % 2 else 'y',
+            value=round(100 + i * 0.5, 2),
+            clock=CRDTClock(now + i // 4, i % 4, sessions[i % len(sessions)]),
+            origin=sessions[i % len(sessions)],
+        )
+        for i in range(count)
+    ]
+
+
+def frames(ops):
+    for start in range(0, len(ops), FRAME_SIZE):
+        yield ops[start:start + FRAME_SIZE]
+
+
+def bench_json(ops):
+    total_bytes = 0
+    started = time.perf_counter()
+    for chunk in frames(ops):
+        payload = json.dumps({
+            'type': 'crdt_ops', 'ops': [op.to_dict() for op in chunk],
+            'version': 1, 'origin': chunk[0].origin,
+        })
+        total_bytes += len(payload.encode())
+        [CRDTOperation.from_dict(d) for d in json.loads(payload)['ops']]
+    return time.perf_counter() - started, total_bytes
+
+
+def bench_binary(ops):
+    total_bytes = 0
+    started = time.perf_counter()
+    for chunk in frames(ops):
+        payload = encode_ops_frame(chunk, 1, chunk[0].origin)
+        total_bytes += len(payload)
+        decode_frame(payload)
+    return time.perf_counter() - started, total_bytes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--ops', type=int, default=20000)
+    args = parser.parse_args()
+
+    ops = make_ops(args.ops)
+    results = {'json': bench_json(ops)}
+    if MSGPACK_AVAILABLE:
+        results['msgpack'] = bench_binary(ops)
+    else:
+        print('msgpack not installed — skipping binary format')
+
+    print(f'{"format":<10}{"ops/sec":>14}{"bytes/op":>12}')
+    for name, (elapsed, total_bytes) in results.items():
+        print(f'{name:<10}{args.ops / elapsed:>14,.0f}{total_bytes / args.ops:>12.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,193 @@
+#!/usr/bin/env python
+"""
+Curve Kernel Benchmark
+Times flatten, bounds and length on icon-like paths of ``--segments``
+cubic/line segments (closed blobs of 8-24 segments each).
+
+loop   – the per-command Python loops VectorService used before:
+         VectorMath.bezier_point per sample, 20 chords per cubic for
+         length, control/end points for bounds
+kernel – vector_editing.curves on the same compiled path
+
+The compile step is cached and excluded from both.  ``error`` compares
+each result with a dense 20k-sample reference.
+Run: python scripts/bench_curves.py [--segments 10000] [--repeat 5]
+"""
+import argparse
+import math
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+import numpy as np  # noqa: E402
+
+from vector_editing import curves  # noqa: E402
+from vector_editing.path_ir import CLOSE, CUBIC, LINE, MOVE, compile_path  # noqa: E402
+from vector_editing.services import SVGPathParser, VectorMath, VectorService  # noqa: E402
+
+
+def make_icon_path(segments: int) -> str:
+    rng = random.Random(7)
+    parts = []
+    drawn = 0
+    while drawn < segments:
+        count = min(rng.randint(8, 24), segments - drawn)
+        cx, cy = rng.uniform(0, 1000), rng.uniform(0, 1000)
+        radius = rng.uniform(5, 40)
+        angles = sorted(rng.uniform(0, 2 * math.pi) for _ in range(count))
+        ring = [(cx + radius * math.cos(a), cy + radius * math.sin(a)) for a in angles]
+        parts.append(f'M{ring[0][0]:.2f} {ring[0][1]:.2f}')
+        for (x0, y0), (x1, y1) in zip(ring, ring[1:] + ring[:1]):
+            if rng.random() < 0.7:
+                bulge = rng.uniform(-0.6, 0.6)
+                nx, ny = -(y1 - y0) * bulge, (x1 - x0) * bulge
+                parts.append(
+                    f'C{x0 + (x1 - x0) / 3 + nx:.2f} {y0 + (y1 - y0) / 3 + ny:.2f} '
+                    f'{x0 + 2 * (x1 - x0) / 3 + nx:.2f} {y0 + 2 * (y1 - y0) / 3 + ny:.2f} {x1:.2f} {y1:.2f}'
+                )
+            else:
+                parts.append(f'L{x1:.2f} {y1:.2f}')
+        parts.append('Z')
+        drawn += count
+    return ''.join(parts)
+
+
+def loop_flatten(compiled, segments_per_curve=10):
+    new_commands = []
+    current = (0, 0)
+    for code, values in compiled.commands():
+        if code == MOVE:
+            new_commands.append({'command': 'M', 'params': list(values)})
+            current = values
+        elif code == LINE:
+            new_commands.append({'command': 'L', 'params': list(values)})
+            current = values
+        elif code == CUBIC:
+            p1, p2, p3 = values[0:2], values[2:4], values[4:6]
+            for i in range(1, segments_per_curve + 1):
+                point = VectorMath.bezier_point(current, p1, p2, p3, i / segments_per_curve)
+                new_commands.append({'command': 'L', 'params': [point[0], point[1]]})
+            current = p3
+        elif code == CLOSE:
+            new_commands.append({'command': 'Z', 'params': []})
+    return SVGPathParser.generate(new_commands)
+
+
+def loop_bounds(compiled):
+    xs = compiled.vertices[:, 0].tolist()
+    ys = compiled.vertices[:, 1].tolist()
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def loop_length(compiled):
+    total = 0
+    current = start = (0, 0)
+    for code, values in compiled.commands():
+        if code == MOVE:
+            current = start = values
+        elif code == LINE:
+            total += VectorMath.distance(current, values)
+            current = values
+        elif code == CUBIC:
+            p1, p2, p3 = values[0:2], values[2:4], values[4:6]
+            prev = current
+            for i in range(1, 21):
+                point = VectorMath.bezier_point(current, p1, p2, p3, i / 20)
+                total += VectorMath.distance(prev, point)
+                prev = point
+            current = p3
+        elif code == CLOSE:
+            total += VectorMath.distance(current, start)
+            current = start
+    return total
+
+
+def reference(compiled):
+    points = curves.segments(compiled).points
+    t = np.linspace(0, 1, 20001)
+    length, lows, highs = 0.0, [], []
+    for chunk in range(0, len(points), 500):
+        dense = curves.evaluate(points[chunk:chunk + 500], t)
+        length += np.linalg.norm(np.diff(dense, axis=1), axis=-1).sum()
+        lows.append(dense.reshape(-1, 2).min(axis=0))
+        highs.append(dense.reshape(-1, 2).max(axis=0))
+    return (*np.min(lows, axis=0), *np.max(highs, axis=0)), length
+
+
+def timed(func, repeat):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        curves_cache_reset()
+        started = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def curves_cache_reset():
+    # Segments are memoized on the compiled path; time building them too
+    compile_path(PATH)._segments = None
+
+
+PATH = ''
+
+
+def main():
+    global PATH
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--segments', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--tolerance', type=float, default=0.1)
+    args = parser.parse_args()
+
+    PATH = make_icon_path(args.segments)
+    compiled = compile_path(PATH)
+    ref_bounds, ref_length = reference(compiled)
+
+    cases = [
+        ('flatten', lambda: loop_flatten(compiled),
+         lambda: VectorService.flatten_beziers(PATH), None),
+        ('flatten~', None,
+         lambda: VectorService.flatten_beziers(PATH, tolerance=args.tolerance), None),
+        ('bounds', lambda: loop_bounds(compiled),
+         lambda: curves.bounds(compiled),
+         lambda b: max(abs(x - y) for x, y in zip(b, ref_bounds))),
+        ('length', lambda: loop_length(compiled),
+         lambda: curves.path_length(compiled),
+         lambda n: abs(n - ref_length)),
+    ]
+
+    print(f'{args.segments:,} segments, {len(PATH):,} bytes of path data '
+          f'(flatten~ is adaptive at tolerance {args.tolerance:g})')
+    print(f'{"operation":<10}{"loop ms":>10}{"kernel ms":>12}{"speedup":>10}{"loop error":>13}{"kernel error":>15}')
+    for name, loop_func, kernel_func, error in cases:
+        kernel_time, kernel_result = timed(kernel_func, args.repeat)
+        if loop_func is None:
+            points = kernel_result.count('L')
+            print(f'{name:<10}{"":>10}{kernel_time * 1000:>12.2f}{"":>10}{f"{points:,} pts":>13}')
+            continue
+        loop_time, loop_result = timed(loop_func, args.repeat)
+        errors = ''
+        if error is not None:
+            errors = f'{error(loop_result):>13.4f}{error(kernel_result):>15.6f}'
+        else:
+            # Same points; sums in a different order can round a last digit apart
+            drift = np.abs(compile_path(loop_result).vertices - compile_path(kernel_result).vertices).max()
+            assert drift < 2e-3, drift
+        print(f'{name:<10}{loop_time * 1000:>10.2f}{kernel_time * 1000:>12.2f}'
+              f'{loop_time / kernel_time:>9.1f}x{errors}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+"""
+Design Diff Benchmark
+Compares two versions of a ``--nodes`` component document in which
+``--changes`` components were edited, one added and one removed.
+
+legacy  – the previous VersionService._compute_diff loop, on documents
+          freshly decoded from JSON (as loaded from two JSON columns)
+engine  – projects.design_diff on the same documents
+shared  – the engine on documents whose unchanged components are shared
+          objects, as ObjectStore.read_many returns two snapshots
+hashed  – the engine with both sides' node hashes already cached, as
+          for commits compared before
+Also reports the size of the patch against the document and the time to
+apply and revert it.
+Run: python scripts/bench_design_diff.py [--nodes 10000] [--changes 20]
+"""
+import argparse
+import copy
+import json
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+
+def legacy_diff(old_data, new_data):
+    """VersionService._compute_diff before the shared engine."""
+    old_components = {c['id']: c for c in old_data.get('components', [])}
+    new_components = {c['id']: c for c in new_data.get('components', [])}
+    old_ids, new_ids = set(old_components), set(new_components)
+    added = [new_components[i] for i in new_ids - old_ids]
+    removed = [old_components[i] for i in old_ids - new_ids]
+    modified = []
+    for comp_id in old_ids & new_ids:
+        old_comp, new_comp = old_components[comp_id], new_components[comp_id]
+        if old_comp != new_comp:
+            old_props, new_props = old_comp.get('properties', {}), new_comp.get('properties', {})
+            changes = [key for key in set(old_props) | set(new_props) if old_props.get(key) != new_props.get(key)]
+            modified.append({'id': comp_id, 'changes': changes})
+    return added, removed, modified
+
+
+def make_component(i, rng):
+    return {
+        'id': f'c{i}', 'type': rng.choice(['rect', 'text', 'frame']), 'z_index': i, 'ai_generated': False,
+        'properties': {
+            'position': {'x': rng.randint(0, 4000), 'y': rng.randint(0, 4000)},
+            'size': {'width': rng.randint(10, 400), 'height': rng.randint(10, 400)},
+            'fill': {'type': 'solid', 'color': '#%06x' % rng.randrange(1 << 24), 'opacity': 1},
+            'stroke': {'color': '#000000', 'width': 1},
+            'effects': [{'type': 'shadow', 'blur': 4, 'x': 0, 'y': 2}],
+            'text': 'Lorem ipsum dolor sit amet ' * rng.randint(0, 3),
+        },
+    }
+
+
+def timed(func, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - started)
+    return result, best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--nodes', type=int, default=10000)
+    parser.add_argument('--changes', type=int, default=20)
+    args = parser.parse_args()
+
+    from projects.design_diff import apply_patch, diff_documents, node_hashes, revert_patch
+    from projects.version_models import VersionService
+
+    rng = random.Random(11)
+    old = {'components': [make_component(i, rng) for i in range(args.nodes)], 'project_settings': {'name': 'bench'}}
+    # Unchanged components are shared, like two snapshots read together
+    shared_new = dict(old, components=list(old['components']))
+    for index in rng.sample(range(1, args.nodes), args.changes):
+        component = copy.deepcopy(shared_new['components'][index])
+        component['properties']['position']['x'] += 1
+        shared_new['components'][index] = component
+    shared_new['components'].pop(0)
+    shared_new['components'].append(make_component(args.nodes, rng))
+
+    old_encoded, new_encoded = json.dumps(old), json.dumps(shared_new)
+    fresh_old, fresh_new = json.loads(old_encoded), json.loads(new_encoded)
+    old_hashes, new_hashes = node_hashes(fresh_old['components']), node_hashes(fresh_new['components'])
+    service = VersionService(project=None)
+
+    print(f'{args.nodes:,} components ({len(old_encoded) / 1e6:.1f} MB), '
+          f'{args.changes} edited, 1 added, 1 removed')
+    _, ms = timed(lambda: json.loads(old_encoded) and json.loads(new_encoded))
+    print(f'{"decode both":<28}{ms:>9.1f} ms')
+    _, ms = timed(lambda: legacy_diff(fresh_old, fresh_new))
+    print(f'{"legacy":<28}{ms:>9.1f} ms')
+    _, ms = timed(lambda: diff_documents(fresh_old, fresh_new, key='components'))
+    print(f'{"engine":<28}{ms:>9.1f} ms')
+    diff, ms = timed(lambda: diff_documents(old, shared_new, key='components'))
+    print(f'{"shared":<28}{ms:>9.1f} ms')
+    _, ms = timed(lambda: diff_documents(fresh_old, fresh_new, key='components',
+                                         old_hashes=old_hashes, new_hashes=new_hashes))
+    print(f'{"hashed":<28}{ms:>9.1f} ms')
+    _, ms = timed(lambda: node_hashes(fresh_new['components']), repeat=1)
+    print(f'{"  (hashing one side, cold)":<28}{ms:>9.1f} ms')
+    _, ms = timed(lambda: service._compute_diff(old, shared_new))
+    print(f'{"VersionService (shared)":<28}{ms:>9.1f} ms')
+
+    patch = diff.patch()
+    patched, apply_ms = timed(lambda: apply_patch(old, patch))
+    reverted, revert_ms = timed(lambda: revert_patch(shared_new, patch))
+    assert patched == shared_new and reverted == old
+    print(f'patch {len(json.dumps(patch)) / 1e3:.1f} kB against {len(new_encoded) / 1e6:.1f} MB; '
+          f'apply {apply_ms:.1f} ms, revert {revert_ms:.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+"""
+Design Sync Bytes-on-the-Wire Benchmark
+Compares full Fabric JSON snapshot broadcasts with JSON Patch deltas for
+typical canvas edits.  ``channel layer`` is what one sync publishes
+(the snapshot is sent once per collaborator); ``diff ms`` is the time
+to compute the delta on the server.
+Run: python scripts/bench_design_sync.py [--objects 4000] [--peers 10]
+"""
+import argparse
+import copy
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from projects.design_delta import canonical_json, make_delta  # noqa: E402
+
+
+def make_design(count: int) -> dict:
+    rng = random.Random(7)
+    objects = []
+    for i in range(count):
+        objects.append({
+            'id': f'obj-{i}',
+            'type': rng.choice(['rect', 'textbox', 'circle', 'path']),
+            'left': rng.uniform(0, 4000), 'top': rng.uniform(0, 4000),
+            'width': rng.uniform(10, 400), 'height': rng.uniform(10, 400),
+            'fill': f'#{rng.randrange(0xffffff):06x}', 'stroke': None, 'strokeWidth': 1,
+            'angle': 0, 'opacity': 1, 'scaleX': 1, 'scaleY': 1,
+            'text': 'Lorem ipsum dolor sit amet ' * rng.randint(0, 4),
+            'shadow': None, 'visible': True,
+        })
+    return {'version': '5.3.0', 'background': '#ffffff', 'objects': objects}
+
+
+def edits(design: dict):
+    def move_one(d):
+        d['objects'][123]['left'] += 15
+        d['objects'][123]['top'] -= 4
+
+    def recolor(d):
+        d['objects'][42]['fill'] = '#123456'
+
+    def add_one(d):
+        d['objects'].insert(500, {**d['objects'][0], 'id': 'new-1', 'left': 10})
+
+    def delete_one(d):
+        del d['objects'][777]
+
+    def move_selection(d):
+        for obj in d['objects'][1000:1020]:
+            obj['left'] += 30
+
+    def edit_text(d):
+        d['objects'][9]['text'] = 'Updated headline'
+
+    def bring_to_front(d):
+        d['objects'].append(d['objects'].pop(5))
+
+    return [
+        ('move one object', move_one),
+        ('recolor', recolor),
+        ('add object', add_one),
+        ('delete object', delete_one),
+        ('move 20 objects', move_selection),
+        ('edit text', edit_text),
+        ('bring to front', bring_to_front),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--objects', type=int, default=4000)
+    parser.add_argument('--peers', type=int, default=10)
+    args = parser.parse_args()
+
+    base = make_design(args.objects)
+    snapshot_bytes = len(json.dumps(base, separators=(',', ':')).encode())
+    print(f"{args.objects} objects, snapshot {snapshot_bytes / 1e6:.2f} MB, {args.peers} peers")
+    print(f"{'edit':<18}{'snapshot x peers':>18}{'delta':>12}{'x peers':>12}{'diff ms':>10}")
+
+    for name, edit in edits(base):
+        new = copy.deepcopy(base)
+        edit(new)
+        encoded = canonical_json(new)
+        started = time.perf_counter()
+        patch = make_delta(base, new, encoded)
+        elapsed = (time.perf_counter() - started) * 1000
+        full = len(encoded.encode()) * args.peers
+        if patch is None:
+            delta = 'snapshot'
+            per_peer = full
+        else:
+            size = len(json.dumps(patch, separators=(',', ':')).encode())
+            delta = f'{size:,} B'
+            per_peer = size * args.peers
+        print(f"{name:<18}{full:>16,} B{delta:>12}{per_peer:>10,} B{elapsed:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
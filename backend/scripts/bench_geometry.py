@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+"""
+Geometry Kernel Benchmark
+Compares the per-component Python loops the batch operations used before
+with the vectorized kernel for align, distribute and resize.  ``math ms``
+is the array math alone; the rest of the kernel time is reading and
+writing the JSON properties.
+Run: python scripts/bench_geometry.py [--components 10000]
+"""
+import argparse
+import copy
+import random
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from projects import geometry  # noqa: E402
+
+
+def make_properties(count: int) -> list[dict]:
+    rng = random.Random(42)
+    return [
+        {
+            'position': {'x': rng.randint(0, 4000), 'y': rng.randint(0, 4000)},
+            'size': {'width': rng.randint(10, 400), 'height': rng.randint(10, 400)},
+            'fill': '#ffffff',
+        }
+        for _ in range(count)
+    ]
+
+
+def _collect(props):
+    rows = []
+    for p in props:
+        pos = p.get('position', {'x': 0, 'y': 0})
+        size = p.get('size', {'width': 100, 'height': 100})
+        rows.append({
+            'props': p,
+            'x': pos.get('x', 0),
+            'y': pos.get('y', 0),
+            'width': size.get('width', 100),
+            'height': size.get('height', 100),
+        })
+    return rows
+
+
+def loop_align(props):
+    rows = _collect(props)
+    min_x = min(r['x'] for r in rows)
+    max_x = max(r['x'] + r['width'] for r in rows)
+    center_x = (min_x + max_x) / 2
+    for r in rows:
+        new_pos = r['props'].get('position', {'x': 0, 'y': 0}).copy()
+        new_pos['x'] = center_x - r['width'] / 2
+        r['props']['position'] = new_pos
+
+
+def loop_distribute(props):
+    rows = sorted(_collect(props), key=lambda r: r['x'])
+    start = rows[0]['x'] + rows[0]['width']
+    end = rows[-1]['x']
+    middle = sum(r['width'] for r in rows[1:-1])
+    gap = (end - start - middle) / (len(rows) - 1)
+    cursor = start + gap
+    for r in rows[1:-1]:
+        new_pos = r['props'].get('position', {'x': 0, 'y': 0}).copy()
+        new_pos['x'] = cursor
+        r['props']['position'] = new_pos
+        cursor += r['width'] + gap
+
+
+def loop_resize(props):
+    rows = _collect(props)
+    cx = sum(r['x'] + r['width'] / 2 for r in rows) / len(rows)
+    cy = sum(r['y'] + r['height'] / 2 for r in rows) / len(rows)
+    for r in rows:
+        new_w, new_h = r['width'] * 1.5, r['height'] * 1.5
+        new_cx = cx + (r['x'] + r['width'] / 2 - cx) * 1.5
+        new_cy = cy + (r['y'] + r['height'] / 2 - cy) * 1.5
+        r['props']['position'] = {'x': new_cx - new_w / 2, 'y': new_cy - new_h / 2}
+        r['props']['size'] = {'width': new_w, 'height': new_h}
+
+
+def kernel_align(props):
+    geometry.align(geometry.Boxes.from_properties(props), 'center').write_positions(props)
+
+
+def kernel_distribute(props):
+    boxes = geometry.Boxes.from_properties(props)
+    geometry.distribute(boxes, 'horizontal').write_positions(props)
+
+
+def kernel_resize(props):
+    boxes = geometry.Boxes.from_properties(props)
+    resized = geometry.scale(boxes, 1.5, 1.5, geometry.centroid(boxes))
+    resized.write_positions(props)
+    resized.write_sizes(props)
+
+
+def math_only(name, props, repeat):
+    """Time just the array math, excluding JSON extraction/writeback."""
+    boxes = geometry.Boxes.from_properties(props)
+    ops = {
+        'align': lambda: geometry.align(boxes, 'center'),
+        'distribute': lambda: geometry.distribute(boxes, 'horizontal'),
+        'resize': lambda: geometry.scale(boxes, 1.5, 1.5, geometry.centroid(boxes)),
+    }
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        ops[name]()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def timed(func, props, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        data = copy.deepcopy(props)
+        started = time.perf_counter()
+        func(data)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--components', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    props = make_properties(args.components)
+    cases = [
+        ('align', loop_align, kernel_align),
+        ('distribute', loop_distribute, kernel_distribute),
+        ('resize', loop_resize, kernel_resize),
+    ]
+
+    print(f'{"operation":<12}{"loop ms":>10}{"kernel ms":>12}{"math ms":>10}{"speedup":>10}')
+    for name, loop_func, kernel_func in cases:
+        loop_time = timed(loop_func, props, args.repeat)
+        kernel_time = timed(kernel_func, props, args.repeat)
+        math_time = math_only(name, props, args.repeat)
+        print(f'{name:<12}{loop_time * 1000:>10.2f}{kernel_time * 1000:>12.2f}'
+              f'{math_time * 1000:>10.2f}{loop_time / kernel_time:>9.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+"""
+Keyframe Interpolation Benchmark
+Samples ``--tracks`` tracks of 4-12 keyframes each (a mix of linear,
+hold, bezier and eased segments; scalar, 2D and colour values) at
+``--frames`` frames.
+
+loop   – a per-track, per-frame Python evaluator: bisect for the
+         keyframe, Newton/bisection for each eased sample
+engine – animation_timeline.interpolation.evaluate on the compiled
+         tracks, one call for every track and frame
+
+``compile`` is the one-off compile_tracks step.  ``error`` is the largest
+difference between the two.
+Run: python scripts/bench_interpolation.py [--tracks 1000] [--frames 600]
+"""
+import argparse
+import bisect
+import os
+import random
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+import numpy as np  # noqa: E402
+
+from animation_timeline.interpolation import (  # noqa: E402
+    EASING_PRESETS, compile_tracks, keyframe_vector, sample_frames,
+)
+
+FRAME_RATE = 60
+INTERPOLATIONS = ['linear', 'hold', 'bezier', 'ease', 'ease_in_out', 'ease_out']
+
+
+def make_tracks(count, duration):
+    rng = random.Random(5)
+    tracks = []
+    for track_id in range(count):
+        kind = rng.choice(['scalar', 'point', 'color'])
+        keyframes = []
+        for key_time in sorted(rng.uniform(0, duration) for _ in range(rng.randint(4, 12))):
+            if kind == 'scalar':
+                value = {'value': rng.uniform(0, 100)}
+            elif kind == 'point':
+                value = [rng.uniform(0, 1920), rng.uniform(0, 1080)]
+            else:
+                value = {'r': rng.randint(0, 255), 'g': rng.randint(0, 255), 'b': rng.randint(0, 255), 'a': 1}
+            keyframes.append(SimpleNamespace(
+                time=key_time, value=value, interpolation=rng.choice(INTERPOLATIONS),
+                handle_out_x=rng.random(), handle_out_y=rng.uniform(-0.5, 1.5),
+                handle_in_x=rng.random(), handle_in_y=rng.uniform(-0.5, 1.5),
+            ))
+        tracks.append(SimpleNamespace(id=track_id, keyframes=SimpleNamespace(all=lambda k=keyframes: k)))
+    return tracks
+
+
+def ease(progress, x1, y1, x2, y2):
+    def bezier(p1, p2, s):
+        return 3 * (1 - s) ** 2 * s * p1 + 3 * (1 - s) * s ** 2 * p2 + s ** 3
+
+    s = progress
+    for _ in range(8):
+        slope = 3 * (1 - s) ** 2 * x1 + 6 * (1 - s) * s * (x2 - x1) + 3 * s ** 2 * (1 - x2)
+        if abs(slope) < 1e-6:
+            break
+        s = min(max(s - (bezier(x1, x2, s) - progress) / slope, 0.0), 1.0)
+    if abs(bezier(x1, x2, s) - progress) > 1e-7:
+        low, high = 0.0, 1.0
+        for _ in range(30):
+            s = (low + high) / 2
+            if bezier(x1, x2, s) < progress:
+                low = s
+            else:
+                high = s
+        s = (low + high) / 2
+    return bezier(y1, y2, s)
+
+
+def loop_sample(tracks, frames):
+    results = []
+    for track in tracks:
+        keyframes = sorted(track.keyframes.all(), key=lambda keyframe: keyframe.time)
+        times = [keyframe.time for keyframe in keyframes]
+        vectors = [keyframe_vector(keyframe.value) for keyframe in keyframes]
+        rows = []
+        for frame in frames:
+            t = frame / FRAME_RATE
+            index = min(max(bisect.bisect_right(times, t) - 1, 0), len(times) - 1)
+            following = min(index + 1, len(times) - 1)
+            span = times[following] - times[index]
+            progress = min(max((t - times[index]) / span, 0.0), 1.0) if span > 0 else 0.0
+            keyframe = keyframes[index]
+            if keyframe.interpolation == 'hold':
+                progress = 0.0
+            elif keyframe.interpolation == 'bezier':
+                progress = ease(progress, min(max(keyframe.handle_out_x, 0), 1), keyframe.handle_out_y,
+                                min(max(keyframe.handle_in_x, 0), 1), keyframe.handle_in_y)
+            elif keyframe.interpolation in EASING_PRESETS:
+                progress = ease(progress, *EASING_PRESETS[keyframe.interpolation])
+            rows.append([a + (b - a) * progress for a, b in zip(vectors[index], vectors[following])])
+        results.append(rows)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--tracks', type=int, default=1000)
+    parser.add_argument('--frames', type=int, default=600)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    tracks = make_tracks(args.tracks, duration=args.frames / FRAME_RATE)
+    frames = range(args.frames)
+
+    started = time.perf_counter()
+    compiled = compile_tracks(tracks)
+    compile_ms = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    expected = loop_sample(tracks, frames)
+    loop_ms = (time.perf_counter() - started) * 1000
+
+    engine_ms = float('inf')
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        values = sample_frames(compiled, frames, FRAME_RATE)
+        engine_ms = min(engine_ms, (time.perf_counter() - started) * 1000)
+
+    error = max(
+        float(np.abs(values[i, :, :len(rows[0])] - np.array(rows)).max())
+        for i, rows in enumerate(expected)
+    )
+    samples = args.tracks * args.frames
+    print(f'{args.tracks:,} tracks x {args.frames} frames ({samples:,} samples), '
+          f'{len(compiled.times):,} keyframes')
+    print(f'{"compile":<10}{compile_ms:>10.1f} ms')
+    print(f'{"loop":<10}{loop_ms:>10.1f} ms')
+    print(f'{"engine":<10}{engine_ms:>10.1f} ms   {loop_ms / engine_ms:.0f}x   error {error:.2e}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+"""
+Collaboration Room State Load Test
+Drives the presence/cursor/lock traffic of one collaboration worker:
+``--users`` clients in a room each send ``--messages`` messages (mostly
+cursor moves, plus lock, update and unlock) concurrently on one event
+loop, and reports messages/sec.
+
+before – the previous consumer code: synchronous cache calls that read
+         and rewrite the whole per-room dict (blocking the loop)
+after  – RedisRoomStateBackend: one async per-field round-trip
+
+Against fakeredis every Redis round-trip is charged ``--rtt-ms`` of
+simulated network latency (a blocking sleep for the synchronous path, an
+awaited one for the async path).  Pass ``--redis-url`` to measure a real
+server instead.
+Run: python scripts/bench_room_state.py [--users 50] [--messages 200] [--rtt-ms 0.3]
+"""
+import argparse
+import asyncio
+import pickle
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from projects.room_state import RedisRoomStateBackend  # noqa: E402
+
+ROOM = 'bench'
+
+
+class BlockingCache:
+    """The subset of the Django cache API the old consumer used."""
+
+    def __init__(self, client, rtt: float):
+        self.client = client
+        self.rtt = rtt
+
+    def get(self, key, default=None):
+        time.sleep(self.rtt)
+        raw = self.client.get(key)
+        return default if raw is None else pickle.loads(raw)
+
+    def set(self, key, value, timeout):
+        time.sleep(self.rtt)
+        self.client.set(key, pickle.dumps(value), ex=timeout)
+
+
+class OldRoomState:
+    """Whole-dict read/modify/write, as the consumer did before."""
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    async def update_cursor(self, user_id, cursor):
+        cursors = self.cache.get(f'collab:cursors:{ROOM}', {})
+        cursors[str(user_id)] = cursor
+        self.cache.set(f'collab:cursors:{ROOM}', cursors, 300)
+
+    async def try_acquire_lock(self, user_id, component_id):
+        locks = self.cache.get(f'collab:locks:{ROOM}', {})
+        existing = locks.get(component_id)
+        if existing and existing['user_id'] != user_id:
+            return False
+        locks[component_id] = {'user_id': user_id, 'acquired_at': time.time()}
+        self.cache.set(f'collab:locks:{ROOM}', locks, 3600)
+        return True
+
+    async def check_has_lock(self, user_id, component_id):
+        lock = self.cache.get(f'collab:locks:{ROOM}', {}).get(component_id)
+        return bool(lock and lock['user_id'] == user_id)
+
+    async def release_lock(self, user_id, component_id):
+        locks = self.cache.get(f'collab:locks:{ROOM}', {})
+        if locks.get(component_id, {}).get('user_id') == user_id:
+            del locks[component_id]
+            self.cache.set(f'collab:locks:{ROOM}', locks, 3600)
+
+
+class NewRoomState:
+    """The room state service, with an awaited delay per round-trip."""
+
+    def __init__(self, backend: RedisRoomStateBackend, rtt: float):
+        self.backend = backend
+        self.rtt = rtt
+
+    async def _trip(self):
+        if self.rtt:
+            await asyncio.sleep(self.rtt)
+
+    async def update_cursor(self, user_id, cursor):
+        await self._trip()
+        await self.backend.set_cursor(ROOM, user_id, cursor)
+
+    async def try_acquire_lock(self, user_id, component_id):
+        await self._trip()
+        acquired, _ = await self.backend.acquire_lock(
+            ROOM, component_id, {'user_id': user_id, 'acquired_at': time.time()}
+        )
+        return acquired
+
+    async def check_has_lock(self, user_id, component_id):
+        await self._trip()
+        return await self.backend.refresh_lock(ROOM, component_id, user_id)
+
+    async def release_lock(self, user_id, component_id):
+        await self._trip()
+        await self.backend.release_lock(ROOM, component_id, user_id)
+
+
+async def client(state, user_id: int, messages: int) -> int:
+    """Mostly cursor moves; every 20th message edits the user's own component."""
+    sent = 0
+    component_id = f'component-{user_id}'
+    for i in range(messages):
+        if i % 20 == 19:
+            if await state.try_acquire_lock(user_id, component_id):
+                await state.check_has_lock(user_id, component_id)
+                await state.release_lock(user_id, component_id)
+        else:
+            await state.update_cursor(user_id, {'user_id': user_id, 'x': i, 'y': i})
+        sent += 1
+    return sent
+
+
+async def drive(state, users: int, messages: int) -> float:
+    started = time.perf_counter()
+    sent = await asyncio.gather(*[client(state, uid, messages) for uid in range(users)])
+    return sum(sent) / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--messages', type=int, default=200)
+    parser.add_argument('--rtt-ms', type=float, default=0.3)
+    parser.add_argument('--redis-url', default=None)
+    args = parser.parse_args()
+
+    if args.redis_url:
+        import redis
+        import redis.asyncio as aioredis
+        sync_client = redis.Redis.from_url(args.redis_url)
+        async_client = aioredis.Redis.from_url(args.redis_url)
+        rtt = 0.0
+    else:
+        import fakeredis
+        from fakeredis import aioredis
+        sync_client = fakeredis.FakeRedis()
+        async_client = aioredis.FakeRedis()
+        rtt = args.rtt_ms / 1000
+
+    print(f"{args.users} users x {args.messages} messages, "
+          + (args.redis_url or f"fakeredis with {args.rtt_ms} ms simulated RTT"))
+
+    before = asyncio.run(drive(OldRoomState(BlockingCache(sync_client, rtt)), args.users, args.messages))
+    after = asyncio.run(drive(
+        NewRoomState(RedisRoomStateBackend(client=async_client), rtt), args.users, args.messages,
+    ))
+    print(f"{'before':>8}: {before:10,.0f} msg/s")
+    print(f"{'after':>8}: {after:10,.0f} msg/s  ({after / before:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
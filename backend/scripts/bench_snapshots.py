@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+"""
+Snapshot Storage Benchmark
+Builds a project of ``--components`` design components in a throwaway
+test database and snapshots it ``--snapshots`` times, editing
+``--edit-ratio`` of the components in between.
+
+full-blob – the previous scheme: the whole design_data hashed and
+            inserted as one JSON row per snapshot; reads load two rows
+store     – projects.object_store: only objects the store lacks are
+            inserted; reads load both trees level by level, shared
+            objects once
+Both columns time the same steps (building design_data is common and
+excluded).  "diff" is VersionService._compute_diff on the two documents
+as each scheme returns them.
+Run: python scripts/bench_snapshots.py [--components 2000] [--snapshots 20]
+"""
+import argparse
+import hashlib
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.db.models import Sum  # noqa: E402
+from django.test.utils import CaptureQueriesContext, setup_test_environment  # noqa: E402
+
+
+class DisableMigrations:
+    def __contains__(self, item):
+        return True
+
+    def __getitem__(self, item):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--components', type=int, default=2000)
+    parser.add_argument('--snapshots', type=int, default=20)
+    parser.add_argument('--edit-ratio', type=float, default=0.01)
+    args = parser.parse_args()
+
+    from django.contrib.auth.models import User
+    from projects.models import DesignObject, Project
+    from projects.object_store import ObjectStore, canonical_json
+    from projects.version_models import VersionService
+
+    settings.MIGRATION_MODULES = DisableMigrations()
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, serialize=False)
+    try:
+        rng = random.Random(7)
+        user = User.objects.create(username='bench', password='!')
+        project = Project.objects.create(user=user, name='bench')
+        components = [
+            {'id': str(i), 'type': 'text', 'z_index': i, 'ai_generated': False, 'properties': {
+                'text': f'Paragraph {i} ' + 'lorem ipsum ' * 20,
+                'position': {'x': i % 97, 'y': i // 97}, 'size': {'width': 120, 'height': 40},
+                'style': {'font': 'Inter', 'fontSize': 14, 'color': '#333333'},
+            }}
+            for i in range(args.components)
+        ]
+        edits = max(1, int(args.components * args.edit_ratio))
+        store = ObjectStore()
+        timings = {'full-blob': [0.0, 0], 'store': [0.0, 0]}
+        blob_bytes = 0
+        blobs, roots = [], []
+
+        for n in range(args.snapshots):
+            if n:
+                for component in rng.sample(components, edits):
+                    component['properties'] = dict(component['properties'], position={'x': n, 'y': rng.randint(0, 999)})
+            design_data = {'components': components, 'project_settings': {'name': 'bench'}}
+
+            with CaptureQueriesContext(connection) as ctx:
+                started = time.perf_counter()
+                blob = canonical_json(design_data)
+                digest = hashlib.sha256(blob.encode()).hexdigest()
+                # DesignObject rows of kind 'blob' stand in for the old JSON column
+                DesignObject.objects.create(hash=digest, kind='blob', data=design_data, size_bytes=len(blob))
+                timings['full-blob'][0] += time.perf_counter() - started
+            timings['full-blob'][1] += len(ctx.captured_queries)
+            blob_bytes += len(blob)
+            blobs.append(digest)
+
+            with CaptureQueriesContext(connection) as ctx:
+                started = time.perf_counter()
+                roots.append(store.write(design_data))
+                timings['store'][0] += time.perf_counter() - started
+            timings['store'][1] += len(ctx.captured_queries)
+
+        objects = DesignObject.objects.exclude(kind='blob')
+        stored = objects.aggregate(total=Sum('size_bytes'))['total']
+        print(f'{args.components:,} components, {args.snapshots} snapshots, {edits} edited between each')
+        print(f'{"method":<10}{"write ms":>10}{"queries":>9}{"MB":>8}{"rows":>8}{"read ms":>9}{"diff ms":>9}')
+        service = VersionService(project)
+        for method, size, rows in (('full-blob', blob_bytes, len(blobs)), ('store', stored, objects.count())):
+            started = time.perf_counter()
+            if method == 'full-blob':
+                data = dict(DesignObject.objects.filter(hash__in=blobs[-2:]).values_list('hash', 'data'))
+                old, new = data[blobs[-2]], data[blobs[-1]]
+            else:
+                old, new = store.read_many(roots[-2:])
+            read_ms = (time.perf_counter() - started) * 1000
+            started = time.perf_counter()
+            service._compute_diff(old, new)
+            diff_ms = (time.perf_counter() - started) * 1000
+            seconds, queries = timings[method]
+            print(f'{method:<10}{seconds / args.snapshots * 1000:>10.1f}{queries / args.snapshots:>9.1f}'
+                  f'{size / 1e6:>8.1f}{rows:>8,}{read_ms:>9.1f}{diff_ms:>9.1f}')
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+"""
+Webhook Delivery Throughput Benchmark
+Sends ``--deliveries`` signed webhook requests to a local HTTP stand-in
+server spread over ``--hosts`` ports, each answering after ``--latency-ms``.
+
+before – the previous task body: one ``requests.post`` per delivery on a
+         fresh connection, one delivery after another (as one worker
+         drains its queue)
+after  – WebhookDispatcher: one batch over pooled keep-alive connections,
+         at most ``--per-host`` requests per host at a time
+Run: python scripts/bench_webhooks.py [--deliveries 500] [--hosts 4] [--latency-ms 20]
+"""
+import argparse
+import logging
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+import requests  # noqa: E402
+
+from notifications.webhook_dispatcher import WebhookDispatcher, build_request  # noqa: E402
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers['Content-Length']))
+        time.sleep(self.server.latency)
+        with self.server.lock:
+            self.server.connections.add(self.client_address)
+        self.send_response(200)
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'ok')
+
+    def log_message(self, *args):
+        pass
+
+
+def start_server(latency: float) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.lock = threading.Lock()
+    server.connections = set()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def make_requests(servers, count):
+    payload = {'event': 'project.updated', 'project': {'id': 1, 'name': 'Landing page', 'tags': ['web'] * 10}}
+    return [
+        build_request(
+            f'http://127.0.0.1:{servers[i % len(servers)].server_address[1]}/hook',
+            'project.updated', payload, i, secret_key='bench-secret',
+        )
+        for i in range(count)
+    ]
+
+
+def run_before(batch):
+    for request in batch:
+        requests.post(request.url, data=request.body, headers=request.headers, timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--deliveries', type=int, default=500)
+    parser.add_argument('--hosts', type=int, default=4)
+    parser.add_argument('--latency-ms', type=float, default=20)
+    parser.add_argument('--per-host', type=int, default=8)
+    args = parser.parse_args()
+    logging.getLogger('httpx').setLevel(logging.WARNING)
+
+    servers = [start_server(args.latency_ms / 1000) for _ in range(args.hosts)]
+    batch = make_requests(servers, args.deliveries)
+
+    print(f"{args.deliveries} deliveries to {args.hosts} hosts, {args.latency_ms:g} ms server latency")
+    print(f"{'':<8}{'seconds':>10}{'deliveries/s':>15}{'connections':>14}")
+
+    started = time.perf_counter()
+    run_before(batch)
+    elapsed = time.perf_counter() - started
+    connections = sum(len(s.connections) for s in servers)
+    print(f"{'before':<8}{elapsed:>10.2f}{args.deliveries / elapsed:>15,.0f}{connections:>14,}")
+
+    for server in servers:
+        server.connections.clear()
+    dispatcher = WebhookDispatcher(per_host=args.per_host)
+    started = time.perf_counter()
+    results = dispatcher.dispatch_sync(batch)
+    elapsed = time.perf_counter() - started
+    dispatcher.close()
+    assert all(result.ok for result in results)
+    connections = sum(len(s.connections) for s in servers)
+    print(f"{'after':<8}{elapsed:>10.2f}{args.deliveries / elapsed:>15,.0f}{connections:>14,}")
+
+
+if __name__ == '__main__':
+    main()
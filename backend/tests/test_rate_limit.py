@@ -0,0 +1,88 @@
+"""
+Unit tests for the rate limiting engine.
+"""
+import pytest
+
+from backend.rate_limit import (
+    LocalMemoryRateLimiter, RateLimit, RateLimitRouter, RedisRateLimiter,
+)
+
+fakeredis = pytest.importorskip('fakeredis')
+
+
+@pytest.fixture(params=['memory', 'redis'])
+def limiter(request):
+    if request.param == 'memory':
+        return LocalMemoryRateLimiter()
+    return RedisRateLimiter(client=fakeredis.FakeRedis())
+
+
+@pytest.mark.unit
+class TestRateLimiter:
+    """Tests shared by the local and Redis limiters."""
+
+    def test_limit_exhausted(self, limiter):
+        limits = [RateLimit('global', 3, 60)]
+        assert all(limiter.hit('1.2.3.4', limits).allowed for _ in range(3))
+
+        result = limiter.hit('1.2.3.4', limits)
+        assert not result.allowed
+        assert result.exceeded == limits[0]
+        # Other clients are unaffected.
+        assert limiter.hit('5.6.7.8', limits).allowed
+
+    def test_denied_request_counts_nowhere(self, limiter):
+        burst, wide = RateLimit('burst', 1, 60), RateLimit('global', 2, 60)
+        assert limiter.hit('ip', [burst, wide]).allowed
+        assert limiter.hit('ip', [burst, wide]).exceeded == burst
+        # The denied hit did not consume the wider limit.
+        assert limiter.hit('ip', [wide]).allowed
+
+    def test_violations_block_client(self, limiter):
+        assert not limiter.record_violation('ip', threshold=2, window=300, block_for=60)
+        assert limiter.record_violation('ip', threshold=2, window=300, block_for=60)
+
+        result = limiter.hit('ip', [RateLimit('global', 100, 60)])
+        assert result.blocked and not result.allowed
+
+    def test_track_activity(self, limiter):
+        for path in ('/a/', '/b/', '/a/'):
+            activity = limiter.track_activity('ip', path)
+        limiter.track_error('ip')
+
+        assert activity.requests == 3
+        assert activity.unique_paths == 2
+        assert limiter.track_activity('ip', '/c/').errors == 1
+
+
+@pytest.mark.unit
+class TestLocalMemoryRateLimiter:
+
+    def test_expired_entries_are_swept(self, monkeypatch):
+        clock = [1000.0]
+        monkeypatch.setattr('backend.rate_limit.time.time', lambda: clock[0])
+        limiter = LocalMemoryRateLimiter()
+        for client in ('a', 'b', 'c'):
+            limiter.hit(client, [RateLimit('burst', 10, 1)])
+            limiter.track_activity(client, '/x/')
+        assert limiter._counters and limiter._paths
+
+        clock[0] += 3600
+        limiter.hit('d', [RateLimit('burst', 10, 1)])
+        assert [key.split(':')[0] for key in limiter._counters] == ['d']
+        assert limiter._paths == {}
+
+
+@pytest.mark.unit
+class TestRateLimitRouter:
+
+    def test_first_matching_rule_wins(self):
+        router = RateLimitRouter({
+            r'^/api/v1/auth/oauth/': {'requests': 10, 'window': 60},
+            r'^/api/v1/auth/': {'requests': 20, 'window': 60},
+            r'^/api/': {'requests': 100, 'window': 60},
+        })
+        assert router.match('/api/v1/auth/oauth/github/').limit == 10
+        assert router.match('/api/v1/auth/login/').limit == 20
+        assert router.match('/api/v1/projects/').scope == 'path:2'
+        assert router.match('/health/') is None
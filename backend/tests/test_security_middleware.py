@@ -0,0 +1,95 @@
+"""
+Unit tests for RequestValidationMiddleware body inspection.
+"""
+import json
+
+import pytest
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+from backend.security_middleware import AdvancedRateLimitMiddleware, RequestValidationMiddleware
+
+
+@pytest.fixture
+def middleware():
+    return RequestValidationMiddleware(lambda request: HttpResponse())
+
+
+def post_json(path, payload):
+    return RequestFactory().post(path, data=json.dumps(payload), content_type='application/json')
+
+
+@pytest.mark.unit
+class TestRequestValidationMiddleware:
+    """Tests for compiled, JSON-aware request inspection."""
+
+    def test_blocks_malicious_string_leaf(self, middleware):
+        request = post_json('/api/v1/teams/', {'name': 'x', 'bio': ['<script>alert(1)</script>']})
+        response = middleware.process_request(request)
+        assert response.status_code == 400
+        assert json.loads(response.content)['code'] == 'MALICIOUS_INPUT'
+
+    def test_blocks_malicious_key(self, middleware):
+        request = post_json('/api/v1/teams/', {'onload=': 1})
+        assert middleware.process_request(request).status_code == 400
+
+    def test_matches_do_not_span_adjacent_leaves(self, middleware):
+        payload = {'note': 'please insert', 'hint': 'into the frame', 'onion': '=layers'}
+        assert middleware.process_request(post_json('/api/v1/teams/', payload)) is None
+        payload['hint'] = 'insert into users'
+        assert middleware.process_request(post_json('/api/v1/teams/', payload)).status_code == 400
+
+    def test_skips_allowlisted_design_fields(self, middleware):
+        payload = {'name': 'Poster', 'design_data': {'layers': [{'fill': '#ff0000'}]}}
+        assert middleware.process_request(post_json('/api/v1/projects/1/', payload)) is None
+        # The same payload on another route is still scanned.
+        assert middleware.process_request(post_json('/api/v1/teams/', payload)).status_code == 400
+
+    def test_invalid_json_scanned_as_text(self, middleware):
+        request = RequestFactory().post(
+            '/api/v1/teams/', data=b'{"a": "union all select', content_type='application/json'
+        )
+        assert middleware.process_request(request).status_code == 400
+
+    def test_body_cap_without_content_length(self, middleware, monkeypatch):
+        monkeypatch.setattr(RequestValidationMiddleware, 'MAX_BODY_SIZE', 16)
+        request = post_json('/api/v1/teams/', {'name': 'a' * 32})
+        del request.META['CONTENT_LENGTH']
+        assert middleware.process_request(request).status_code == 413
+
+    def test_records_inspection_time(self, middleware):
+        before = RequestValidationMiddleware.get_stats()['requests']
+        request = post_json('/api/v1/teams/', {'name': 'ok'})
+        response = middleware(request)
+
+        assert request.validation_us >= 0
+        assert response['Server-Timing'].startswith('reqval;')
+        assert RequestValidationMiddleware.get_stats()['requests'] == before + 1
+
+
+@pytest.mark.unit
+class TestAdvancedRateLimitMiddleware:
+    """Tests for single-call rate limiting."""
+
+    def test_burst_limit(self, monkeypatch):
+        monkeypatch.setattr(AdvancedRateLimitMiddleware, 'BURST_LIMIT', 2)
+        middleware = AdvancedRateLimitMiddleware(lambda request: HttpResponse())
+        factory = RequestFactory()
+
+        assert middleware.process_request(factory.get('/api/v1/projects/')) is None
+        assert middleware.process_request(factory.get('/api/v1/projects/')) is None
+        response = middleware.process_request(factory.get('/api/v1/projects/'))
+        assert response.status_code == 429
+        assert json.loads(response.content)['code'] == 'BURST_LIMIT_EXCEEDED'
+
+    def test_endpoint_limit(self, monkeypatch):
+        monkeypatch.setattr(AdvancedRateLimitMiddleware, 'RATE_LIMITS', {
+            r'^/api/v1/ai/': {'requests': 1, 'window': 60},
+        })
+        middleware = AdvancedRateLimitMiddleware(lambda request: HttpResponse())
+        factory = RequestFactory()
+
+        assert middleware.process_request(factory.post('/api/v1/ai/generate/')) is None
+        response = middleware.process_request(factory.post('/api/v1/ai/generate/'))
+        assert json.loads(response.content)['code'] == 'ENDPOINT_RATE_LIMIT'
+        assert middleware.process_request(factory.get('/api/v1/projects/')) is None
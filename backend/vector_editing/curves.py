@@ -0,0 +1,442 @@
+"""
+Vectorized Curve Kernel
+
+Evaluates every segment of a compiled path at once instead of walking
+commands in Python.  A path's drawn segments (lines, cubics and closing
+lines) are gathered into one ``(n, 4, 2)`` array of cubic control
+points; lines are stored as degree-elevated cubics so one set of array
+expressions covers both.
+
+* ``flatten``      polylines at a fixed count per curve, or adaptively so
+                   no chord strays more than ``tolerance`` from its curve
+* ``bounds``       exact bounding box from the curve extrema, not the
+                   control points
+* ``path_length``  adaptive Gauss-Legendre quadrature of the curve speed
+
+Usage:
+    compiled = compile_path('M0 0 C0 10 10 10 10 0')
+    bounds(compiled)                       # (0, 0, 10, 7.5)
+    path_length(compiled)
+    codes, coords = flatten(compiled, tolerance=0.25)
+"""
+from functools import lru_cache
+from typing import Optional, Tuple
+
+import numpy as np
+
+from .path_ir import CLOSE, CUBIC, LINE, MOVE, CompiledPath
+
+GAUSS_LEGENDRE_ORDER = 16
+
+# Upper bound on the chords one cubic is flattened into
+MAX_CHORDS_PER_CURVE = 1024
+
+
+class Segments:
+    """
+    Drawn segments of a compiled path as cubic control points.
+
+    ``points[i]`` are the four control points of segment i, ``codes[i]``
+    is the command that drew it (LINE, CUBIC or CLOSE) and ``command[i]``
+    its index in the compiled path.
+    """
+    __slots__ = ('codes', 'points', 'command')
+
+    def __init__(self, codes, points, command):
+        self.codes = codes
+        self.points = points
+        self.command = command
+        for array in (codes, points, command):
+            array.flags.writeable = False
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+
+def _command_endpoints(compiled: CompiledPath) -> np.ndarray:
+    """End point of every command, shape (len(codes), 2)."""
+    codes = compiled.codes
+    vertex = np.cumsum(codes != CLOSE) - 1
+    # A close ends where its subpath's MOVE started
+    subpath_start = np.maximum.accumulate(np.where(codes == MOVE, vertex, 0))
+    return compiled.vertices[np.where(codes == CLOSE, subpath_start, vertex)]
+
+
+def segments(compiled: CompiledPath) -> Segments:
+    """The path's drawn segments (built once per compiled path)."""
+    if compiled._segments is not None:
+        return compiled._segments
+
+    codes = compiled.codes
+    if len(codes) < 2:
+        empty = Segments(np.empty(0, np.uint8), np.empty((0, 4, 2)), np.empty(0, np.int64))
+        compiled._segments = empty
+        return empty
+
+    ends = _command_endpoints(compiled)
+    command = np.flatnonzero(codes != MOVE)
+    command = command[command > 0]
+    p0 = ends[command - 1]
+    p3 = ends[command]
+
+    # Lines: control points at thirds, so the parameterization stays linear
+    delta = (p3 - p0)[:, None, :]
+    points = p0[:, None, :] + delta * np.array([0.0, 1 / 3, 2 / 3, 1.0])[None, :, None]
+
+    seg_codes = codes[command]
+    is_cubic = seg_codes == CUBIC
+    if is_cubic.any():
+        offsets = compiled.offsets[command[is_cubic]]
+        controls = compiled.coords[offsets[:, None] + np.arange(4)]
+        points[is_cubic, 1:3] = controls.reshape(-1, 2, 2)
+        points[is_cubic, 3] = p3[is_cubic]
+
+    compiled._segments = Segments(seg_codes.copy(), points, command)
+    return compiled._segments
+
+
+def _bernstein(t: np.ndarray) -> np.ndarray:
+    mt = 1 - t
+    return np.stack([mt * mt * mt, 3 * mt * mt * t, 3 * mt * t * t, t * t * t], axis=-1)
+
+
+def evaluate(points: np.ndarray, t) -> np.ndarray:
+    """
+    Points on each cubic: ``t`` of shape (m,) evaluates every segment at
+    the same parameters, shape (n, m) at per-segment ones.  Returns (n, m, 2).
+    """
+    return _bernstein(np.asarray(t, dtype=np.float64)) @ points
+
+
+def derivative(points: np.ndarray, t) -> np.ndarray:
+    """First derivative of each cubic, shaped like ``evaluate``."""
+    t = np.asarray(t, dtype=np.float64)
+    hodograph = 3 * np.diff(points, axis=1)
+    mt = 1 - t
+    return np.stack([mt * mt, 2 * mt * t, t * t], axis=-1) @ hodograph
+
+
+@lru_cache(maxsize=8)
+def _gauss_legendre(order: int) -> Tuple[np.ndarray, np.ndarray]:
+    nodes, weights = np.polynomial.legendre.leggauss(order)
+    # Mapped from [-1, 1] to [0, 1]
+    return (nodes + 1) / 2, weights / 2
+
+
+def _quadrature(points: np.ndarray, lo: np.ndarray, hi: np.ndarray, order: int) -> np.ndarray:
+    nodes, weights = _gauss_legendre(order)
+    span = hi - lo
+    t = lo[:, None] + span[:, None] * nodes
+    velocity = derivative(points, t)
+    speed = np.hypot(velocity[..., 0], velocity[..., 1])
+    return (speed @ weights) * span
+
+
+def arc_lengths(points: np.ndarray, order: int = GAUSS_LEGENDRE_ORDER,
+                rel_tolerance: float = 1e-8, max_depth: int = 8) -> np.ndarray:
+    """
+    Length of each cubic by Gauss-Legendre quadrature of its speed.
+
+    Pieces whose two halves disagree with the whole (loops, near-cusps)
+    are bisected again, all such pieces of all segments in one step.
+    """
+    lengths = np.zeros(len(points))
+    if not len(points):
+        return lengths
+
+    index = np.arange(len(points))
+    lo = np.zeros(len(points))
+    hi = np.ones(len(points))
+    whole = _quadrature(points, lo, hi, order)
+    for _ in range(max_depth):
+        mid = (lo + hi) / 2
+        pieces = points[index]
+        left = _quadrature(pieces, lo, mid, order)
+        right = _quadrature(pieces, mid, hi, order)
+        split = left + right
+        done = np.abs(split - whole) <= rel_tolerance * np.maximum(split, 1e-12)
+        np.add.at(lengths, index[done], split[done])
+        pending = ~done
+        if not pending.any():
+            return lengths
+        index = np.concatenate([index[pending], index[pending]])
+        lo, hi = np.concatenate([lo[pending], mid[pending]]), np.concatenate([mid[pending], hi[pending]])
+        whole = np.concatenate([left[pending], right[pending]])
+
+    np.add.at(lengths, index, whole)
+    return lengths
+
+
+def path_length(compiled: CompiledPath, order: int = GAUSS_LEGENDRE_ORDER) -> float:
+    """Total length of all drawn segments, closing lines included."""
+    return float(arc_lengths(segments(compiled).points, order).sum())
+
+
+def extrema(points: np.ndarray) -> np.ndarray:
+    """
+    Parameters in (0, 1) where each cubic's x or y derivative is zero, as
+    an (n, 4) array; slots without an extremum hold NaN.
+    """
+    d0 = points[:, 1] - points[:, 0]
+    d1 = points[:, 2] - points[:, 1]
+    d2 = points[:, 3] - points[:, 2]
+    # B'(t) / 3 = a t^2 + b t + c, per axis
+    a = d0 - 2 * d1 + d2
+    b = 2 * (d1 - d0)
+    c = d0
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        root = np.sqrt(b * b - 4 * a * c)
+        quadratic = np.abs(a) > 1e-12
+        t1 = np.where(quadratic, (-b + root) / (2 * a), -c / b)
+        t2 = np.where(quadratic, (-b - root) / (2 * a), np.nan)
+    roots = np.concatenate([t1, t2], axis=1)
+    return np.where((roots > 0) & (roots < 1), roots, np.nan)
+
+
+def bounds(compiled: CompiledPath) -> Optional[Tuple[float, float, float, float]]:
+    """Exact ``(min_x, min_y, max_x, max_y)`` of the path, or None if empty."""
+    vertices = compiled.vertices
+    if not len(vertices):
+        return None
+
+    candidates = [vertices]
+    segs = segments(compiled)
+    cubic = segs.points[segs.codes == CUBIC]
+    if len(cubic):
+        t = extrema(cubic)
+        found = ~np.isnan(t)
+        if found.any():
+            rows = np.nonzero(found)[0]
+            candidates.append(evaluate(cubic[rows], t[found][:, None])[:, 0])
+
+    all_points = np.concatenate(candidates)
+    min_x, min_y = all_points.min(axis=0).tolist()
+    max_x, max_y = all_points.max(axis=0).tolist()
+    return min_x, min_y, max_x, max_y
+
+
+def subdivisions(points: np.ndarray, tolerance: float) -> np.ndarray:
+    """
+    Chords needed per cubic so none strays more than ``tolerance`` from the
+    curve (Wang's bound on the second differences of the control points).
+    """
+    if not tolerance > 0:
+        raise ValueError('tolerance must be positive')
+    second = np.linalg.norm(points[:, 2:] - 2 * points[:, 1:3] + points[:, :2], axis=-1).max(axis=1)
+    count = np.ceil(np.sqrt(0.75 * second / tolerance))
+    return np.clip(count, 1, MAX_CHORDS_PER_CURVE).astype(np.int64)
+
+
+def flatten(compiled: CompiledPath, segments_per_curve: int = 10,
+            tolerance: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Replace every cubic with line segments.
+
+    Uses ``segments_per_curve`` chords per cubic, or as many as each
+    cubic needs when ``tolerance`` is given, at most
+    ``MAX_CHORDS_PER_CURVE``.  Returns the new command
+    codes (MOVE/LINE/CLOSE) and their flat coordinates, ready for
+    ``path_ir.format_commands``.
+    """
+    codes = compiled.codes
+    if not len(codes):
+        return codes, compiled.coords
+
+    segs = segments(compiled)
+    is_cubic = segs.codes == CUBIC
+    cubic_points = segs.points[is_cubic]
+    cubic_command = segs.command[is_cubic]
+    if tolerance is not None:
+        per_cubic = subdivisions(cubic_points, tolerance)
+    else:
+        count = min(max(1, int(segments_per_curve)), MAX_CHORDS_PER_CURVE)
+        per_cubic = np.full(len(cubic_points), count, dtype=np.int64)
+
+    # Output rows per command: one per MOVE/LINE/CLOSE, n per cubic
+    counts = np.ones(len(codes), dtype=np.int64)
+    counts[cubic_command] = per_cubic
+    owner = np.repeat(np.arange(len(codes)), counts)
+    step = np.arange(len(owner)) - np.repeat(np.cumsum(counts) - counts, counts)
+
+    out_codes = np.where(codes[owner] == CUBIC, LINE, codes[owner]).astype(np.uint8)
+    xy = _command_endpoints(compiled)[owner]
+
+    cubic_rows = np.flatnonzero(codes[owner] == CUBIC)
+    if len(cubic_rows):
+        which = np.full(len(codes), -1, dtype=np.int64)
+        which[cubic_command] = np.arange(len(cubic_command))
+        segment = which[owner[cubic_rows]]
+        t = (step[cubic_rows] + 1) / per_cubic[segment]
+        xy[cubic_rows] = (_bernstein(t)[:, None, :] @ cubic_points[segment])[:, 0]
+
+    return out_codes, xy[out_codes != CLOSE].ravel()
+
+
+# Curve fitting: polylines back to cubics (Schneider, Graphics Gems 1990)
+
+CORNER_ANGLE = 45.0
+
+
+def _unit(vectors: np.ndarray) -> np.ndarray:
+    length = np.hypot(vectors[..., 0], vectors[..., 1])
+    return vectors / np.where(length == 0, 1, length)[..., None]
+
+
+def _chord_parameters(points: np.ndarray) -> np.ndarray:
+    cumulative = np.concatenate(([0.0], np.cumsum(np.hypot(*np.diff(points, axis=0).T))))
+    return cumulative / cumulative[-1]
+
+
+def _least_squares_cubic(points, u, tangent1, tangent2) -> np.ndarray:
+    """Cubic through the run's ends with handle lengths fitted to ``points``."""
+    p0, p3 = points[0], points[-1]
+    basis = _bernstein(u)
+    a1 = basis[:, 1, None] * tangent1
+    a2 = basis[:, 2, None] * tangent2
+    residual = points - (basis[:, 0] + basis[:, 1])[:, None] * p0 - (basis[:, 2] + basis[:, 3])[:, None] * p3
+
+    c00, c01, c11 = (a1 * a1).sum(), (a1 * a2).sum(), (a2 * a2).sum()
+    x0, x1 = (a1 * residual).sum(), (a2 * residual).sum()
+    det = c00 * c11 - c01 * c01
+    alpha1 = (x0 * c11 - x1 * c01) / det if abs(det) > 1e-12 else 0.0
+    alpha2 = (c00 * x1 - c01 * x0) / det if abs(det) > 1e-12 else 0.0
+
+    chord = float(np.hypot(*(p3 - p0)))
+    if alpha1 < 1e-6 * chord or alpha2 < 1e-6 * chord:
+        alpha1 = alpha2 = chord / 3
+    return np.array([p0, p0 + alpha1 * tangent1, p3 + alpha2 * tangent2, p3])
+
+
+def _newton_parameters(cubic, points, u) -> np.ndarray:
+    """One Newton-Raphson step moving each ``u`` closer to its point."""
+    first = 3 * np.diff(cubic, axis=0)
+    second = 2 * np.diff(first, axis=0)
+    mt = 1 - u
+    q = _bernstein(u) @ cubic
+    q1 = np.stack([mt * mt, 2 * mt * u, u * u], axis=-1) @ first
+    q2 = mt[:, None] * second[0] + u[:, None] * second[1]
+    offset = q - points
+    numerator = (offset * q1).sum(axis=1)
+    denominator = (q1 * q1).sum(axis=1) + (offset * q2).sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        stepped = np.where(denominator != 0, u - numerator / denominator, u)
+    return np.clip(stepped, 0, 1)
+
+
+def _fit_error(cubic, points, u) -> Tuple[float, int]:
+    """Worst distance from the points, and from each chord at mid-parameter."""
+    distance = np.hypot(*((_bernstein(u) @ cubic) - points).T)
+    # Long chords have no points between their ends for the curve to miss
+    middle = _bernstein((u[:-1] + u[1:]) / 2) @ cubic
+    start, chord = points[:-1], np.diff(points, axis=0)
+    along = np.clip(((middle - start) * chord).sum(axis=1) / np.maximum((chord * chord).sum(axis=1), 1e-12), 0, 1)
+    bulge = np.hypot(*(start + chord * along[:, None] - middle).T)
+
+    if bulge.max() > distance.max():
+        worst = int(np.argmax(bulge))
+        split = worst if worst > 0 else 1
+        return float(bulge.max()), min(split, len(points) - 2)
+    return float(distance.max()), int(np.argmax(distance[1:-1])) + 1
+
+
+def _fit_run(points, tangent1, tangent2, tolerance, codes, coords, depth=0):
+    end = points[-1]
+    chord = _unit(end - points[0])
+    deviation = np.abs(np.cross(chord, points - points[0])) if len(points) > 2 else np.zeros(1)
+    if len(points) == 2 or deviation.max() <= tolerance:
+        codes.append(LINE)
+        coords.extend(end.tolist())
+        return
+
+    u = _chord_parameters(points)
+    cubic = _least_squares_cubic(points, u, tangent1, tangent2)
+    error, split = _fit_error(cubic, points, u)
+    if tolerance < error <= 4 * tolerance:
+        for _ in range(4):
+            u = _newton_parameters(cubic, points, u)
+            cubic = _least_squares_cubic(points, u, tangent1, tangent2)
+            error, split = _fit_error(cubic, points, u)
+            if error <= tolerance:
+                break
+    if error <= tolerance or depth >= 32:
+        codes.append(CUBIC)
+        coords.extend(cubic[1:].ravel().tolist())
+        return
+
+    if error > 4 * tolerance:
+        # Far off: halve the run rather than chase the worst point
+        split = len(points) // 2
+    center = _unit(points[split - 1] - points[split + 1])
+    _fit_run(points[:split + 1], tangent1, center, tolerance, codes, coords, depth + 1)
+    _fit_run(points[split:], -center, tangent2, tolerance, codes, coords, depth + 1)
+
+
+def fit_cubics(points, tolerance: float, closed: bool = True,
+               corner_angle: float = CORNER_ANGLE) -> Tuple[list, list]:
+    """
+    Fit cubic Beziers to a polyline, within ``tolerance`` of its vertices.
+
+    Vertices where the polyline turns by more than ``corner_angle``
+    degrees stay sharp corners; straight runs stay lines.  Returns
+    ``(codes, coords)`` for one subpath, ready for
+    ``path_ir.format_commands``.
+    """
+    points = np.asarray(points, dtype=np.float64)
+    if len(points) > 1:
+        moved = np.concatenate(([True], np.any(np.diff(points, axis=0) != 0, axis=1)))
+        points = points[moved]
+    if closed and len(points) > 1 and np.array_equal(points[0], points[-1]):
+        points = points[:-1]
+
+    codes, coords = [MOVE], points[0].tolist() if len(points) else [0.0, 0.0]
+    if len(points) < 3:
+        for point in points[1:]:
+            codes.append(LINE)
+            coords.extend(point.tolist())
+        if closed and len(points):
+            codes.append(CLOSE)
+        return codes, coords
+
+    threshold = np.cos(np.radians(corner_angle))
+    if closed:
+        incoming = _unit(points - np.roll(points, 1, axis=0))
+        outgoing = _unit(np.roll(points, -1, axis=0) - points)
+        corners = np.flatnonzero((incoming * outgoing).sum(axis=1) < threshold)
+        start = int(corners[0]) if len(corners) else 0
+        points = np.roll(points, -start, axis=0)
+        points = np.vstack([points, points[:1]])
+        breaks = sorted(set((corners - start).tolist()) | {0, len(points) - 1})
+        smooth = set()
+        if len(breaks) == 2:
+            # One run would start and end on the same point: split it at the
+            # farthest vertex, keeping the tangent continuous there
+            far = int(np.argmax(np.hypot(*(points - points[0]).T)))
+            breaks = [0, far, len(points) - 1]
+            smooth = {far} if len(corners) else set(breaks)
+        coords = points[0].tolist()
+    else:
+        incoming = _unit(points[1:-1] - points[:-2])
+        outgoing = _unit(points[2:] - points[1:-1])
+        corners = np.flatnonzero((incoming * outgoing).sum(axis=1) < threshold) + 1
+        breaks = [0] + corners.tolist() + [len(points) - 1]
+        smooth = set()
+
+    def smooth_tangent(index):
+        before = points[index - 1] if index > 0 else points[-2]
+        after = points[index + 1] if index < len(points) - 1 else points[1]
+        return _unit(after - before)
+
+    for first, last in zip(breaks[:-1], breaks[1:]):
+        run = points[first:last + 1]
+        tangent1 = smooth_tangent(first) if first in smooth else _unit(run[1] - run[0])
+        tangent2 = -smooth_tangent(last) if last in smooth else _unit(run[-2] - run[-1])
+        _fit_run(run, tangent1, tangent2, tolerance, codes, coords)
+
+    if closed:
+        if codes[-1] == LINE:
+            # The close draws the last line back to the start
+            codes.pop()
+            del coords[-2:]
+        codes.append(CLOSE)
+    return codes, coords
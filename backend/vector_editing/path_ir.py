@@ -0,0 +1,329 @@
+"""
+Compiled SVG Path IR
+
+Vector operations used to re-parse the path string on every call, into
+one dict per command, then convert to absolute coordinates and Points.
+``compile_path`` does that once per distinct path string and returns a
+``CompiledPath``: one command code per command and all coordinates in a
+single flat float array, absolute and normalized to four commands:
+
+    MOVE   x y
+    LINE   x y                      (L, H, V)
+    CUBIC  c1x c1y c2x c2y x y      (C, S, and Q, T, A converted exactly
+                                     or, for arcs, to within 1e-4)
+    CLOSE                           (Z)
+
+Results are kept in a process-wide LRU keyed by the path string, so a
+chain of edits or repeated bounds/length queries on the same path pay
+the parse once.  Compiled paths are shared and their arrays are
+read-only; ``to_points`` returns fresh, mutable Points.
+
+Usage:
+    compiled = compile_path('M0 0 C10 0 10 10 0 10Z')
+    compiled.vertices        # (n, 2) on-curve points
+    compiled.to_points()     # List[Point] with bezier handles
+"""
+import math
+import re
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+MOVE, LINE, CUBIC, CLOSE = 0, 1, 2, 3
+ARITY = (2, 2, 6, 0)
+
+PATH_CACHE_SIZE = 512
+
+_COMMAND_RE = re.compile(r'([MmZzLlHhVvCcSsQqTtAa])([^MmZzLlHhVvCcSsQqTtAa]*)')
+_NUMBER_RE = re.compile(r'[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?')
+
+# Coordinates consumed per repetition of each SVG command
+_SVG_ARITY = {'M': 2, 'L': 2, 'H': 1, 'V': 1, 'C': 6, 'S': 4, 'Q': 4, 'T': 2, 'A': 7, 'Z': 0}
+
+
+def _readonly(values, dtype) -> np.ndarray:
+    array = np.asarray(values, dtype=dtype)
+    array.flags.writeable = False
+    return array
+
+
+class CompiledPath:
+    """
+    Absolute, normalized path commands as flat arrays.
+
+    ``codes[i]`` is the i-th command and its coordinates are
+    ``coords[offsets[i]:offsets[i] + ARITY[codes[i]]]``.  ``vertices``
+    holds the end point of every MOVE/LINE/CUBIC in order.
+    """
+    __slots__ = ('codes', 'coords', 'offsets', 'vertices', '_segments')
+
+    def __init__(self, codes, coords):
+        self._segments = None
+        self.codes = _readonly(codes, np.uint8)
+        self.coords = _readonly(coords, np.float64)
+        arity = np.array(ARITY, dtype=np.int64)[self.codes]
+        self.offsets = _readonly(np.concatenate(([0], np.cumsum(arity)[:-1])) if len(arity) else arity, np.int64)
+        ends = self.offsets[self.codes != CLOSE] + arity[self.codes != CLOSE] - 2
+        self.vertices = _readonly(
+            np.stack([self.coords[ends], self.coords[ends + 1]], axis=1) if len(ends) else np.empty((0, 2)),
+            np.float64,
+        )
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def commands(self):
+        """Iterate ``(code, coords)`` pairs (coords as a tuple of floats)."""
+        coords = self.coords.tolist()
+        for code, offset in zip(self.codes.tolist(), self.offsets.tolist()):
+            yield code, tuple(coords[offset:offset + ARITY[code]])
+
+    def to_points(self):
+        """Vertices as Points with bezier handles (same shape as SVGPathParser.to_points)."""
+        from .services import Point
+
+        points = []
+        for code, values in self.commands():
+            if code == CUBIC:
+                c1x, c1y, c2x, c2y, x, y = values
+                if points:
+                    points[-1].handle_out = (c1x - points[-1].x, c1y - points[-1].y)
+                points.append(Point(x=x, y=y, handle_in=(c2x - x, c2y - y), point_type='smooth'))
+            elif code != CLOSE:
+                points.append(Point(x=values[0], y=values[1], point_type='corner'))
+        return points
+
+    def subpaths(self) -> List[Tuple[np.ndarray, bool]]:
+        """On-curve vertices of each subpath with whether it is closed."""
+        result = []
+        start = 0
+        count = 0
+        for code in self.codes.tolist():
+            if code == MOVE:
+                if count > start:
+                    result.append((self.vertices[start:count], False))
+                start = count
+                count += 1
+            elif code == CLOSE:
+                if count > start:
+                    result.append((self.vertices[start:count], True))
+                start = count
+            else:
+                count += 1
+        if count > start:
+            result.append((self.vertices[start:count], False))
+        return result
+
+
+_FORMATS = ('M%s %s', 'L%s %s', 'C%s %s %s %s %s %s', 'Z')
+_TRAILING_ZEROS_RE = re.compile(r'\.?0+(?=[ MLCZ]|$)')
+
+
+def format_commands(codes, coords, precision: int = 3) -> str:
+    """
+    Path data for normalized ``codes`` and their flat ``coords``, formatted
+    like ``SVGPathParser.generate`` (fixed precision, trailing zeros cut).
+    """
+    number = f'%.{precision}f'
+    templates = [template.replace('%s', number) for template in _FORMATS]
+    template = ''.join([templates[code] for code in np.asarray(codes).tolist()])
+    text = template % tuple(np.asarray(coords, dtype=np.float64).tolist())
+    return _TRAILING_ZEROS_RE.sub('', text) if precision else text
+
+
+class _PathCompiler:
+    """Single pass from SVG path data to CompiledPath."""
+
+    def __init__(self):
+        self.codes: List[int] = []
+        self.coords: List[float] = []
+        self.x = self.y = 0.0
+        self.start_x = self.start_y = 0.0
+        self.open_subpath = False
+        # Reflection sources for S and T
+        self.last_cubic: Optional[Tuple[float, float]] = None
+        self.last_quad: Optional[Tuple[float, float]] = None
+
+    def compile(self, path_data: str) -> CompiledPath:
+        for letter, params in _COMMAND_RE.findall(path_data):
+            command = letter.upper()
+            relative = letter != command
+            if command == 'Z':
+                self.close()
+                continue
+            numbers = [float(n) for n in _NUMBER_RE.findall(params)]
+            arity = _SVG_ARITY[command]
+            for i in range(0, len(numbers) - arity + 1, arity):
+                self.apply(command, relative, numbers[i:i + arity])
+                if command == 'M':
+                    # Extra coordinate pairs after a moveto are linetos
+                    command = 'L'
+        return CompiledPath(self.codes, self.coords)
+
+    def emit(self, code, values, cubic_ctrl=None, quad_ctrl=None):
+        if code != MOVE and not self.open_subpath:
+            # Drawing after Z continues from the subpath start
+            self.codes.append(MOVE)
+            self.coords.extend((self.x, self.y))
+        self.open_subpath = True
+        self.codes.append(code)
+        self.coords.extend(values)
+        self.x, self.y = values[-2], values[-1]
+        self.last_cubic = cubic_ctrl
+        self.last_quad = quad_ctrl
+
+    def close(self):
+        if self.open_subpath:
+            self.codes.append(CLOSE)
+        self.open_subpath = False
+        self.x, self.y = self.start_x, self.start_y
+        self.last_cubic = self.last_quad = None
+
+    def apply(self, command, relative, p):
+        dx, dy = (self.x, self.y) if relative else (0.0, 0.0)
+        if command == 'M':
+            x, y = p[0] + dx, p[1] + dy
+            self.emit(MOVE, (x, y))
+            self.start_x, self.start_y = x, y
+        elif command == 'L':
+            self.emit(LINE, (p[0] + dx, p[1] + dy))
+        elif command == 'H':
+            self.emit(LINE, (p[0] + dx, self.y))
+        elif command == 'V':
+            self.emit(LINE, (self.x, p[0] + dy))
+        elif command == 'C':
+            c2 = (p[2] + dx, p[3] + dy)
+            self.emit(CUBIC, (p[0] + dx, p[1] + dy) + c2 + (p[4] + dx, p[5] + dy), cubic_ctrl=c2)
+        elif command == 'S':
+            c1 = self.reflect(self.last_cubic)
+            c2 = (p[0] + dx, p[1] + dy)
+            self.emit(CUBIC, c1 + c2 + (p[2] + dx, p[3] + dy), cubic_ctrl=c2)
+        elif command == 'Q':
+            self.quad((p[0] + dx, p[1] + dy), (p[2] + dx, p[3] + dy))
+        elif command == 'T':
+            self.quad(self.reflect(self.last_quad), (p[0] + dx, p[1] + dy))
+        elif command == 'A':
+            end = (p[5] + dx, p[6] + dy)
+            cubics = arc_to_cubics((self.x, self.y), p[0], p[1], p[2], p[3] != 0, p[4] != 0, end)
+            if not cubics:
+                self.emit(LINE, end)
+            for cubic in cubics:
+                self.emit(CUBIC, cubic)
+
+    def reflect(self, control):
+        if control is None:
+            return (self.x, self.y)
+        return (2 * self.x - control[0], 2 * self.y - control[1])
+
+    def quad(self, control, end):
+        # Degree elevation: the cubic traces the same curve
+        x0, y0 = self.x, self.y
+        c1 = (x0 + 2 / 3 * (control[0] - x0), y0 + 2 / 3 * (control[1] - y0))
+        c2 = (end[0] + 2 / 3 * (control[0] - end[0]), end[1] + 2 / 3 * (control[1] - end[1]))
+        self.emit(CUBIC, c1 + c2 + end, quad_ctrl=control)
+
+
+def arc_to_cubics(start, rx, ry, rotation, large_arc, sweep, end):
+    """
+    SVG elliptical arc (endpoint parameterization) as cubic segments of
+    at most 90 degrees each.  Returns [] for a degenerate arc.
+    """
+    x1, y1 = start
+    x2, y2 = end
+    if (x1 == x2 and y1 == y2) or rx == 0 or ry == 0:
+        return []
+    rx, ry = abs(rx), abs(ry)
+    phi = math.radians(rotation % 360)
+    cos_phi, sin_phi = math.cos(phi), math.sin(phi)
+
+    # Center parameterization (SVG implementation notes, F.6.5)
+    hx, hy = (x1 - x2) / 2, (y1 - y2) / 2
+    x1p = cos_phi * hx + sin_phi * hy
+    y1p = -sin_phi * hx + cos_phi * hy
+    scale = (x1p / rx) ** 2 + (y1p / ry) ** 2
+    if scale > 1:
+        rx, ry = rx * math.sqrt(scale), ry * math.sqrt(scale)
+    num = rx * rx * ry * ry - rx * rx * y1p * y1p - ry * ry * x1p * x1p
+    den = rx * rx * y1p * y1p + ry * ry * x1p * x1p
+    coef = math.sqrt(max(0.0, num / den)) if den else 0.0
+    if large_arc == sweep:
+        coef = -coef
+    cxp, cyp = coef * rx * y1p / ry, -coef * ry * x1p / rx
+    cx = cos_phi * cxp - sin_phi * cyp + (x1 + x2) / 2
+    cy = sin_phi * cxp + cos_phi * cyp + (y1 + y2) / 2
+
+    theta1 = math.atan2((y1p - cyp) / ry, (x1p - cxp) / rx)
+    delta = math.atan2((-y1p - cyp) / ry, (-x1p - cxp) / rx) - theta1
+    if sweep and delta < 0:
+        delta += 2 * math.pi
+    elif not sweep and delta > 0:
+        delta -= 2 * math.pi
+
+    count = max(1, math.ceil(abs(delta) / (math.pi / 2) - 1e-9))
+    step = delta / count
+    alpha = 4 / 3 * math.tan(step / 4)
+
+    def on_ellipse(angle):
+        ex, ey = rx * math.cos(angle), ry * math.sin(angle)
+        return cx + cos_phi * ex - sin_phi * ey, cy + sin_phi * ex + cos_phi * ey
+
+    def tangent(angle):
+        tx, ty = -rx * math.sin(angle), ry * math.cos(angle)
+        return cos_phi * tx - sin_phi * ty, sin_phi * tx + cos_phi * ty
+
+    cubics = []
+    angle = theta1
+    p0 = (x1, y1)
+    for i in range(count):
+        next_angle = angle + step
+        p3 = end if i == count - 1 else on_ellipse(next_angle)
+        t0, t1 = tangent(angle), tangent(next_angle)
+        cubics.append((
+            p0[0] + alpha * t0[0], p0[1] + alpha * t0[1],
+            p3[0] - alpha * t1[0], p3[1] - alpha * t1[1],
+            p3[0], p3[1],
+        ))
+        p0, angle = p3, next_angle
+    return cubics
+
+
+class PathCache:
+    """Thread-safe LRU of compiled paths keyed by path string."""
+
+    def __init__(self, maxsize: int = PATH_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: 'OrderedDict[str, CompiledPath]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path_data: str) -> CompiledPath:
+        with self._lock:
+            compiled = self._entries.get(path_data)
+            if compiled is not None:
+                self._entries.move_to_end(path_data)
+                self.hits += 1
+                return compiled
+            self.misses += 1
+
+        compiled = _PathCompiler().compile(path_data)
+        with self._lock:
+            self._entries[path_data] = compiled
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return compiled
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+
+path_cache = PathCache()
+
+
+def compile_path(path_data: str) -> CompiledPath:
+    """The compiled form of ``path_data`` (memoized)."""
+    return path_cache.get(path_data or '')
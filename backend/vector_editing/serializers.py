@@ -5,6 +5,7 @@ REST API serializers for vector editing models.
 """
 
 from rest_framework import serializers
+from .curves import MAX_CHORDS_PER_CURVE
 from .models import (
     VectorPath, PathPoint, BooleanOperation, PathOffset,
     VectorPattern, VectorShape, PenToolSession
@@ -137,6 +138,15 @@ class BooleanOperationRequestSerializer(serializers.Serializer):
         min_length=2,
         help_text='List of path UUIDs to operate on'
     )
+    tolerance = serializers.FloatField(
+        default=0.1,
+        min_value=0.001,
+        help_text='Maximum distance between curves and their flattened outline'
+    )
+    refit_curves = serializers.BooleanField(
+        default=False,
+        help_text='Fit cubic curves back onto the clipped outline'
+    )
     
     def validate_path_ids(self, value):
         if len(value) < 2:
@@ -144,6 +154,23 @@ class BooleanOperationRequestSerializer(serializers.Serializer):
         return value
 
 
+class FlattenBeziersRequestSerializer(serializers.Serializer):
+    """Serializer for bezier flattening requests."""
+    
+    segments_per_curve = serializers.IntegerField(
+        default=10,
+        min_value=1,
+        max_value=MAX_CHORDS_PER_CURVE,
+        help_text='Line segments per curve when no tolerance is given'
+    )
+    tolerance = serializers.FloatField(
+        required=False,
+        allow_null=True,
+        min_value=0.001,
+        help_text='Maximum distance between curves and their line segments'
+    )
+
+
 class PathOffsetSerializer(serializers.ModelSerializer):
     """Serializer for path offset operations."""
     
@@ -14,6 +14,9 @@ from typing import List, Dict, Any, Tuple, Optional
 from dataclasses import dataclass
 import re
 
+from . import clipping, curves
+from .path_ir import compile_path, format_commands
+
 
 @dataclass
 class Point:
@@ -175,6 +178,8 @@ class SVGPathParser:
     """Parse and generate SVG path data."""
     
     COMMANDS = 'MmZzLlHhVvCcSsQqTtAa'
+    COMMAND_RE = re.compile(f'([{COMMANDS}])([^{COMMANDS}]*)')
+    NUMBER_RE = re.compile(r'-?\d*\.?\d+(?:e[+-]?\d+)?')
     
     @staticmethod
     def parse(path_data: str) -> List[Dict[str, Any]]:
@@ -182,16 +187,16 @@ class SVGPathParser:
         Parse SVG path data string into command list.
         
         Returns list of dicts with 'command' and 'params' keys.
+        Vector operations use the cached ``compile_path`` form instead.
         """
         commands = []
         
         # Split into command + parameters
-        pattern = f'([{SVGPathParser.COMMANDS}])([^{SVGPathParser.COMMANDS}]*)'
-        matches = re.findall(pattern, path_data)
+        matches = SVGPathParser.COMMAND_RE.findall(path_data)
         
         for command, params_str in matches:
             # Parse parameters
-            params = [float(p) for p in re.findall(r'-?\d*\.?\d+(?:e[+-]?\d+)?', params_str)]
+            params = [float(p) for p in SVGPathParser.NUMBER_RE.findall(params_str)]
             commands.append({
                 'command': command,
                 'params': params
@@ -397,19 +402,8 @@ class BooleanOperations:
     @staticmethod
     def path_to_polygon(path_data: str) -> List[Tuple[int, int]]:
         """Convert SVG path to polygon (list of integer points)."""
-        commands = SVGPathParser.parse(path_data)
-        commands = SVGPathParser.to_absolute(commands)
-        points = SVGPathParser.to_points(commands)
-        
-        # Flatten bezier curves to line segments
-        polygon = []
-        for point in points:
-            polygon.append((
-                int(point.x * BooleanOperations.SCALE),
-                int(point.y * BooleanOperations.SCALE)
-            ))
-        
-        return polygon
+        vertices = compile_path(path_data).vertices * BooleanOperations.SCALE
+        return [(int(x), int(y)) for x, y in vertices.tolist()]
     
     @staticmethod
     def polygon_to_path(polygon: List[Tuple[int, int]]) -> str:
@@ -436,120 +430,46 @@ class BooleanOperations:
         return SVGPathParser.generate(commands)
     
     @staticmethod
-    def union(paths: List[str]) -> str:
+    def union(paths: List[str], tolerance: float = clipping.DEFAULT_TOLERANCE,
+              refit: bool = False, fill_rule: str = 'nonzero') -> str:
         """
         Combine multiple paths into one.
         
-        This is a simplified implementation. In production,
-        use a proper polygon clipping library like pyclipper.
+        All paths are merged in one pass; paths that overlap no other
+        path are kept as they are. See ``vector_editing.clipping``.
         """
-        # For production, integrate with pyclipper library
-        # This is a placeholder that concatenates paths
-        combined_commands = []
-        
-        for path in paths:
-            commands = SVGPathParser.parse(path)
-            combined_commands.extend(commands)
-        
-        return SVGPathParser.generate(combined_commands)
+        return clipping.union(paths, tolerance, refit, fill_rule)
     
     @staticmethod
-    def subtract(path1: str, path2: str) -> str:
+    def subtract(path1: str, path2: str, tolerance: float = clipping.DEFAULT_TOLERANCE,
+                 refit: bool = False, fill_rule: str = 'nonzero') -> str:
         """
         Subtract path2 from path1.
 
         Returns the area of path1 that doesn't overlap with path2.
-        Uses pyclipper if available, otherwise raises NotImplementedError.
+        Raises NotImplementedError if pyclipper is not installed.
         """
-        try:
-            import pyclipper
-        except ImportError:
-            raise NotImplementedError(
-                'Boolean subtract requires the pyclipper library. '
-                'Install it with: pip install pyclipper'
-            )
-
-        subj = BooleanOperations._path_to_polygon(path1)
-        clip = BooleanOperations._path_to_polygon(path2)
-
-        pc = pyclipper.Pyclipper()
-        pc.AddPath(subj, pyclipper.PT_SUBJECT, True)
-        pc.AddPath(clip, pyclipper.PT_CLIP, True)
-        solution = pc.Execute(pyclipper.CT_DIFFERENCE, pyclipper.PFT_NONZERO)
-        return BooleanOperations._polygon_to_path(solution)
+        return clipping.subtract(path1, [path2], tolerance, refit, fill_rule)
 
     @staticmethod
-    def intersect(path1: str, path2: str) -> str:
+    def intersect(path1: str, path2: str, tolerance: float = clipping.DEFAULT_TOLERANCE,
+                  refit: bool = False, fill_rule: str = 'nonzero') -> str:
         """
         Return only the overlapping area of two paths.
 
-        Uses pyclipper if available, otherwise raises NotImplementedError.
+        Raises NotImplementedError if pyclipper is not installed.
         """
-        try:
-            import pyclipper
-        except ImportError:
-            raise NotImplementedError(
-                'Boolean intersect requires the pyclipper library. '
-                'Install it with: pip install pyclipper'
-            )
-
-        subj = BooleanOperations._path_to_polygon(path1)
-        clip = BooleanOperations._path_to_polygon(path2)
-
-        pc = pyclipper.Pyclipper()
-        pc.AddPath(subj, pyclipper.PT_SUBJECT, True)
-        pc.AddPath(clip, pyclipper.PT_CLIP, True)
-        solution = pc.Execute(pyclipper.CT_INTERSECTION, pyclipper.PFT_NONZERO)
-        return BooleanOperations._polygon_to_path(solution)
+        return clipping.intersect(path1, path2, tolerance, refit, fill_rule)
 
     @staticmethod
-    def exclude(path1: str, path2: str) -> str:
+    def exclude(path1: str, path2: str, tolerance: float = clipping.DEFAULT_TOLERANCE,
+                refit: bool = False, fill_rule: str = 'nonzero') -> str:
         """
         XOR operation - return areas that don't overlap.
 
-        Uses pyclipper if available, otherwise raises NotImplementedError.
+        Raises NotImplementedError if pyclipper is not installed.
         """
-        try:
-            import pyclipper
-        except ImportError:
-            raise NotImplementedError(
-                'Boolean exclude requires the pyclipper library. '
-                'Install it with: pip install pyclipper'
-            )
-
-        subj = BooleanOperations._path_to_polygon(path1)
-        clip = BooleanOperations._path_to_polygon(path2)
-
-        pc = pyclipper.Pyclipper()
-        pc.AddPath(subj, pyclipper.PT_SUBJECT, True)
-        pc.AddPath(clip, pyclipper.PT_CLIP, True)
-        solution = pc.Execute(pyclipper.CT_XOR, pyclipper.PFT_NONZERO)
-        return BooleanOperations._polygon_to_path(solution)
-
-    @staticmethod
-    def _path_to_polygon(path_data: str) -> list:
-        """Convert SVG path to a pyclipper-compatible polygon (list of [x,y] int pairs)."""
-        SCALE = 1000  # pyclipper uses int coords
-        commands = SVGPathParser.parse(path_data)
-        points = []
-        for cmd in commands:
-            if cmd['command'] in ('M', 'L') and len(cmd['params']) >= 2:
-                points.append([int(cmd['params'][0] * SCALE), int(cmd['params'][1] * SCALE)])
-        return points
-
-    @staticmethod
-    def _polygon_to_path(solution: list) -> str:
-        """Convert pyclipper solution polygons back to SVG path string."""
-        SCALE = 1000
-        if not solution:
-            return ''
-        commands = []
-        for polygon in solution:
-            for i, pt in enumerate(polygon):
-                cmd = 'M' if i == 0 else 'L'
-                commands.append({'command': cmd, 'params': [pt[0] / SCALE, pt[1] / SCALE]})
-            commands.append({'command': 'Z', 'params': []})
-        return SVGPathParser.generate(commands)
+        return clipping.exclude(path1, path2, tolerance, refit, fill_rule)
 
 
 class PathOffset:
@@ -572,9 +492,7 @@ class PathOffset:
         Returns:
             New SVG path data string
         """
-        commands = SVGPathParser.parse(path_data)
-        commands = SVGPathParser.to_absolute(commands)
-        points = SVGPathParser.to_points(commands)
+        points = compile_path(path_data).to_points()
         
         if len(points) < 2:
             return path_data
@@ -660,10 +578,6 @@ class PathOffset:
         outer = PathOffset.offset_path(path_data, half_width, join)
         inner = PathOffset.offset_path(path_data, -half_width, join)
         
-        # Reverse inner path
-        inner_commands = SVGPathParser.parse(inner)
-        inner_commands = SVGPathParser.to_absolute(inner_commands)
-        
         # Combine into compound path
         # In production, properly handle caps and joins
         combined = outer + ' ' + inner
@@ -761,9 +675,7 @@ class CornerRounding:
         Returns:
             New path data with rounded corners
         """
-        commands = SVGPathParser.parse(path_data)
-        commands = SVGPathParser.to_absolute(commands)
-        points = SVGPathParser.to_points(commands)
+        points = compile_path(path_data).to_points()
         
         if len(points) < 3:
             return path_data
@@ -970,15 +882,13 @@ class VectorService:
         Simplify a path by removing unnecessary points.
         Uses Ramer-Douglas-Peucker algorithm.
         """
-        commands = SVGPathParser.parse(path_data)
-        commands = SVGPathParser.to_absolute(commands)
-        points = SVGPathParser.to_points(commands)
+        vertices = compile_path(path_data).vertices
         
-        if len(points) < 3:
+        if len(vertices) < 3:
             return path_data
         
         # Flatten to simple points for simplification
-        simple_points = [(p.x, p.y) for p in points]
+        simple_points = [tuple(p) for p in vertices.tolist()]
         simplified = VectorService._rdp_simplify(simple_points, tolerance)
         
         # Rebuild path
@@ -1037,85 +947,27 @@ class VectorService:
         return VectorMath.distance(point, (closest_x, closest_y))
     
     @staticmethod
-    def flatten_beziers(path_data: str, segments_per_curve: int = 10) -> str:
+    def flatten_beziers(path_data: str, segments_per_curve: int = 10,
+                        tolerance: Optional[float] = None) -> str:
         """
         Convert all bezier curves to line segments.
         Useful for boolean operations and exports.
-        """
-        commands = SVGPathParser.parse(path_data)
-        commands = SVGPathParser.to_absolute(commands)
-        
-        new_commands = []
-        current_x, current_y = 0, 0
         
-        for cmd in commands:
-            command = cmd['command']
-            params = cmd['params']
-            
-            if command == 'M':
-                new_commands.append(cmd)
-                current_x, current_y = params[0], params[1]
-                
-            elif command == 'L':
-                new_commands.append(cmd)
-                current_x, current_y = params[0], params[1]
-                
-            elif command == 'C':
-                # Flatten cubic bezier
-                p0 = (current_x, current_y)
-                p1 = (params[0], params[1])
-                p2 = (params[2], params[3])
-                p3 = (params[4], params[5])
-                
-                for i in range(1, segments_per_curve + 1):
-                    t = i / segments_per_curve
-                    point = VectorMath.bezier_point(p0, p1, p2, p3, t)
-                    new_commands.append({
-                        'command': 'L',
-                        'params': [point[0], point[1]]
-                    })
-                
-                current_x, current_y = params[4], params[5]
-                
-            elif command == 'Q':
-                # Flatten quadratic bezier
-                p0 = (current_x, current_y)
-                p1 = (params[0], params[1])
-                p2 = (params[2], params[3])
-                
-                for i in range(1, segments_per_curve + 1):
-                    t = i / segments_per_curve
-                    mt = 1 - t
-                    point = (
-                        mt * mt * p0[0] + 2 * mt * t * p1[0] + t * t * p2[0],
-                        mt * mt * p0[1] + 2 * mt * t * p1[1] + t * t * p2[1]
-                    )
-                    new_commands.append({
-                        'command': 'L',
-                        'params': [point[0], point[1]]
-                    })
-                
-                current_x, current_y = params[2], params[3]
-                
-            elif command == 'Z':
-                new_commands.append(cmd)
-        
-        return SVGPathParser.generate(new_commands)
+        With ``tolerance`` each curve gets just enough segments to stay
+        within that distance of it, instead of ``segments_per_curve``.
+        """
+        codes, coords = curves.flatten(compile_path(path_data), segments_per_curve, tolerance)
+        return format_commands(codes, coords)
     
     @staticmethod
     def get_path_bounds(path_data: str) -> Dict[str, float]:
-        """Calculate bounding box of a path."""
-        commands = SVGPathParser.parse(path_data)
-        commands = SVGPathParser.to_absolute(commands)
-        points = SVGPathParser.to_points(commands)
+        """Calculate bounding box of a path, including curve extrema."""
+        bounds = curves.bounds(compile_path(path_data))
         
-        if not points:
+        if bounds is None:
             return {'x': 0, 'y': 0, 'width': 0, 'height': 0}
         
-        min_x = min(p.x for p in points)
-        min_y = min(p.y for p in points)
-        max_x = max(p.x for p in points)
-        max_y = max(p.y for p in points)
+        min_x, min_y, max_x, max_y = bounds
         
         return {
             'x': min_x,
@@ -1127,62 +979,12 @@ class VectorService:
     @staticmethod
     def get_path_length(path_data: str) -> float:
         """Calculate total length of a path."""
-        commands = SVGPathParser.parse(path_data)
-        commands = SVGPathParser.to_absolute(commands)
-        
-        total_length = 0
-        current_x, current_y = 0, 0
-        start_x, start_y = 0, 0
-        
-        for cmd in commands:
-            command = cmd['command']
-            params = cmd['params']
-            
-            if command == 'M':
-                current_x, current_y = params[0], params[1]
-                start_x, start_y = current_x, current_y
-                
-            elif command == 'L':
-                length = VectorMath.distance(
-                    (current_x, current_y),
-                    (params[0], params[1])
-                )
-                total_length += length
-                current_x, current_y = params[0], params[1]
-                
-            elif command == 'C':
-                # Approximate bezier length
-                p0 = (current_x, current_y)
-                p1 = (params[0], params[1])
-                p2 = (params[2], params[3])
-                p3 = (params[4], params[5])
-                
-                # Sample points along curve
-                prev = p0
-                for i in range(1, 21):
-                    t = i / 20
-                    point = VectorMath.bezier_point(p0, p1, p2, p3, t)
-                    total_length += VectorMath.distance(prev, point)
-                    prev = point
-                
-                current_x, current_y = params[4], params[5]
-                
-            elif command == 'Z':
-                length = VectorMath.distance(
-                    (current_x, current_y),
-                    (start_x, start_y)
-                )
-                total_length += length
-                current_x, current_y = start_x, start_y
-        
-        return total_length
+        return curves.path_length(compile_path(path_data))
     
     @staticmethod
     def reverse_path(path_data: str) -> str:
         """Reverse the direction of a path."""
-        commands = SVGPathParser.parse(path_data)
-        commands = SVGPathParser.to_absolute(commands)
-        points = SVGPathParser.to_points(commands)
+        points = compile_path(path_data).to_points()
         
         if not points:
             return path_data
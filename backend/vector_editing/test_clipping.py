@@ -0,0 +1,118 @@
+"""
+Unit tests for the clipping-backed boolean operations.
+"""
+import math
+
+import numpy as np
+import pytest
+
+from vector_editing import clipping, curves
+from vector_editing.path_ir import CLOSE, CUBIC, compile_path, format_commands
+from vector_editing.services import BooleanOperations
+
+SQUARE = 'M0 0H10V10H0Z'
+SHIFTED = 'M5 5H15V15H5Z'
+FAR = 'M100 100C110 100 110 110 100 110Z'
+
+
+def circle(cx, cy, r):
+    return f'M{cx - r} {cy}A{r} {r} 0 1 1 {cx + r} {cy}A{r} {r} 0 1 1 {cx - r} {cy}Z'
+
+
+def area(path_data):
+    """Signed shoelace area summed over subpaths (holes count negative)."""
+    codes, coords = curves.flatten(compile_path(path_data), tolerance=0.001)
+    points = coords.reshape(-1, 2)
+    total = 0.0
+    ring_sizes = np.diff(np.flatnonzero(np.append(codes[codes != CLOSE] == 0, True)))
+    for ring in np.split(points, np.cumsum(ring_sizes)[:-1]):
+        x, y = ring[:, 0], ring[:, 1]
+        total += (np.dot(x, np.roll(y, -1)) - np.dot(y, np.roll(x, -1))) / 2
+    return abs(total)
+
+
+@pytest.mark.unit
+class TestOverlapGroups:
+
+    def test_groups_connected_boxes(self):
+        boxes = [(0, 0, 10, 10), (50, 50, 60, 60), (8, 8, 20, 20), (19, 0, 30, 9), (100, 0, 110, 10)]
+        groups = sorted(sorted(group) for group in clipping.overlap_groups(boxes))
+        assert groups == [[0, 2, 3], [1], [4]]
+
+    def test_touching_boxes_merge(self):
+        assert len(clipping.overlap_groups([(0, 0, 10, 10), (10, 0, 20, 10)])) == 1
+
+
+@pytest.mark.unit
+class TestBooleanOperations:
+
+    def test_union_merges_overlaps(self):
+        result = BooleanOperations.union([SQUARE, SHIFTED])
+        assert area(result) == pytest.approx(175)
+        assert result.count('M') == 1
+
+    def test_union_passes_isolated_paths_through(self):
+        result = BooleanOperations.union([SQUARE, FAR, SHIFTED])
+        assert result.endswith(FAR)
+        assert result.count('M') == 2
+
+    def test_union_of_many_in_one_pass(self):
+        row = [f'M{i * 8} 0h10v10h-10Z' for i in range(50)]
+        result = BooleanOperations.union(row)
+        assert result.count('M') == 1
+        assert area(result) == pytest.approx(49 * 8 * 10 + 100)
+
+    def test_subtract(self):
+        assert area(BooleanOperations.subtract(SQUARE, SHIFTED)) == pytest.approx(75)
+        assert BooleanOperations.subtract(SQUARE, FAR) == SQUARE
+
+    def test_subtract_several_cutters(self):
+        holes = ['M1 1h2v2h-2Z', 'M6 6h2v2h-2Z', FAR]
+        assert area(clipping.subtract(SQUARE, holes)) == pytest.approx(92)
+
+    def test_intersect(self):
+        assert area(BooleanOperations.intersect(SQUARE, SHIFTED)) == pytest.approx(25)
+        assert BooleanOperations.intersect(SQUARE, FAR) == ''
+
+    def test_exclude(self):
+        assert area(BooleanOperations.exclude(SQUARE, SHIFTED)) == pytest.approx(150)
+        assert BooleanOperations.exclude(SQUARE, FAR) == SQUARE + FAR
+
+    def test_curves_are_flattened_within_tolerance(self):
+        result = BooleanOperations.intersect(circle(0, 0, 50), 'M0 -60H60V60H0Z', tolerance=0.01)
+        assert area(result) == pytest.approx(math.pi * 50 * 50 / 2, rel=1e-3)
+
+    def test_refit_restores_curves(self):
+        paths = [circle(0, 0, 50), circle(60, 0, 50)]
+        polygon = BooleanOperations.union(paths)
+        refitted = BooleanOperations.union(paths, refit=True)
+        assert CUBIC in compile_path(refitted).codes
+        assert len(refitted) < len(polygon)
+        assert area(refitted) == pytest.approx(area(polygon), rel=2e-3)
+
+    def test_missing_pyclipper(self, monkeypatch):
+        monkeypatch.setattr(clipping, 'PYCLIPPER_AVAILABLE', False)
+        with pytest.raises(NotImplementedError):
+            BooleanOperations.union([SQUARE, SHIFTED])
+        # Disjoint operands never reach Clipper
+        assert BooleanOperations.intersect(SQUARE, FAR) == ''
+
+
+@pytest.mark.unit
+class TestFitCubics:
+
+    def test_polygon_corners_stay_lines(self):
+        codes, coords = curves.fit_cubics([[0, 0], [5, 0], [10, 0], [10, 10], [0, 10]], 0.1)
+        assert codes == [0, 1, 1, 1, CLOSE]
+        assert coords == [0, 0, 10, 0, 10, 10, 0, 10]
+
+    def test_smooth_ring_fits_within_tolerance(self):
+        angles = np.linspace(0, 2 * math.pi, 90, endpoint=False)
+        ring = np.stack([50 * np.cos(angles), 50 * np.sin(angles)], axis=1)
+        codes, coords = curves.fit_cubics(ring, 0.05)
+        assert set(codes[1:-1]) == {CUBIC}
+        assert len(codes) <= 10
+
+        fitted = curves.segments(compile_path(format_commands(codes, coords, precision=6))).points
+        samples = curves.evaluate(fitted, np.linspace(0, 1, 50)).reshape(-1, 2)
+        assert np.abs(np.hypot(samples[:, 0], samples[:, 1]) - 50).max() < 0.2
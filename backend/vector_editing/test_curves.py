@@ -0,0 +1,119 @@
+"""
+Unit tests for the vectorized curve kernel.
+"""
+import math
+
+import numpy as np
+import pytest
+
+from vector_editing import curves
+from vector_editing.path_ir import CLOSE, CUBIC, LINE, compile_path, format_commands
+from vector_editing.serializers import FlattenBeziersRequestSerializer
+from vector_editing.services import SVGPathParser, VectorMath, VectorService
+
+LOOP = 'M0 0 C100 200 -50 300 200 0 C300 -100 0 -50 40 40Z'
+
+
+def dense_reference(path_data, samples=20001):
+    points = curves.segments(compile_path(path_data)).points
+    dense = curves.evaluate(points, np.linspace(0, 1, samples))
+    length = np.hypot(*np.diff(dense, axis=1).transpose(2, 0, 1)).sum()
+    flat = dense.reshape(-1, 2)
+    return (*flat.min(axis=0), *flat.max(axis=0)), length
+
+
+@pytest.mark.unit
+class TestSegments:
+
+    def test_lines_cubics_and_closing_line(self):
+        segs = curves.segments(compile_path('M0 0L30 0C30 10 20 20 10 20Z'))
+        assert segs.codes.tolist() == [LINE, CUBIC, CLOSE]
+        assert segs.points[0].tolist() == [[0, 0], [10, 0], [20, 0], [30, 0]]
+        assert segs.points[1].tolist() == [[30, 0], [30, 10], [20, 20], [10, 20]]
+        assert segs.points[2, 3].tolist() == [0, 0]
+
+    def test_evaluate_matches_scalar_bezier(self):
+        points = curves.segments(compile_path(LOOP)).points
+        t = np.array([0.0, 0.3, 0.75, 1.0])
+        values = curves.evaluate(points, t)
+        for i, p in enumerate(points.tolist()):
+            for j, tj in enumerate(t):
+                assert values[i, j].tolist() == pytest.approx(VectorMath.bezier_point(*p, tj))
+
+
+@pytest.mark.unit
+class TestBoundsAndLength:
+
+    def test_bounds_use_curve_extrema(self):
+        # Control points reach y=10, the curve only 7.5
+        assert VectorService.get_path_bounds('M0 0 C0 10 10 10 10 0') == {
+            'x': 0, 'y': 0, 'width': 10, 'height': 7.5,
+        }
+
+    def test_bounds_match_dense_sampling(self):
+        expected, _ = dense_reference(LOOP)
+        assert curves.bounds(compile_path(LOOP)) == pytest.approx(expected, abs=1e-6)
+        assert curves.bounds(compile_path('')) is None
+
+    def test_length_of_circle_and_loop(self):
+        circle = 'M0 50 A50 50 0 1 1 100 50 A50 50 0 1 1 0 50'
+        assert VectorService.get_path_length(circle) == pytest.approx(2 * math.pi * 50, rel=1e-3)
+
+        _, expected = dense_reference(LOOP)
+        assert VectorService.get_path_length(LOOP) == pytest.approx(expected, rel=1e-7)
+
+    def test_length_of_lines_is_exact(self):
+        assert VectorService.get_path_length('M0 0L30 0L30 40Z') == 120
+        assert VectorService.get_path_length('') == 0
+
+
+@pytest.mark.unit
+class TestFlatten:
+
+    def test_fixed_count_matches_scalar_sampling(self):
+        flattened = compile_path(VectorService.flatten_beziers('M0 0 C0 10 10 10 10 0L20 0Z', 4))
+        expected = [VectorMath.bezier_point((0, 0), (0, 10), (10, 10), (10, 0), i / 4) for i in range(5)]
+        assert flattened.codes.tolist() == [0, LINE, LINE, LINE, LINE, LINE, CLOSE]
+        assert np.allclose(flattened.vertices[:5], expected, atol=1e-3)
+        assert flattened.vertices[5].tolist() == [20, 0]
+
+    def test_tolerance_bounds_chord_error(self):
+        tolerance = 0.05
+        codes, coords = curves.flatten(compile_path(LOOP), tolerance=tolerance)
+        polyline = coords.reshape(-1, 2)
+        samples = curves.evaluate(curves.segments(compile_path(LOOP)).points[:2], np.linspace(0, 1, 2001))
+        for point in samples.reshape(-1, 2):
+            a, b = polyline[:-1], polyline[1:]
+            ab = b - a
+            t = np.clip(((point - a) * ab).sum(axis=1) / np.maximum((ab * ab).sum(axis=1), 1e-12), 0, 1)
+            nearest = np.hypot(*(a + ab * t[:, None] - point).T).min()
+            assert nearest <= tolerance
+
+    def test_tolerance_adapts_to_curvature(self):
+        gentle = curves.flatten(compile_path('M0 0 C10 1 20 1 30 0'), tolerance=0.1)[0]
+        sharp = curves.flatten(compile_path('M0 0 C0 100 30 100 30 0'), tolerance=0.1)[0]
+        assert len(gentle) < len(sharp)
+
+    def test_chord_count_is_capped(self):
+        codes, _ = curves.flatten(compile_path('M0 0 C0 1000 1000 1000 1000 0'), tolerance=1e-9)
+        assert len(codes) == curves.MAX_CHORDS_PER_CURVE + 1
+        with pytest.raises(ValueError):
+            curves.flatten(compile_path(LOOP), tolerance=-1)
+
+    def test_flatten_request_validation(self):
+        assert not FlattenBeziersRequestSerializer(data={'tolerance': -1}).is_valid()
+        assert not FlattenBeziersRequestSerializer(data={'tolerance': 'fine'}).is_valid()
+        assert not FlattenBeziersRequestSerializer(data={'segments_per_curve': 10 ** 6}).is_valid()
+        serializer = FlattenBeziersRequestSerializer(data={'tolerance': 0.5})
+        assert serializer.is_valid()
+        assert serializer.validated_data == {'segments_per_curve': 10, 'tolerance': 0.5}
+
+    def test_format_commands_matches_generate(self):
+        commands = [
+            {'command': 'M', 'params': [0, -0.5]},
+            {'command': 'C', 'params': [1.25, 100.1004, 3, 4.0006, 5, 6]},
+            {'command': 'Z', 'params': []},
+        ]
+        codes = [0, CUBIC, CLOSE]
+        coords = [0, -0.5, 1.25, 100.1004, 3, 4.0006, 5, 6]
+        assert format_commands(codes, coords) == SVGPathParser.generate(commands)
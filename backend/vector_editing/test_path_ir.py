@@ -0,0 +1,79 @@
+"""
+Unit tests for the compiled SVG path IR and the services built on it.
+"""
+import math
+
+import numpy as np
+import pytest
+
+from vector_editing.path_ir import CLOSE, CUBIC, LINE, MOVE, PathCache, compile_path
+from vector_editing.services import SVGPathParser, VectorService
+
+
+@pytest.mark.unit
+class TestCompiledPath:
+    """Parsing into absolute, normalized flat arrays."""
+
+    def test_relative_and_shorthand_commands(self):
+        compiled = compile_path('m10 10 h20 v10 l-5 5 -5 0 z')
+        assert compiled.codes.tolist() == [MOVE, LINE, LINE, LINE, LINE, CLOSE]
+        assert compiled.vertices.tolist() == [[10, 10], [30, 10], [30, 20], [25, 25], [20, 25]]
+
+    def test_implicit_lineto_after_moveto(self):
+        compiled = compile_path('M0 0 10 0 10 10Z')
+        assert compiled.codes.tolist() == [MOVE, LINE, LINE, CLOSE]
+
+    def test_smooth_and_quadratic_become_cubics(self):
+        compiled = compile_path('M0 0 C0 10 10 10 10 0 S20 -10 20 0 Q25 10 30 0 T40 0')
+        assert compiled.codes.tolist() == [MOVE, CUBIC, CUBIC, CUBIC, CUBIC]
+        commands = list(compiled.commands())
+        # S reflects the previous second control point
+        assert commands[2][1][:2] == (10.0, -10.0)
+        # Q is degree-elevated: control points at 2/3 toward the quad control
+        assert commands[3][1] == pytest.approx((20 + 10 / 3, 20 / 3, 30 - 10 / 3, 20 / 3, 30, 0))
+
+    def test_arc_becomes_cubics_on_the_circle(self):
+        compiled = compile_path('M0 0 A50 50 0 0 1 100 0')
+        assert compiled.codes.tolist() == [MOVE, CUBIC, CUBIC]
+        assert compiled.vertices[1].tolist() == pytest.approx([50, -50])
+        assert VectorService.get_path_length('M0 0 A50 50 0 0 1 100 0') == pytest.approx(math.pi * 50, rel=1e-3)
+
+    def test_arrays_are_shared_and_read_only(self):
+        first = compile_path('M0 0L5 5')
+        assert compile_path('M0 0L5 5') is first
+        with pytest.raises(ValueError):
+            first.coords[0] = 1
+
+        points = first.to_points()
+        points[0].x = 99
+        assert compile_path('M0 0L5 5').to_points()[0].x == 0
+
+    def test_cache_evicts_least_recently_used(self):
+        cache = PathCache(maxsize=2)
+        cache.get('M0 0L1 1')
+        cache.get('M0 0L2 2')
+        cache.get('M0 0L1 1')
+        cache.get('M0 0L3 3')
+        assert list(cache._entries) == ['M0 0L1 1', 'M0 0L3 3']
+        assert (cache.hits, cache.misses) == (1, 3)
+
+
+@pytest.mark.unit
+class TestServicesOnCompiledPaths:
+    """The services agree with the dict-based parser for absolute paths."""
+
+    PATH = 'M10 10L60 10C70 10 80 20 80 30L80 60L10 60Z'
+
+    def test_points_match_parser(self):
+        expected = SVGPathParser.to_points(SVGPathParser.to_absolute(SVGPathParser.parse(self.PATH)))
+        assert compile_path(self.PATH).to_points() == expected
+
+    def test_bounds_length_and_reverse(self):
+        assert VectorService.get_path_bounds(self.PATH) == {'x': 10, 'y': 10, 'width': 70, 'height': 50}
+        assert VectorService.get_path_length('M0 0L30 0L30 40Z') == pytest.approx(120)
+        assert VectorService.reverse_path('M0 0L10 0L10 10') == 'M10 10L10 0L0 0Z'
+
+    def test_flatten_handles_relative_curves(self):
+        flattened = VectorService.flatten_beziers('m0 0 c0 10 10 10 10 0', segments_per_curve=2)
+        assert flattened == 'M0 0L5 7.5L10 0'
+        assert np.allclose(compile_path(flattened).vertices[-1], [10, 0])
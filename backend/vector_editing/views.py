@@ -17,6 +17,7 @@ from .models import (
 from .serializers import (
     VectorPathSerializer, VectorPathCreateSerializer, VectorPathUpdateSerializer,
     PathPointSerializer, BooleanOperationSerializer, BooleanOperationRequestSerializer,
+    FlattenBeziersRequestSerializer,
     PathOffsetSerializer, PathOffsetRequestSerializer,
     VectorPatternSerializer, VectorShapeSerializer, PenToolSessionSerializer, PenToolPointSerializer,
     CornerRoundingSerializer, PathTransformSerializer, PathAlignSerializer, SVGImportSerializer, SVGExportSerializer
@@ -155,9 +156,15 @@ class VectorPathViewSet(viewsets.ModelViewSet):
     def flatten_beziers(self, request, pk=None):
         """Convert all bezier curves to line segments."""
         path = self.get_object()
-        segments = request.data.get('segments_per_curve', 10)
+        serializer = FlattenBeziersRequestSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         
-        flattened_data = VectorService.flatten_beziers(path.path_data, segments)
+        flattened_data = VectorService.flatten_beziers(
+            path.path_data,
+            serializer.validated_data['segments_per_curve'],
+            serializer.validated_data.get('tolerance'),
+        )
         path.path_data = flattened_data
         path.save()
         
@@ -274,20 +281,26 @@ class BooleanOperationView(APIView):
         # Get path data
         path_data_list = [p.path_data for p in paths]
         
+        first_path = paths.first()
+        options = {
+            'tolerance': data['tolerance'],
+            'refit': data['refit_curves'],
+            'fill_rule': first_path.fill_rule,
+        }
+        
         # Perform operation
         if operation_type == 'union':
-            result_data = BooleanOperations.union(path_data_list)
+            result_data = BooleanOperations.union(path_data_list, **options)
         elif operation_type == 'subtract':
-            result_data = BooleanOperations.subtract(path_data_list[0], path_data_list[1])
+            result_data = BooleanOperations.subtract(path_data_list[0], path_data_list[1], **options)
         elif operation_type == 'intersect':
-            result_data = BooleanOperations.intersect(path_data_list[0], path_data_list[1])
+            result_data = BooleanOperations.intersect(path_data_list[0], path_data_list[1], **options)
         elif operation_type == 'exclude':
-            result_data = BooleanOperations.exclude(path_data_list[0], path_data_list[1])
+            result_data = BooleanOperations.exclude(path_data_list[0], path_data_list[1], **options)
         else:
-            result_data = BooleanOperations.union(path_data_list)
+            result_data = BooleanOperations.union(path_data_list, **options)
         
         # Create result path
-        first_path = paths.first()
         result_path = VectorPath.objects.create(
             user=request.user,
             project=first_path.project,
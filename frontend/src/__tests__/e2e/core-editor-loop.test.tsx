@@ -11,7 +11,7 @@ import {
   ACCESS_TOKEN_KEY,
   LEGACY_AUTH_TOKEN_KEY,
 } from '@/lib/auth-token';
-import { nextSyncTimestamp, shouldApplyRemoteSync } from '@/lib/collab-sync';
+import { applyJsonPatch, nextSyncTimestamp, shouldApplyRemoteSync } from '@/lib/collab-sync';
 import { AdvancedCanvasRenderer } from '@/components/canvas/AdvancedCanvasRenderer';
 
 vi.mock('fabric', () => {
@@ -81,6 +81,22 @@ describe('Collab last-write-wins', () => {
     const b = nextSyncTimestamp(a);
     expect(b).toBeGreaterThanOrEqual(a);
   });
+
+  it('applies design patches without mutating the base', () => {
+    const base = {
+      background: '#fff',
+      objects: [{ id: 'a', left: 1 }, { id: 'b', left: 2 }],
+    };
+    const next = applyJsonPatch(base, [
+      { op: 'replace', path: '/objects/1/left', value: 5 },
+      { op: 'remove', path: '/objects/0' },
+      { op: 'add', path: '/objects/-', value: { id: 'c', left: 3 } },
+      { op: 'remove', path: '/background' },
+    ]);
+    expect(next).toEqual({ objects: [{ id: 'b', left: 5 }, { id: 'c', left: 3 }] });
+    expect(base.objects).toHaveLength(2);
+    expect(base.objects[1].left).toBe(2);
+  });
 });
 
 describe('AI → canvas rendering', () => {
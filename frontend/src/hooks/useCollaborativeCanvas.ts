@@ -4,7 +4,12 @@
  */
 import { useEffect, useRef, useState, useCallback } from 'react';
 import { getAccessToken } from '@/lib/auth-token';
-import { nextSyncTimestamp, shouldApplyRemoteSync } from '@/lib/collab-sync';
+import {
+  applyJsonPatch,
+  nextSyncTimestamp,
+  shouldApplyRemoteSync,
+  type JsonPatchOperation,
+} from '@/lib/collab-sync';
 
 export interface CollaborativeUser {
   user_id: number;
@@ -14,7 +19,7 @@ export interface CollaborativeUser {
 }
 
 export interface CanvasUpdate {
-  type: 'element_updated' | 'element_created' | 'element_deleted' | 'cursor_update' | 'selection_changed' | 'active_users' | 'user_joined' | 'user_left' | 'design_synced' | 'pong';
+  type: 'element_updated' | 'element_created' | 'element_deleted' | 'cursor_update' | 'selection_changed' | 'active_users' | 'user_joined' | 'user_left' | 'design_synced' | 'design_patch' | 'pong';
   user_id?: number;
   username?: string;
   element_id?: string;
@@ -24,6 +29,9 @@ export interface CanvasUpdate {
   selected_elements?: string[];
   users?: CollaborativeUser[];
   design_data?: Record<string, unknown>;
+  patch?: JsonPatchOperation[];
+  hash?: string;
+  base_hash?: string;
   timestamp?: number;
 }
 
@@ -61,8 +69,29 @@ export function useCollaborativeCanvas(projectId: number | null, token?: string
   const applyingRemoteRef = useRef(false);
   const lastSentSyncRef = useRef(0);
   const lastAppliedSyncRef = useRef(0);
+  // Last design sent or received; `design_patch` deltas apply to it
+  const lastDesignRef = useRef<Record<string, unknown> | null>(null);
 
   const handleMessage = useCallback((data: CanvasUpdate) => {
+    const applyRemoteDesign = (update: CanvasUpdate) => {
+      if (update.design_data) {
+        lastDesignRef.current = update.design_data;
+      }
+      if (
+        !shouldApplyRemoteSync(
+          update.timestamp,
+          lastAppliedSyncRef.current,
+          lastSentSyncRef.current,
+        )
+      ) {
+        return;
+      }
+      if (typeof update.timestamp === 'number') {
+        lastAppliedSyncRef.current = update.timestamp;
+      }
+      window.dispatchEvent(new CustomEvent('canvas-update', { detail: update }));
+    };
+
     switch (data.type) {
       case 'active_users':
         setActiveUsers(data.users || []);
@@ -93,23 +122,28 @@ export function useCollaborativeCanvas(projectId: number | null, token?: string
         ));
         break;
 
-      case 'design_synced': {
-        if (
-          !shouldApplyRemoteSync(
-            data.timestamp,
-            lastAppliedSyncRef.current,
-            lastSentSyncRef.current,
-          )
-        ) {
-          return;
+      case 'design_patch': {
+        let designData: Record<string, unknown> | null = null;
+        if (lastDesignRef.current && data.patch) {
+          try {
+            designData = applyJsonPatch(lastDesignRef.current, data.patch);
+          } catch (error) {
+            console.error('Failed to apply design patch:', error);
+          }
         }
-        if (typeof data.timestamp === 'number') {
-          lastAppliedSyncRef.current = data.timestamp;
+        if (!designData) {
+          lastDesignRef.current = null;
+          ws.current?.send(JSON.stringify({ action: 'design_resync' }));
+          return;
         }
-        window.dispatchEvent(new CustomEvent('canvas-update', { detail: data }));
+        applyRemoteDesign({ ...data, type: 'design_synced', design_data: designData, patch: undefined });
         break;
       }
 
+      case 'design_synced':
+        applyRemoteDesign(data);
+        break;
+
       case 'element_updated':
       case 'element_created':
       case 'element_deleted':
@@ -127,7 +161,7 @@ export function useCollaborativeCanvas(projectId: number | null, token?: string
       return;
     }
 
-    const wsUrl = `${resolveWsBaseUrl()}/ws/canvas/${projectId}/?token=${encodeURIComponent(authToken)}`;
+    const wsUrl = `${resolveWsBaseUrl()}/ws/canvas/${projectId}/?token=${encodeURIComponent(authToken)}&sync=patch`;
     ws.current = new WebSocket(wsUrl);
 
     ws.current.onopen = () => {
@@ -236,6 +270,7 @@ export function useCollaborativeCanvas(projectId: number | null, token?: string
     if (ws.current?.readyState === WebSocket.OPEN) {
       const timestamp = nextSyncTimestamp(lastSentSyncRef.current);
       lastSentSyncRef.current = timestamp;
+      lastDesignRef.current = designData;
       ws.current.send(JSON.stringify({
         action: 'design_sync',
         design_data: designData,
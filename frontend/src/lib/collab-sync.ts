@@ -19,3 +19,63 @@ export function nextSyncTimestamp(previous: number = 0): number {
   const now = Date.now();
   return now > previous ? now : previous + 1;
 }
+
+export interface JsonPatchOperation {
+  op: 'add' | 'remove' | 'replace';
+  path: string;
+  value?: unknown;
+}
+
+type JsonContainer = Record<string, unknown> | unknown[];
+
+function unescapeToken(token: string): string {
+  return token.replace(/~1/g, '/').replace(/~0/g, '~');
+}
+
+/**
+ * Apply RFC 6902 add/remove/replace operations (as sent in `design_patch`
+ * messages) without mutating `doc`: only containers along each path are
+ * copied. Throws if a path does not exist.
+ */
+export function applyJsonPatch<T>(doc: T, patch: JsonPatchOperation[]): T {
+  const copied = new Set<JsonContainer>();
+  const own = (container: JsonContainer): JsonContainer => {
+    if (copied.has(container)) return container;
+    const copy = Array.isArray(container) ? [...container] : { ...container };
+    copied.add(copy);
+    return copy;
+  };
+
+  let root: unknown = doc;
+  for (const operation of patch) {
+    if (operation.path === '') {
+      root = operation.value;
+      continue;
+    }
+    const tokens = operation.path.split('/').slice(1).map(unescapeToken);
+    root = own(root as JsonContainer);
+    let parent = root as JsonContainer;
+    for (const token of tokens.slice(0, -1)) {
+      const record = parent as Record<string, unknown>;
+      const child = record[token];
+      if (child === null || typeof child !== 'object') {
+        throw new Error(`Invalid patch path: ${operation.path}`);
+      }
+      record[token] = own(child as JsonContainer);
+      parent = record[token] as JsonContainer;
+    }
+
+    const last = tokens[tokens.length - 1];
+    if (Array.isArray(parent)) {
+      const index = last === '-' ? parent.length : Number(last);
+      if (operation.op === 'add') parent.splice(index, 0, operation.value);
+      else if (operation.op === 'remove') parent.splice(index, 1);
+      else parent[index] = operation.value;
+    } else if (operation.op === 'remove') {
+      delete parent[last];
+    } else {
+      parent[last] = operation.value;
+    }
+  }
+  return root as T;
+}